@@ -0,0 +1,211 @@
+"""
+Microbenchmark de los codecs del paquete `messages`.
+
+Mide el encode y el decode de cada tipo de mensaje con tamaños de payload representativos y
+reporta ns por ítem y MB/s. Los resultados se pueden guardar como baseline y comparar contra él:
+
+    python benchmarks/codecs_benchmark.py --save benchmarks/baselines/codecs.json
+    python benchmarks/codecs_benchmark.py --compare benchmarks/baselines/codecs.json
+
+Con `--compare`, el proceso termina con código 1 si algún caso es más lento que el baseline por
+encima de `--tolerance`.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from messages.games_msg import BasicGame, DimGame, GamesType, Genre, GenreGame, Q1Game, Q2Game  # noqa: E402
+from messages.messages import ClientData, Data, Dataset, ListMessage, MsgType, PushDataMessage, ResultMessage, SimpleMessage, decode_msg  # noqa: E402
+from messages.results_msg import Q1Result, Q2Result, Q3Result, Q4Result, Q5Result, QueryNumber  # noqa: E402
+from messages.reviews_msg import BasicReview, Review, ReviewCount, ReviewsType, Score, TextReview  # noqa: E402
+
+BATCH_SIZES = (10, 100, 1000)
+ROW_BLOCK_SIZES = (16 * 1024, 256 * 1024)
+STATE_SIZES = (1000, 50000)
+
+WORDS = "the game is really good and i love the story but the combat feels slow sometimes great graphics".split()
+
+
+def game_name(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+
+def review_text(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 80)))
+
+def games(games_type: GamesType, count: int, rng: random.Random) -> list:
+    app_ids = rng.sample(range(10, 3000000), count)
+    if games_type == GamesType.BASICGAME:
+        return [BasicGame(app_id, game_name(rng)) for app_id in app_ids]
+    if games_type == GamesType.Q1GAMES:
+        return [Q1Game(app_id, rng.random() < 0.99, rng.random() < 0.15, rng.random() < 0.2) for app_id in app_ids]
+    if games_type == GamesType.Q2GAMES:
+        return [Q2Game(app_id, game_name(rng), rng.randint(2000, 2024), rng.randint(0, 5000)) for app_id in app_ids]
+    if games_type == GamesType.GENREGAMES:
+        return [GenreGame(app_id, game_name(rng), rng.randint(2000, 2024), rng.randint(0, 5000), [Genre.INDIE, Genre.ACTION][:rng.randint(1, 2)]) for app_id in app_ids]
+    return [DimGame(app_id, game_name(rng), rng.randint(1, 3), rng.randint(2000, 2024), rng.randint(0, 5000)) for app_id in app_ids]
+
+def reviews(reviews_type: ReviewsType, count: int, rng: random.Random) -> list:
+    app_ids = [rng.randint(10, 3000000) for _ in range(count)]
+    if reviews_type == ReviewsType.FULLREVIEW:
+        return [Review(app_id, review_text(rng), rng.choice([Score.POSITIVE, Score.NEGATIVE])) for app_id in app_ids]
+    if reviews_type == ReviewsType.BASICREVIEW:
+        return [BasicReview(app_id) for app_id in app_ids]
+    if reviews_type == ReviewsType.TEXTREVIEW:
+        return [TextReview(app_id, review_text(rng)) for app_id in app_ids]
+    return [ReviewCount(app_id, rng.randint(1, 100000)) for app_id in app_ids]
+
+def row_block(size: int, rng: random.Random) -> bytes:
+    lines = []
+    total = 0
+    while total < size:
+        line = f'{rng.randint(10, 3000000)},"{game_name(rng)}","{review_text(rng)}",1,0'.encode()
+        lines.append(line)
+        total += len(line) + 1
+    return b'\n'.join(lines)[:size]
+
+
+def build_cases(rng: random.Random) -> List[Tuple[str, object, int]]:
+    """
+    Devuelve `(nombre, mensaje, cantidad de ítems)` para cada caso del benchmark.
+    """
+    cases = []
+    for games_type in GamesType:
+        for size in BATCH_SIZES:
+            items = games(games_type, size, rng)
+            cases.append((f'ListMessage[GAMES.{games_type.name}] x{size}', ListMessage(MsgType.GAMES, games_type, items, client_id=1), size))
+    for reviews_type in ReviewsType:
+        for size in BATCH_SIZES:
+            items = reviews(reviews_type, size, rng)
+            cases.append((f'ListMessage[REVIEWS.{reviews_type.name}] x{size}', ListMessage(MsgType.REVIEWS, reviews_type, items, client_id=1), size))
+    for size in ROW_BLOCK_SIZES:
+        rows = row_block(size, rng)
+        lines = rows.count(b'\n') + 1
+        cases.append((f'ClientData {size // 1024}KB', ClientData(rows=rows, dataset=Dataset.REVIEW), lines))
+        cases.append((f'Data {size // 1024}KB', Data(client_id=1, rows=rows, dataset=Dataset.REVIEW), lines))
+    for size in STATE_SIZES:
+        # Estados como los que replican los joiners y los contadores
+        joiner_state = {'type': 'games', 'id': 1, 'update': rng.sample(range(10, 3000000), size)}
+        counter_state = {'type': 'counts', 'id': 1, 'update': {app_id: rng.randint(1, 5000) for app_id in rng.sample(range(10, 3000000), size)}}
+        cases.append((f'PushDataMessage[joiner games] x{size}', PushDataMessage(data=joiner_state, node_id=1), size))
+        cases.append((f'PushDataMessage[counter counts] x{size}', PushDataMessage(data=counter_state, node_id=1), size))
+    top = [(game_name(rng), rng.randint(1, 100000)) for _ in range(10)]
+    negatives = [(rng.randint(10, 3000000), game_name(rng), rng.randint(5000, 100000)) for _ in range(200)]
+    results = [
+        (QueryNumber.Q1, Q1Result(100000, 20000, 15000), 1),
+        (QueryNumber.Q2, Q2Result(top), len(top)),
+        (QueryNumber.Q3, Q3Result(top[:5]), 5),
+        (QueryNumber.Q4, Q4Result(negatives), len(negatives)),
+        (QueryNumber.Q5, Q5Result(negatives), len(negatives)),
+    ]
+    for query, result, items in results:
+        cases.append((f'ResultMessage[{query.name}]', ResultMessage(client_id=1, result_type=query, result=result), items))
+    cases.append(('SimpleMessage[FIN]', SimpleMessage(type=MsgType.FIN, client_id=1, node_type=2), 1))
+    cases.append(('SimpleMessage[FIN_NOTIFICATION]', SimpleMessage(type=MsgType.FIN_NOTIFICATION, client_id=1, node_type=2, node_instance=3), 1))
+    return cases
+
+
+def measure(function: Callable[[], object], min_time: float, repeats: int) -> float:
+    """
+    Devuelve el mejor tiempo por llamada (en segundos) entre `repeats` rondas de al menos `min_time` segundos.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        loops *= 2
+    loops = max(1, int(loops * (min_time / max(elapsed, 1e-9))))
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def run(min_time: float, repeats: int, only: str = '') -> Dict[str, dict]:
+    results = {}
+    for name, message, items in build_cases(random.Random(42)):
+        if only and only not in name:
+            continue
+        encoded = message.encode()
+        # Los mensajes de socket llevan la longitud adelante, que `decode_msg` no espera
+        payload = encoded[4:] if isinstance(message, (ClientData, ResultMessage)) else encoded
+        decode_msg(payload)
+
+        encode_time = measure(message.encode, min_time, repeats)
+        decode_time = measure(lambda: decode_msg(payload), min_time, repeats)
+        size = len(encoded)
+        results[name] = {
+            'items': items,
+            'bytes': size,
+            'encode_ns_per_item': encode_time * 1e9 / items,
+            'decode_ns_per_item': decode_time * 1e9 / items,
+            'encode_mb_per_s': size / encode_time / 1e6,
+            'decode_mb_per_s': size / decode_time / 1e6,
+        }
+        print(f"{name:<45} {size:>10} B  enc {results[name]['encode_ns_per_item']:>10.1f} ns/item {results[name]['encode_mb_per_s']:>8.1f} MB/s"
+              f"  dec {results[name]['decode_ns_per_item']:>10.1f} ns/item {results[name]['decode_mb_per_s']:>8.1f} MB/s")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> bool:
+    """
+    Imprime la relación contra el baseline de cada caso y devuelve si alguno empeoró más allá de la tolerancia.
+    """
+    regressed = False
+    print(f"\n{'case':<45} {'encode':>8} {'decode':>8}   (tiempo actual / baseline)")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<45} {'new':>8}")
+            continue
+        encode_ratio = current['encode_ns_per_item'] / previous['encode_ns_per_item']
+        decode_ratio = current['decode_ns_per_item'] / previous['decode_ns_per_item']
+        flag = ''
+        if max(encode_ratio, decode_ratio) > 1 + tolerance:
+            regressed = True
+            flag = '  <-- regression'
+        print(f"{name:<45} {encode_ratio:>8.2f} {decode_ratio:>8.2f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de encode/decode de los mensajes.")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Segundos mínimos por ronda de medición")
+    parser.add_argument('--repeats', type=int, default=5, help="Rondas por medición (se toma la mejor)")
+    parser.add_argument('--only', default='', help="Correr solo los casos cuyo nombre contenga este texto")
+    parser.add_argument('--save', help="Guardar los resultados como baseline en este archivo")
+    parser.add_argument('--compare', help="Comparar contra este baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Empeoramiento relativo tolerado al comparar")
+    args = parser.parse_args()
+
+    results = run(args.min_time, args.repeats, args.only)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as baseline_file:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'cases': results}, baseline_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['cases']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark de punta a punta del sistema desplegado con docker compose.
+
+Lanza N clientes concurrentes (uno por proceso) contra el server y mide:
+- la latencia de cada query por cliente, desde el inicio del envío y desde el fin del envío,
+- las filas por segundo que ingresan al sistema,
+- los mensajes por segundo que publica y consume cada cola de RabbitMQ (API de management),
+- el pico de memoria residente (VmHWM) de cada nodo, leído de /proc dentro de cada contenedor.
+
+El resultado se escribe en JSON para poder comparar corridas entre versiones.
+
+Uso (con el sistema levantado por `make docker-compose-up`):
+    python benchmarks/e2e_benchmark.py --clients 2 --games datasets/synthetic/games.csv \\
+        --reviews datasets/synthetic/reviews.csv --output benchmarks/results/e2e.json
+"""
+import argparse
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'src', 'client')]
+
+from client import Client  # noqa: E402
+
+QUERIES = ['Q1', 'Q2', 'Q3', 'Q4', 'Q5']
+
+
+class BenchmarkClient(Client):
+    """
+    Cliente que registra cuándo termina de enviar los datasets y cuándo llega cada resultado.
+    """
+
+    def __init__(self, results_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self.results_dir = results_dir
+        self.started_at = None
+        self.upload_finished_at = None
+        self.result_times: Dict[str, float] = {}
+
+    def run(self):
+        self.started_at = time.monotonic()
+        super().run()
+
+    def send_dataset(self, fname, dataset_type):
+        super().send_dataset(fname, dataset_type)
+        self.upload_finished_at = time.monotonic()
+
+    def save_to_file(self, filename: str, content: str, id: int):
+        self.result_times[filename.split('.')[0]] = time.monotonic()
+        results_dir = os.path.join(self.results_dir, f"results_client_{id}")
+        os.makedirs(results_dir, exist_ok=True)
+        with open(os.path.join(results_dir, filename), "w") as file:
+            file.write(content)
+
+
+def run_client(index: int, args, barrier, results):
+    """
+    Corre un cliente en su propio proceso y devuelve sus tiempos por la cola `results`.
+    """
+    host, port = args.server.rsplit(':', 1)
+    client = BenchmarkClient(
+        results_dir=args.results_dir,
+        id=index,
+        server_addr=(host, int(port)),
+        max_batch_size=args.batch_kb,
+        games=args.games,
+        reviews=args.reviews,
+    )
+    barrier.wait()
+    client.run()
+
+    queries = {}
+    for query in QUERIES:
+        received_at = client.result_times.get(query)
+        if received_at is None:
+            continue
+        queries[query] = {
+            'latency_s': received_at - client.started_at,
+            'after_upload_s': received_at - client.upload_finished_at if client.upload_finished_at else None,
+        }
+    results.put({
+        'client': index,
+        'upload_s': client.upload_finished_at - client.started_at if client.upload_finished_at else None,
+        'queries': queries,
+        'missing_queries': [query for query in QUERIES if query not in queries],
+    })
+
+
+def count_rows(path: str) -> int:
+    with open(path, 'rb') as file:
+        return max(sum(1 for _ in file) - 1, 0)  # sin el header
+
+
+def rabbitmq_queues(api: str, user: str, password: str) -> Optional[Dict[str, dict]]:
+    """
+    Devuelve los contadores acumulados de publicación y entrega de cada cola, o None si la API no responde.
+    """
+    request = urllib.request.Request(f"{api.rstrip('/')}/api/queues")
+    credentials = base64.b64encode(f"{user}:{password}".encode()).decode()
+    request.add_header('Authorization', f"Basic {credentials}")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            queues = json.load(response)
+    except OSError as e:
+        logging.warning(f"action: rabbitmq_stats | result: fail | error: {e}")
+        return None
+    stats = {}
+    for queue in queues:
+        message_stats = queue.get('message_stats', {})
+        stats[queue['name']] = {
+            'published': message_stats.get('publish', 0),
+            'delivered': message_stats.get('deliver_get', 0),
+        }
+    return stats
+
+
+def stage_throughput(before: Dict[str, dict], after: Dict[str, dict], elapsed: float) -> Dict[str, dict]:
+    stages = {}
+    for queue, counters in after.items():
+        previous = before.get(queue, {'published': 0, 'delivered': 0})
+        published = counters['published'] - previous['published']
+        delivered = counters['delivered'] - previous['delivered']
+        if published == 0 and delivered == 0:
+            continue
+        stages[queue] = {
+            'published': published,
+            'delivered': delivered,
+            'messages_per_sec': delivered / elapsed if elapsed > 0 else None,
+        }
+    return stages
+
+
+def nodes_peak_rss(exclude=('rabbitmq',)) -> Optional[Dict[str, dict]]:
+    """
+    Lee el VmHWM de todos los procesos de cada contenedor en ejecución. Devuelve None si no hay docker.
+    """
+    try:
+        names = subprocess.run(['docker', 'ps', '--format', '{{.Names}}'], capture_output=True, text=True, check=True).stdout.split()
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.warning(f"action: nodes_peak_rss | result: fail | error: {e}")
+        return None
+    nodes = {}
+    for name in names:
+        if name in exclude:
+            continue
+        output = subprocess.run(['docker', 'exec', name, 'sh', '-c', 'cat /proc/[0-9]*/status 2>/dev/null'],
+                                capture_output=True, text=True).stdout
+        peaks = [int(line.split()[1]) for line in output.splitlines() if line.startswith('VmHWM:')]
+        if peaks:
+            nodes[name] = {'max_process_peak_rss_kb': max(peaks), 'sum_peak_rss_kb': sum(peaks), 'processes': len(peaks)}
+    return nodes
+
+
+def summarize(values: List[float]) -> Optional[dict]:
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return {
+        'min': values[0],
+        'p50': values[(len(values) - 1) // 2],
+        'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+        'max': values[-1],
+        'mean': sum(values) / len(values),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta con N clientes concurrentes.")
+    parser.add_argument('--server', default='localhost:12345', help="host:puerto del server")
+    parser.add_argument('--clients', type=int, default=1, help="Cantidad de clientes concurrentes")
+    parser.add_argument('--games', required=True, help="CSV de juegos")
+    parser.add_argument('--reviews', required=True, help="CSV de reseñas")
+    parser.add_argument('--batch-kb', type=int, default=16, help="Tamaño máximo de batch de los clientes, en KB")
+    parser.add_argument('--output', default='benchmarks/results/e2e.json', help="Archivo JSON de salida")
+    parser.add_argument('--results-dir', default=None, help="Directorio donde guardar los resultados de las queries")
+    parser.add_argument('--rabbitmq-api', default='http://localhost:15672', help="URL de la API de management ('' para omitir)")
+    parser.add_argument('--rabbitmq-user', default='guest')
+    parser.add_argument('--rabbitmq-password', default='guest')
+    parser.add_argument('--no-docker', action='store_true', help="No medir la memoria de los contenedores")
+    args = parser.parse_args()
+    args.results_dir = args.results_dir or tempfile.mkdtemp(prefix='e2e_results_')
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)-8s %(message)s')
+
+    games_rows, reviews_rows = count_rows(args.games), count_rows(args.reviews)
+    input_bytes = os.path.getsize(args.games) + os.path.getsize(args.reviews)
+
+    queues_before = rabbitmq_queues(args.rabbitmq_api, args.rabbitmq_user, args.rabbitmq_password) if args.rabbitmq_api else None
+
+    barrier = multiprocessing.Barrier(args.clients + 1)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_client, args=(i, args, barrier, results)) for i in range(1, args.clients + 1)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    started_at = time.monotonic()
+
+    clients = [results.get() for _ in processes]
+    elapsed = time.monotonic() - started_at
+    for process in processes:
+        process.join()
+
+    queues_after = rabbitmq_queues(args.rabbitmq_api, args.rabbitmq_user, args.rabbitmq_password) if queues_before is not None else None
+    total_rows = (games_rows + reviews_rows) * args.clients
+    uploads = [client['upload_s'] for client in clients]
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': git_commit(),
+        'config': {'clients': args.clients, 'server': args.server, 'batch_kb': args.batch_kb,
+                   'games': args.games, 'reviews': args.reviews},
+        'dataset': {'games_rows': games_rows, 'reviews_rows': reviews_rows, 'bytes': input_bytes},
+        'wall_s': elapsed,
+        'ingest': {
+            'rows': total_rows,
+            'rows_per_sec': total_rows / max(filter(None, uploads), default=elapsed),
+            'rows_per_sec_end_to_end': total_rows / elapsed,
+            'upload_s': summarize(uploads),
+        },
+        'queries': {query: summarize([client['queries'].get(query, {}).get('latency_s') for client in clients]) for query in QUERIES},
+        'queries_after_upload': {query: summarize([client['queries'].get(query, {}).get('after_upload_s') for client in clients]) for query in QUERIES},
+        'stages': stage_throughput(queues_before, queues_after, elapsed) if queues_after is not None else None,
+        'nodes': None if args.no_docker else nodes_peak_rss(),
+        'clients': sorted(clients, key=lambda client: client['client']),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(json.dumps({key: report[key] for key in ('wall_s', 'ingest', 'queries')}, indent=2))
+
+    if any(client['missing_queries'] for client in clients):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
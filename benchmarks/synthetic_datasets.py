@@ -0,0 +1,195 @@
+"""
+Generador de datasets sintéticos con el formato de los CSV de Steam que consume el sistema.
+
+Los datos tienen sesgos parecidos a los reales: la cantidad de reseñas por juego sigue una
+distribución de Zipf, los textos mezclan idiomas y tienen largos log-normales, y los géneros,
+plataformas, años y tiempos de juego respetan proporciones aproximadas del dataset original.
+
+Uso:
+    python benchmarks/synthetic_datasets.py --games 20000 --reviews 500000 --output datasets/synthetic
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+from typing import List
+
+# Columnas del dataset de juegos, en el mismo orden que `GAME_FIELD_NAMES` del Trimmer
+GAME_COLUMNS = 40
+APP_ID, NAME, RELEASE_DATE, WINDOWS, MAC, LINUX, POSITIVE, NEGATIVE, AVG_PLAYTIME, GENRES = 0, 1, 2, 17, 18, 19, 23, 24, 29, 36
+GAMES_HEADER = ['AppID', 'Name', 'Release date', 'Estimated owners', 'Peak CCU', 'Required age', 'Price',
+                'DiscountDLC count', 'About the game', 'Supported languages', 'Full audio languages', 'Reviews',
+                'Header image', 'Website', 'Support url', 'Support email', 'Windows', 'Mac', 'Linux',
+                'Metacritic score', 'Metacritic url', 'User score', 'Positive', 'Negative', 'Score rank',
+                'Achievements', 'Recommendations', 'Notes', 'Average playtime forever', 'Average playtime two weeks',
+                'Median playtime forever', 'Median playtime two weeks', 'Developers', 'Publishers', 'Categories',
+                'Genres', 'Tags', 'Screenshots', 'Movies']
+REVIEWS_HEADER = ['app_id', 'app_name', 'review_text', 'review_score', 'review_votes']
+
+# Probabilidad de que un juego tenga cada género (aproximada sobre el dataset original)
+GENRE_WEIGHTS = {
+    'Indie': 0.66, 'Casual': 0.40, 'Action': 0.40, 'Adventure': 0.38, 'Simulation': 0.19, 'Strategy': 0.18,
+    'RPG': 0.17, 'Early Access': 0.12, 'Free to Play': 0.07, 'Sports': 0.04, 'Racing': 0.04,
+    'Massively Multiplayer': 0.03,
+}
+PLATFORM_PROBS = {'windows': 0.99, 'mac': 0.20, 'linux': 0.15}
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Vocabularios por idioma, suficientes para que un clasificador de idioma los distinga
+VOCABULARIES = {
+    'en': "the game is really good and i love the story but the combat feels slow sometimes great graphics "
+          "would recommend this to anyone who likes puzzles worst purchase ever refund please fun with friends".split(),
+    'es': "el juego es muy bueno y me encanta la historia pero el combate es lento a veces gráficos geniales "
+          "lo recomiendo a quien le gusten los puzzles la peor compra divertido con amigos".split(),
+    'pt': "o jogo é muito bom e eu adoro a história mas o combate é lento às vezes gráficos incríveis "
+          "recomendo para quem gosta de quebra-cabeças pior compra divertido com amigos".split(),
+    'ru': "игра очень хорошая и мне нравится сюжет но бои иногда медленные отличная графика "
+          "рекомендую всем кто любит головоломки худшая покупка весело с друзьями".split(),
+    'de': "das spiel ist wirklich gut und ich liebe die geschichte aber der kampf ist manchmal langsam tolle grafik "
+          "empfehle ich jedem der rätsel mag schlechtester kauf macht spaß mit freunden".split(),
+    'zh': "这个 游戏 真的 很 好玩 我 喜欢 剧情 但是 战斗 有时候 很 慢 画面 很 棒 推荐 给 喜欢 解谜 的 人 最差 的 购买 和 朋友 一起 玩".split(),
+}
+DEFAULT_LANGUAGE_MIX = {'en': 0.70, 'ru': 0.09, 'zh': 0.07, 'es': 0.05, 'pt': 0.05, 'de': 0.04}
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'zen', 'tor', 'vex', 'qui', 'sol', 'dar', 'nyx', 'ul', 'bra', 'fen', 'gal']
+
+
+def game_name(rng: random.Random) -> str:
+    words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))).capitalize() for _ in range(rng.randint(1, 4))]
+    name = ' '.join(words)
+    # Algunos nombres con comas y comillas para ejercitar el quoting del CSV
+    if rng.random() < 0.02:
+        name += ', "Deluxe Edition"'
+    return name
+
+def release_date(rng: random.Random) -> str:
+    # Más lanzamientos en los años recientes
+    year = 2024 - min(int(rng.expovariate(1 / 5)), 24)
+    return f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {year}"
+
+def genres(rng: random.Random) -> str:
+    chosen = [genre for genre, weight in GENRE_WEIGHTS.items() if rng.random() < weight]
+    return ','.join(chosen or ['Casual'])
+
+def average_playtime(rng: random.Random) -> int:
+    # La mayoría de los juegos no tiene tiempo de juego registrado
+    if rng.random() < 0.7:
+        return 0
+    return int(rng.lognormvariate(5, 1.5))
+
+def game_row(rng: random.Random, app_id: int) -> List[str]:
+    row = [''] * GAME_COLUMNS
+    row[APP_ID] = str(app_id)
+    row[NAME] = game_name(rng)
+    row[RELEASE_DATE] = release_date(rng)
+    row[WINDOWS] = str(rng.random() < PLATFORM_PROBS['windows'])
+    row[MAC] = str(rng.random() < PLATFORM_PROBS['mac'])
+    row[LINUX] = str(rng.random() < PLATFORM_PROBS['linux'])
+    row[POSITIVE] = str(int(rng.lognormvariate(3, 2)))
+    row[NEGATIVE] = str(int(rng.lognormvariate(2, 2)))
+    row[AVG_PLAYTIME] = str(average_playtime(rng))
+    row[GENRES] = genres(rng)
+    return row
+
+def review_text(rng: random.Random, language: str, mean_words: int) -> str:
+    # Largo log-normal con cola pesada, acotado para no generar filas gigantes
+    sigma = 1.0
+    mu = math.log(max(mean_words, 1)) - sigma ** 2 / 2
+    length = max(1, min(int(rng.lognormvariate(mu, sigma)), 50 * mean_words))
+    vocabulary = VOCABULARIES[language]
+    return ' '.join(rng.choice(vocabulary) for _ in range(length))
+
+def generate(output: str, games: int, reviews: int, seed: int = 42, zipf_exponent: float = 1.1,
+             language_mix: dict = None, mean_words: int = 40) -> dict:
+    """
+    Genera `games.csv` y `reviews.csv` en `output` y devuelve un resumen de lo generado.
+    """
+    rng = random.Random(seed)
+    language_mix = language_mix or DEFAULT_LANGUAGE_MIX
+    os.makedirs(output, exist_ok=True)
+    games_path = os.path.join(output, 'games.csv')
+    reviews_path = os.path.join(output, 'reviews.csv')
+
+    app_ids = rng.sample(range(10, 10 * games + 10), games)
+    names = {}
+    with open(games_path, 'w', newline='', encoding='utf-8') as games_file:
+        writer = csv.writer(games_file)
+        writer.writerow(GAMES_HEADER)
+        for app_id in app_ids:
+            row = game_row(rng, app_id)
+            names[app_id] = row[NAME]
+            writer.writerow(row)
+
+    # Popularidad de Zipf: el juego en la posición k recibe reseñas con peso 1 / k^s
+    popularity = app_ids[:]
+    rng.shuffle(popularity)
+    cumulative_weights = list(_cumulative(1 / (rank ** zipf_exponent) for rank in range(1, games + 1)))
+    languages = list(language_mix)
+    language_weights = list(_cumulative(language_mix[language] for language in languages))
+
+    reviews_per_language = dict.fromkeys(languages, 0)
+    chunk = 10000
+    with open(reviews_path, 'w', newline='', encoding='utf-8') as reviews_file:
+        writer = csv.writer(reviews_file)
+        writer.writerow(REVIEWS_HEADER)
+        for start in range(0, reviews, chunk):
+            count = min(chunk, reviews - start)
+            reviewed = rng.choices(popularity, cum_weights=cumulative_weights, k=count)
+            chosen_languages = rng.choices(languages, cum_weights=language_weights, k=count)
+            for app_id, language in zip(reviewed, chosen_languages):
+                reviews_per_language[language] += 1
+                score = '1' if rng.random() < 0.8 else '-1'
+                writer.writerow([app_id, names[app_id], review_text(rng, language, mean_words), score, rng.randint(0, 3)])
+
+    summary = {
+        'games': games,
+        'reviews': reviews,
+        'seed': seed,
+        'zipf_exponent': zipf_exponent,
+        'mean_words': mean_words,
+        'reviews_per_language': reviews_per_language,
+        'games_bytes': os.path.getsize(games_path),
+        'reviews_bytes': os.path.getsize(reviews_path),
+    }
+    with open(os.path.join(output, 'summary.json'), 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+    return summary
+
+def _cumulative(weights):
+    total = 0
+    for weight in weights:
+        total += weight
+        yield total
+
+def parse_language_mix(value: str) -> dict:
+    """
+    Parsea una mezcla de idiomas del estilo 'en=0.7,es=0.2,ru=0.1'.
+    """
+    mix = {}
+    for item in value.split(','):
+        language, weight = item.split('=')
+        if language not in VOCABULARIES:
+            raise argparse.ArgumentTypeError(f"Idioma no soportado: {language}")
+        mix[language] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos de juegos y reseñas de Steam.")
+    parser.add_argument('--games', type=int, default=10000, help="Cantidad de juegos")
+    parser.add_argument('--reviews', type=int, default=200000, help="Cantidad de reseñas")
+    parser.add_argument('--output', default='datasets/synthetic', help="Directorio de salida")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--zipf', type=float, default=1.1, help="Exponente de Zipf de las reseñas por juego")
+    parser.add_argument('--languages', type=parse_language_mix, default=DEFAULT_LANGUAGE_MIX, help="Mezcla de idiomas, ej: en=0.7,es=0.3")
+    parser.add_argument('--mean-words', type=int, default=40, help="Largo medio de las reseñas en palabras")
+    args = parser.parse_args()
+
+    summary = generate(args.output, args.games, args.reviews, args.seed, args.zipf, args.languages, args.mean_words)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,19 @@ import os
 import yaml
 import sys
 
+# Fracción de batches a trazar (ver src/utils/tracing.py). Con 0 no se agregan ni la variable ni el volumen de trazas
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+# Plan de caídas a inyectar en los nodos (ver src/utils/fault_injection.py). Vacío deshabilita la inyección
+FAULT_SCHEDULE = os.getenv('FAULT_SCHEDULE', '')
+# Con PROFILING=1 los perfiles de los nodos (ver src/utils/profiler.py) quedan en ./profiles
+PROFILING = os.getenv('PROFILING', '') == '1'
+# Umbrales de sospecha por tipo de nodo de los WatchDogs (ver src/utils/failure_detector.py), como JSON
+PHI_THRESHOLDS = os.getenv('PHI_THRESHOLDS', '')
+# Segundos máximos procesando un mismo mensaje por tipo de nodo, como JSON (ver src/utils/failure_detector.py)
+MAX_BUSY_SECONDS = os.getenv('MAX_BUSY_SECONDS', '')
+# Directorio de los nombres de los juegos de los joiners (NAMES_STORE_DIR en src/utils/container_constants.py)
+NAMES_STORE_DIR = '/game_names'
+
 # Recibir argumentos del script de Bash que indican el número de instancias de cada nodo
 def parse_args():
     try:
@@ -34,6 +47,13 @@ def parse_args():
         print("Error: Asegúrate de pasar las instancias de los nodos en el orden correcto.")
         sys.exit(1)
 
+# Habilitar las trazas de latencia en un servicio, con los spans en ./traces
+def add_tracing(service):
+    if TRACE_SAMPLE_RATE <= 0:
+        return
+    service['environment'].append(f'TRACE_SAMPLE_RATE={TRACE_SAMPLE_RATE}')
+    service.setdefault('volumes', []).append('./traces:/traces')
+
 # Generar el archivo YAML de Docker Compose basado en las instancias proporcionadas
 def generate_docker_compose(instances):
     services = {}
@@ -82,8 +102,12 @@ def generate_docker_compose(instances):
             **{f"watchdog_{i}": {'condition': 'service_started'} for i in range(1, instances['watchdog'] + 1)}
         },
         'networks': ['testing_net'],
+        'ports': [
+            "12345:12345"  # Expuesto para los clientes del benchmark de punta a punta
+        ],
         'privileged': True  # Añadir el modo privileged
     }
+    add_tracing(services['server'])
 
     # Generación de servicios con instancias, incluyendo nodos de una sola instancia
     for node, count in instances.items():
@@ -142,6 +166,10 @@ def generate_docker_compose(instances):
                         }
 
             if node == 'watchdog':
+                if PHI_THRESHOLDS:
+                    services[service_name]['environment'].append(f'PHI_THRESHOLDS={PHI_THRESHOLDS}')
+                if MAX_BUSY_SECONDS:
+                    services[service_name]['environment'].append(f'MAX_BUSY_SECONDS={MAX_BUSY_SECONDS}')
                 for k in range(1, instances['trimmer'] + 1):
                     services[service_name]['depends_on'][f"trimmer_{k}"] = {
                         'condition': 'service_started'
@@ -151,6 +179,17 @@ def generate_docker_compose(instances):
                         'condition': 'service_started'
                     }
 
+            if node not in {'client', 'watchdog'}:
+                add_tracing(services[service_name])
+                if FAULT_SCHEDULE:
+                    services[service_name]['environment'].append(f'FAULT_SCHEDULE={FAULT_SCHEDULE}')
+                if PROFILING:
+                    services[service_name].setdefault('volumes', []).append('./profiles:/profiles')
+
+            # Los nombres de los juegos no se replican: quedan en un volumen del joiner, que sobrevive a recrearlo
+            if node in {'q3_joiner', 'q4_joiner', 'q5_joiner'}:
+                services[service_name].setdefault('volumes', []).append(f'./game_names/{service_name}:{NAMES_STORE_DIR}')
+
             # Si es una réplica, añadir el volumen para el socket de Docker
             if node in replica_nodes or node == 'watchdog':
                 services[service_name].setdefault('volumes', []).append('/var/run/docker.sock:/var/run/docker.sock')
@@ -0,0 +1,138 @@
+"""
+Reporte de las trazas de latencia generadas con `TRACE_SAMPLE_RATE` (ver src/utils/tracing.py).
+
+Lee los archivos de spans de todos los nodos y muestra:
+- el camino crítico de cada cliente: para cada resultado que llegó al ResultDispatcher, los saltos
+  desde el gateway con la espera en cola y el tiempo en cada nodo, marcando el último resultado;
+- por etapa (tipo de nodo y cola), los percentiles de espera en cola y de procesamiento de todos los
+  mensajes trazados, para ver dónde se acumula la latencia de cola.
+
+Uso:
+    python scripts/trace_report.py traces/ [--client 1] [--kind fin] [--json reporte.json]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+HOP_NODE, HOP_QUEUE, HOP_RECEIVED, HOP_SENT = range(4)
+TERMINAL_NODE = 'result_dispatcher'
+
+
+def stage(node: str) -> str:
+    """
+    Nombre de la etapa de un nodo, sin el número de instancia.
+    """
+    return re.sub(r'_\d+$', '', node)
+
+def load_spans(directory: str) -> List[dict]:
+    spans = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))):
+        with open(path) as spans_file:
+            for line in spans_file:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue  # Línea cortada por una caída del nodo
+    return spans
+
+def percentile(values: List[float], p: float) -> float:
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+def summarize(values: List[float]) -> Optional[dict]:
+    values = sorted(values)
+    if not values:
+        return None
+    return {'count': len(values), 'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95),
+            'p99': percentile(values, 0.99), 'max': values[-1]}
+
+
+def critical_path(span: dict) -> List[dict]:
+    """
+    Reconstruye los saltos de un span terminal: cuánto esperó el mensaje en cada cola y cuánto tardó
+    cada nodo en emitir el mensaje que continuó el camino.
+    """
+    path = []
+    hops = span['hops']
+    for previous, hop in zip(hops, hops[1:]):
+        # El último salto no publica: su tiempo es el del callback que cierra el span
+        sent = hop[HOP_SENT] if hop[HOP_SENT] is not None else span['end']
+        path.append({
+            'node': hop[HOP_NODE],
+            'queue': hop[HOP_QUEUE],
+            'wait_s': hop[HOP_RECEIVED] - previous[HOP_SENT],
+            'processing_s': sent - hop[HOP_RECEIVED],
+        })
+    return path
+
+def client_paths(spans: List[dict], kind: Optional[str]) -> Dict[int, List[dict]]:
+    clients = defaultdict(list)
+    for span in spans:
+        if stage(span['node']) != TERMINAL_NODE or (kind and span['kind'] != kind):
+            continue
+        clients[span['client']].append({
+            'trace': span['trace'],
+            'kind': span['kind'],
+            'latency_s': span['end'] - span['ingress'],
+            'path': critical_path(span),
+        })
+    for results in clients.values():
+        results.sort(key=lambda result: result['latency_s'])
+    return clients
+
+def stage_stats(spans: List[dict], kind: Optional[str]) -> Dict[str, dict]:
+    waits = defaultdict(list)
+    processing = defaultdict(list)
+    for span in spans:
+        if kind and span['kind'] != kind:
+            continue
+        key = f"{stage(span['node'])} <- {span['queue']}"
+        if span['sent'] is not None:
+            waits[key].append(span['received'] - span['sent'])
+        processing[key].append(span['end'] - span['received'])
+    return {key: {'wait_s': summarize(waits[key]), 'processing_s': summarize(processing[key])} for key in processing}
+
+
+def print_report(clients: Dict[int, List[dict]], stages: Dict[str, dict]):
+    for client, results in sorted(clients.items()):
+        print(f"\nCliente {client}: {len(results)} resultados trazados")
+        for i, result in enumerate(results):
+            marker = '  <-- crítico' if i == len(results) - 1 else ''
+            print(f"  traza {result['trace']} ({result['kind']}) {result['latency_s'] * 1000:.1f} ms{marker}")
+            for hop in result['path']:
+                print(f"    {hop['node']:<28} {hop['queue']:<32} cola {hop['wait_s'] * 1000:>9.1f} ms  nodo {hop['processing_s'] * 1000:>9.1f} ms")
+
+    print(f"\n{'etapa':<60} {'n':>6} {'cola p50':>10} {'cola p99':>10} {'nodo p50':>10} {'nodo p99':>10}  (ms)")
+    ordered = sorted(stages.items(), key=lambda item: -((item[1]['wait_s'] or {}).get('p99', 0) + item[1]['processing_s']['p99']))
+    for key, stats in ordered:
+        wait = stats['wait_s'] or {'p50': 0, 'p99': 0}
+        processing = stats['processing_s']
+        print(f"{key:<60} {processing['count']:>6} {wait['p50'] * 1000:>10.1f} {wait['p99'] * 1000:>10.1f}"
+              f" {processing['p50'] * 1000:>10.1f} {processing['p99'] * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye los caminos críticos de las trazas de latencia.")
+    parser.add_argument('directory', help="Directorio con los archivos de spans de los nodos")
+    parser.add_argument('--client', type=int, help="Mostrar solo este cliente")
+    parser.add_argument('--kind', choices=['data', 'fin'], help="Considerar solo las trazas de batches de datos o de FINs")
+    parser.add_argument('--json', help="Guardar además el reporte en este archivo JSON")
+    args = parser.parse_args()
+
+    spans = load_spans(args.directory)
+    if args.client is not None:
+        spans = [span for span in spans if span['client'] == args.client]
+    clients = client_paths(spans, args.kind)
+    stages = stage_stats(spans, args.kind)
+    print_report(clients, stages)
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'clients': clients, 'stages': stages}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -59,35 +59,33 @@ class Client:
         Envía el dataset pasado por parámetro al server, con batches configurables.
         """
         # Chequear si existe el archivo
-        with open(fname, mode='r') as file:
+        with open(fname, mode='rb') as file:
             next(file)  # Para saltearse el header
-            batch = []
-            current_batch_size = 0  # Tamaño actual del batch en bytes
+            batch = bytearray()  # Líneas ya codificadas, separadas por salto de línea
 
             for line in file:
                 line = line.strip()
-                line_size = len(line.encode('utf-8'))  # Tamaño de la línea en bytes
 
                 # Verifica si agregar esta línea excedería el tamaño del batch
-                if current_batch_size + line_size > self.max_batch_size:
+                if batch and len(batch) + len(line) > self.max_batch_size:
                     # Envía el batch actual y reinicia
                     data = ClientData(rows=batch, dataset=dataset_type)  # Usa el batch completo
                     self.client_socket.sendall(data.encode())  # Envía el batch codificado
-                    # logging.info(f"action: send_batch | result: success | dataset: {dataset} | batch_size: {current_batch_size} bytes | lines: {len(batch)}")
+                    # logging.info(f"action: send_batch | result: success | dataset: {dataset} | batch_size: {len(batch)} bytes")
                     
-                    # Reinicia el batch y el contador de tamaño
-                    batch = []
-                    current_batch_size = 0
+                    # Reinicia el batch
+                    batch = bytearray()
 
-                # Agrega la línea actual al batch y actualiza el tamaño
-                batch.append(line)
-                current_batch_size += line_size
+                # Agrega la línea actual al batch
+                if batch:
+                    batch += b"\n"
+                batch += line
 
             # Enviar el último batch si contiene líneas restantes
             if batch:
                 data = ClientData(rows=batch, dataset=dataset_type)
                 self.client_socket.sendall(data.encode())
-                # logging.info(f"action: send_last_batch | result: success | dataset: {dataset} | batch_size: {current_batch_size} bytes")
+                # logging.info(f"action: send_last_batch | result: success | dataset: {dataset} | batch_size: {len(batch)} bytes")
             
         logging.info(f"action: send_data | result: success | dataset: {dataset_type}")
 
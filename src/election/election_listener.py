@@ -41,7 +41,7 @@ class ElectionListener:
                 msg = decode_msg(raw_msg)
 
                 if msg.type == MsgType.ELECTION:
-                    self._handle_election_message(msg)
+                    self._handle_election_message(conn, msg)
 
                 elif msg.type == MsgType.COORDINATOR:
                     self._handle_leader_election_message(msg)
@@ -58,17 +58,14 @@ class ElectionListener:
             self.stop()
 
 
-    def _handle_election_message(self, msg):
-        """Procesa un mensaje de tipo ELECTION."""
+    def _handle_election_message(self, conn, msg):
+        """Procesa un mensaje de tipo ELECTION, respondiendo el OK por la misma conexión."""
         logging.info(f"node {self.id}: Llego un mensaje Election")
         try:
-            with socket.create_connection((f'{self.ip_prefix}_{msg.node_id}', self.port), timeout=3) as response_socket:
-                ok_msg = SimpleMessage(type=MsgType.OK_ELECTION, socket_compatible=True, node_id=self.id)
-                response_socket.sendall(ok_msg.encode())
-                logging.info(f"node {self.id}: Enviado OK a {msg.node_id}")
-        except socket.gaierror as e:
-            logging.warning(f"node {self.id}: Error en resolución de nombre al responder a {msg.node_id}: {e}")
-        except (socket.timeout, ConnectionRefusedError) as e:
+            ok_msg = SimpleMessage(type=MsgType.OK_ELECTION, socket_compatible=True, node_id=self.id)
+            conn.sendall(ok_msg.encode())
+            logging.info(f"node {self.id}: Enviado OK a {msg.node_id}")
+        except OSError as e:
             logging.warning(f"node {self.id}: Nodo {msg.node_id} no está disponible: {e}")
         except Exception as e:
             logging.error(f"node {self.id}: Error inesperado al manejar mensaje Election: {e}")
@@ -1,13 +1,48 @@
 import logging
 import signal
 import socket
-from messages.messages import MsgType, SimpleMessage
+import time
+from concurrent.futures import ThreadPoolExecutor
+from messages.messages import MsgType, SimpleMessage, decode_msg
 from utils.container_constants import LISTENER_PORT
+from utils.utils import recv_msg
 
-TIMEOUT = 5
+ELECTION_TIMEOUT = 0.5 # Segundos que tiene cada nodo para aceptar un mensaje de la elección y responderlo
+COORDINATOR_TIMEOUT = 2 # Segundos que se espera el anuncio del líder después de un OK, antes de reintentar la elección
+
+def request_all(ip_prefix, node_ids: list[int], msg: SimpleMessage, expect_reply=True, timeout=ELECTION_TIMEOUT) -> dict:
+    """
+    Envía `msg` en paralelo a los nodos indicados, con un plazo de `timeout` segundos para cada uno.
+
+    :return: nodo -> respuesta decodificada (o True si no se espera respuesta), o None si el nodo no respondió.
+    """
+    def request(nid):
+        deadline = time.monotonic() + timeout
+        try:
+            with socket.create_connection((f'{ip_prefix}_{nid}', LISTENER_PORT), timeout=timeout) as sock:
+                sock.sendall(msg.encode())
+                if not expect_reply:
+                    return True
+                sock.settimeout(max(0.01, deadline - time.monotonic()))
+                return decode_msg(recv_msg(sock))
+        except (ConnectionRefusedError, socket.timeout, socket.gaierror):
+            logging.warning(f"[Manager] No se pudo contactar a Node {nid} (timeout o nodo caido).")
+        except Exception as e:
+            logging.error(f"[Manager] Error inesperado al contactar a Node {nid}: {e}")
+        return None
+
+    if not node_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(node_ids)) as pool:
+        return dict(zip(node_ids, pool.map(request, node_ids)))
 
 def initiate_election(node_id, node_ids: list[int], ip_prefix, election_in_progress, election_condition, waiting_ok, ok_condition, leader_id):
-    """Inicia el algoritmo de elección Bully."""
+    """
+    Inicia el algoritmo de elección Bully.
+
+    Los mensajes ELECTION se envían en paralelo a los nodos de ID mayor, que responden OK (o COORDINATOR,
+    si ya son el líder) por la misma conexión. Sin OKs dentro de `ELECTION_TIMEOUT`, este nodo es el líder.
+    """
 
     def handle_sigterm(sig, frame):
         exit(0)
@@ -16,50 +51,41 @@ def initiate_election(node_id, node_ids: list[int], ip_prefix, election_in_progr
     logging.info(f"[Manager] Iniciando elección.")
     higher_node_ids = [nid for nid in node_ids if nid > node_id]
 
-    if not higher_node_ids:
-        declare_leader(node_id, node_ids, ip_prefix, election_in_progress, election_condition, leader_id)
-        return
+    while True:
+        with ok_condition:
+            waiting_ok.value = True
 
-    # Ya seteo el esperando ok antes de enviar
-    with ok_condition:
-        waiting_ok.value = True
+        e_msg = SimpleMessage(type=MsgType.ELECTION, socket_compatible=True, node_id=node_id)
+        replies = [reply for reply in request_all(ip_prefix, higher_node_ids, e_msg).values() if reply is not None]
 
-    # Enviar mensajes de elección a nodos con ID mayor
-    for nid in higher_node_ids:
-        try:
-            with socket.create_connection((f'{ip_prefix}_{nid}', LISTENER_PORT), timeout=3) as sock:
-                e_msg = SimpleMessage(type=MsgType.ELECTION, socket_compatible=True, node_id=node_id)
-                sock.sendall(e_msg.encode())
-                logging.info(f"[Manager] Mensaje de elección enviado a Node {ip_prefix}_{nid}:{LISTENER_PORT}.")
-        except (ConnectionRefusedError, socket.timeout, socket.gaierror):
-            logging.warning(f"[Manager] No se pudo contactar a Node {nid} (timeout o nodo caido).")
+        with ok_condition:
+            waiting_ok.value = False
+            ok_condition.notify_all()
 
-        except Exception as e:
-            logging.error(f"[Manager] Error inesperado al contactar a Node {nid}: {e}")
+        coordinators = [reply.node_id for reply in replies if reply.type == MsgType.COORDINATOR]
+        if coordinators:
+            # Ya hay un líder de ID mayor: se adopta sin esperar su anuncio
+            _finish_election(max(coordinators), election_in_progress, election_condition, leader_id)
+            return
+
+        if not any(reply.type == MsgType.OK_ELECTION for reply in replies):
+            logging.info(f"[Manager] Ningún nodo de ID mayor respondió. Declarándose líder.")
+            declare_leader(node_id, node_ids, ip_prefix, election_in_progress, election_condition, leader_id)
+            return
 
-    # Esperar OK o Timeout
-    _wait_for_ok_or_leader(node_id, node_ids, ip_prefix, election_in_progress, election_condition, waiting_ok, ok_condition, leader_id)
-
-
-def _wait_for_ok_or_leader(node_id, node_ids, ip_prefix, election_in_progress, election_condition, waiting_ok, ok_condition, leader_id):
-    """Espera una confirmación OK o una notificación de liderazgo."""
-    with ok_condition:
-        # logging.info(f"[Manager] Entre a esperar los Oks")
-        # Validar si el OK ya fue recibido antes de esperar
-        if not waiting_ok.value:
-            logging.info(f"[Manager] OK ya recibido antes de esperar. Continuando.")
-        else:
-            # Esperar por el OK con timeout
-            if not ok_condition.wait_for(lambda: not waiting_ok.value, timeout=10):
-                logging.info(f"[Manager] Timeout esperando OK. Declarándose líder.")
-                declare_leader(node_id, node_ids, ip_prefix, election_in_progress, election_condition, leader_id)
+        logging.info(f"[Manager] OK recibido. Esperando anuncio de líder.")
+        with election_condition:
+            if election_condition.wait_for(lambda: not election_in_progress.value, timeout=COORDINATOR_TIMEOUT):
                 return
-            logging.info(f"[Manager] OK recibido. Esperando anuncio de líder.")
+        # El nodo que respondió OK se cayó antes de anunciarse: se vuelve a empezar
+        logging.info(f"[Manager] Timeout esperando el anuncio del líder. Reintentando la elección.")
 
-    # Si se recibe el OK, continuar con la lógica de esperar el anuncio del líder
+def _finish_election(new_leader_id, election_in_progress, election_condition, leader_id):
     with election_condition:
-        election_condition.wait_for(lambda: not election_in_progress.value)
-        # logging.info(f"[Manager] Anuncio de líder recibido. Continuando ejecución.")
+        leader_id.value = new_leader_id
+        election_in_progress.value = False
+        election_condition.notify_all()  # Notificar a otros procesos que la elección terminó
+    logging.info(f"[Manager] Elección finalizada, líder: {new_leader_id}.")
 
 def declare_leader(node_id, node_ids, ip_prefix, election_in_progress, election_condition, leader_id):
     """Se declara líder y ejecuta la acción proporcionada."""
@@ -68,25 +94,11 @@ def declare_leader(node_id, node_ids, ip_prefix, election_in_progress, election_
     with election_condition:
         leader_id.value = node_id
 
-    # logging.info(f"[Manager] Entro a notificar que soy el leader.")
     # Notificar a los nodos que es el líder
-    _notify_leader_selected(node_id, node_ids, ip_prefix, election_in_progress, election_condition, leader_id)
-
-def _notify_leader_selected(node_id, node_ids, ip_prefix, election_in_progress, election_condition, leader_id):
-    """Notifica a todos los nodos que este nodo es el líder."""
-    for nid in node_ids:
-        if nid != node_id:
-            try:
-                with socket.create_connection((f'{ip_prefix}_{nid}', LISTENER_PORT), timeout=TIMEOUT) as sock:
-                    leader_msg = SimpleMessage(type=MsgType.COORDINATOR, socket_compatible=True, node_id=node_id)
-                    sock.sendall(leader_msg.encode())
-                    # logging.info(f"[Manager] Notificación de liderazgo enviada a Node {nid}.")
-            except (ConnectionRefusedError, socket.timeout, socket.gaierror):
-                logging.warning(f"[Manager] No se pudo contactar a Node {nid} (timeout o nodo caido).")
-            except Exception as e:
-                logging.error(f"[Manager] Error inesperado al contactar a Node {nid}: {e}")
+    _notify_leader_selected(node_id, node_ids, ip_prefix)
+    _finish_election(node_id, election_in_progress, election_condition, leader_id)
 
-    with election_condition:
-        election_in_progress.value = False
-        election_condition.notify_all()  # Notificar a otros procesos que la elección terminó
-    logging.info(f"[Manager] Elección finalizada, election_in_progress=False.")
\ No newline at end of file
+def _notify_leader_selected(node_id, node_ids, ip_prefix):
+    """Notifica en paralelo a todos los nodos que este nodo es el líder."""
+    leader_msg = SimpleMessage(type=MsgType.COORDINATOR, socket_compatible=True, node_id=node_id)
+    request_all(ip_prefix, [nid for nid in node_ids if nid != node_id], leader_msg, expect_reply=False)
@@ -1,11 +1,20 @@
 import logging
 from multiprocessing import Process
+import os
 import signal
 import socket
-from messages.messages import MsgType, SimpleMessage, decode_msg
-from utils.container_constants import LISTENER_PORT
+import threading
+import time
+from messages.messages import HeartbeatMessage, MetricsMessage, MsgType, SimpleMessage, decode_msg
+from utils.container_constants import HEARTBEAT_INTERVAL, HEARTBEAT_PORT, HEARTBEAT_RESOLVE_INTERVAL, LISTENER_PORT, WATCHDOG_CONTAINER_NAME
+from utils.metrics import METRICS
 from utils.utils import recv_msg
 
+HTTP_GET = b'GET '
+MAX_HTTP_REQUEST = 8192
+MAX_UINT32 = 0xFFFFFFFF
+PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
 class Listener:
     def __init__(self, id, ip_prefix, port=LISTENER_PORT, backlog=5):
         """
@@ -40,15 +49,98 @@ class Listener:
         self.shutdown()
 
     def process_msg(self, conn):
+        # Un scraper de Prometheus pide las métricas por HTTP en el mismo puerto
+        if conn.recv(len(HTTP_GET), socket.MSG_PEEK) == HTTP_GET:
+            self.process_http_request(conn)
+            return
+
         raw_msg = recv_msg(conn)
-        msg = decode_msg(raw_msg)
+        self.handle_msg(decode_msg(raw_msg), conn)
 
+    def handle_msg(self, msg, conn):
+        """
+        Responde un mensaje recibido por la conexión. Los listeners que atienden otros tipos de
+        mensaje la extienden y delegan en `super()` los de todos los nodos (KEEP_ALIVE y METRICS).
+        """
         if msg.type == MsgType.KEEP_ALIVE:
             conn.sendall(SimpleMessage(type=MsgType.ALIVE, socket_compatible=True).encode())
+        elif msg.type == MsgType.METRICS:
+            conn.sendall(MetricsMessage(text=METRICS.render()).encode())
+
+    def process_http_request(self, conn):
+        """
+        Responde un pedido HTTP con las métricas del nodo en el formato de texto de Prometheus.
+        """
+        request = b''
+        while b'\r\n\r\n' not in request and len(request) < MAX_HTTP_REQUEST:
+            chunk = conn.recv(1024)
+            if not chunk:
+                break
+            request += chunk
+        body = METRICS.render().encode()
+        headers = (
+            "HTTP/1.0 200 OK\r\n"
+            "Content-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        )
+        conn.sendall(headers.encode() + body)
     
+    def send_heartbeats(self):
+        """
+        Envía un latido por UDP a cada WatchDog cada `HEARTBEAT_INTERVAL` segundos, con un número de
+        secuencia, la memoria residente del nodo y hace cuánto está procesando el mensaje actual.
+        """
+        name = f'{self.ip_prefix}_{self.id}'
+        n_watchdogs = int(os.getenv(f'{WATCHDOG_CONTAINER_NAME.upper()}_INSTANCES', '0'))
+        watchdogs = [f'{WATCHDOG_CONTAINER_NAME}_{i}' for i in range(1, n_watchdogs + 1) if f'{WATCHDOG_CONTAINER_NAME}_{i}' != name]
+        if not watchdogs:
+            return
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        addresses = []
+        resolved_at = 0
+        seq = 0
+        while not self.shutting_down:
+            # Las direcciones se resuelven cada tanto y no en cada latido
+            if time.monotonic() - resolved_at > HEARTBEAT_RESOLVE_INTERVAL:
+                addresses = []
+                for watchdog in watchdogs:
+                    try:
+                        addresses.append((socket.gethostbyname(watchdog), HEARTBEAT_PORT))
+                    except OSError:
+                        pass
+                resolved_at = time.monotonic()
+
+            seq = (seq + 1) & MAX_UINT32
+            beat = HeartbeatMessage(
+                node=name,
+                rss_kb=min(self.node_rss_kb(), MAX_UINT32),
+                busy_ms=min(int(METRICS.busy_seconds() * 1000), MAX_UINT32),
+                msg_id=seq,
+            ).encode()
+            for address in addresses:
+                try:
+                    sock.sendto(beat, address)
+                except OSError:
+                    resolved_at = 0 # El WatchDog puede haber cambiado de dirección
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    def node_rss_kb(self) -> int:
+        """
+        Memoria residente del proceso del nodo (el padre del Listener), en KB.
+        """
+        try:
+            with open(f'/proc/{os.getppid()}/statm') as statm:
+                return int(statm.read().split()[1]) * PAGE_KB
+        except (OSError, ValueError, IndexError):
+            return 0
+
     def run(self):
         """Proceso dedicado a manejar mensajes de Keep Alive."""
 
+        threading.Thread(target=self.send_heartbeats, daemon=True).start()
+
         while not self.shutting_down:
             try:
                 self.conn, _ = self.sock.accept()
@@ -1,11 +1,9 @@
 import logging
 from multiprocessing import Process
-import socket
 from election.election_logic import initiate_election
 from listener.listener import Listener
-from messages.messages import MsgType, SimpleMessage, decode_msg
+from messages.messages import MsgType, SimpleMessage
 from utils.container_constants import LISTENER_PORT
-from utils.utils import recv_msg
 
 
 class WatchDogListener(Listener):
@@ -20,15 +18,9 @@ class WatchDogListener(Listener):
         self.ok_condition = ok_condition
         self.election_process = None
 
-    def process_msg(self, conn):
-        raw_msg = recv_msg(conn)
-        msg = decode_msg(raw_msg)
-
-        if msg.type == MsgType.KEEP_ALIVE:
-            conn.sendall(SimpleMessage(type=MsgType.ALIVE, socket_compatible=True).encode())
-
-        elif msg.type == MsgType.ELECTION:
-            self._handle_election_message(msg)
+    def handle_msg(self, msg, conn):
+        if msg.type == MsgType.ELECTION:
+            self._handle_election_message(conn, msg)
 
         elif msg.type == MsgType.COORDINATOR:
             self._handle_leader_election_message(msg)
@@ -41,28 +33,25 @@ class WatchDogListener(Listener):
                 conn.sendall(SimpleMessage(type=MsgType.COORDINATOR, socket_compatible=True, node_id=self.id).encode())
             else:
                 conn.sendall(SimpleMessage(type=MsgType.NO_LEADER, socket_compatible=True).encode())
-    
-    def _handle_election_message(self, msg):
-        """Procesa un mensaje de tipo ELECTION."""
+
+        else:
+            super().handle_msg(msg, conn)
+
+    def _handle_election_message(self, conn, msg):
+        """
+        Procesa un mensaje de tipo ELECTION. La respuesta (COORDINATOR si este nodo ya es el líder,
+        OK si no) va por la misma conexión, que el nodo que inició la elección espera con un plazo corto.
+        """
         logging.info(f"[Listener] Llego un mensaje Election de {msg.node_id}")
         try:
             if self.leader_id.value == self.id:
-                with socket.create_connection((f'{self.ip_prefix}_{msg.node_id}', self.port), timeout=3) as response_socket:
-                    ok_msg = SimpleMessage(type=MsgType.COORDINATOR, socket_compatible=True, node_id=self.id)
-                    response_socket.sendall(ok_msg.encode())
-                    logging.info(f"[Listener] Enviado Leader a {self.ip_prefix}_{msg.node_id}:{self.port}")
-                    return
-            else: 
-                with socket.create_connection((f'{self.ip_prefix}_{msg.node_id}', self.port), timeout=3) as response_socket:
-                    ok_msg = SimpleMessage(type=MsgType.OK_ELECTION, socket_compatible=True, node_id=self.id)
-                    response_socket.sendall(ok_msg.encode())
-                    logging.info(f"[Listener] Enviado OK a {self.ip_prefix}_{msg.node_id}:{self.port}")
-        except socket.gaierror as e:
-            logging.warning(f"[Listener] Error en resolución de nombre al responder a {msg.node_id}: {e}")
-        except (socket.timeout, ConnectionRefusedError) as e:
+                conn.sendall(SimpleMessage(type=MsgType.COORDINATOR, socket_compatible=True, node_id=self.id).encode())
+                logging.info(f"[Listener] Enviado Leader a {self.ip_prefix}_{msg.node_id}")
+                return
+            conn.sendall(SimpleMessage(type=MsgType.OK_ELECTION, socket_compatible=True, node_id=self.id).encode())
+            logging.info(f"[Listener] Enviado OK a {self.ip_prefix}_{msg.node_id}")
+        except OSError as e:
             logging.warning(f"[Listener] Nodo {msg.node_id} no está disponible: {e}")
-        except Exception as e:
-            logging.error(f"[Listener] Error inesperado al manejar mensaje Election: {e}")
 
         start_election = False
 
@@ -2,6 +2,15 @@ import struct
 from enum import Enum
 from typing import List
 
+# Codecs precompilados de las partes de tamaño fijo de cada juego
+ITEM_LEN = struct.Struct('>I') # largo del ítem, antecede a cada juego codificado
+NAME_HEADER = struct.Struct('>IB') # app_id, largo del nombre
+Q1GAME = struct.Struct('>IIB') # largo, app_id, plataformas
+Q1GAME_BODY = struct.Struct('>IB') # app_id, plataformas
+Q2GAME_TAIL = struct.Struct('>HI') # release_year, avg_playtime
+GENREGAME_TAIL = struct.Struct('>HIB') # release_year, avg_playtime, cantidad de géneros
+DIMGAME_TAIL = struct.Struct('>BHI') # genre_flags, release_year, avg_playtime
+
 class Genre(Enum):
     """
     Tipos de género de juego.
@@ -28,6 +37,7 @@ class GamesType(Enum):
     Q1GAMES = 1
     Q2GAMES = 2
     GENREGAMES = 3
+    DIMGAME = 4
 
     @classmethod
     def get_class(cls, item_type: int):
@@ -39,6 +49,7 @@ class GamesType(Enum):
             cls.Q1GAMES.value: Q1Game,
             cls.Q2GAMES.value: Q2Game,
             cls.GENREGAMES.value: GenreGame,
+            cls.DIMGAME.value: DimGame,
         }
         return mapping.get(item_type)
 
@@ -73,16 +84,16 @@ class BasicGame(Game):
         Codifica `BasicGame` en bytes, incluyendo la longitud total.
         """
         name_bytes = self.name.encode('utf-8')
-        body = struct.pack(f'>I B{len(name_bytes)}s', self.app_id, len(name_bytes), name_bytes)
-        return struct.pack('>I', len(body)) + body  # Incluye la longitud total
+        body_length = NAME_HEADER.size + len(name_bytes)
+        return ITEM_LEN.pack(body_length) + NAME_HEADER.pack(self.app_id, len(name_bytes)) + name_bytes  # Incluye la longitud total
 
     @staticmethod
     def decode(data: bytes) -> "BasicGame":
         """
         Decodifica bytes en un objeto `BasicGame`.
         """
-        app_id, name_length = struct.unpack('>I B', data[:5])
-        name = data[5:5 + name_length].decode('utf-8')
+        app_id, name_length = NAME_HEADER.unpack_from(data)
+        name = str(data[5:5 + name_length], 'utf-8')
         return BasicGame(app_id, name)
 
     def __str__(self):
@@ -103,9 +114,7 @@ class Q1Game(Game):
         """
         Codifica `Q1Game` en bytes, incluyendo la longitud total.
         """
-        platforms = self.encode_platforms()
-        body = struct.pack(f'>I B', self.app_id, platforms)
-        return struct.pack('>I', len(body)) + body  # Incluye la longitud total
+        return Q1GAME.pack(Q1GAME_BODY.size, self.app_id, self.encode_platforms())  # Incluye la longitud total
 
     def encode_platforms(self) -> int:
         """
@@ -125,7 +134,7 @@ class Q1Game(Game):
         """
         Decodifica bytes a un Q1Game.
         """
-        app_id, platforms = struct.unpack('>I B', data[:5])
+        app_id, platforms = Q1GAME_BODY.unpack_from(data)
         windows, linux, mac = bool(platforms & 0b001), bool(platforms & 0b010), bool(platforms & 0b100)
         return Q1Game(app_id, windows, linux, mac)
 
@@ -135,12 +144,12 @@ class Q1Game(Game):
 
 class Q2Game(Game):
     """
-    Clase que hereda de `Game` y agrega `name`, `release_date` y `avg_playtime`.
+    Clase que hereda de `Game` y agrega `name`, `release_year` y `avg_playtime`.
     """
-    def __init__(self, app_id: int, name: str, release_date: str, avg_playtime: int):
+    def __init__(self, app_id: int, name: str, release_year: int, avg_playtime: int):
         super().__init__(app_id)
         self.name = name
-        self.release_date = release_date
+        self.release_year = release_year
         self.avg_playtime = avg_playtime
 
     def encode(self) -> bytes:
@@ -148,48 +157,35 @@ class Q2Game(Game):
         Codifica `Q2Game` en bytes, incluyendo la longitud total.
         """
         name_bytes = self.name.encode('utf-8')
-        release_date_bytes = self.release_date.encode('utf-8')
-        body = struct.pack(
-            f'>I B{len(name_bytes)}s B{len(release_date_bytes)}s I',
-            self.app_id,
-            len(name_bytes),
-            name_bytes,
-            len(release_date_bytes),
-            release_date_bytes,
-            self.avg_playtime
-        )
-        return struct.pack('>I', len(body)) + body  # Incluye la longitud total
+        body_length = NAME_HEADER.size + len(name_bytes) + Q2GAME_TAIL.size
+        return (ITEM_LEN.pack(body_length) + NAME_HEADER.pack(self.app_id, len(name_bytes)) + name_bytes
+                + Q2GAME_TAIL.pack(self.release_year, self.avg_playtime))  # Incluye la longitud total
 
     @staticmethod
     def decode(data: bytes) -> "Q2Game":
         """
         Decodifica bytes a un Q2Game.
         """
-        app_id, name_length = struct.unpack('>I B', data[:5])
-        offset = 5
-        name = data[offset:offset + name_length].decode('utf-8')
+        app_id, name_length = NAME_HEADER.unpack_from(data)
+        offset = NAME_HEADER.size
+        name = str(data[offset:offset + name_length], 'utf-8')
         offset += name_length
 
-        release_date_length = struct.unpack('>B', data[offset:offset + 1])[0]
-        offset += 1
-        release_date = data[offset:offset + release_date_length].decode('utf-8')
-        offset += release_date_length
-
-        avg_playtime = struct.unpack('>I', data[offset:offset + 4])[0]
-        return Q2Game(app_id, name, release_date, avg_playtime)
+        release_year, avg_playtime = Q2GAME_TAIL.unpack_from(data, offset)
+        return Q2Game(app_id, name, release_year, avg_playtime)
 
     def __str__(self):
-        return f"Q2Game(app_id={self.app_id}, name={self.name}, release_date={self.release_date}, avg_playtime={self.avg_playtime})"
+        return f"Q2Game(app_id={self.app_id}, name={self.name}, release_year={self.release_year}, avg_playtime={self.avg_playtime})"
 
 
 class GenreGame(Game):
     """
-    Clase que hereda de `Game` y agrega `name`, `release_date`, `avg_playtime`, y `genres`.
+    Clase que hereda de `Game` y agrega `name`, `release_year`, `avg_playtime`, y `genres`.
     """
-    def __init__(self, app_id: int, name: str, release_date: str, avg_playtime: int, genres: List[int]):
+    def __init__(self, app_id: int, name: str, release_year: int, avg_playtime: int, genres: List[int]):
         super().__init__(app_id)
         self.name = name
-        self.release_date = release_date
+        self.release_year = release_year
         self.avg_playtime = avg_playtime
         self.genres = genres
 
@@ -198,42 +194,94 @@ class GenreGame(Game):
         Codifica `GenreGame` en bytes, incluyendo la longitud total.
         """
         name_bytes = self.name.encode('utf-8')
-        release_date_bytes = self.release_date.encode('utf-8')
-        genres_bytes = b''.join([struct.pack('B', genre.value) for genre in self.genres])
-        
-        body = struct.pack(
-            f'>I B{len(name_bytes)}s B{len(release_date_bytes)}s I B',
-            self.app_id,
-            len(name_bytes),
-            name_bytes,
-            len(release_date_bytes),
-            release_date_bytes,
-            self.avg_playtime,
-            len(self.genres)
-        ) + genres_bytes
-
-        return struct.pack('>I', len(body)) + body  # Incluye la longitud total
+        genres_bytes = bytes([genre.value for genre in self.genres])
+        body_length = NAME_HEADER.size + len(name_bytes) + GENREGAME_TAIL.size + len(genres_bytes)
+
+        return (ITEM_LEN.pack(body_length) + NAME_HEADER.pack(self.app_id, len(name_bytes)) + name_bytes
+                + GENREGAME_TAIL.pack(self.release_year, self.avg_playtime, len(self.genres)) + genres_bytes)  # Incluye la longitud total
 
     @staticmethod
     def decode(data: bytes) -> "GenreGame":
         """
         Decodifica bytes a un GenreGame.
         """
-        app_id, name_length = struct.unpack('>I B', data[:5])
-        offset = 5
-        name = data[offset:offset + name_length].decode('utf-8')
+        app_id, name_length = NAME_HEADER.unpack_from(data)
+        offset = NAME_HEADER.size
+        name = str(data[offset:offset + name_length], 'utf-8')
         offset += name_length
 
-        release_date_length = struct.unpack('>B', data[offset:offset + 1])[0]
-        offset += 1
-        release_date = data[offset:offset + release_date_length].decode('utf-8')
-        offset += release_date_length
+        release_year, avg_playtime, genres_count = GENREGAME_TAIL.unpack_from(data, offset)
+        offset += GENREGAME_TAIL.size
+        genres = list(data[offset:offset + genres_count])
+
+        return GenreGame(app_id, name, release_year, avg_playtime, genres)
+
+    def __str__(self):
+        return f"GenreGame(app_id={self.app_id}, name={self.name}, release_year={self.release_year}, avg_playtime={self.avg_playtime}, genres={self.genres})"
+
+
+class DimGame(Game):
+    """
+    Registro de la dimensión compartida de juegos que publica el GenreFilter una sola vez
+    para todos sus consumidores. Agrega `name`, los géneros como flags de bits,
+    `release_year` y `avg_playtime`.
+    """
+    def __init__(self, app_id: int, name: str, genre_flags: int, release_year: int, avg_playtime: int):
+        super().__init__(app_id)
+        self.name = name
+        self.genre_flags = genre_flags
+        self.release_year = release_year
+        self.avg_playtime = avg_playtime
+
+    @staticmethod
+    def flags_from_genres(genres: List[int]) -> int:
+        """
+        Traduce un listado de géneros a sus flags de bits.
+        """
+        flags = 0
+        for genre in genres:
+            flags |= 1 << genre
+        return flags
 
-        avg_playtime, genres_count = struct.unpack('>IB', data[offset:offset + 5])
-        offset += 5
-        genres = [data[offset + i] for i in range(genres_count)]
+    def has_genre(self, genre: Genre) -> bool:
+        """
+        Indica si el juego pertenece al género dado.
+        """
+        return bool(self.genre_flags & (1 << genre.value))
+
+    def released_in_2010s(self) -> bool:
+        """
+        Indica si el juego fue lanzado en la década de 2010.
+        """
+        return 2010 <= self.release_year <= 2019
+
+    def to_q2game(self) -> Q2Game:
+        """
+        Proyecta el juego a un `Q2Game` para el contador de promedios.
+        """
+        return Q2Game(app_id=self.app_id, name=self.name, release_year=self.release_year, avg_playtime=self.avg_playtime)
+
+    def encode(self) -> bytes:
+        """
+        Codifica `DimGame` en bytes, incluyendo la longitud total.
+        """
+        name_bytes = self.name.encode('utf-8')
+        body_length = NAME_HEADER.size + len(name_bytes) + DIMGAME_TAIL.size
+        return (ITEM_LEN.pack(body_length) + NAME_HEADER.pack(self.app_id, len(name_bytes)) + name_bytes
+                + DIMGAME_TAIL.pack(self.genre_flags, self.release_year, self.avg_playtime))  # Incluye la longitud total
+
+    @staticmethod
+    def decode(data: bytes) -> "DimGame":
+        """
+        Decodifica bytes a un DimGame.
+        """
+        app_id, name_length = NAME_HEADER.unpack_from(data)
+        offset = NAME_HEADER.size
+        name = str(data[offset:offset + name_length], 'utf-8')
+        offset += name_length
 
-        return GenreGame(app_id, name, release_date, avg_playtime, genres)
+        genre_flags, release_year, avg_playtime = DIMGAME_TAIL.unpack_from(data, offset)
+        return DimGame(app_id, name, genre_flags, release_year, avg_playtime)
 
     def __str__(self):
-        return f"GenreGame(app_id={self.app_id}, name={self.name}, release_date={self.release_date}, avg_playtime={self.avg_playtime}, genres={self.genres})"
+        return f"DimGame(app_id={self.app_id}, name={self.name}, genre_flags={self.genre_flags}, release_year={self.release_year}, avg_playtime={self.avg_playtime})"
@@ -1,11 +1,15 @@
+from array import array
 from enum import Enum
 import struct
 import json
-from typing import List, Type, TypeVar
+import sys
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar
 
-from messages.games_msg import BasicGame, GamesType, GenreGame, Q1Game, Q2Game
+from messages.games_msg import BasicGame, DimGame, GamesType, GenreGame, Q1Game, Q2Game
 from messages.results_msg import Q1Result, Q2Result, Q3Result, Q4Result, Q5Result, QueryNumber, Result
-from messages.reviews_msg import BasicReview, Review, ReviewsType, TextReview
+from messages.reviews_msg import BasicReview, Review, ReviewCount, ReviewsType, TextReview
+from utils.metrics import METRICS
 from utils.utils import DecodeError, handle_encode_error
 
 class MsgType(Enum):
@@ -36,6 +40,13 @@ class MsgType(Enum):
     ASK_LEADER = 21
     NO_LEADER = 22
     CLOSE = 23
+    RELEVANT_GAMES = 24
+    METRICS = 25
+    HEARTBEAT = 26
+    REPLICA_STATUS = 27
+    PROMOTE = 28
+    STATE_OFFER = 29
+    STATE_STREAM_REQUEST = 30
 
 class Dataset(Enum):
     """
@@ -46,18 +57,77 @@ class Dataset(Enum):
 
 T = TypeVar("T", bound="BaseMessage")
 
+MSG_TYPE_BY_VALUE = {msg_type.value: msg_type for msg_type in MsgType}
+
+# Codecs precompilados de los encabezados de los mensajes
+BASE_HEADER = struct.Struct('>BI') # type, msg_id
+MSG_LEN = struct.Struct('>I') # largo total, para los mensajes de socket
+ITEM_LEN = struct.Struct('>I') # largo de cada ítem de un ListMessage
+CLIENT_DATA_HEADER = struct.Struct('>BI') # dataset, largo de las filas
+DATA_HEADER = struct.Struct('>BBI') # client_id, dataset, largo de las filas
+PUSH_DATA_HEADER = struct.Struct('>BI') # node_id, largo del json
+RESULT_HEADER = struct.Struct('>BB') # result_type, client_id
+LIST_HEADER = struct.Struct('>BBH') # item_type, client_id, cantidad de ítems
+RELEVANT_GAMES_HEADER = struct.Struct('>BBI') # client_id, node_type, cantidad de app_ids
+HEARTBEAT_HEADER = struct.Struct('>II') # rss_kb, busy_ms
+
+# Esquema declarativo de los mensajes simples: atributos (enteros de un byte) de cada tipo, en orden.
+# A partir de él se arma un único codec por tipo que usan tanto `encode` como `decode`.
+SIMPLE_MESSAGE_SCHEMA = {
+    MsgType.FIN: ("client_id", "node_type"),
+    MsgType.ELECTION: ("node_id",),
+    MsgType.OK_ELECTION: ("node_id",),
+    MsgType.COORDINATOR: ("node_id",),
+    MsgType.COORDFIN: ("client_id", "node_id"),
+    MsgType.SYNC_STATE_REQUEST: ("requester_id",),
+    MsgType.EMPTY_STATE: ("node_id",),
+    MsgType.FIN_NOTIFICATION: ("client_id", "node_type", "node_instance"),
+    MsgType.CLIENT_CLOSE: ("client_id",),
+    MsgType.FIN_PROPAGATED: ("client_id", "node_type"),
+    MsgType.REPLICA_STATUS: ("synchronized",), # el msg_id de la respuesta es el último push aplicado
+    MsgType.STATE_OFFER: ("node_id",), # el msg_id es el último push aplicado del estado ofrecido
+    MsgType.STATE_STREAM_REQUEST: ("requester_id",), # el msg_id es el primer chunk a enviar (cursor)
+}
+
+SIMPLE_MESSAGE_CODECS = {
+    msg_type: (fields, struct.Struct('>BI' + 'B' * len(fields)))
+    for msg_type, fields in SIMPLE_MESSAGE_SCHEMA.items()
+}
+NO_FIELDS_CODEC = ((), BASE_HEADER)
+
+def pack_uint32_array(values) -> bytes:
+    """
+    Codifica una lista de enteros sin signo de 4 bytes en big endian, sin armar un formato por llamada.
+    """
+    packed = array('I', values)
+    if sys.byteorder == 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+def unpack_uint32_array(data: bytes) -> List[int]:
+    """
+    Decodifica una lista de enteros sin signo de 4 bytes en big endian.
+    """
+    unpacked = array('I')
+    unpacked.frombytes(data)
+    if sys.byteorder == 'little':
+        unpacked.byteswap()
+    return unpacked.tolist()
+
 # Diccionarios de mapeo para clases específicas
 GAME_CLASSES = {
     0: BasicGame,
     1: Q1Game,
     2: Q2Game,
-    3: GenreGame
+    3: GenreGame,
+    4: DimGame
 }
 
 REVIEW_CLASSES = {
     0: Review,
     1: BasicReview,
-    2: TextReview
+    2: TextReview,
+    3: ReviewCount
 }
 
 RESULT_CLASSES = {
@@ -116,7 +186,7 @@ class BaseMessage:
 
         :return: Los datos binarios que incluyen `type` y `msg_id`.
         """
-        return struct.pack('>BI', self.type.value, self.msg_id)
+        return BASE_HEADER.pack(self.type.value, self.msg_id)
 
     @classmethod
     def base_decode(cls: Type[T], data: bytes) -> (MsgType, int, bytes): # type: ignore
@@ -132,12 +202,11 @@ class BaseMessage:
             raise DecodeError("Insufficient data to decode `type` and `msg_id`")
 
         # Decodificar el `type` y el `msg_id`
-        type_value, msg_id = struct.unpack('>BI', data[:5])
-        remaining_data = data[5:]
+        type_value, msg_id = BASE_HEADER.unpack_from(data)
+        remaining_data = data[BASE_HEADER.size:]
 
-        try:
-            msg_type = MsgType(type_value)
-        except ValueError:
+        msg_type = MSG_TYPE_BY_VALUE.get(type_value)
+        if msg_type is None:
             raise DecodeError(f"Unknown MsgType: {type_value}")
 
         return msg_type, msg_id, remaining_data
@@ -151,8 +220,7 @@ class BaseMessage:
         :param body: Los datos binarios del mensaje.
         :return: Los datos binarios con el tamaño total prepended.
         """
-        total_len = len(body)
-        return struct.pack('>I', total_len) + body
+        return MSG_LEN.pack(len(body)) + body
 
     def __str__(self):
         return f"{self.__class__.__name__}({vars(self)})"
@@ -177,22 +245,14 @@ class SimpleMessage(BaseMessage):
         """Codifica un mensaje simple en formato binario.
 
         Si `socket_compatible` es True, se agrega la longitud total del
-        mensaje al inicio del cuerpo. Los atributos adicionales se codifican
-        como enteros de un byte.
+        mensaje al inicio del cuerpo. Los atributos del esquema del tipo se
+        codifican como enteros de un byte.
 
         :return: El mensaje codificado en binario.
         """
-        # Codificar los campos comunes (`type` y `msg_id`)
-        base_data = self.base_encode()
-
-        # Codificar atributos específicos
-        body = b""
-        for attr, value in vars(self).items():
-            if attr not in {"type", "msg_id", "socket_compatible"}:
-                body += struct.pack('>B', value)
-
-        # Concatenar la base y los datos específicos
-        encoded_message = base_data + body
+        # Codificar los campos comunes (`type` y `msg_id`) y los atributos específicos en un solo pack
+        fields, codec = SIMPLE_MESSAGE_CODECS.get(self.type, NO_FIELDS_CODEC)
+        encoded_message = codec.pack(self.type.value, self.msg_id, *[getattr(self, field) for field in fields])
 
         # Agregar largo total si es necesario
         if self.socket_compatible:
@@ -211,50 +271,34 @@ class SimpleMessage(BaseMessage):
         :raises DecodeError: Si los datos son insuficientes o no coinciden con
                             el tipo esperado.
         """
-        ATTRIBUTE_MAPPING = {
-            MsgType.FIN: ["client_id", "node_type"],
-            MsgType.ELECTION: ["node_id"],
-            MsgType.OK_ELECTION: ["node_id"],
-            MsgType.COORDINATOR: ["node_id"],
-            MsgType.COORDFIN: ["client_id", "node_id"],
-            MsgType.SYNC_STATE_REQUEST: ["requester_id"],
-            MsgType.EMPTY_STATE: ["node_id"],
-            MsgType.FIN_NOTIFICATION: ["client_id", "node_type", "node_instance"],
-            MsgType.CLIENT_CLOSE: ["client_id"],
-            MsgType.FIN_PROPAGATED: ["client_id", "node_type"]
-        }
+        if len(data) < BASE_HEADER.size:  # 1 byte para `type` y 4 bytes para `msg_id`
+            raise DecodeError("Insufficient data to decode `type` and `msg_id`")
 
-        # Decodificar los campos comunes (`type` y `msg_id`)
-        msg_type, msg_id, remaining_data = cls.base_decode(data)
+        msg_type = MSG_TYPE_BY_VALUE.get(data[0])
+        if msg_type is None:
+            raise DecodeError(f"Unknown MsgType: {data[0]}")
 
-        # Determinar el mapeo de atributos según el tipo de mensaje
-        attribute_names = ATTRIBUTE_MAPPING.get(msg_type, [])
+        # Determinar el codec según el esquema del tipo de mensaje
+        attribute_names, codec = SIMPLE_MESSAGE_CODECS.get(msg_type, NO_FIELDS_CODEC)
 
-        if len(remaining_data) < len(attribute_names):
+        if len(data) < codec.size:
             raise DecodeError(f"Insufficient data to decode attributes for {msg_type}")
-        
-        # Decodificar los campos adicionales en base al número esperado de atributos
-        format_string = f'>{len(attribute_names)}B'
-        fields = struct.unpack(format_string, remaining_data[:len(attribute_names)])
-
-        if len(fields) != len(attribute_names):
-            raise DecodeError(f"Expected {len(attribute_names)} fields for {type}, got {len(fields)}")
 
-        # Crear un diccionario de atributos con nombres correctos
-        attributes = dict(zip(attribute_names, fields))
+        # Decodificar los campos comunes y los atributos en un solo unpack
+        _, msg_id, *fields = codec.unpack_from(data)
 
         # Instanciar la clase con los atributos
-        return cls(type=msg_type, msg_id=msg_id, **attributes)
+        return cls(type=msg_type, msg_id=msg_id, **dict(zip(attribute_names, fields)))
 
 # ===================================================================================================================== #
 
 class ClientData(BaseMessage):
-    def __init__(self, rows: List[str], dataset: Dataset, msg_id: int = 0):
+    def __init__(self, rows: bytes, dataset: Dataset, msg_id: int = 0):
         """
         Mensaje que contiene datos del cliente.
 
         :param msg_id: Identificador único del mensaje.
-        :param rows: Lista de filas de datos.
+        :param rows: Bloque opaco con las filas ya codificadas y separadas por saltos de línea.
         :param dataset: Tipo de dataset (Dataset).
         """
         super().__init__(MsgType.CLIENT_DATA, msg_id=msg_id, rows=rows, dataset=dataset)
@@ -269,22 +313,18 @@ class ClientData(BaseMessage):
         # Codificar los campos comunes (`type` y `msg_id`)
         base_data = self.base_encode()
 
-        # Codificar atributos específicos
-        data_bytes = "\n".join(self.rows).encode()
-        data_length = len(data_bytes)
-
-        # Codificar dataset, longitud de datos y datos
-        body = struct.pack('>BI', self.dataset.value, data_length) + data_bytes
+        # Codificar dataset, longitud de datos y el bloque de filas tal cual llega
+        body = b"".join([base_data, CLIENT_DATA_HEADER.pack(self.dataset.value, len(self.rows)), self.rows])
 
         # añadir longitud total al mensaje y retornar
-        body_with_len = self.add_msg_len(base_data + body)
-        return body_with_len
+        return self.add_msg_len(body)
 
     @classmethod
     def decode(cls: Type[T], data: bytes) -> T:
         """Decodifica un mensaje `ClientData` desde binario.
 
-        Extrae el `msg_id`, el dataset y las filas (`rows`).
+        Extrae el `msg_id`, el dataset y las filas (`rows`). Las filas no se
+        decodifican: quedan como una vista sobre `data`, sin copiarlas.
 
         :param data: Los datos binarios del mensaje.
         :return: Una instancia de `ClientData`.
@@ -292,7 +332,7 @@ class ClientData(BaseMessage):
         """
 
         # Decodificar los campos comunes (`type` y `msg_id`)
-        msg_type, msg_id, remaining_data = cls.base_decode(data)
+        msg_type, msg_id, remaining_data = cls.base_decode(memoryview(data))
 
         if msg_type != MsgType.CLIENT_DATA:
             raise DecodeError(f"Invalid message type: expected {MsgType.CLIENT_DATA}, got {msg_type}")
@@ -302,13 +342,11 @@ class ClientData(BaseMessage):
         if len(remaining_data) < 5:  # 1 byte para dataset y 4 bytes para data_length
             raise DecodeError("Insufficient data to decode ClientData header")
 
-        dataset_value, data_length = struct.unpack('>BI', remaining_data[:5])
+        dataset_value, data_length = CLIENT_DATA_HEADER.unpack_from(remaining_data)
         if len(remaining_data) < 5 + data_length:
             raise DecodeError(f"Insufficient data to decode ClientData: expected {5 + data_length}, got {len(remaining_data)}")
 
-        # Decodificar filas
-        rows_data = remaining_data[5:5 + data_length].decode()
-        rows = rows_data.split("\n")
+        rows = remaining_data[5:5 + data_length]
         return cls(rows=rows, dataset=Dataset(dataset_value), msg_id=msg_id)
 
     def __str__(self):
@@ -371,12 +409,12 @@ class ActiveNodesMessage(BaseMessage):
 
 
 class Data(BaseMessage):
-    def __init__(self, client_id: int, rows: List[str], dataset: Dataset, msg_id: int = 0):
+    def __init__(self, client_id: int, rows: bytes, dataset: Dataset, msg_id: int = 0):
         """
         Mensaje de datos con información del cliente.
 
         :param client_id: Identificador único del cliente.
-        :param rows: Lista de filas de datos.
+        :param rows: Bloque opaco con las filas codificadas y separadas por saltos de línea.
         :param dataset: Tipo de dataset (Dataset).
         :param msg_id: Identificador único del mensaje.
         """
@@ -392,28 +430,25 @@ class Data(BaseMessage):
         # Codificar los campos comunes (`type` y `msg_id`)
         base_data = self.base_encode()
 
-        # Codificar atributos específicos
-        data_bytes = "\n".join(self.rows).encode()
-        data_length = len(data_bytes)
-        
-        # Codificar `client_id`, `dataset` y longitud de datos
-        body = struct.pack('>BBI', self.client_id, self.dataset.value, data_length) + data_bytes
+        # Codificar `client_id`, `dataset`, longitud de datos y el bloque de filas tal cual llega
+        header = DATA_HEADER.pack(self.client_id, self.dataset.value, len(self.rows))
 
         # Concatenar la base y los datos específicos
-        return base_data + body
+        return b"".join([base_data, header, self.rows])
 
     @classmethod
     def decode(cls: Type[T], data: bytes) -> T:
         """Decodifica un mensaje `Data` desde binario.
 
-        Extrae el `msg_id`, el `client_id`, el dataset y las filas (`rows`).
+        Extrae el `msg_id`, el `client_id`, el dataset y las filas (`rows`). Las
+        filas no se decodifican: quedan como una vista sobre `data`, sin copiarlas.
 
         :param data: Los datos binarios del mensaje.
         :return: Una instancia de `Data`.
         :raises DecodeError: Si los datos son insuficientes o inválidos.
         """
         # Decodificar los campos comunes (`type` y `msg_id`)
-        msg_type, msg_id, remaining_data = cls.base_decode(data)
+        msg_type, msg_id, remaining_data = cls.base_decode(memoryview(data))
 
         if msg_type != MsgType.DATA:
             raise DecodeError(f"Invalid message type: expected {MsgType.DATA}, got {msg_type}")
@@ -422,14 +457,12 @@ class Data(BaseMessage):
         if len(remaining_data) < 6:  # 1 byte para `client_id`, 1 byte para `dataset`, 4 bytes para `data_length`
             raise DecodeError("Insufficient data to decode Data header")
 
-        client_id, dataset_value, data_length = struct.unpack('>BBI', remaining_data[:6])
+        client_id, dataset_value, data_length = DATA_HEADER.unpack_from(remaining_data)
 
         if len(remaining_data) < 6 + data_length:
             raise DecodeError(f"Insufficient data to decode Data: expected {6 + data_length}, got {len(remaining_data)}")
 
-        # Decodificar filas
-        rows_data = remaining_data[6:6 + data_length].decode()
-        rows = rows_data.split("\n")
+        rows = remaining_data[6:6 + data_length]
 
         return cls(client_id=client_id, rows=rows, dataset=Dataset(dataset_value), msg_id=msg_id)
 
@@ -471,20 +504,17 @@ class PushDataMessage(BaseMessage):
 
         Incluye el msg_id, tipo de mensaje (`type`) y los datos serializados.
         """
-        # Codificar los campos comunes (`type` y `msg_id`)
-        base_data = self.base_encode()
-
-        node_id = struct.pack('>B', self.node_id)
-
         # Serializar el diccionario de datos a JSON
         data_json = json.dumps(self.data)
-        data_bytes = data_json.encode()
+        return self.encode_json(data_json.encode(), self.node_id, self.msg_id)
 
-        # Codificar la longitud del mensaje y los datos
-        body = struct.pack('>I', len(data_bytes)) + data_bytes
-
-        # Concatenar la base, el node_id y el cuerpo
-        return base_data + node_id + body
+    @staticmethod
+    def encode_json(data_bytes: bytes, node_id: int = 0, msg_id: int = 0) -> bytes:
+        """
+        Codifica el mensaje a partir de los datos ya serializados en JSON.
+        """
+        # Concatenar la base (`type` y `msg_id`), el node_id, la longitud de los datos y los datos
+        return BASE_HEADER.pack(MsgType.PUSH_DATA.value, msg_id) + PUSH_DATA_HEADER.pack(node_id, len(data_bytes)) + data_bytes
 
     @classmethod
     def decode(cls: Type[T], data: bytes) -> T:
@@ -499,16 +529,11 @@ class PushDataMessage(BaseMessage):
         if msg_type != MsgType.PUSH_DATA:
             raise DecodeError(f"Invalid message type: expected {MsgType.PUSH_DATA}, got {msg_type}")
         
-        # Decodificar el campo node_id
-        if len(remaining_data) < 1:
-            raise DecodeError("Insufficient data to decode node_id")
-        node_id = struct.unpack('>B', remaining_data[:1])[0]
+        # Decodificar el campo node_id y la longitud de los datos
+        if len(remaining_data) < PUSH_DATA_HEADER.size:
+            raise DecodeError("Insufficient data to decode PushDataMessage header")
+        node_id, data_len = PUSH_DATA_HEADER.unpack_from(remaining_data)
         remaining_data = remaining_data[1:]
-        
-        # Decodificar la longitud de los datos
-        if len(remaining_data) < 4:
-            raise DecodeError("Insufficient data to decode PushDataMessage length")
-        data_len = struct.unpack('>I', remaining_data[:4])[0]
 
         if len(remaining_data) < 4 + data_len:
             raise DecodeError(f"Insufficient data to decode PushDataMessage: expected {4 + data_len}, got {len(remaining_data)}")
@@ -526,6 +551,105 @@ class PushDataMessage(BaseMessage):
         """
         return f"PushDataMessage(msg_id={self.msg_id}, data={self.data})"
     
+def encode_state_chunks(state: Iterable[Tuple[str, object]], node_id: int, max_size: int) -> Iterator[bytes]:
+    """
+    Parte un estado en `PushDataMessage`s numerados en el msg_id, con a lo sumo `max_size` bytes de JSON
+    de valores cada uno (salvo que un único valor ya los supere). Los chunks se arman a medida que se
+    recorre `state`, así que el estado completo nunca está en memoria.
+
+    `state` son pares (estructura, valor). Los dicts y los sets se parten entre chunks a cualquier
+    profundidad: un chunk puede traer solo algunos clientes, o solo algunos juegos de un cliente. Por eso
+    el que carga el estado tiene que unir las partes, actualizando los dicts y los sets en lugar de
+    reemplazarlos. Un iterador de pares (clave, valor) se parte como un dict, y se recorre recién al
+    armar su chunk. Los demás valores (listas, tuplas, números, textos) van enteros.
+
+    Las claves de los dicts y los elementos de los sets se recorren ordenados (los iteradores, en su
+    orden), por lo que el mismo estado se parte siempre igual.
+    """
+    writer = _StateChunkWriter(node_id, max_size)
+    for structure, value in state:
+        yield from writer.write((), structure, value)
+    if writer.values:
+        yield writer.flush()
+
+class _StateChunkWriter:
+    """
+    Escribe el JSON de los chunks de `encode_state_chunks`: abre y cierra los dicts y sets anidados
+    a medida que cambia el camino (estructura, cliente, ...) de cada valor, y al cortar un chunk
+    vuelve a abrir en el siguiente los que quedaron a la mitad.
+    """
+
+    def __init__(self, node_id: int, max_size: int):
+        self.node_id = node_id
+        self.max_size = max_size
+        self.seq = 0
+        self._start()
+
+    def _start(self):
+        self.parts = ['{']
+        self.size = 0 # bytes de los valores escritos
+        self.values = 0
+        self.path = () # (clave, cierre) de cada contenedor abierto, desde la raíz
+        self.counts = [0] # elementos escritos en la raíz y en cada contenedor abierto
+
+    def write(self, path: tuple, key, value) -> Iterator[bytes]:
+        """Escribe `value` en la clave `key` del contenedor en `path`, y genera los chunks que se completen."""
+        if isinstance(value, (dict, Iterator)):
+            items = ((item_key, value[item_key]) for item_key in sorted(value, key=str)) if isinstance(value, dict) else value
+            container = path + ((key, '}'),)
+            empty = True
+            for item_key, item in items:
+                empty = False
+                yield from self.write(container, item_key, item)
+            if empty:
+                yield from self._write_value(path, key, '{}')
+        elif isinstance(value, (set, frozenset)):
+            container = path + ((key, ']'),)
+            for element in sorted(value, key=str):
+                yield from self._write_value(container, None, json.dumps(element))
+            if not value:
+                yield from self._write_value(path, key, '[]')
+        else:
+            yield from self._write_value(path, key, json.dumps(value))
+
+    def _write_value(self, path: tuple, key, text: str) -> Iterator[bytes]:
+        fragment = text if key is None else f'{json.dumps(str(key))}: {text}'
+        if self.values and self.size + len(fragment) > self.max_size:
+            yield self.flush()
+        self._move(path)
+        self._append(fragment)
+        self.size += len(fragment)
+        self.values += 1
+
+    def _move(self, path: tuple):
+        """Cierra los contenedores abiertos que no están en `path` y abre los que faltan."""
+        common = 0
+        while common < min(len(self.path), len(path)) and self.path[common] == path[common]:
+            common += 1
+        for _, closing in reversed(self.path[common:]):
+            self.parts.append(closing)
+            self.counts.pop()
+        for key, closing in path[common:]:
+            self._append(f'{json.dumps(str(key))}: {"{" if closing == "}" else "["}')
+            self.counts.append(0)
+        self.path = path
+
+    def _append(self, text: str):
+        if self.counts[-1]:
+            self.parts.append(', ')
+        self.counts[-1] += 1
+        self.parts.append(text)
+
+    def flush(self) -> bytes:
+        """Cierra el chunk en curso y lo devuelve codificado."""
+        self._move(())
+        self.parts.append('}')
+        # json.dumps escapa lo que no es ASCII, así que el largo en caracteres es el largo en bytes
+        chunk = PushDataMessage.encode_json(''.join(self.parts).encode(), self.node_id, self.seq)
+        self.seq += 1
+        self._start()
+        return chunk
+
 # ===================================================================================================================== #
 
 class ResultMessage(BaseMessage):
@@ -564,7 +688,7 @@ class ResultMessage(BaseMessage):
         base_data = self.base_encode()
 
         # Codificar atributos específicos
-        body = struct.pack('>BB', int(self.result_type.value), self.client_id) + self.result.encode()
+        body = RESULT_HEADER.pack(int(self.result_type.value), self.client_id) + self.result.encode()
         body_with_len = self.add_msg_len(base_data + body)
         return body_with_len
 
@@ -590,7 +714,7 @@ class ResultMessage(BaseMessage):
         # Decodificar el tipo de resultado y el client_id
         if len(remaining_data) < 2:
             raise DecodeError("Insufficient data to decode ResultMessage header")
-        result_type_value, client_id = struct.unpack('>BB', remaining_data[:2])
+        result_type_value, client_id = RESULT_HEADER.unpack_from(remaining_data)
         
         # Determinar la clase del resultado
         result_cls = cls.RESULT_CLASSES.get(result_type_value)
@@ -628,11 +752,13 @@ class ListMessage(BaseMessage):
             1: Q1Game,
             2: Q2Game,
             3: GenreGame,
+            4: DimGame,
         },
         MsgType.REVIEWS.value: {  # Mapeo para reseñas
             0: Review,
             1: BasicReview,
             2: TextReview,
+            3: ReviewCount,
         },
     }
 
@@ -678,18 +804,21 @@ class ListMessage(BaseMessage):
         :param item_cls: Clase que define el tipo de elementos.
         :return: Lista de objetos decodificados.
         """
+        # Los ítems se decodifican sobre un memoryview para no copiar cada uno
+        data = memoryview(data)
+        data_length = len(data)
+        item_decode = item_cls.decode
         offset = 0
         items = []
         for _ in range(count):
-            if len(data) < offset + 4:
+            if data_length < offset + ITEM_LEN.size:
                 raise DecodeError("Insufficient data to decode item length")
-            item_length = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
-            if len(data) < offset + item_length:
+            item_length = ITEM_LEN.unpack_from(data, offset)[0]
+            offset += ITEM_LEN.size
+            if data_length < offset + item_length:
                 raise DecodeError("Insufficient data to decode item data")
-            item_data = data[offset:offset + item_length]
+            items.append(item_decode(data[offset:offset + item_length]))
             offset += item_length
-            items.append(item_cls.decode(item_data))
         return items
 
     @handle_encode_error
@@ -703,9 +832,7 @@ class ListMessage(BaseMessage):
 
         # Codificar atributos específicos
         items_bytes = b"".join([item.encode() for item in self.items])
-        body = struct.pack('>BBH', self.item_type.value, self.client_id, len(self.items)) + items_bytes
-
-        return base_data + body
+        return base_data + LIST_HEADER.pack(self.item_type.value, self.client_id, len(self.items)) + items_bytes
 
     @classmethod
     def decode(cls: Type[T], data: bytes) -> T:
@@ -718,12 +845,12 @@ class ListMessage(BaseMessage):
         """
         # Decodificar los campos comunes (`type` y `msg_id`)
         msg_type, msg_id, remaining_data = cls.base_decode(data)
-        if len(remaining_data) < 4:
+        if len(remaining_data) < LIST_HEADER.size:
             raise DecodeError("Insufficient data to decode ListMessage header")
 
         # Decodificar el item_type, client_id y cantidad de elementos
-        item_type_value, client_id, items_count = struct.unpack('>BBH', remaining_data[:4])
-        remaining_data = remaining_data[4:]
+        item_type_value, client_id, items_count = LIST_HEADER.unpack_from(remaining_data)
+        remaining_data = remaining_data[LIST_HEADER.size:]
 
         # Obtener la clase del ítem
         item_cls = cls.get_item_class(msg_type.value, item_type_value)
@@ -746,6 +873,205 @@ class ListMessage(BaseMessage):
         return f"ListMessage(type={self.type}, msg_id={self.msg_id}, item_type={self.item_type}, client_id={self.client_id}, items={self.items})"
 
 
+# ========================================================================================================== #
+
+class BatchBuilder:
+    """
+    Arma el payload de un `ListMessage` a partir de ítems ya codificados.
+
+    Los ítems se agregan directamente a un `bytearray` que ya contiene el encabezado,
+    por lo que cada ítem se codifica una única vez y no se arman listas intermedias.
+    Cuando el próximo ítem excede el presupuesto de bytes (o la cantidad máxima de
+    ítems del encabezado) se emite el batch actual a través de `send`.
+    """
+
+    HEADER = struct.Struct('>BIBBH') # type, msg_id, item_type, client_id, cantidad de ítems
+    COUNT = struct.Struct('>H')
+    COUNT_OFFSET = 7
+    MAX_ITEMS = 0xFFFF
+
+    def __init__(self, type: MsgType, item_type: Enum, client_id: int, send: Callable[[bytes], None], max_size: Optional[int] = None):
+        """
+        :param type: Tipo de mensaje (MsgType, como GAMES o REVIEWS).
+        :param item_type: Subtipo de los elementos (GamesType, ReviewsType, etc.).
+        :param client_id: Id del cliente.
+        :param send: Función que recibe cada payload listo para enviar.
+        :param max_size: Presupuesto en bytes de los ítems de cada batch (sin límite si es None).
+        """
+        self.type = type
+        self.item_type = item_type
+        self.client_id = client_id
+        self.send = send
+        self.max_size = max_size
+        self.count = 0
+        self._buffer = bytearray(self.HEADER.pack(type.value, 0, item_type.value, client_id, 0))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> int:
+        """Cantidad de bytes de los ítems del batch actual."""
+        return len(self._buffer) - self.HEADER.size
+
+    def append(self, encoded_item: bytes):
+        """
+        Agrega un ítem ya codificado (con su largo al principio).
+        Si el ítem no entra en el batch actual, primero se emite el batch.
+        """
+        if self.count and (self.count == self.MAX_ITEMS or (self.max_size is not None and self.size + len(encoded_item) > self.max_size)):
+            self.flush()
+        self._buffer += encoded_item
+        self.count += 1
+
+    def add(self, item):
+        """
+        Codifica y agrega un ítem.
+        """
+        self.append(item.encode())
+
+    def flush(self):
+        """
+        Emite el batch actual si tiene ítems y reinicia el builder.
+        """
+        if not self.count:
+            return
+        self.COUNT.pack_into(self._buffer, self.COUNT_OFFSET, self.count)
+        payload = bytes(self._buffer)
+        del self._buffer[self.HEADER.size:]
+        METRICS.inc('items_out_total', self.count, type=self.type.name, item_type=self.item_type.name)
+        self.count = 0
+        self.send(payload)
+
+# ========================================================================================================== #
+
+class RelevantGamesMessage(BaseMessage):
+    """
+    Mensaje con el conjunto exacto de `app_id` relevantes para un cliente.
+    Lo publican los joiners al recibir el FIN de juegos para que el ScoreFilter
+    descarte temprano las reseñas de juegos que nunca van a joinear.
+    """
+
+    def __init__(self, client_id: int, node_type: int, app_ids: List[int], msg_id: int = 0):
+        """
+        :param client_id: Id del cliente.
+        :param node_type: Valor del NodeType del joiner que publica el conjunto.
+        :param app_ids: Lista de `app_id` relevantes.
+        :param msg_id: Identificador único del mensaje.
+        """
+        super().__init__(MsgType.RELEVANT_GAMES, msg_id=msg_id, client_id=client_id, node_type=node_type, app_ids=app_ids)
+
+    @handle_encode_error
+    def encode(self) -> bytes:
+        """
+        Codifica el mensaje en formato binario.
+
+        Orden: `client_id` (1 byte), `node_type` (1 byte), cantidad (4 bytes) y los `app_id` (4 bytes c/u).
+        """
+        # Codificar los campos comunes (`type` y `msg_id`)
+        base_data = self.base_encode()
+
+        header = RELEVANT_GAMES_HEADER.pack(self.client_id, self.node_type, len(self.app_ids))
+        return base_data + header + pack_uint32_array(self.app_ids)
+
+    @classmethod
+    def decode(cls: Type[T], data: bytes) -> T:
+        """
+        Decodifica un mensaje `RelevantGamesMessage` desde binario.
+
+        :param data: Datos binarios a decodificar.
+        :return: Instancia de `RelevantGamesMessage`.
+        :raises DecodeError: Si los datos son insuficientes o inválidos.
+        """
+        # Decodificar los campos comunes (`type` y `msg_id`)
+        msg_type, msg_id, remaining_data = cls.base_decode(data)
+
+        if msg_type != MsgType.RELEVANT_GAMES:
+            raise DecodeError(f"Invalid message type: expected {MsgType.RELEVANT_GAMES}, got {msg_type}")
+
+        if len(remaining_data) < RELEVANT_GAMES_HEADER.size:
+            raise DecodeError("Insufficient data to decode RelevantGamesMessage header")
+        client_id, node_type, count = RELEVANT_GAMES_HEADER.unpack_from(remaining_data)
+
+        offset = RELEVANT_GAMES_HEADER.size
+        if len(remaining_data) < offset + 4 * count:
+            raise DecodeError(f"Insufficient data to decode RelevantGamesMessage: expected {offset + 4 * count}, got {len(remaining_data)}")
+        app_ids = unpack_uint32_array(remaining_data[offset:offset + 4 * count])
+
+        return cls(client_id=client_id, node_type=node_type, app_ids=app_ids, msg_id=msg_id)
+
+    def __str__(self):
+        """
+        Representación legible del mensaje.
+        """
+        return f"RelevantGamesMessage(msg_id={self.msg_id}, client_id={self.client_id}, node_type={self.node_type}, app_ids={len(self.app_ids)})"
+
+# ========================================================================================================== #
+
+class MetricsMessage(BaseMessage):
+    """
+    Pedido de métricas al Listener de un nodo (con `text` vacío) y su respuesta, con las
+    métricas en el formato de texto de Prometheus.
+    """
+
+    def __init__(self, text: str = '', msg_id: int = 0):
+        super().__init__(MsgType.METRICS, msg_id=msg_id, text=text)
+
+    @handle_encode_error
+    def encode(self) -> bytes:
+        """
+        Codifica el mensaje con la longitud total al inicio, para enviarlo por socket.
+        """
+        return self.add_msg_len(self.base_encode() + self.text.encode())
+
+    @classmethod
+    def decode(cls: Type[T], data: bytes) -> T:
+        """
+        Decodifica un mensaje `MetricsMessage` desde binario.
+        """
+        msg_type, msg_id, remaining_data = cls.base_decode(data)
+        if msg_type != MsgType.METRICS:
+            raise DecodeError(f"Invalid message type: expected {MsgType.METRICS}, got {msg_type}")
+        return cls(text=bytes(remaining_data).decode(), msg_id=msg_id)
+
+    def __str__(self):
+        return f"MetricsMessage(msg_id={self.msg_id}, text_length={len(self.text)})"
+
+# ========================================================================================================== #
+
+class HeartbeatMessage(BaseMessage):
+    """
+    Latido que el Listener de cada nodo envía por UDP a los WatchDogs. El `msg_id` es el número de
+    secuencia del latido, y lleva la memoria residente del nodo y hace cuánto está procesando el
+    mensaje actual (0 si está esperando mensajes).
+    """
+
+    def __init__(self, node: str = '', rss_kb: int = 0, busy_ms: int = 0, msg_id: int = 0):
+        super().__init__(MsgType.HEARTBEAT, msg_id=msg_id, node=node, rss_kb=rss_kb, busy_ms=busy_ms)
+
+    @handle_encode_error
+    def encode(self) -> bytes:
+        """
+        Codifica el latido. Viaja en un datagrama, por lo que no lleva la longitud al inicio.
+        """
+        return self.base_encode() + HEARTBEAT_HEADER.pack(self.rss_kb, self.busy_ms) + self.node.encode()
+
+    @classmethod
+    def decode(cls: Type[T], data: bytes) -> T:
+        """
+        Decodifica un mensaje `HeartbeatMessage` desde binario.
+        """
+        msg_type, msg_id, remaining_data = cls.base_decode(data)
+        if msg_type != MsgType.HEARTBEAT:
+            raise DecodeError(f"Invalid message type: expected {MsgType.HEARTBEAT}, got {msg_type}")
+        rss_kb, busy_ms = HEARTBEAT_HEADER.unpack_from(remaining_data)
+        node = bytes(remaining_data[HEARTBEAT_HEADER.size:]).decode()
+        return cls(node=node, rss_kb=rss_kb, busy_ms=busy_ms, msg_id=msg_id)
+
+    def __str__(self):
+        return f"HeartbeatMessage(seq={self.msg_id}, node={self.node}, rss_kb={self.rss_kb}, busy_ms={self.busy_ms})"
+
+
 # Uso General del Decode
 MESSAGE_CLASSES = {
     MsgType.GAMES: ListMessage,
@@ -754,6 +1080,9 @@ MESSAGE_CLASSES = {
     MsgType.CLIENT_DATA: ClientData,
     MsgType.DATA: Data,
     MsgType.PUSH_DATA: PushDataMessage,
+    MsgType.RELEVANT_GAMES: RelevantGamesMessage,
+    MsgType.METRICS: MetricsMessage,
+    MsgType.HEARTBEAT: HeartbeatMessage,
     #========== SimpleMessages ==========#
     MsgType.HANDSHAKE: SimpleMessage,
     MsgType.FIN: SimpleMessage,
@@ -772,23 +1101,41 @@ MESSAGE_CLASSES = {
     MsgType.FIN_PROPAGATED: SimpleMessage,
     MsgType.ASK_LEADER: SimpleMessage,
     MsgType.NO_LEADER: SimpleMessage,
-    MsgType.CLOSE: SimpleMessage
+    MsgType.CLOSE: SimpleMessage,
+    MsgType.REPLICA_STATUS: SimpleMessage,
+    MsgType.PROMOTE: SimpleMessage,
+    MsgType.STATE_OFFER: SimpleMessage,
+    MsgType.STATE_STREAM_REQUEST: SimpleMessage
 }
 
 
+# Tabla de despacho indexada por el byte de tipo del mensaje
+DECODERS = [None] * 256
+for _msg_type, _msg_class in MESSAGE_CLASSES.items():
+    DECODERS[_msg_type.value] = _msg_class.decode
+
+
 def decode_msg(data: bytes) -> BaseMessage:
     """
     Decodifica bytes a un BaseMessage.
     """
-    try:
-        type = MsgType(data[0])
-        msg_class = MESSAGE_CLASSES.get(type)
-        if msg_class:
-            return msg_class.decode(data)
-        raise DecodeError(f"Unhandled MsgType: {data[0]}")
-    except IndexError:
+    if not data:
         raise DecodeError("Data too short to determine message type")
-    except ValueError:
+    decoder = DECODERS[data[0]]
+    if decoder is None:
+        if data[0] in MSG_TYPE_BY_VALUE:
+            raise DecodeError(f"Unhandled MsgType: {data[0]}")
         raise DecodeError(f"Unknown MsgType: {data[0]}")
+    try:
+        if not METRICS.recording:
+            return decoder(data)
+        start = time.perf_counter()
+        msg = decoder(data)
+        METRICS.observe('decode_seconds', time.perf_counter() - start, type=msg.type.name)
+        if isinstance(msg, ListMessage):
+            METRICS.inc('items_in_total', len(msg.items), type=msg.type.name)
+        return msg
+    except ValueError as e:
+        raise DecodeError(f"Invalid {MSG_TYPE_BY_VALUE[data[0]].name} message: {e}")
 
 
@@ -1,6 +1,12 @@
 import struct
 from enum import Enum
 
+# Codecs precompilados de las partes de tamaño fijo de los resultados
+Q1RESULT = struct.Struct('>IHH') # windows, mac, linux
+NAME_LEN = struct.Struct('>H')
+COUNT = struct.Struct('>I')
+APP_ID_NAME_LEN = struct.Struct('>IH') # app_id, largo del nombre
+
 class QueryNumber(Enum):
     """
     Clase enum con las distintas queries.
@@ -39,13 +45,12 @@ class Q1Result(Result):
 
     def encode(self) -> bytes:
         """Codifica el resultado de la query 1 a bytes para su envío."""
-        body = struct.pack('>IHH', self.windows_count, self.mac_count, self.linux_count)
-        return body
+        return Q1RESULT.pack(self.windows_count, self.mac_count, self.linux_count)
 
     @classmethod
     def decode(cls, data: bytes) -> "Q1Result":
         """Decodifica los bytes correspondientes al resultado de la query 1."""
-        windows_count, mac_count, linux_count = struct.unpack('>IHH', data)
+        windows_count, mac_count, linux_count = Q1RESULT.unpack(data)
         return cls(windows_count=windows_count, mac_count=mac_count, linux_count=linux_count)
 
 class Q2Result(Result):
@@ -60,12 +65,11 @@ class Q2Result(Result):
 
     def encode(self) -> bytes:
         """Codifica el resultado de la query 2 a bytes para su envío."""
-        body = b''
+        parts = []
         for name, playtime in self.top_games:
             name_encoded = name.encode()
-            name_length = len(name_encoded)
-            body += struct.pack(f'>H{name_length}sI', name_length, name_encoded, playtime)
-        return body
+            parts += (NAME_LEN.pack(len(name_encoded)), name_encoded, COUNT.pack(playtime))
+        return b''.join(parts)
 
     @classmethod
     def decode(cls, data: bytes) -> "Q2Result":
@@ -73,12 +77,12 @@ class Q2Result(Result):
         offset = 0
         top_games = []
         while offset < len(data):
-            name_length = struct.unpack('>H', data[offset:offset + 2])[0]
-            offset += 2
-            name = data[offset:offset + name_length].decode()
+            name_length = NAME_LEN.unpack_from(data, offset)[0]
+            offset += NAME_LEN.size
+            name = str(data[offset:offset + name_length], 'utf-8')
             offset += name_length
-            playtime = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
+            playtime = COUNT.unpack_from(data, offset)[0]
+            offset += COUNT.size
             top_games.append((name, playtime))
         return cls(top_games=top_games)
 
@@ -94,12 +98,11 @@ class Q3Result(Result):
 
     def encode(self) -> bytes:
         """Codifica el resultado de la query 3 a bytes para su envío."""
-        body = b''
+        parts = []
         for name, reviews in self.top_indie_games:
             name_encoded = name.encode()
-            name_length = len(name_encoded)
-            body += struct.pack(f'>H{name_length}sI', name_length, name_encoded, reviews)
-        return body
+            parts += (NAME_LEN.pack(len(name_encoded)), name_encoded, COUNT.pack(reviews))
+        return b''.join(parts)
 
     @classmethod
     def decode(cls, data: bytes) -> "Q3Result":
@@ -107,12 +110,12 @@ class Q3Result(Result):
         offset = 0
         top_indie_games = []
         while offset < len(data):
-            name_length = struct.unpack('>H', data[offset:offset + 2])[0]
-            offset += 2
-            name = data[offset:offset + name_length].decode()
+            name_length = NAME_LEN.unpack_from(data, offset)[0]
+            offset += NAME_LEN.size
+            name = str(data[offset:offset + name_length], 'utf-8')
             offset += name_length
-            reviews = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
+            reviews = COUNT.unpack_from(data, offset)[0]
+            offset += COUNT.size
             top_indie_games.append((name, reviews))
         return cls(top_indie_games=top_indie_games)
 
@@ -128,12 +131,11 @@ class Q4Result(Result):
 
     def encode(self) -> bytes:
         """Codifica el resultado de la query 4 a bytes para su envío."""
-        body = b''
+        parts = []
         for app_id, name, count in self.negative_reviews:
             name_encoded = name.encode()
-            name_length = len(name_encoded)
-            body += struct.pack(f'>IH{name_length}sI', app_id, name_length, name_encoded, count)
-        return body
+            parts += (APP_ID_NAME_LEN.pack(app_id, len(name_encoded)), name_encoded, COUNT.pack(count))
+        return b''.join(parts)
 
     @classmethod
     def decode(cls, data: bytes) -> "Q4Result":
@@ -141,14 +143,12 @@ class Q4Result(Result):
         offset = 0
         negative_reviews = []
         while offset < len(data):
-            app_id = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
-            name_length = struct.unpack('>H', data[offset:offset + 2])[0]
-            offset += 2
-            name = data[offset:offset + name_length].decode()
+            app_id, name_length = APP_ID_NAME_LEN.unpack_from(data, offset)
+            offset += APP_ID_NAME_LEN.size
+            name = str(data[offset:offset + name_length], 'utf-8')
             offset += name_length
-            count = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
+            count = COUNT.unpack_from(data, offset)[0]
+            offset += COUNT.size
             negative_reviews.append((app_id, name, count))
         return cls(negative_reviews=negative_reviews)
 
@@ -164,12 +164,11 @@ class Q5Result(Result):
 
     def encode(self) -> bytes:
         """Codifica el resultado de la query 5 a bytes para su envío."""
-        body = b''
+        parts = []
         for app_id, name, count in self.top_negative_reviews:
             name_encoded = name.encode()
-            name_length = len(name_encoded)
-            body += struct.pack(f'>IH{name_length}sI', app_id, name_length, name_encoded, count)
-        return body
+            parts += (APP_ID_NAME_LEN.pack(app_id, len(name_encoded)), name_encoded, COUNT.pack(count))
+        return b''.join(parts)
 
     @classmethod
     def decode(cls, data: bytes) -> "Q5Result":
@@ -177,13 +176,11 @@ class Q5Result(Result):
         offset = 0
         top_negative_reviews = []
         while offset < len(data):
-            app_id = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
-            name_length = struct.unpack('>H', data[offset:offset + 2])[0]
-            offset += 2
-            name = data[offset:offset + name_length].decode()
+            app_id, name_length = APP_ID_NAME_LEN.unpack_from(data, offset)
+            offset += APP_ID_NAME_LEN.size
+            name = str(data[offset:offset + name_length], 'utf-8')
             offset += name_length
-            count = struct.unpack('>I', data[offset:offset + 4])[0]
-            offset += 4
+            count = COUNT.unpack_from(data, offset)[0]
+            offset += COUNT.size
             top_negative_reviews.append((app_id, name, count))
         return cls(top_negative_reviews=top_negative_reviews)
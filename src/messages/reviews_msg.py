@@ -1,6 +1,15 @@
 from enum import Enum
 import struct
 
+# Codecs precompilados de las partes de tamaño fijo de cada reseña
+ITEM_LEN = struct.Struct('>I') # largo del ítem, antecede a cada reseña codificada
+TEXT_HEADER = struct.Struct('>IH') # app_id, largo del texto
+SCORE = struct.Struct('>B')
+BASICREVIEW = struct.Struct('>II') # largo, app_id
+BASICREVIEW_BODY = struct.Struct('>I') # app_id
+REVIEWCOUNT = struct.Struct('>III') # largo, app_id, count
+REVIEWCOUNT_BODY = struct.Struct('>II') # app_id, count
+
 class Score(Enum):
     """
     Clase con los tipos de Score de una review: positiva o negativa.
@@ -13,11 +22,12 @@ class Score(Enum):
 
 class ReviewsType(Enum):
     """
-    Clase con los tipos de reviews: completa, básica o texto.
+    Clase con los tipos de reviews: completa, básica, texto o conteo.
     """
     FULLREVIEW = 0
     BASICREVIEW = 1
     TEXTREVIEW = 2
+    REVIEWCOUNT = 3
 
     @classmethod
     def get_class(cls, item_type: int):
@@ -25,6 +35,7 @@ class ReviewsType(Enum):
             cls.FULLREVIEW.value: Review,
             cls.BASICREVIEW.value: BasicReview,
             cls.TEXTREVIEW.value: TextReview,
+            cls.REVIEWCOUNT.value: ReviewCount,
         }
         return mapping.get(item_type)
 
@@ -44,18 +55,9 @@ class Review:
         text_bytes = self.text.encode('utf-8')
         text_length = len(text_bytes)
 
-        # Codificación del objeto `Review`
-        body = struct.pack(
-            f'>IH{len(text_bytes)}sB',
-            self.app_id,
-            text_length,
-            text_bytes,
-            self.score.value
-        )
-        
         # Añadir longitud total al principio del mensaje
-        total_length = len(body)
-        return struct.pack('>I', total_length) + body
+        total_length = TEXT_HEADER.size + text_length + SCORE.size
+        return ITEM_LEN.pack(total_length) + TEXT_HEADER.pack(self.app_id, text_length) + text_bytes + SCORE.pack(self.score.value)
 
     @staticmethod
     def decode(data: bytes) -> "Review":
@@ -66,11 +68,11 @@ class Review:
         offset = 0
 
         # Decodificar el app_id y la longitud del texto
-        app_id, text_length = struct.unpack('>IH', data[offset:offset + 6])
-        offset += 6
+        app_id, text_length = TEXT_HEADER.unpack_from(data, offset)
+        offset += TEXT_HEADER.size
 
         # Decodificar el texto
-        text = data[offset:offset + text_length].decode('utf-8')
+        text = str(data[offset:offset + text_length], 'utf-8')
         offset += text_length
         
         # Decodificar el valor del score
@@ -98,9 +100,7 @@ class BasicReview:
         """
         Codifica un objeto `BasicReview` en bytes.
         """
-        body = struct.pack('>I', self.app_id)
-        total_length = len(body)
-        return struct.pack('>I', total_length) + body  # Añadir longitud total al principio
+        return BASICREVIEW.pack(BASICREVIEW_BODY.size, self.app_id)  # Añadir longitud total al principio
 
     @staticmethod
     def decode(data: bytes) -> "BasicReview":
@@ -108,7 +108,7 @@ class BasicReview:
         Decodifica bytes en un objeto `BasicReview`.
         Asume que la longitud del mensaje ya fue leída y excluida.
         """
-        app_id = struct.unpack('>I', data[:4])[0]
+        app_id = BASICREVIEW_BODY.unpack_from(data)[0]
         return BasicReview(app_id)
 
     def __str__(self):
@@ -131,9 +131,8 @@ class TextReview:
         text_bytes = self.text.encode('utf-8')
         text_length = len(text_bytes)
 
-        body = struct.pack(f'>IH{len(text_bytes)}s', self.app_id, text_length, text_bytes)
-        total_length = len(body)
-        return struct.pack('>I', total_length) + body  # Añadir longitud total al principio
+        total_length = TEXT_HEADER.size + text_length
+        return ITEM_LEN.pack(total_length) + TEXT_HEADER.pack(self.app_id, text_length) + text_bytes  # Añadir longitud total al principio
 
     @staticmethod
     def decode(data: bytes) -> "TextReview":
@@ -141,11 +140,39 @@ class TextReview:
         Decodifica bytes en un objeto `TextReview`.
         Asume que la longitud del mensaje ya fue leída y excluida.
         """
-        offset = 0
-        app_id, text_length = struct.unpack('>IH', data[offset:offset + 6])
-        offset += 6
-        text = data[offset:offset + text_length].decode('utf-8')
+        app_id, text_length = TEXT_HEADER.unpack_from(data)
+        offset = TEXT_HEADER.size
+        text = str(data[offset:offset + text_length], 'utf-8')
         return TextReview(app_id, text)
 
     def __str__(self):
-        return f"TextReview(app_id={self.app_id}, text={self.text})"
\ No newline at end of file
+        return f"TextReview(app_id={self.app_id}, text={self.text})"
+
+# ===================================================================================================================== #
+
+class ReviewCount:
+    """
+    Representa la cantidad de reseñas de un juego (`app_id`, `count`) dentro de un batch.
+    Lo usa el ScoreFilter en modo combiner para pre-agregar las reseñas antes de enviarlas.
+    """
+    def __init__(self, app_id: int, count: int):
+        self.app_id = app_id
+        self.count = count
+
+    def encode(self) -> bytes:
+        """
+        Codifica un objeto `ReviewCount` en bytes.
+        """
+        return REVIEWCOUNT.pack(REVIEWCOUNT_BODY.size, self.app_id, self.count)  # Añadir longitud total al principio
+
+    @staticmethod
+    def decode(data: bytes) -> "ReviewCount":
+        """
+        Decodifica bytes en un objeto `ReviewCount`.
+        Asume que la longitud del mensaje ya fue leída y excluida.
+        """
+        app_id, count = REVIEWCOUNT_BODY.unpack_from(data)
+        return ReviewCount(app_id, count)
+
+    def __str__(self):
+        return f"ReviewCount(app_id={self.app_id}, count={self.count})"
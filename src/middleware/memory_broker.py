@@ -0,0 +1,445 @@
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Optional, Tuple
+
+# Backend del Middleware: 'rabbitmq' (por defecto) o 'memory'
+MIDDLEWARE_BACKEND = os.getenv('MIDDLEWARE_BACKEND', 'rabbitmq')
+# Dirección 'host:puerto' de un broker en memoria compartido entre procesos. Si no se define, el broker es del proceso.
+MEMORY_BROKER_ADDRESS = os.getenv('MEMORY_BROKER_ADDRESS', '')
+MEMORY_BROKER_AUTHKEY = os.getenv('MEMORY_BROKER_AUTHKEY', 'memory_broker').encode()
+
+POLL_INTERVAL = 0.1 # segundos que espera un consumidor antes de volver a chequear si debe cortar
+
+DEFAULT_EXCHANGE = ''
+EXCHANGE_TYPES = ('direct', 'topic', 'fanout')
+
+
+class BasicProperties:
+    """
+    Propiedades de un mensaje, equivalentes al subconjunto de `pika.BasicProperties` que usa el sistema.
+    """
+    def __init__(self, headers: Optional[dict] = None):
+        self.headers = headers
+
+
+class Deliver:
+    """
+    Datos de la entrega de un mensaje, equivalentes a `pika.spec.Basic.Deliver`.
+    """
+    def __init__(self, consumer_tag: str, delivery_tag: int, redelivered: bool, exchange: str, routing_key: str):
+        self.consumer_tag = consumer_tag
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+        self.exchange = exchange
+        self.routing_key = routing_key
+
+
+class DeclareOk:
+    """
+    Respuesta de `queue_declare`: `result.method.queue` tiene el nombre de la cola, como en pika.
+    """
+    def __init__(self, queue: str, message_count: int):
+        self.method = self
+        self.queue = queue
+        self.message_count = message_count
+
+
+def topic_matches(pattern: str, routing_key: str) -> bool:
+    """
+    Indica si una routing key cumple con un patrón de topic ('*' es una palabra, '#' es cero o más palabras).
+    """
+    return _topic_words_match(pattern.split('.'), routing_key.split('.'))
+
+def _topic_words_match(pattern: List[str], words: List[str]) -> bool:
+    if not pattern:
+        return not words
+    head = pattern[0]
+    if head == '#':
+        return any(_topic_words_match(pattern[1:], words[i:]) for i in range(len(words) + 1))
+    if not words:
+        return False
+    return (head == '*' or head == words[0]) and _topic_words_match(pattern[1:], words[1:])
+
+
+class MemoryBroker:
+    """
+    Broker en memoria que implementa la semántica de RabbitMQ que usa el sistema: colas, exchanges
+    direct/topic/fanout, bindings por routing key, colas exclusivas y reencolado de mensajes.
+
+    Es thread-safe: todas las operaciones toman una única condición, sobre la que esperan los consumidores.
+    Los acks se resuelven en cada canal; el broker solo lleva las estadísticas por cola.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queues: Dict[str, deque] = {}
+        self._exclusive_owner: Dict[str, str] = {}
+        self._exchanges: Dict[str, str] = {}
+        self._bindings: Dict[str, List[Tuple[str, str]]] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def queue_declare(self, queue: str = '', exclusive: bool = False, owner: str = '') -> Tuple[str, int]:
+        with self._condition:
+            if not queue:
+                queue = f'amq.gen-{uuid.uuid4().hex}'
+            if queue not in self._queues:
+                self._queues[queue] = deque()
+                self._stats[queue] = {'published': 0, 'delivered': 0, 'acked': 0, 'requeued': 0, 'max_depth': 0}
+                if exclusive:
+                    self._exclusive_owner[queue] = owner
+            return queue, len(self._queues[queue])
+
+    def queue_delete(self, queue: str):
+        with self._condition:
+            self._queues.pop(queue, None)
+            self._stats.pop(queue, None)
+            self._exclusive_owner.pop(queue, None)
+            for exchange, bindings in self._bindings.items():
+                self._bindings[exchange] = [binding for binding in bindings if binding[0] != queue]
+            self._condition.notify_all()
+
+    def delete_exclusive_queues(self, owner: str):
+        with self._condition:
+            owned = [queue for queue, queue_owner in self._exclusive_owner.items() if queue_owner == owner]
+        for queue in owned:
+            self.queue_delete(queue)
+
+    def exchange_declare(self, exchange: str, exchange_type: str = 'direct'):
+        if exchange_type not in EXCHANGE_TYPES:
+            raise ValueError(f"Tipo de exchange no soportado: {exchange_type}")
+        with self._condition:
+            declared = self._exchanges.setdefault(exchange, exchange_type)
+            if declared != exchange_type:
+                raise ValueError(f"El exchange '{exchange}' ya fue declarado como {declared}")
+            self._bindings.setdefault(exchange, [])
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: Optional[str] = None):
+        with self._condition:
+            if queue not in self._queues:
+                raise ValueError(f"La cola '{queue}' no existe")
+            if exchange not in self._exchanges:
+                raise ValueError(f"El exchange '{exchange}' no existe")
+            binding = (queue, routing_key or '')
+            if binding not in self._bindings[exchange]:
+                self._bindings[exchange].append(binding)
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties: Optional[BasicProperties] = None):
+        with self._condition:
+            for queue in self._route(exchange, routing_key):
+                messages = self._queues[queue]
+                messages.append((bytes(body), properties, exchange, routing_key, False))
+                stats = self._stats[queue]
+                stats['published'] += 1
+                stats['max_depth'] = max(stats['max_depth'], len(messages))
+            self._condition.notify_all()
+
+    def get_any(self, queues: List[str], timeout: float):
+        """
+        Saca el primer mensaje disponible de alguna de las colas, esperando a lo sumo `timeout` segundos.
+        Devuelve `(cola, body, properties, exchange, routing_key, redelivered)` o None.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                for queue in queues:
+                    messages = self._queues.get(queue)
+                    if messages:
+                        self._stats[queue]['delivered'] += 1
+                        return (queue,) + messages.popleft()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def ack(self, queue: str):
+        with self._condition:
+            if queue in self._stats:
+                self._stats[queue]['acked'] += 1
+
+    def requeue(self, queue: str, body: bytes, properties, exchange: str, routing_key: str):
+        """
+        Devuelve un mensaje no confirmado al principio de su cola, marcado como reentregado.
+        """
+        with self._condition:
+            messages = self._queues.get(queue)
+            if messages is None:
+                return
+            messages.appendleft((body, properties, exchange, routing_key, True))
+            self._stats[queue]['requeued'] += 1
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Devuelve, por cola, los mensajes publicados, entregados, confirmados y reencolados, y la profundidad actual y máxima.
+        """
+        with self._condition:
+            return {queue: dict(stats, depth=len(self._queues[queue])) for queue, stats in self._stats.items()}
+
+    def _route(self, exchange: str, routing_key: str) -> List[str]:
+        if exchange == DEFAULT_EXCHANGE:
+            return [routing_key] if routing_key in self._queues else []
+        exchange_type = self._exchanges.get(exchange)
+        if exchange_type is None:
+            raise ValueError(f"El exchange '{exchange}' no existe")
+        bindings = self._bindings[exchange]
+        if exchange_type == 'fanout':
+            queues = [queue for queue, _ in bindings]
+        elif exchange_type == 'direct':
+            queues = [queue for queue, key in bindings if key == routing_key]
+        else:
+            queues = [queue for queue, key in bindings if topic_matches(key, routing_key)]
+        return list(dict.fromkeys(queues))
+
+
+class MemoryChannel:
+    """
+    Canal sobre un `MemoryBroker` con la interfaz de `pika.adapters.blocking_connection.BlockingChannel`
+    que usa el `Middleware`: los callbacks reciben `(ch, method, properties, body)` y se ejecutan en el
+    hilo que llama a `start_consuming` o `process_data_events`.
+    """
+
+    def __init__(self, connection: "MemoryConnection"):
+        self.connection = connection
+        self._broker = connection.broker
+        self._consumers: Dict[str, Tuple[callable, bool, str]] = {}
+        self._unacked: Dict[int, tuple] = {}
+        self._delivery_tags = itertools.count(1)
+        self._consumer_tags = itertools.count(1)
+        self._rotation = itertools.count()
+        self._prefetch_count = 0
+        self._consuming = False
+        self._closed = False
+        self.callbacks = self._consumers
+
+    @property
+    def is_open(self) -> bool:
+        return not self._closed
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def basic_qos(self, prefetch_count: int = 0):
+        self._prefetch_count = prefetch_count
+
+    def queue_declare(self, queue: str = '', durable: bool = False, exclusive: bool = False) -> DeclareOk:
+        name, message_count = self._broker.queue_declare(queue, exclusive, self.connection.id)
+        return DeclareOk(name, message_count)
+
+    def queue_delete(self, queue: str):
+        self._broker.queue_delete(queue)
+
+    def exchange_declare(self, exchange: str, exchange_type: str = 'direct'):
+        self._broker.exchange_declare(exchange, exchange_type)
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: Optional[str] = None):
+        self._broker.queue_bind(queue, exchange, routing_key)
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties: Optional[BasicProperties] = None):
+        self._broker.basic_publish(exchange, routing_key, body, properties)
+
+    def basic_consume(self, queue: str, on_message_callback, auto_ack: bool = False) -> str:
+        consumer_tag = f'ctag-{self.connection.id}-{next(self._consumer_tags)}'
+        self._consumers[queue] = (on_message_callback, auto_ack, consumer_tag)
+        return consumer_tag
+
+    def basic_ack(self, delivery_tag: int = 0, multiple: bool = False):
+        for queue, *_ in self._pop_unacked(delivery_tag, multiple):
+            self._broker.ack(queue)
+
+    def basic_nack(self, delivery_tag: int = 0, multiple: bool = False, requeue: bool = True):
+        # Se reencolan del último al primero para que vuelvan al principio de la cola en su orden original
+        for queue, body, properties, exchange, routing_key in reversed(self._pop_unacked(delivery_tag, multiple)):
+            if requeue:
+                self._broker.requeue(queue, body, properties, exchange, routing_key)
+
+    def start_consuming(self):
+        """
+        Entrega mensajes a los consumidores registrados hasta que se llame a `stop_consuming`
+        o no queden consumidores.
+        """
+        self._consuming = True
+        while self._consuming and self._consumers and not self._closed:
+            self._dispatch(POLL_INTERVAL)
+            self.connection._run_timers()
+
+    def stop_consuming(self):
+        """
+        Corta el consumo y cancela los consumidores, como pika.
+        """
+        self._consuming = False
+        self._consumers.clear()
+
+    def close(self):
+        if self._closed:
+            return
+        self.stop_consuming()
+        # Los mensajes sin confirmar vuelven a sus colas, como al cerrarse un canal de RabbitMQ
+        for queue, body, properties, exchange, routing_key in reversed(list(self._unacked.values())):
+            self._broker.requeue(queue, body, properties, exchange, routing_key)
+        self._unacked.clear()
+        self._closed = True
+
+    def _pending(self, queue: str) -> int:
+        return sum(1 for unacked in self._unacked.values() if unacked[0] == queue)
+
+    def _pop_unacked(self, delivery_tag: int, multiple: bool) -> List[tuple]:
+        if multiple:
+            tags = [tag for tag in self._unacked if delivery_tag == 0 or tag <= delivery_tag]
+        else:
+            tags = [delivery_tag] if delivery_tag in self._unacked else []
+        return [self._unacked.pop(tag) for tag in tags]
+
+    def _dispatch(self, timeout: float) -> bool:
+        """
+        Entrega a lo sumo un mensaje, esperando hasta `timeout` segundos. Devuelve si entregó alguno.
+        """
+        # Como en RabbitMQ, el prefetch es por consumidor: no se le entregan más mensajes hasta que confirme los pendientes
+        queues = [queue for queue in self._consumers if not self._prefetch_count or self._pending(queue) < self._prefetch_count]
+        if not queues:
+            time.sleep(timeout)
+            return False
+
+        # Se rota la cola por la que se empieza para no postergar indefinidamente a ningún consumidor
+        start = next(self._rotation) % len(queues)
+        delivery = self._broker.get_any(queues[start:] + queues[:start], timeout)
+        if delivery is None:
+            return False
+        queue, body, properties, exchange, routing_key, redelivered = delivery
+
+        consumer = self._consumers.get(queue)
+        if consumer is None:
+            # El consumidor se canceló mientras se esperaba el mensaje
+            self._broker.requeue(queue, body, properties, exchange, routing_key)
+            return False
+        callback, auto_ack, consumer_tag = consumer
+
+        delivery_tag = next(self._delivery_tags)
+        if auto_ack:
+            self._broker.ack(queue)
+        else:
+            self._unacked[delivery_tag] = (queue, body, properties, exchange, routing_key)
+
+        method = Deliver(consumer_tag, delivery_tag, redelivered, exchange, routing_key)
+        callback(self, method, properties or BasicProperties(), body)
+        return True
+
+
+class MemoryConnection:
+    """
+    Conexión a un `MemoryBroker` con la interfaz de `pika.BlockingConnection` que usa el `Middleware`.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.id = uuid.uuid4().hex
+        self._channels: List[MemoryChannel] = []
+        self._timers: List[Tuple[float, callable]] = []
+        self._closed = False
+
+    @property
+    def is_open(self) -> bool:
+        return not self._closed
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def channel(self) -> MemoryChannel:
+        channel = MemoryChannel(self)
+        self._channels.append(channel)
+        return channel
+
+    def process_data_events(self, time_limit: float = 0):
+        """
+        Entrega los mensajes disponibles a los consumidores de la conexión, esperando a lo sumo `time_limit` segundos.
+        """
+        deadline = time.monotonic() + (time_limit or 0)
+        while True:
+            remaining = max(deadline - time.monotonic(), 0)
+            channels = [channel for channel in self._channels if channel.is_open]
+            if not channels:
+                time.sleep(remaining)
+                return
+            delivered = [channel._dispatch(remaining / len(channels)) for channel in channels]
+            self._run_timers()
+            if any(delivered) or time.monotonic() >= deadline:
+                return
+
+    def call_later(self, delay: float, callback):
+        """
+        Programa `callback` para dentro de `delay` segundos. Como en pika, se ejecuta en el hilo que
+        consume (dentro de `start_consuming` o `process_data_events`), no en uno aparte.
+        """
+        self._timers.append((time.monotonic() + delay, callback))
+
+    def _run_timers(self):
+        now = time.monotonic()
+        due = [timer for timer in self._timers if timer[0] <= now]
+        if not due:
+            return
+        self._timers = [timer for timer in self._timers if timer[0] > now]
+        for _, callback in due:
+            callback()
+
+    def close(self):
+        if self._closed:
+            return
+        for channel in self._channels:
+            channel.close()
+        self.broker.delete_exclusive_queues(self.id)
+        self._closed = True
+
+
+_local_broker = None
+_local_broker_lock = threading.Lock()
+
+def get_local_broker() -> MemoryBroker:
+    """
+    Devuelve el broker en memoria del proceso, creándolo la primera vez.
+    """
+    global _local_broker
+    with _local_broker_lock:
+        if _local_broker is None:
+            _local_broker = MemoryBroker()
+        return _local_broker
+
+
+class MemoryBrokerManager(BaseManager):
+    """
+    Manager que expone un único `MemoryBroker` a otros procesos.
+    """
+
+MemoryBrokerManager.register('get_broker', callable=get_local_broker)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+def start_memory_broker_server(address: str = MEMORY_BROKER_ADDRESS, authkey: bytes = MEMORY_BROKER_AUTHKEY) -> MemoryBrokerManager:
+    """
+    Levanta en un proceso aparte un broker en memoria accesible desde otros procesos en `address`
+    ('host:puerto'). Se detiene con `shutdown()` sobre el manager devuelto.
+    """
+    manager = MemoryBrokerManager(address=parse_address(address), authkey=authkey)
+    manager.start()
+    logging.info(f"action: memory_broker start_server | result: success | address: {address}")
+    return manager
+
+def connect_memory_broker() -> MemoryConnection:
+    """
+    Abre una conexión al broker en memoria: al compartido entre procesos si se configuró
+    `MEMORY_BROKER_ADDRESS`, o al del proceso en caso contrario.
+    """
+    if MEMORY_BROKER_ADDRESS:
+        manager = MemoryBrokerManager(address=parse_address(MEMORY_BROKER_ADDRESS), authkey=MEMORY_BROKER_AUTHKEY)
+        manager.connect()
+        return MemoryConnection(manager.get_broker())
+    return MemoryConnection(get_local_broker())
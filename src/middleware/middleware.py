@@ -1,21 +1,32 @@
 import logging
-import pika
 import time
 from typing import List, Tuple, Callable
 
+from middleware.memory_broker import MIDDLEWARE_BACKEND, BasicProperties, connect_memory_broker
+from utils.metrics import METRICS
+from utils.tracing import TRACE_HEADER, TRACER
+
 
 class Middleware:
     def __init__(self, host='rabbitmq'):
         """
         Inicializa la conexión con RabbitMQ y el canal.
+
+        Si `MIDDLEWARE_BACKEND` es 'memory', se conecta en cambio al broker en memoria
+        (ver `memory_broker`), que permite correr la topología sin RabbitMQ.
         """
+        self.host = host
         self.connection = None
         self.channel = None
         self.queues = set()
         self.exchanges = set()
+        self._properties_class = BasicProperties
 
         try:
-            self.connection = self._connect_to_rabbitmq()
+            if MIDDLEWARE_BACKEND == 'memory':
+                self.connection = connect_memory_broker()
+            else:
+                self.connection = self._connect_to_rabbitmq()
             self.channel = self.connection.channel()
             self.channel.basic_qos(prefetch_count=1)
             #logging.info(f"action: middleware init_middleware | result: success | host: {host}")
@@ -67,13 +78,21 @@ class Middleware:
     def send_to_queue(self, destination, message, key=''):
         """
         Envía un mensaje a la cola especificada.
+
+        Si hay una traza en curso (ver `TRACER`), el mensaje lleva su contexto en los headers.
         """
+        METRICS.inc('messages_out_total', destination=destination, key=key)
+        METRICS.inc('bytes_out_total', len(message), destination=destination, key=key)
+        properties = None
+        if TRACER.current is not None:
+            properties = self._properties_class(headers={TRACE_HEADER: TRACER.header()})
         if destination in self.queues:
             try:
                 self.channel.basic_publish(
                     exchange='',
                     routing_key=destination, # Cola a la que se envía el mensaje
-                    body=message
+                    body=message,
+                    properties=properties
                 )
                 # logging.info(f"action: send_to_queue | destination: {destination} | exchange: default | key: {key} | result: success")
             except Exception as e:
@@ -83,7 +102,8 @@ class Middleware:
                 self.channel.basic_publish(
                     exchange=destination,
                     routing_key=key,
-                    body=message
+                    body=message,
+                    properties=properties
                 )
                 # logging.info(f"action: send_to_exchange | destination: {destination} | result: success")
             except Exception as e:
@@ -103,7 +123,7 @@ class Middleware:
             raise RuntimeError("middleware: El canal no está disponible para consumir mensajes.")
 
         # Configura el consumidor en el canal con auto_ack
-        self.channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=auto_ack)
+        self.channel.basic_consume(queue=queue_name, on_message_callback=self._instrument(queue_name, callback), auto_ack=auto_ack)
 
         # Inicia el consumo de mensajes
         if get_blocked:
@@ -123,7 +143,7 @@ class Middleware:
                 raise RuntimeError("middleware: El canal no está disponible para consumir mensajes.")
             
             # Configura el consumidor en el canal con auto_ack
-            self.channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=auto_ack)
+            self.channel.basic_consume(queue=queue_name, on_message_callback=self._instrument(queue_name, callback), auto_ack=auto_ack)
 
         # Inicia el consumo de mensajes
         self.channel.start_consuming()
@@ -150,7 +170,7 @@ class Middleware:
             callback(ch, method, properties, body)
 
         # Configura el consumidor en el canal con auto_ack
-        self.channel.basic_consume(queue=queue_name, on_message_callback=wrapped_callback, auto_ack=auto_ack)
+        self.channel.basic_consume(queue=queue_name, on_message_callback=self._instrument(queue_name, wrapped_callback), auto_ack=auto_ack)
 
         while True:
             self.connection.process_data_events(time_limit=inactivity_time)  # Procesa eventos con un timeout corto
@@ -162,6 +182,54 @@ class Middleware:
                 self.channel.stop_consuming()
                 break
 
+    def stop_consuming_when(self, predicate: Callable[[], bool], interval: float) -> Callable[[], None]:
+        """
+        Revisa `predicate` cada `interval` segundos mientras se consume y corta el consumo cuando se cumple.
+        Los chequeos corren en el hilo que consume, entre callbacks, así que nunca cortan un mensaje a la mitad.
+
+        :return: Función que cancela los chequeos (por ejemplo, cuando el consumo terminó por otro motivo).
+        """
+        cancelled = False
+
+        def check():
+            if cancelled:
+                return
+            if predicate():
+                self.channel.stop_consuming()
+            else:
+                self.connection.call_later(interval, check)
+
+        def cancel():
+            nonlocal cancelled
+            cancelled = True
+
+        self.connection.call_later(interval, check)
+        return cancel
+
+    def _instrument(self, queue_name, callback):
+        """
+        Envuelve un callback para contar los mensajes recibidos de la cola, medir su tiempo de procesamiento
+        y propagar el contexto de traza de los mensajes trazados.
+        """
+        if not METRICS.recording and not TRACER.enabled:
+            return callback
+
+        def instrumented_callback(ch, method, properties, body):
+            start = time.perf_counter()
+            traced = TRACER.enabled and TRACER.receive(queue_name, properties)
+            METRICS.busy()
+            try:
+                callback(ch, method, properties, body)
+            finally:
+                METRICS.idle()
+                if traced:
+                    TRACER.finish()
+                METRICS.observe('callback_seconds', time.perf_counter() - start, queue=queue_name)
+                METRICS.inc('messages_in_total', queue=queue_name)
+                METRICS.inc('bytes_in_total', len(body), queue=queue_name)
+
+        return instrumented_callback
+
     def close(self):
         """
         Cierra la conexión a RabbitMQ de forma segura.
@@ -248,11 +316,14 @@ class Middleware:
         """
         Lógica de conexión a RabbitMQ con reintentos.
         """
+        import pika  # Solo se requiere con el backend de RabbitMQ
+        self._properties_class = pika.BasicProperties
+
         retries = 10
         for i in range(retries):
             try:
                 connection = pika.BlockingConnection(
-                    pika.ConnectionParameters('rabbitmq')
+                    pika.ConnectionParameters(self.host)
                 )
                 return connection
             except pika.exceptions.AMQPConnectionError:
@@ -1,5 +1,6 @@
 from collections import defaultdict
 import logging
+from typing import List
 from messages.messages import MsgType, PushDataMessage, ResultMessage, decode_msg
 from messages.results_msg import Q2Result, QueryNumber
 import heapq
@@ -7,12 +8,13 @@ import heapq
 from node import Node
 from utils.container_constants import ENDPOINTS_PROB_FAILURE
 from utils.middleware_constants import E_FROM_PROP, K_FIN, Q_RELEASE_DATE_AVG_COUNTER, Q_QUERY_RESULT_2
-from utils.utils import NodeType, log_with_location, simulate_random_failure
+from utils.fault_injection import FAULTS
+from utils.utils import NodeType
 
 class AvgCounter(Node):
 
-    def __init__(self, id: int, n_nodes: int, container_name: str, n_replicas: int):
-        super().__init__(id, n_nodes, container_name)
+    def __init__(self, id: int, n_nodes: int, container_name: str, n_replicas: int, promoted_state: List[PushDataMessage] = None):
+        super().__init__(id, n_nodes, container_name, promoted_state=promoted_state)
 
         self.n_replicas = n_replicas
         self._middleware.declare_queue(Q_RELEASE_DATE_AVG_COUNTER)
@@ -27,15 +29,15 @@ class AvgCounter(Node):
     def get_type(self) -> NodeType:
         return NodeType.AVG_COUNTER
 
+    def client_state_size(self, client_id: int):
+        return len(self.avg_count.get(client_id, ()))
+
     def run(self):
 
         try:
 
             if self.n_replicas > 0:
-                # ==================================================================
-                # CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS
-                simulate_random_failure(self, log_with_location("CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-                # ==================================================================
+                FAULTS.point(self, 'avg_counter.antes_de_sincronizar_con_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS")
                 self._synchronize_with_replicas()  # Sincronizar con la réplica al inicio
 
             # Ejecuta el consumo de mensajes con el callback `process_message`
@@ -56,17 +58,9 @@ class AvgCounter(Node):
         elif msg.type == MsgType.FIN:
             self._process_fin_message(msg)
 
-        # ==================================================================
-        # CAIDA ANTES DE HACER EL ACK AL MENSAJE
-        # simulate_random_failure(self, log_with_location("⚠️ CAIDA ANTES DE HACER EL ACK AL MENSAJE ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
-        
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-        # ==================================================================
-        # CAIDA DESPUES DE HACER EL ACK AL MENSAJE
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE HACER EL ACK AL MENSAJE"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'avg_counter.despues_de_hacer_el_ack_al_mensaje', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE HACER EL ACK AL MENSAJE")
     
     def _process_game_message(self, msg):
         client_id = msg.client_id  # Asumo que cada mensaje tiene un client_id
@@ -80,10 +74,7 @@ class AvgCounter(Node):
             elif game.avg_playtime > client_heap[0][0]:  # 0 es el índice de avg_playtime
                 heapq.heapreplace(client_heap, (game.avg_playtime, game.app_id, game.name))
 
-        # ==================================================================
-        # CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y ANTES DE ENVIAR A LA REPLICA
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y ANTES DE ENVIAR A LA REPLICA"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'avg_counter.despues_de_actualizar_los_contadores_y_antes_de_enviar_a_la_replica', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y ANTES DE ENVIAR A LA REPLICA")
 
         # Enviar los datos actualizados a la réplica
         self.push_update('avg_count', client_id, client_heap)
@@ -92,10 +83,7 @@ class AvgCounter(Node):
         # TODO: Posible Solucion: Ids en los mensajes para que si la replica recibe repetido lo descarte
         # TODO: Opcion 2: si con el delivery_tag se puede chequear si se recibe un mensaje repetido
 
-        # ==================================================================
-        # CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y DESPUES DE ENVIAR A LA REPLICA
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y DESPUES DE ENVIAR A LA REPLICA"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'avg_counter.despues_de_actualizar_los_contadores_y_despues_de_enviar_a_la_replica', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y DESPUES DE ENVIAR A LA REPLICA")
     
     def _process_fin_message(self, msg):
 
@@ -112,18 +100,10 @@ class AvgCounter(Node):
             q2_result = Q2Result(top_games=top_games)
             result_message = ResultMessage(client_id=msg.client_id, result_type=QueryNumber.Q2, result=q2_result)
 
-            # ==================================================================
-            # CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y ANTES DE ENVIARLO
-            simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y ANTES DE ENVIARLO"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'avg_counter.despues_de_crear_el_mensaje_de_resultado_y_antes_de_enviarlo', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y ANTES DE ENVIARLO")
 
             self._middleware.send_to_queue(Q_QUERY_RESULT_2, result_message.encode())
 
-            # ==================================================================
-            # CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y DESPUES DE ENVIARLO
-            # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y DESPUES DE ENVIARLO ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
-
             # TODO: Como no es atomico esto y el ACK, podria mandar repetido un resultado al dispatcher
             # TODO: Descartar mensajes repetidos en el dispatcher
             
@@ -134,10 +114,7 @@ class AvgCounter(Node):
     def load_state(self, msg: PushDataMessage):
         """Carga el estado completo recibido en la réplica."""
 
-        # ==================================================================
-        # CAIDA ANTES DE CARGAR EL ESTADO
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE CARGAR EL ESTADO"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'avg_counter.antes_de_cargar_el_estado', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE CARGAR EL ESTADO")
 
         state = msg.data
 
@@ -147,10 +124,7 @@ class AvgCounter(Node):
                 self.avg_count[client_id] = [tuple(item) for item in heap_data]
             logging.info(f"Replica: Heaps de promedio actualizados desde estado recibido.")
 
-        # ==================================================================
-        # CAIDA DESPUES DE CARGAR EL ESTADO
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CARGAR EL ESTADO"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'avg_counter.despues_de_cargar_el_estado', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CARGAR EL ESTADO")
 
         # Actualizar el último mensaje procesado
         if "last_msg_id" in state:
@@ -1,17 +1,19 @@
 import logging
+from typing import List
 from messages.messages import PushDataMessage, ResultMessage, decode_msg, MsgType
 from messages.results_msg import Q1Result, QueryNumber
 
 from node import Node
 
 from utils.container_constants import ENDPOINTS_PROB_FAILURE
-from utils.utils import NodeType, log_with_location, simulate_random_failure
+from utils.fault_injection import FAULTS
+from utils.utils import NodeType
 from utils.middleware_constants import E_FROM_PROP, E_FROM_TRIMMER, K_FIN, K_Q1GAME, Q_QUERY_RESULT_1, Q_TRIMMER_OS_COUNTER
 
 class OsCounter(Node):
 
-    def __init__(self, id: int, n_nodes: int, container_name: str, n_replicas: int):
-        super().__init__(id, n_nodes, container_name)
+    def __init__(self, id: int, n_nodes: int, container_name: str, n_replicas: int, promoted_state: List[PushDataMessage] = None):
+        super().__init__(id, n_nodes, container_name, promoted_state=promoted_state)
 
         self.n_replicas = n_replicas
 
@@ -35,10 +37,7 @@ class OsCounter(Node):
             
             if self.n_replicas > 0:
 
-                # ==================================================================
-                # CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS
-                simulate_random_failure(self, log_with_location("CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-                # ==================================================================
+                FAULTS.point(self, 'os_counter.antes_de_sincronizar_con_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS")
                 self._synchronize_with_replicas()  # Sincronizar con la réplica al inicio
             
             # Ejecuta el consumo de mensajes con el callback `process_message`
@@ -61,17 +60,9 @@ class OsCounter(Node):
         elif msg.type == MsgType.FIN:
             self._process_fin_message(msg)
 
-        # ==================================================================
-        # CAIDA ANTES DE HACER EL ACK AL MENSAJE
-        # simulate_random_failure(self, log_with_location("⚠️ CAIDA ANTES DE HACER EL ACK AL MENSAJE ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
-        
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-        # ==================================================================
-        # CAIDA DESPUES DE HACER EL ACK AL MENSAJE
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE HACER EL ACK AL MENSAJE"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'os_counter.despues_de_hacer_el_ack_al_mensaje', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE HACER EL ACK AL MENSAJE")
 
     
     def get_type(self):
@@ -93,10 +84,7 @@ class OsCounter(Node):
         # Guardar los contadores actualizados
         self.os_count[msg.client_id] = (windows, mac, linux)
 
-        # ==================================================================
-        # CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y ANTES DE ENVIAR A LA REPLICA
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y ANTES DE ENVIAR A LA REPLICA"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'os_counter.despues_de_actualizar_los_contadores_y_antes_de_enviar_a_la_replica', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y ANTES DE ENVIAR A LA REPLICA")
 
         # Enviar los datos actualizados a la réplica
         self.push_update('os_count', msg.client_id, self.os_count[msg.client_id])
@@ -104,11 +92,6 @@ class OsCounter(Node):
         # TODO: Como no es atómico puede romper justo despues de enviarlo a la replica y no hacer el ACK
         # TODO: Posible Solucion: Ids en los mensajes para que si la replica recibe repetido lo descarte
 
-        # ==================================================================
-        # CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y DESPUES DE ENVIAR A LA REPLICA
-        # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ACTUALIZAR LOS CONTADORES Y DESPUES DE ENVIAR A LA REPLICA ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
-
 
     def _process_fin_message(self, msg):
 
@@ -120,17 +103,11 @@ class OsCounter(Node):
             q1_result = Q1Result(windows_count=windows_count, mac_count=mac_count, linux_count=linux_count)
             result_message = ResultMessage(client_id=msg.client_id, result_type=QueryNumber.Q1, result=q1_result)
 
-            # ==================================================================
-            # CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y ANTES DE ENVIARLO
-            simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y ANTES DE ENVIARLO"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'os_counter.despues_de_crear_el_mensaje_de_resultado_y_antes_de_enviarlo', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y ANTES DE ENVIARLO")
 
             self._middleware.send_to_queue(Q_QUERY_RESULT_1, result_message.encode())
 
-            # ==================================================================
-            # CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y DESPUES DE ENVIARLO
-            simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y DESPUES DE ENVIARLO"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'os_counter.despues_de_crear_el_mensaje_de_resultado_y_despues_de_enviarlo', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CREAR EL MENSAJE DE RESULTADO Y DESPUES DE ENVIARLO")
             
             # Limpiar el heap para este cliente
             del self.os_count[msg.client_id]
@@ -139,10 +116,7 @@ class OsCounter(Node):
     def load_state(self, msg: PushDataMessage):
         """Carga el estado completo recibido en la réplica."""
 
-        # ==================================================================
-        # CAIDA ANTES DE CARGAR EL ESTADO
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE CARGAR EL ESTADO"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'os_counter.antes_de_cargar_el_estado', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE CARGAR EL ESTADO")
 
         state = msg.data
 
@@ -152,10 +126,7 @@ class OsCounter(Node):
                 self.os_count[client_id] = (windows, mac, linux)
             logging.info(f"Replica: Contadores de sistemas operativos actualizados desde estado recibido.")
 
-        # ==================================================================
-        # CAIDA DESPUES DE CARGAR EL ESTADO
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CARGAR EL ESTADO"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'os_counter.despues_de_cargar_el_estado', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CARGAR EL ESTADO")
 
         # Actualizar el último mensaje procesado
         if "last_msg_id" in state:
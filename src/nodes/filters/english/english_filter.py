@@ -1,6 +1,6 @@
 import logging
 from typing import List, Tuple
-from messages.messages import ListMessage, MsgType, decode_msg
+from messages.messages import BatchBuilder, MsgType, decode_msg
 from messages.reviews_msg import BasicReview, ReviewsType
 from node import Node  # Importa la clase base Node
 from utils.middleware_constants import E_FROM_PROP, K_NOTIFICATION, Q_ENGLISH_Q4_JOINER, Q_NOTIFICATION, Q_Q4_JOINER_ENGLISH, Q_TO_PROP
@@ -77,13 +77,11 @@ class EnglishFilter(Node):
         """
         Filtra y envía reseñas en inglés a la cola correspondiente.
         """
-        en_reviews = [
-            BasicReview(review.app_id) for review in msg.items if self.is_english(review.text)
-        ]
-
-        if en_reviews:
-            english_reviews_msg = ListMessage(type=MsgType.REVIEWS, item_type= ReviewsType.BASICREVIEW, items=en_reviews, client_id=msg.client_id)
-            self._middleware.send_to_queue(Q_ENGLISH_Q4_JOINER, english_reviews_msg.encode())
+        en_reviews = BatchBuilder(MsgType.REVIEWS, ReviewsType.BASICREVIEW, msg.client_id, lambda payload: self._middleware.send_to_queue(Q_ENGLISH_Q4_JOINER, payload))
+        for review in msg.items:
+            if self.is_english(review.text):
+                en_reviews.add(BasicReview(review.app_id))
+        en_reviews.flush()
 
     def is_english(self, text):
         """
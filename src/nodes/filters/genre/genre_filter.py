@@ -1,11 +1,11 @@
 import logging
 from typing import List, Tuple
-from messages.messages import ListMessage, MsgType, decode_msg
-from messages.games_msg import GamesType, Q2Game, BasicGame, Genre
+from messages.messages import BatchBuilder, MsgType, decode_msg
+from messages.games_msg import DimGame, GamesType, Genre
 from node import Node  # Importa la clase base Node
 from utils.container_constants import Q3_JOINER_CONTAINER_NAME, Q4_JOINER_CONTAINER_NAME, RELEASE_DATE_CONTAINER_NAME
 from utils.utils import NodeType
-from utils.middleware_constants import E_FROM_GENRE, E_FROM_PROP, E_FROM_TRIMMER, K_FIN, K_GENREGAME, K_INDIE_BASICGAMES, K_INDIE_Q2GAMES, K_NOTIFICATION, K_SHOOTER_GAMES, Q_NOTIFICATION, Q_TO_PROP, Q_TRIMMER_GENRE_FILTER
+from utils.middleware_constants import E_FROM_GENRE, E_FROM_PROP, E_FROM_TRIMMER, K_ACTION_GAMES, K_FIN, K_GAMES_DIMENSION_ACTION, K_GAMES_DIMENSION_INDIE, K_GAMES_DIMENSION_INDIE_ACTION, K_GENREGAME, K_INDIE_GAMES, K_NOTIFICATION, Q_NOTIFICATION, Q_RELEASE_DATE_AVG_COUNTER, Q_TO_PROP, Q_TRIMMER_GENRE_FILTER
 
 class GenreFilter(Node):
     """
@@ -25,6 +25,12 @@ class GenreFilter(Node):
         self._middleware.bind_queue(Q_TRIMMER_GENRE_FILTER, E_FROM_TRIMMER, K_GENREGAME)
         self._middleware.declare_exchange(E_FROM_GENRE)
 
+        # Sin instancias de ReleaseDateFilter, el filtro de fecha se aplica acá (fusión de operadores)
+        # y los juegos van directo al AvgCounter, ahorrando un salto por el broker
+        self.fused_release_date = dict(n_next_nodes).get(RELEASE_DATE_CONTAINER_NAME, 0) == 0
+        if self.fused_release_date:
+            self._middleware.declare_queue(Q_RELEASE_DATE_AVG_COUNTER)
+
         self._middleware.declare_queue(Q_TO_PROP)
         self.notification_queue = Q_NOTIFICATION + f'_{container_name}_{id}'
         self._middleware.declare_queue(self.notification_queue)
@@ -43,15 +49,14 @@ class GenreFilter(Node):
     def get_keys(self):
         """
         Obtiene un listado de keys de los siguientes nodos.
+        Todos consumen la dimensión compartida de juegos, cada uno por las keys de los géneros que usa.
         """
         keys = []
         for node, n_nodes in self.n_next_nodes:
-            if node == RELEASE_DATE_CONTAINER_NAME:
-                keys.append((K_INDIE_Q2GAMES, n_nodes))
-            elif node == Q3_JOINER_CONTAINER_NAME:
-                keys.append((K_INDIE_BASICGAMES, n_nodes))
+            if node in (RELEASE_DATE_CONTAINER_NAME, Q3_JOINER_CONTAINER_NAME):
+                keys.extend((key, n_nodes) for key in K_INDIE_GAMES)
             elif node == Q4_JOINER_CONTAINER_NAME:
-                keys.append((K_SHOOTER_GAMES, n_nodes))
+                keys.extend((key, n_nodes) for key in K_ACTION_GAMES)
         return keys
     
     def run(self):
@@ -85,26 +90,36 @@ class GenreFilter(Node):
 
     def _process_games_message(self, msg):
         """
-        Filtra juegos por género y los envía a las colas correspondientes.
+        Filtra los juegos indie o de acción y publica una única vez la dimensión compartida
+        de juegos, con la key de sus géneros: los juegos indie y de acción a la vez van en
+        `K_GAMES_DIMENSION_INDIE_ACTION`, así cada consumidor recibe solo los juegos que usa
+        (Q3 y ReleaseDate los indie, Q4 y Q5 los de acción) y ninguno los recibe dos veces.
+        Si el ReleaseDateFilter está fusionado, además aplica su predicado en memoria y envía
+        los juegos indie de la década de 2010 directamente al AvgCounter.
         """
-        indie_basic_games, indie_q2_games, shooter_games = [], [], []
+        indie_flag = DimGame.flags_from_genres([Genre.INDIE.value])
+        action_flag = DimGame.flags_from_genres([Genre.ACTION.value])
+        dimension = {
+            key: BatchBuilder(MsgType.GAMES, GamesType.DIMGAME, msg.client_id, lambda payload, key=key: self._middleware.send_to_queue(E_FROM_GENRE, payload, key=key))
+            for key in (K_GAMES_DIMENSION_INDIE, K_GAMES_DIMENSION_ACTION, K_GAMES_DIMENSION_INDIE_ACTION)
+        }
+        avg_counter_games = None
+        if self.fused_release_date:
+            avg_counter_games = BatchBuilder(MsgType.GAMES, GamesType.Q2GAMES, msg.client_id, lambda payload: self._middleware.send_to_queue(Q_RELEASE_DATE_AVG_COUNTER, payload))
 
         for game in msg.items:
-            for genre in game.genres:
-                if genre == Genre.INDIE.value:
-                    indie_basic_games.append(BasicGame(app_id=game.app_id, name=game.name))
-                    indie_q2_games.append(Q2Game(app_id=game.app_id, name=game.name, release_date=game.release_date, avg_playtime=game.avg_playtime))
-                elif genre == Genre.ACTION.value:
-                    shooter_games.append(BasicGame(app_id=game.app_id, name=game.name))
-
-        if indie_basic_games:
-            indie_basic_msg = ListMessage(type=MsgType.GAMES, item_type=GamesType.BASICGAME, items=indie_basic_games, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_GENRE, indie_basic_msg.encode(), key=K_INDIE_BASICGAMES)
+            genre_flags = DimGame.flags_from_genres(game.genres)
+            indie = genre_flags & indie_flag
+            action = genre_flags & action_flag
+            if not indie and not action:
+                continue
+            key = K_GAMES_DIMENSION_INDIE_ACTION if indie and action else K_GAMES_DIMENSION_INDIE if indie else K_GAMES_DIMENSION_ACTION
+            dim_game = DimGame(app_id=game.app_id, name=game.name, genre_flags=genre_flags, release_year=game.release_year, avg_playtime=game.avg_playtime)
+            dimension[key].add(dim_game)
+            if avg_counter_games is not None and indie and dim_game.released_in_2010s():
+                avg_counter_games.add(dim_game.to_q2game())
 
-        if indie_q2_games:
-            indie_q2_msg = ListMessage(type=MsgType.GAMES, item_type=GamesType.Q2GAMES, items=indie_q2_games, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_GENRE, indie_q2_msg.encode(), key=K_INDIE_Q2GAMES)
-        
-        if shooter_games:
-            shooter_msg = ListMessage(type=MsgType.GAMES, item_type=GamesType.BASICGAME, items=shooter_games, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_GENRE, shooter_msg.encode(), key=K_SHOOTER_GAMES)
+        for batch in dimension.values():
+            batch.flush()
+        if avg_counter_games is not None:
+            avg_counter_games.flush()
@@ -1,11 +1,11 @@
 import logging
 from typing import List, Tuple
 from messages.games_msg import GamesType
-from messages.messages import ListMessage, MsgType, decode_msg
+from messages.messages import BatchBuilder, MsgType, decode_msg
 from node import Node  # Importa la clase base Node
 
 from utils.utils import NodeType
-from utils.middleware_constants import E_FROM_GENRE, E_FROM_PROP, K_FIN, K_INDIE_Q2GAMES, K_NOTIFICATION, Q_NOTIFICATION, Q_RELEASE_DATE_AVG_COUNTER, Q_GENRE_RELEASE_DATE, Q_TO_PROP
+from utils.middleware_constants import E_FROM_GENRE, E_FROM_PROP, K_FIN, K_INDIE_GAMES, K_NOTIFICATION, Q_NOTIFICATION, Q_RELEASE_DATE_AVG_COUNTER, Q_GENRE_RELEASE_DATE, Q_TO_PROP
 
 class ReleaseDateFilter(Node):
     """
@@ -22,7 +22,8 @@ class ReleaseDateFilter(Node):
         # Configura las colas y los intercambios específicos para ReleaseDateFilter
         self._middleware.declare_queue(Q_GENRE_RELEASE_DATE)
         self._middleware.declare_exchange(E_FROM_GENRE)
-        self._middleware.bind_queue(Q_GENRE_RELEASE_DATE, E_FROM_GENRE, K_INDIE_Q2GAMES)
+        for key in K_INDIE_GAMES:
+            self._middleware.bind_queue(Q_GENRE_RELEASE_DATE, E_FROM_GENRE, key)
         self._middleware.declare_queue(Q_RELEASE_DATE_AVG_COUNTER)
 
         self._middleware.declare_queue(Q_TO_PROP)
@@ -76,10 +77,11 @@ class ReleaseDateFilter(Node):
 
     def _process_games_message(self, msg):
         """
-        Filtra y envía juegos lanzados en 2010 o después.
+        Filtra y envía los juegos indie lanzados en 2010 o después.
         """
-        batch = [game for game in msg.items if "201" in game.release_date]
-        if batch:
-            games_msg = ListMessage(type=MsgType.GAMES, item_type=GamesType.Q2GAMES, items=batch, client_id=msg.client_id)
-            self._middleware.send_to_queue(Q_RELEASE_DATE_AVG_COUNTER, games_msg.encode())
+        batch = BatchBuilder(MsgType.GAMES, GamesType.Q2GAMES, msg.client_id, lambda payload: self._middleware.send_to_queue(Q_RELEASE_DATE_AVG_COUNTER, payload))
+        for game in msg.items:
+            if game.released_in_2010s(): # Solo llegan juegos indie (keys `K_INDIE_GAMES`)
+                batch.add(game.to_q2game())
+        batch.flush()
 
@@ -20,7 +20,8 @@ def main():
         id=config_params["instance_id"],
         n_nodes=config_params["score_instances"],
         n_next_nodes=next_nodes,
-        container_name=SCORE_CONTAINER_NAME
+        container_name=SCORE_CONTAINER_NAME,
+        combine_reviews=bool(config_params["combine_reviews"])
     )
 
     logging.info(f"ScoreFilter {config_params['instance_id']} iniciado. ")
@@ -1,25 +1,41 @@
+from collections import Counter, OrderedDict, defaultdict
 import logging
 from typing import List, Tuple
-from messages.messages import ListMessage, MsgType, decode_msg
-from messages.reviews_msg import BasicReview, ReviewsType, Score, TextReview
+from messages.messages import BatchBuilder, MsgType, decode_msg
+from messages.reviews_msg import BasicReview, ReviewCount, ReviewsType, Score, TextReview
 from node import Node  # Importa la clase base Node
 
 from utils.container_constants import Q3_JOINER_CONTAINER_NAME, Q4_JOINER_CONTAINER_NAME, Q5_JOINER_CONTAINER_NAME
 from utils.utils import NodeType
-from utils.middleware_constants import E_FROM_PROP, E_FROM_SCORE, E_FROM_TRIMMER, K_FIN, K_NEGATIVE, K_NEGATIVE_TEXT, K_NOTIFICATION, K_POSITIVE, K_REVIEW, Q_NOTIFICATION, Q_TO_PROP, Q_TRIMMER_SCORE_FILTER
+from utils.middleware_constants import E_FROM_PROP, E_FROM_SCORE, E_FROM_TRIMMER, E_RELEVANT_GAMES, K_FIN, K_NEGATIVE, K_NEGATIVE_TEXT, K_NOTIFICATION, K_POSITIVE, K_REVIEW, Q_NOTIFICATION, Q_RELEVANT_GAMES, Q_TO_PROP, Q_TRIMMER_SCORE_FILTER
 
+# Routing key de las reseñas que filtra el conjunto publicado por cada joiner
+RELEVANT_GAMES_KEYS = {
+    NodeType.Q3_JOINER.value: K_POSITIVE,
+    NodeType.Q4_JOINER.value: K_NEGATIVE_TEXT,
+    NodeType.Q5_JOINER.value: K_NEGATIVE,
+}
+
+# Cantidad de clientes terminados que se recuerdan para descartar sus conjuntos tardíos. Los ids se asignan en
+# orden y ocupan un byte, así que un id se reutiliza recién 256 clientes después: con la mitad del espacio de ids
+# la memoria queda acotada y el id de un cliente nuevo ya no figura como terminado.
+FINISHED_CLIENTS_WINDOW = 128
 
 class ScoreFilter(Node):
     """
     Clase del nodo ScoreFilter.
     """
-    def __init__(self, id: int, n_nodes: int, n_next_nodes: List[Tuple[str, int]], container_name):
+    def __init__(self, id: int, n_nodes: int, n_next_nodes: List[Tuple[str, int]], container_name, combine_reviews: bool = False):
         """
         Inicializa el nodo ScoreFilter.
         Declara colas y exchanges necesarios.
+
+        Si `combine_reviews` es True, las reseñas que van a Q3 y Q5 se pre-agregan
+        por batch en pares (`app_id`, `count`) en lugar de enviar una por reseña.
         """
         # Inicializa la clase base Node
         super().__init__(id, n_nodes, container_name, n_next_nodes=n_next_nodes)
+        self.combine_reviews = combine_reviews
         
         # Configura las colas y los intercambios específicos para ScoreFilter
         self._middleware.declare_queue(Q_TRIMMER_SCORE_FILTER)
@@ -36,6 +52,15 @@ class ScoreFilter(Node):
         # logging.info(f'Bindeo cola {Q_TRIMMER_SCORE_FILTER} a {E_FROM_PROP} con key {fin_key}')
         self._middleware.bind_queue(Q_TRIMMER_SCORE_FILTER, E_FROM_PROP, key=fin_key)
 
+        # Conjuntos de juegos relevantes que publican los joiners (semi-join)
+        self.relevant_games_queue = Q_RELEVANT_GAMES + f'_{container_name}_{id}'
+        self._middleware.declare_queue(self.relevant_games_queue)
+        self._middleware.declare_exchange(E_RELEVANT_GAMES, type='fanout')
+        self._middleware.bind_queue(self.relevant_games_queue, E_RELEVANT_GAMES)
+
+        self.relevant_games_per_client = defaultdict(dict) # para cada cliente, routing key -> set de app_ids relevantes
+        self.finished_clients = OrderedDict() # últimos clientes cuyo FIN ya se procesó, para descartar conjuntos que lleguen tarde
+
     def get_type(self):
         """
         Devuelve el tipo de nodo correspondiente al ScoreFilter.
@@ -63,6 +88,7 @@ class ScoreFilter(Node):
         while not self.shutting_down:
             try:
                 #logging.info("Empiezo a consumir de la cola de DATA")
+                self._middleware.receive_from_queue(self.relevant_games_queue, self._process_relevant_games_message, auto_ack=False, get_blocked=False)
                 self._middleware.receive_from_queue(Q_TRIMMER_SCORE_FILTER, self._process_message, auto_ack=False)
                 # Empieza a escuchar por la cola de notificaciones
                 self._middleware.receive_from_queue(self.notification_queue, self._process_notification, auto_ack=False)
@@ -83,34 +109,107 @@ class ScoreFilter(Node):
         if msg.type == MsgType.REVIEWS:
             self._process_reviews_message(msg)
         elif msg.type == MsgType.FIN:
+            self.relevant_games_per_client.pop(msg.client_id, None)
+            self._mark_finished(msg.client_id)
             self._process_fin_message(ch, method, msg.client_id)
             return
         
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-        
+    def _mark_finished(self, client_id: int):
+        """
+        Recuerda que el cliente terminó, olvidando a los más viejos fuera de la ventana.
+        """
+        self.finished_clients.pop(client_id, None)
+        self.finished_clients[client_id] = True
+        while len(self.finished_clients) > FINISHED_CLIENTS_WINDOW:
+            self.finished_clients.popitem(last=False)
+
+    def _process_relevant_games_message(self, ch, method, properties, raw_message):
+        """
+        Callback para procesar los conjuntos de juegos relevantes publicados por los joiners.
+        A partir de su llegada se descartan las reseñas de juegos que no pertenecen al conjunto.
+        """
+        msg = decode_msg(raw_message)
+
+        if msg.type == MsgType.RELEVANT_GAMES and msg.client_id not in self.finished_clients:
+            key = RELEVANT_GAMES_KEYS.get(msg.node_type)
+            if key:
+                self.relevant_games_per_client[msg.client_id][key] = set(msg.app_ids)
+                logging.info(f"Llego conjunto de {len(msg.app_ids)} juegos relevantes para {key} del cliente {msg.client_id}")
+
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def _is_relevant(self, relevant_games: dict, key: str, app_id: int) -> bool:
+        """
+        Indica si una reseña debe enviarse por la routing key dada.
+        Si todavía no se conoce el conjunto de juegos relevantes, se envía siempre.
+        """
+        games = relevant_games.get(key)
+        return games is None or app_id in games
+
 
     def _process_reviews_message(self, msg):
         """
         Procesa mensajes de tipo REVIEWS y distribuye según el score.
         """
-        negative_textreviews, positive_reviews, negative_reviews = [], [], []
+        if self.combine_reviews:
+            self._process_reviews_message_combined(msg)
+            return
+
+        positive_reviews = self._batch_builder(ReviewsType.BASICREVIEW, msg.client_id, K_POSITIVE)
+        negative_textreviews = self._batch_builder(ReviewsType.TEXTREVIEW, msg.client_id, K_NEGATIVE_TEXT)
+        negative_reviews = self._batch_builder(ReviewsType.BASICREVIEW, msg.client_id, K_NEGATIVE)
+        relevant_games = self.relevant_games_per_client.get(msg.client_id, {})
 
         for review in msg.items:
             if review.score == Score.POSITIVE:
-                positive_reviews.append(BasicReview(review.app_id))
+                if self._is_relevant(relevant_games, K_POSITIVE, review.app_id):
+                    positive_reviews.add(BasicReview(review.app_id))
             else:
-                negative_textreviews.append(TextReview(review.app_id, review.text))
-                negative_reviews.append(BasicReview(review.app_id))
+                if self._is_relevant(relevant_games, K_NEGATIVE_TEXT, review.app_id):
+                    negative_textreviews.add(TextReview(review.app_id, review.text))
+                if self._is_relevant(relevant_games, K_NEGATIVE, review.app_id):
+                    negative_reviews.add(BasicReview(review.app_id))
 
-        if positive_reviews:
-            reviews_msg = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.BASICREVIEW, items=positive_reviews, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_SCORE, reviews_msg.encode(), K_POSITIVE)
+        positive_reviews.flush()
+        negative_textreviews.flush()
+        negative_reviews.flush()
 
-        if negative_textreviews:
-            reviews_msg = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.TEXTREVIEW, items=negative_textreviews, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_SCORE, reviews_msg.encode(), K_NEGATIVE_TEXT)
+    def _process_reviews_message_combined(self, msg):
+        """
+        Procesa mensajes de tipo REVIEWS en modo combiner: las reseñas para Q3 y Q5
+        se agregan en pares (`app_id`, `count`) y se envían como `ReviewCount`.
+        Las reseñas con texto para Q4 se envían igual que en el modo normal.
+        """
+        negative_textreviews = self._batch_builder(ReviewsType.TEXTREVIEW, msg.client_id, K_NEGATIVE_TEXT)
+        positive_counts, negative_counts = Counter(), Counter()
+        relevant_games = self.relevant_games_per_client.get(msg.client_id, {})
 
-        if negative_reviews:
-            reviews_msg = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.BASICREVIEW, items=negative_reviews, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_SCORE, reviews_msg.encode(), K_NEGATIVE)
+        for review in msg.items:
+            if review.score == Score.POSITIVE:
+                if self._is_relevant(relevant_games, K_POSITIVE, review.app_id):
+                    positive_counts[review.app_id] += 1
+            else:
+                if self._is_relevant(relevant_games, K_NEGATIVE_TEXT, review.app_id):
+                    negative_textreviews.add(TextReview(review.app_id, review.text))
+                if self._is_relevant(relevant_games, K_NEGATIVE, review.app_id):
+                    negative_counts[review.app_id] += 1
+
+        positive_reviews = self._batch_builder(ReviewsType.REVIEWCOUNT, msg.client_id, K_POSITIVE)
+        for app_id, count in positive_counts.items():
+            positive_reviews.add(ReviewCount(app_id, count))
+        positive_reviews.flush()
+
+        negative_textreviews.flush()
+
+        negative_reviews = self._batch_builder(ReviewsType.REVIEWCOUNT, msg.client_id, K_NEGATIVE)
+        for app_id, count in negative_counts.items():
+            negative_reviews.add(ReviewCount(app_id, count))
+        negative_reviews.flush()
+
+    def _batch_builder(self, item_type: ReviewsType, client_id: int, key: str) -> BatchBuilder:
+        """
+        Crea un BatchBuilder de reseñas que publica en E_FROM_SCORE con la routing key dada.
+        """
+        return BatchBuilder(MsgType.REVIEWS, item_type, client_id, lambda payload: self._middleware.send_to_queue(E_FROM_SCORE, payload, key))
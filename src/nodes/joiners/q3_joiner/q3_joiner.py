@@ -2,12 +2,15 @@ from collections import defaultdict
 import logging
 from messages.messages import MsgType, PushDataMessage, ResultMessage, decode_msg
 from messages.results_msg import Q3Result, QueryNumber
+from messages.reviews_msg import ReviewsType
 from node import Node
 import heapq
 
-from utils.container_constants import ENDPOINTS_PROB_FAILURE
-from utils.middleware_constants import E_FROM_GENRE, E_FROM_PROP, E_FROM_SCORE, K_FIN, K_INDIE_BASICGAMES, K_POSITIVE, Q_Q3_JOINER, Q_QUERY_RESULT_3
-from utils.utils import NodeType, log_with_location, simulate_random_failure
+from utils.container_constants import ENDPOINTS_PROB_FAILURE, NAMES_STORE_DIR
+from utils.middleware_constants import E_FROM_GENRE, E_FROM_PROP, E_FROM_SCORE, E_RELEVANT_GAMES, K_FIN, K_INDIE_GAMES, K_POSITIVE, Q_Q3_JOINER, Q_QUERY_RESULT_3
+from utils.name_store import NameStore
+from utils.fault_injection import FAULTS
+from utils.utils import NodeType
 
 class Q3Joiner(Node):
     def __init__(self, id: int, n_nodes: int, container_name: str, n_replicas: int):
@@ -18,18 +21,21 @@ class Q3Joiner(Node):
         # Declarar colas y binders
         self._middleware.declare_queue(Q_Q3_JOINER)
         self._middleware.declare_exchange(E_FROM_GENRE)
-        self._middleware.bind_queue(Q_Q3_JOINER, E_FROM_GENRE, K_INDIE_BASICGAMES)
+        for key in K_INDIE_GAMES:
+            self._middleware.bind_queue(Q_Q3_JOINER, E_FROM_GENRE, key)
         self._middleware.declare_exchange(E_FROM_SCORE)
         self._middleware.bind_queue(Q_Q3_JOINER, E_FROM_SCORE, K_POSITIVE)
 
         self._middleware.declare_queue(Q_QUERY_RESULT_3)
 
         self._middleware.declare_exchange(E_FROM_PROP, type='topic')
+        self._middleware.declare_exchange(E_RELEVANT_GAMES, type='fanout')
         self._middleware.bind_queue(Q_Q3_JOINER, E_FROM_PROP, key=K_FIN+f'.{container_name}_games') # hay que modificarlo en el propagator
         self._middleware.bind_queue(Q_Q3_JOINER, E_FROM_PROP, key=K_FIN+f'.{container_name}_reviews')
 
         # Estructuras para almacenar datos
-        self.games_per_client = defaultdict(lambda: {})  # Almacenará juegos por `app_id`, para cada cliente
+        self.games_per_client = defaultdict(set)  # Almacenará los `app_id` de los juegos, para cada cliente
+        self.names_store = NameStore(NAMES_STORE_DIR) # Nombres de los juegos, se resuelven recién en join_results
         self.review_counts_per_client = defaultdict(lambda: defaultdict(int))  # Contará reseñas positivas por `app_id`, para cada cliente
         self.fins_per_client = defaultdict(lambda: [False, False]) #primer valor corresponde al fin de juegos, y el segundo al de reviews
         self.last_msg_id = 0
@@ -37,18 +43,21 @@ class Q3Joiner(Node):
     def get_type(self) -> NodeType:
         return NodeType.Q3_JOINER
 
+    def client_state_size(self, client_id: int):
+        return len(self.games_per_client.get(client_id, ())) + len(self.review_counts_per_client.get(client_id, ()))
+
     def run(self):
 
         try:
 
             if self.n_replicas > 0: # verifico si se instanciaron replicas
 
-                # ==================================================================
-                # CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS
-                simulate_random_failure(self, log_with_location("CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-                # ==================================================================
+                FAULTS.point(self, 'q3_joiner.antes_de_sincronizar_con_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS")
                 self._synchronize_with_replicas()
 
+            # Los nombres de los clientes que no quedaron en el estado ya no se van a usar
+            self.names_store.retain(self.games_per_client)
+
             # Consumir mensajes de ambas colas con sus respectivos callbacks en paralelo
             self._middleware.receive_from_queue(Q_Q3_JOINER, self.process_message, auto_ack=False)
         
@@ -71,25 +80,17 @@ class Q3Joiner(Node):
 
     def process_game_message(self, msg):
 
-        # Inicializar diccionario de actualizaciones
-        update = {}
-        client_games = self.games_per_client[msg.client_id]
-        for game in msg.items:
-            client_games[game.app_id] = game.name
-            # Registrar el cambio en el diccionario de actualizaciones
-            update[game.app_id] = game.name
+        # Solo llegan los juegos indie de la dimensión compartida (keys `K_INDIE_GAMES`)
+        games = msg.items
 
-        # ==================================================================
-        # CAIDA ANTES DE ENVIAR ACTUALIZACION A LAS REPLICAS
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR ACTUALIZACION DE JUEGOS A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        # Los nombres se escriben una sola vez en disco (antes del push), el estado y las réplicas solo llevan los `app_id`
+        update = {game.app_id: game.name for game in games}
+        self.names_store.add_names(msg.client_id, update)
+        self.games_per_client[msg.client_id].update(update)
 
-        self.push_update('games', msg.client_id, update)
+        FAULTS.point(self, 'q3_joiner.antes_de_enviar_actualizacion_de_juegos_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR ACTUALIZACION DE JUEGOS A LAS REPLICAS")
 
-        # ==================================================================
-        # CAIDA DESPUES DE ENVIAR ACTUALIZACION A LAS REPLICAS
-        # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR ACTUALIZACION DE JUEGOS A LAS REPLICAS ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        self.push_update('games', msg.client_id, list(update))
 
     def process_review_message(self, msg):
         """Procesa mensajes de la cola `Q_SCORE_Q3_JOINER`."""
@@ -99,23 +100,17 @@ class Q3Joiner(Node):
         client_reviews = self.review_counts_per_client[msg.client_id]
         client_games = self.games_per_client[msg.client_id]
         games_fin_received = self.fins_per_client[msg.client_id][0]
+        # Si el ScoreFilter combinó el batch, cada ítem trae la cantidad de reseñas del juego
+        combined = msg.item_type == ReviewsType.REVIEWCOUNT.value
         for review in msg.items:
             if (not games_fin_received) or review.app_id in client_games:
-                client_reviews[review.app_id] += 1
+                client_reviews[review.app_id] += review.count if combined else 1
                 update[review.app_id] = client_reviews[review.app_id]
 
-        # ==================================================================
-        # CAIDA ANTES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q3_joiner.antes_de_enviar_actualizacion_de_reviews_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS")
 
         self.push_update('reviews', msg.client_id, update)
 
-        # ==================================================================
-        # CAIDA DESPUES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS
-        # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
-
     def process_fin_message(self, msg):
         logging.info(f"Llego FIN de cliente {msg.client_id}")
         client_fins = self.fins_per_client[msg.client_id]
@@ -125,17 +120,15 @@ class Q3Joiner(Node):
         else:
             logging.info(f"Llego FIN REVIEWS de cliente {msg.client_id}")
             client_fins[1] = True
-        # ==================================================================
-        # CAIDA ANTES DE ENVIAR ACTUALIZACION DE FIN GAMES A LAS REPLICAS
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR FIN GAMES A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q3_joiner.antes_de_enviar_fin_games_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR FIN GAMES A LAS REPLICAS")
 
         self.push_update('fins', msg.client_id, client_fins)
 
-        # ==================================================================
-        # CAIDA DESPUES DE ENVIAR ACTUALIZACION DE FIN GAMES A LAS REPLICAS -> no pasa nada el fin es idempotente
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE ENVIAR FIN GAMES A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q3_joiner.despues_de_enviar_fin_games_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE ENVIAR FIN GAMES A LAS REPLICAS")
+
+        if msg.node_type == NodeType.GENRE.value and not client_fins[1]:
+            # Con los juegos completos, el ScoreFilter puede descartar las reseñas que no joinean
+            self.publish_relevant_games(msg.client_id, self.games_per_client[msg.client_id])
 
         if client_fins[0] and client_fins[1]:
             self.join_results(msg.client_id)
@@ -146,15 +139,25 @@ class Q3Joiner(Node):
         client_games = self.games_per_client[client_id]
         client_reviews = self.review_counts_per_client[client_id]
         
+        client_counts = {app_id: count for app_id, count in client_reviews.items() if app_id in client_games}
+
+        # Solo se resuelven los nombres de los candidatos: los juegos con tantas reseñas como el quinto,
+        # ya que los empates en cantidad se desempatan por nombre
+        top_counts = heapq.nlargest(5, client_counts.values())
+        candidates = [app_id for app_id, count in client_counts.items() if top_counts and count >= top_counts[-1]]
+        # Sin algún nombre, `resolve` lanza `MissingGameNamesError`: el join falla sin enviar el resultado
+        # ni borrar al cliente, y el mensaje queda sin ack
+        names = self.names_store.resolve(client_id, candidates)
+
         top_5_heap = []
-        for app_id, count in client_reviews.items():
-            if app_id in client_games:
-                game_name = client_games[app_id]
-                if len(top_5_heap) < 5:
-                    heapq.heappush(top_5_heap, (count, game_name))
-                else:
-                    # Si ya hay 5 elementos, reemplazamos el menor si encontramos uno mejor
-                    heapq.heappushpop(top_5_heap, (count, game_name))
+        for app_id in candidates:
+            count = client_counts[app_id]
+            game_name = names[app_id]
+            if len(top_5_heap) < 5:
+                heapq.heappush(top_5_heap, (count, game_name))
+            else:
+                # Si ya hay 5 elementos, reemplazamos el menor si encontramos uno mejor
+                heapq.heappushpop(top_5_heap, (count, game_name))
 
         top_5_sorted = [(name, num_reviews) for num_reviews, name in sorted(top_5_heap, reverse=True)]
 
@@ -162,17 +165,11 @@ class Q3Joiner(Node):
         q3_result = Q3Result(top_indie_games=top_5_sorted)
         result_message = ResultMessage(client_id=client_id, result_type=QueryNumber.Q3, result=q3_result)
 
-        # ==================================================================
-        # CAIDA ANTES DE ENVIAR RESULTADO Q3
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR RESULTADO Q3"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q3_joiner.antes_de_enviar_resultado_q3', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR RESULTADO Q3")
 
         self._middleware.send_to_queue(Q_QUERY_RESULT_3, result_message.encode())
 
-        # ==================================================================
-        # CAIDA DESPUES DE ENVIAR RESULTADO Q3
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE ENVIAR RESULTADO Q3"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q3_joiner.despues_de_enviar_resultado_q3', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE ENVIAR RESULTADO Q3")
 
         # Borro los diccionarios de clientes ya resueltos
         del self.games_per_client[client_id]
@@ -180,6 +177,7 @@ class Q3Joiner(Node):
         del self.fins_per_client[client_id]
 
         self.push_update('delete', client_id)
+        self.names_store.delete_client(client_id)
         #TODO: SI SE CAE DESPUES DEL DELETE Y NO HABER HECHO EL ACK PODES PERDER EL CLIENTE PARA SIEMPRE
         # PERO SI LLEGASTE HASTA ACA ES PORQUE YA ENVIASTE LA RESPUESTA AL CLIENTE POR LO QUE NO TE IMPORTA PERDERLO
 
@@ -191,7 +189,7 @@ class Q3Joiner(Node):
         # Actualizar juegos por cliente
         if "games_per_client" in state:
             for client_id, games in state["games_per_client"].items():
-                self.games_per_client[client_id] = games
+                self.games_per_client[client_id].update(games)
             logging.info(f"Replica: Juegos actualizados desde estado recibido.")
 
         # Actualizar reseñas por cliente
@@ -214,10 +212,7 @@ class Q3Joiner(Node):
 
         logging.info(f"Replica: Estado completo cargado. Campos cargados: {list(state.keys())}")
 
-        # ==================================================================
-        # CAIDA DESPUES DE CARGAR EL ESTADO
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CARGAR EL ESTADO"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q3_joiner.despues_de_cargar_el_estado', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CARGAR EL ESTADO")
 
 
 
@@ -22,7 +22,9 @@ def main():
         batch_size=config_params["max_batch_size"],
         n_reviews=config_params["n_reviews"],
         container_name=Q4_JOINER_CONTAINER_NAME,
-        n_replicas=config_params["q4_joiner_replica_instances"]
+        n_replicas=config_params["q4_joiner_replica_instances"],
+        reviews_store_dir=config_params["reviews_store_dir"],
+        reviews_memory_budget=config_params["reviews_memory_budget"]
     )
 
     logging.info(f"Q4Joiner {config_params['instance_id']} iniciado. ")
@@ -1,21 +1,24 @@
 from collections import defaultdict
 import logging
 from typing import List, Tuple
-from messages.messages import ListMessage, MsgType, ResultMessage, decode_msg, PushDataMessage
+from messages.messages import BatchBuilder, MsgType, ResultMessage, decode_msg, PushDataMessage
 from messages.results_msg import Q4Result, QueryNumber
-from messages.reviews_msg import ReviewsType, TextReview
+from messages.reviews_msg import ReviewsType
 from node import Node
 
-from utils.container_constants import ENDPOINTS_PROB_FAILURE
-from utils.middleware_constants import E_FROM_PROP, E_FROM_SCORE, K_FIN, K_NEGATIVE_TEXT, Q_SCORE_Q4_JOINER, Q_Q4_JOINER_ENGLISH, E_FROM_GENRE, K_SHOOTER_GAMES, Q_ENGLISH_Q4_JOINER, Q_GENRE_Q4_JOINER, Q_QUERY_RESULT_4
-from utils.utils import NodeType, log_with_location, simulate_random_failure
+from utils.container_constants import ENDPOINTS_PROB_FAILURE, NAMES_STORE_DIR
+from utils.middleware_constants import E_FROM_PROP, E_FROM_SCORE, E_RELEVANT_GAMES, K_FIN, K_NEGATIVE_TEXT, Q_SCORE_Q4_JOINER, Q_Q4_JOINER_ENGLISH, E_FROM_GENRE, K_ACTION_GAMES, Q_ENGLISH_Q4_JOINER, Q_GENRE_Q4_JOINER, Q_QUERY_RESULT_4
+from utils.name_store import NameStore
+from utils.review_store import ReviewStore
+from utils.fault_injection import FAULTS
+from utils.utils import NodeType
 
 class Q4Joiner(Node):
     """
     Clase del nodo Q4Joiner.
     """
 
-    def __init__(self, id: int, n_nodes: int, n_next_nodes: List[Tuple[str, int]], batch_size: int, n_reviews: int, container_name: str, n_replicas: int):
+    def __init__(self, id: int, n_nodes: int, n_next_nodes: List[Tuple[str, int]], batch_size: int, n_reviews: int, container_name: str, n_replicas: int, reviews_store_dir: str, reviews_memory_budget: int):
         """
         Inicializa el nodo Q4Joiner.
         Declara colas y exchanges necesarios e instancia su estado interno.
@@ -33,18 +36,22 @@ class Q4Joiner(Node):
         self._middleware.declare_queue(Q_QUERY_RESULT_4)
         self._middleware.declare_exchange(E_FROM_GENRE)
         self._middleware.declare_exchange(E_FROM_SCORE)
-        self._middleware.bind_queue(Q_GENRE_Q4_JOINER, E_FROM_GENRE, K_SHOOTER_GAMES)
+        for key in K_ACTION_GAMES:
+            self._middleware.bind_queue(Q_GENRE_Q4_JOINER, E_FROM_GENRE, key)
         self._middleware.bind_queue(Q_SCORE_Q4_JOINER, E_FROM_SCORE, K_NEGATIVE_TEXT)
 
         self._middleware.declare_exchange(E_FROM_PROP, type='topic')
+        self._middleware.declare_exchange(E_RELEVANT_GAMES, type='fanout')
         self._middleware.bind_queue(Q_GENRE_Q4_JOINER, E_FROM_PROP, key=K_FIN+f'.{container_name}_games') # hay que modificarlo en el propagator
         self._middleware.bind_queue(Q_SCORE_Q4_JOINER, E_FROM_PROP, key=K_FIN+f'.{container_name}_reviews')
         self._middleware.bind_queue(Q_ENGLISH_Q4_JOINER, E_FROM_PROP, key=K_FIN+f'.{container_name}_english')
 
         # Estructuras de almacenamiento
         self.negative_reviews_count_per_client = defaultdict(lambda: defaultdict(int))  # Contará reseñas negativas en inglés, para cada cliente
-        self.games_per_client = defaultdict(lambda: {})  # Detalles de juegos de acción/shooter
-        self.negative_reviews_per_client = defaultdict(lambda: defaultdict(lambda: ([], False))) # Guarda las reviews negativas de los juegos
+        self.games_per_client = defaultdict(set)  # `app_id` de los juegos de acción/shooter
+        self.names_store = NameStore(NAMES_STORE_DIR) # Nombres de los juegos, se resuelven recién en join_results
+        self.reviews_store = ReviewStore(reviews_store_dir, reviews_memory_budget * 1024) # Guarda en disco los textos de las reviews negativas de los juegos
+        self.overpassed_per_client = defaultdict(set) # Juegos cuyas reviews ya superaron el umbral y se enviaron al filtro de ingles
         self.fins_per_client = defaultdict(lambda: [False, False]) #primer valor corresponde al fin de juegos, y el segundo al de reviews
         self.last_msg_id = 0
 
@@ -52,7 +59,10 @@ class Q4Joiner(Node):
         """
         Devuelve el tipo de nodo correspondiente al Q4 Joiner.
         """
-        return NodeType.Q3_JOINER
+        return NodeType.Q4_JOINER
+
+    def client_state_size(self, client_id: int):
+        return len(self.games_per_client.get(client_id, ())) + len(self.negative_reviews_count_per_client.get(client_id, ())) + len(self.overpassed_per_client.get(client_id, ()))
 
     def run(self):
         """
@@ -62,12 +72,12 @@ class Q4Joiner(Node):
 
         try:
             if self.n_replicas > 0: # verifico si se instanciaron replicas
-                # ==================================================================
-                # CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS
-                simulate_random_failure(self, log_with_location("CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-                # ==================================================================
+                FAULTS.point(self, 'q4_joiner.antes_de_sincronizar_con_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE SINCRONIZAR CON LAS REPLICAS")
                 self._synchronize_with_replicas()
 
+            # Los nombres de los clientes que no quedaron en el estado ya no se van a usar
+            self.names_store.retain(self.games_per_client)
+
             # Consumir mensajes de ambas colas con sus respectivos callbacks en paralelo
             self._middleware.receive_from_queues([(Q_GENRE_Q4_JOINER, self.process_game_message), (Q_SCORE_Q4_JOINER, self.process_review_message), (Q_ENGLISH_Q4_JOINER, self.process_negative_review_message)], auto_ack=False)
 
@@ -85,42 +95,31 @@ class Q4Joiner(Node):
 
         if msg.type == MsgType.GAMES:
 
-            # Inicializar diccionario de actualizaciones
-            update = {}
-            client_games = self.games_per_client[msg.client_id]
-            for game in msg.items:
-                client_games[game.app_id] = game.name
-                # Registrar el cambio en el diccionario de actualizaciones
-                update[game.app_id] = game.name
-
-            # ==================================================================
-            # CAIDA ANTES DE ENVIAR ACTUALIZACION A LAS REPLICAS
-            simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR ACTUALIZACION DE JUEGOS A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
-
-            self.push_update('games', msg.client_id, update)
-
-            # ==================================================================
-            # CAIDA DESPUES DE ENVIAR ACTUALIZACION A LAS REPLICAS
-            # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR ACTUALIZACION DE JUEGOS A LAS REPLICAS ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
-                
+            # Solo llegan los juegos de acción de la dimensión compartida (keys `K_ACTION_GAMES`)
+            games = msg.items
+
+            # Los nombres se escriben una sola vez en disco (antes del push), el estado y las réplicas solo llevan los `app_id`
+            update = {game.app_id: game.name for game in games}
+            self.names_store.add_names(msg.client_id, update)
+            self.games_per_client[msg.client_id].update(update)
+
+            FAULTS.point(self, 'q4_joiner.antes_de_enviar_actualizacion_de_juegos_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR ACTUALIZACION DE JUEGOS A LAS REPLICAS")
+
+            self.push_update('games', msg.client_id, list(update))
+
         elif msg.type == MsgType.FIN:
             logging.info(f"Llego FIN GAMES de cliente {msg.client_id}")
             client_fins = self.fins_per_client[msg.client_id]
             client_fins[0] = True
 
-            # ==================================================================
-            # CAIDA ANTES DE ENVIAR ACTUALIZACION DE FIN GAMES A LAS REPLICAS
-            simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR FIN GAMES A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'q4_joiner.antes_de_enviar_fin_games_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR FIN GAMES A LAS REPLICAS")
 
             self.push_update('fins', msg.client_id, client_fins)
 
-            # ==================================================================
-            # CAIDA DESPUES DE ENVIAR ACTUALIZACION DE FIN GAMES A LAS REPLICAS
-            # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR FIN GAMES A LAS REPLICAS ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            if not client_fins[1]:
+                self.prune_reviews(msg.client_id)
+                # Con los juegos completos, el ScoreFilter puede descartar las reseñas que no joinean
+                self.publish_relevant_games(msg.client_id, self.games_per_client[msg.client_id])
 
             if client_fins[0] and client_fins[1]:
                 # TODO: Mucho cuidado aca que ya envia reviews a la cola del english
@@ -136,10 +135,7 @@ class Q4Joiner(Node):
         # TODO: Opcion 2: si con el delivery_tag se puede chequear si se recibe un mensaje repetido
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-        # ==================================================================
-        # CAIDA DESPUES DE HACER EL ACK EN GAMES
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE HACER EL ACK EN GAMES"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q4_joiner.despues_de_hacer_el_ack_en_games', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE HACER EL ACK EN GAMES")
 
     def process_review_message(self, ch, method, properties, raw_message):
         """
@@ -151,52 +147,37 @@ class Q4Joiner(Node):
         if msg.type == MsgType.REVIEWS:
             
             # Inicializar diccionario de actualizaciones
+            # Para cada juego: [se enviaron las reviews anteriores al filtro de ingles, textos nuevos]
             update = {}
-            client_reviews = self.negative_reviews_per_client[msg.client_id]
+            client_overpassed = self.overpassed_per_client[msg.client_id]
             client_games = self.games_per_client[msg.client_id]
             games_fin_received = self.fins_per_client[msg.client_id][0]
             for review in msg.items: # para un TextReview en TextReviews
                 if (not games_fin_received) or review.app_id in client_games:
-                    # Debe funcionar appendiendo el elemento directamente de esta manera
-                    game_reviews, _ = client_reviews[review.app_id]
-                    game_reviews.append(review.text)
-                    if len(game_reviews) > self.n_reviews:
+                    game_update = update.setdefault(review.app_id, [False, []])
+                    game_update[1].append(review.text)
+                    if self.reviews_store.append(msg.client_id, review.app_id, review.text) > self.n_reviews:
                         # TODO: Mucho cuidado aca que ya envia reviews a la cola del english
                         #       Hay que ver que pasa si se cae justo antes de entrar, en el
                         #       medio del envio, o si se cae justo despues
-                        self.send_reviews_v2(msg.client_id, review.app_id, game_reviews)
-                        client_reviews[review.app_id] = ([], True)
-                    update[review.app_id] = client_reviews[review.app_id]
+                        self.send_reviews_v2(msg.client_id, review.app_id)
+                        self.reviews_store.discard(msg.client_id, review.app_id)
+                        client_overpassed.add(review.app_id)
+                        update[review.app_id] = [True, []]
 
-            # ==================================================================
-            # CAIDA ANTES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS
-            simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'q4_joiner.antes_de_enviar_actualizacion_de_reviews_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS")
 
             self.push_update('reviews', msg.client_id, update)
 
-            # ==================================================================
-            # CAIDA DESPUES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS
-            # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR ACTUALIZACION DE REVIEWS A LAS REPLICAS ⚠️"), probability=ENDPOINTS_PROB_FAILURE) 
-            # ==================================================================
-
         elif msg.type == MsgType.FIN:
             logging.info(f"Llego FIN REVIEWS de cliente {msg.client_id}")
             client_fins = self.fins_per_client[msg.client_id]
             client_fins[1] = True
 
-            # ==================================================================
-            # CAIDA ANTES DE ENVIAR FIN REVIEWS A LAS REPLICAS
-            simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR FIN REVIEWS A LAS REPLICAS"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'q4_joiner.antes_de_enviar_fin_reviews_a_las_replicas', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR FIN REVIEWS A LAS REPLICAS")
 
             self.push_update('fins', msg.client_id, client_fins)
 
-            # ==================================================================
-            # CAIDA DESPUES DE ENVIAR FIN REVIEWS A LAS REPLICAS
-            # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR FIN REVIEWS A LAS REPLICAS ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
-
             if client_fins[0] and client_fins[1]:
                 # TODO: Mucho cuidado aca que ya envia reviews a la cola del english
                 #       Hay que ver que pasa si se cae justo antes de entrar, en el
@@ -209,69 +190,54 @@ class Q4Joiner(Node):
 
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-        # ==================================================================
-        # CAIDA DESPUES DE HACER EL ACK EN REVIEWS
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE HACER EL ACK EN REVIEWS"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q4_joiner.despues_de_hacer_el_ack_en_reviews', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE HACER EL ACK EN REVIEWS")
+
+    def prune_reviews(self, client_id):
+        """
+        Descarta los textos de reseñas guardados para juegos que no son de acción.
+        Se llama al recibir el FIN de juegos, cuando ya se conoce el conjunto completo.
+        """
+        client_games = self.games_per_client[client_id]
+        pruned = [app_id for app_id in self.reviews_store.app_ids(client_id) if app_id not in client_games]
+        if not pruned:
+            return
 
-    def send_reviews_v2(self, client_id, app_id, reviews):
+        for app_id in pruned:
+            self.reviews_store.discard(client_id, app_id)
+        logging.info(f"Se descartaron las reseñas de {len(pruned)} juegos que no son de acción del cliente {client_id}")
+
+        self.push_update('prune_reviews', client_id, pruned)
+
+    def send_reviews_v2(self, client_id, app_id):
         """
-        Envía las reviews al filtro de inglés para su filtrado.
+        Envía las reviews guardadas de un juego al filtro de inglés para su filtrado.
+        Las reviews se leen en streaming desde el segmento del cliente, ya codificadas.
         """
 
         # manda las reviews del juego al filtro de ingles
-        reviews_batch = []
-        curr_reviews_batch_size = 0
-
-        for review in reviews:
-            text_review = TextReview(app_id, review)
-            text_review_size = len(text_review.encode())
-            if text_review_size + curr_reviews_batch_size > self.batch_size:
-                text_reviews = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.TEXTREVIEW, items=reviews_batch, client_id=client_id)
-                self._middleware.send_to_queue(Q_Q4_JOINER_ENGLISH, text_reviews.encode())
-                curr_reviews_batch_size = 0
-                reviews_batch = []
-            curr_reviews_batch_size += text_review_size
-            reviews_batch.append(text_review)
+        reviews_batch = BatchBuilder(MsgType.REVIEWS, ReviewsType.TEXTREVIEW, client_id, lambda payload: self._middleware.send_to_queue(Q_Q4_JOINER_ENGLISH, payload), max_size=self.batch_size)
+        for encoded_review in self.reviews_store.iter_encoded(client_id, app_id):
+            reviews_batch.append(encoded_review)
 
         # si me quedaron afuera    
-        if reviews_batch:
-            text_reviews = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.TEXTREVIEW, items=reviews_batch, client_id=client_id)
-            self._middleware.send_to_queue(Q_Q4_JOINER_ENGLISH, text_reviews.encode())
+        reviews_batch.flush()
 
     def send_reviews(self, client_id):
         """
         Envía las reviews al filtro de inglés para su filtrado, únicamente si su juego correspondiente tiene más de 5000 reseñas negativas.
         """
 
-        client_reviews = self.negative_reviews_per_client[client_id]
+        client_overpassed = self.overpassed_per_client[client_id]
 
         # Revisa que juego tiene mas de 5000 resenia negativas
-        for app_id, (reviews, overpass_threshold) in client_reviews.items():
-            if overpass_threshold or len(reviews) > self.n_reviews:
+        for app_id in self.reviews_store.app_ids(client_id):
+            if app_id in client_overpassed or self.reviews_store.count(client_id, app_id) > self.n_reviews:
                 # manda las reviews del juego al filtro de ingles
-                reviews_batch = []
-                curr_reviews_batch_size = 0
-                for review in reviews:
-                    text_review = TextReview(app_id, review)
-                    text_review_size = len(text_review.encode())
-                    if text_review_size + curr_reviews_batch_size > self.batch_size:
-                        text_reviews = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.TEXTREVIEW, items=reviews_batch, client_id=client_id)
-                        self._middleware.send_to_queue(Q_Q4_JOINER_ENGLISH, text_reviews.encode())
-                        curr_reviews_batch_size = 0
-                        reviews_batch = []
-                    curr_reviews_batch_size += text_review_size
-                    reviews_batch.append(text_review)
-
-                # si me quedaron afuera    
-                if reviews_batch:
-                    text_reviews = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.TEXTREVIEW, items=reviews_batch, client_id=client_id)
-                    self._middleware.send_to_queue(Q_Q4_JOINER_ENGLISH, text_reviews.encode())
-
-        # Borro el diccionario de textos de reviews del cliente
-        del self.negative_reviews_per_client[client_id]
-        
-        client_reviews.clear() #limpio el diccionario
+                self.send_reviews_v2(client_id, app_id)
+
+        # Borro los textos de reviews del cliente
+        self.reviews_store.delete_client(client_id)
+        del self.overpassed_per_client[client_id]
                             
     def process_negative_review_message(self, ch, method, properties, raw_message):
         """
@@ -292,18 +258,10 @@ class Q4Joiner(Node):
                     client_reviews_count[review.app_id] += 1
                     update[review.app_id] = client_reviews_count[review.app_id]
 
-            # ==================================================================
-            # CAIDA ANTES DE PUSH EN PROCESS_NEGATIVE_REVIEWS_MESSAGE
-            simulate_random_failure(self, log_with_location("CAIDA ANTES DE PUSH EN PROCESS_NEGATIVE_REVIEWS_MESSAGE"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'q4_joiner.antes_de_push_en_process_negative_reviews_message', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE PUSH EN PROCESS_NEGATIVE_REVIEWS_MESSAGE")
 
             self.push_update('reviews_count', msg.client_id, update)
 
-            # ==================================================================
-            # CAIDA DESPUES DE PUSH EN PROCESS_NEGATIVE_REVIEWS_MESSAGE
-            # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE PUSH EN PROCESS_NEGATIVE_REVIEWS_MESSAGE ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-            # ==================================================================
-
         elif msg.type == MsgType.FIN:
             logging.info(f"Llego FIN ENGLISH de cliente {msg.client_id}")
             # TODO: Enviar a las replicas la recepcion de este FIN.
@@ -319,12 +277,11 @@ class Q4Joiner(Node):
         """
 
         client_reviews_count = self.negative_reviews_count_per_client[client_id]
-        client_games = self.games_per_client[client_id]
 
         # Filtrar juegos de acción con más de 5,000 reseñas negativas en inglés
         negative_reviews = sorted(
             [
-                (app_id, client_games[app_id], count)
+                (app_id, count)
                 for app_id, count in client_reviews_count.items()
                 if count > self.n_reviews
             ],
@@ -332,28 +289,30 @@ class Q4Joiner(Node):
             reverse=False  # Orden descendente
         )[:25]  # Tomar los 25 primeros
 
+        # Resolver los nombres solo de los juegos que forman parte del resultado
+        # Sin algún nombre, `resolve` lanza `MissingGameNamesError`: el join falla sin enviar el resultado
+        # ni borrar al cliente, y el mensaje queda sin ack
+        names = self.names_store.resolve(client_id, [app_id for app_id, _ in negative_reviews])
+        negative_reviews = [(app_id, names[app_id], count) for app_id, count in negative_reviews]
+
 
         # Crear y enviar el mensaje Q4Result
         q4_result = Q4Result(negative_reviews=negative_reviews)
         result_message = ResultMessage( client_id=client_id, result_type=QueryNumber.Q4, result=q4_result)
 
-        # ==================================================================
-        # CAIDA ANTES DE ENVIAR RESULTADO Q4
-        simulate_random_failure(self, log_with_location("CAIDA ANTES DE ENVIAR RESULTADO Q4"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'q4_joiner.antes_de_enviar_resultado_q4', ENDPOINTS_PROB_FAILURE, "CAIDA ANTES DE ENVIAR RESULTADO Q4")
 
         self._middleware.send_to_queue(Q_QUERY_RESULT_4, result_message.encode())
 
-        # ==================================================================
-        # CAIDA DESPUES DE ENVIAR RESULTADO Q4
-        # simulate_random_failure(self, log_with_location("⚠️ CAIDA DESPUES DE ENVIAR RESULTADO Q4 ⚠️"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
-
         # Borro los diccionarios de clientes ya resueltos
         del self.games_per_client[client_id]
         del self.negative_reviews_count_per_client[client_id]
+        # Si el estado se recuperó de una réplica después del FIN de reseñas, send_reviews no los borró
+        self.overpassed_per_client.pop(client_id, None)
+        self.reviews_store.delete_client(client_id)
 
         self.push_update('delete', client_id)
+        self.names_store.delete_client(client_id)
         #TODO: SI SE CAE DESPUES DEL DELETE Y NO HABER HECHO EL ACK PODES PERDER EL CLIENTE PARA SIEMPRE
         # PERO SI LLEGASTE HASTA ACA ES PORQUE YA ENVIASTE LA RESPUESTA AL CLIENTE POR LO QUE NO TE IMPORTA PERDERLO
 
@@ -366,7 +325,7 @@ class Q4Joiner(Node):
         # Actualizar juegos por cliente
         if "games_per_client" in state:
             for client_id, games in state["games_per_client"].items():
-                self.games_per_client[client_id] = games
+                self.games_per_client[client_id].update(games)
             logging.info(f"Replica: Juegos actualizados desde estado recibido.")
 
         # Actualizar cantidad de reseñas negativas por cliente
@@ -377,12 +336,19 @@ class Q4Joiner(Node):
                 self.negative_reviews_count_per_client[client_id].update(reviews)
             logging.info(f"Replica: Cantidad de reseñas negativas actualizadas desde estado recibido.")
 
-        # Actualizar reseñas negativas por cliente
+        # Juegos cuyas reseñas ya se enviaron al filtro de inglés
+        if "overpassed_per_client" in state:
+            for client_id, app_ids in state["overpassed_per_client"].items():
+                for app_id in app_ids:
+                    self.reviews_store.discard(client_id, app_id)
+                self.overpassed_per_client[client_id].update(app_ids)
+            logging.info(f"Replica: Juegos enviados al filtro de inglés actualizados desde estado recibido.")
+
+        # Actualizar reseñas negativas por cliente (textos numerados, ver `ReviewStore.load_texts`)
         if "negative_reviews_per_client" in state:
             for client_id, negative_reviews in state["negative_reviews_per_client"].items():
-                if client_id not in self.negative_reviews_per_client:
-                    self.negative_reviews_per_client[client_id] = defaultdict(lambda: ([], False))
-                self.negative_reviews_per_client[client_id].update(negative_reviews)
+                for app_id, texts in negative_reviews.items():
+                    self.reviews_store.load_texts(client_id, app_id, texts)
             logging.info(f"Replica: Reseñas negativas actualizadas desde estado recibido.")
 
         # Actualizar fins por cliente
@@ -397,7 +363,4 @@ class Q4Joiner(Node):
 
         logging.info(f"Replica: Estado completo cargado. Campos cargados: {list(state.keys())}")
 
-        # ==================================================================
-        # CAIDA DESPUES DE CARGAR EL ESTADO
-        simulate_random_failure(self, log_with_location("CAIDA DESPUES DE CARGAR EL ESTADO"), probability=ENDPOINTS_PROB_FAILURE)
-        # ==================================================================
\ No newline at end of file
+        FAULTS.point(self, 'q4_joiner.despues_de_cargar_el_estado', ENDPOINTS_PROB_FAILURE, "CAIDA DESPUES DE CARGAR EL ESTADO")
\ No newline at end of file
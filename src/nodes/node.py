@@ -4,18 +4,24 @@ import random
 import signal
 from multiprocessing import Process, Value, Condition
 import time
+from typing import List
 from middleware.middleware import Middleware
-from messages.messages import MsgType, PushDataMessage, SimpleMessage, decode_msg
+from messages.messages import MsgType, PushDataMessage, RelevantGamesMessage, SimpleMessage, decode_msg
 from listener import Listener
-from utils.middleware_constants import E_FROM_MASTER_PUSH, E_REPLICA_SYNC_REQUEST_LISTENER, Q_TO_PROP, E_FROM_REPLICA_PULL_ANS
-from utils.utils import NodeType, simulate_random_failure, log_with_location
+from utils.middleware_constants import E_FROM_MASTER_PUSH, E_RELEVANT_GAMES, E_REPLICA_SYNC_REQUEST_LISTENER, Q_TO_PROP, E_FROM_REPLICA_PULL_ANS
+from utils.metrics import METRICS
+from utils.tracing import TRACER
+from utils.fault_injection import FAULTS
+from utils.profiler import SamplingProfiler
+from utils.state_transfer import receive_state
+from utils.utils import NodeType
 from utils.container_constants import FILTERS_PROB_FAILURE
 
 class Node:
     """
     Clase del nodo genérico.
     """
-    def __init__(self, id: int, n_nodes: int, container_name: str, n_next_nodes: list = []):
+    def __init__(self, id: int, n_nodes: int, container_name: str, n_next_nodes: list = [], promoted_state: List[PushDataMessage] = None):
         """
         Base class for nodes to avoid code repetition.
 
@@ -23,6 +29,8 @@ class Node:
         - id: Unique identifier for the node.
         - n_nodes: Total number of nodes in the system.
         - n_next_nodes: List of tuples with next node details (node type, count).
+        - promoted_state: State chunks of the replica that hosts this master after a promotion. The replica
+          process already has its Listener, metrics and signal handlers, so none are created.
         """
         self.id = id
         self.n_nodes = n_nodes
@@ -36,11 +44,22 @@ class Node:
         self.fin_to_ack = None
 
         self.timestamp = time.time()  # Marca de tiempo al iniciar
+        self.promoted_state = promoted_state
+        self.listener = None
+        if promoted_state is not None:
+            return
 
+        # Las métricas se habilitan antes de crear el Listener, que las sirve desde la memoria compartida
+        METRICS.enable(f'{container_name}_{id}')
+        TRACER.enable(f'{container_name}_{id}')
+        FAULTS.enable(f'{container_name}_{id}')
         self.listener = Process(target=init_listener, args=(id, container_name))
         self.listener.start()
 
         signal.signal(signal.SIGTERM, self._handle_sigterm)
+        # Perfilado a demanda con SIGUSR1 (instalado después de crear el Listener, que no lo hereda)
+        self.profiler = SamplingProfiler(f'{container_name}_{id}')
+        self.profiler.install()
 
     def _shutdown(self):
         """
@@ -90,10 +109,7 @@ class Node:
         """
         fin_notify_msg = SimpleMessage(type=MsgType.FIN_NOTIFICATION, client_id=client_id, node_type=self.get_type().value, node_instance=self.id)
         self._middleware.send_to_queue(Q_TO_PROP, fin_notify_msg.encode())
-        # ==================================================================
-        # CAIDA POST NOTIFICION DE FIN CLIENTE
-        simulate_random_failure(self, log_with_location(f"CAIDA POST NOTIFICION DE FIN CLIENTE {client_id}"), probability=FILTERS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'node.post_notificion_de_fin_cliente', FILTERS_PROB_FAILURE, "CAIDA POST NOTIFICION DE FIN CLIENTE {}", client_id)
         self.fin_to_ack = (client_id, ch, method.delivery_tag)
         ch.stop_consuming()
     
@@ -103,10 +119,7 @@ class Node:
         """
         msg = decode_msg(raw_message)
 
-        # ==================================================================
-        # CAIDA ESPERANDO NOTIFICION DE FIN CLIENTE
-        simulate_random_failure(self, log_with_location(f"CAIDA ESPERANDO NOTIFICION DE FIN CLIENTE {msg.client_id}"), probability=FILTERS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'node.esperando_notificion_de_fin_cliente', FILTERS_PROB_FAILURE, "CAIDA ESPERANDO NOTIFICION DE FIN CLIENTE {}", msg.client_id)
 
         if msg.type == MsgType.FIN_PROPAGATED:
             if self.fin_to_ack:
@@ -116,10 +129,7 @@ class Node:
                     fin_ch.basic_ack(delivery_tag=tag)
                     self.fin_to_ack = None
                     ch.stop_consuming()
-                    # ==================================================================
-                    # CAIDA POST ACK DE FIN CLIENTE
-                    simulate_random_failure(self, log_with_location(f"CAIDA POST ACK DE FIN CLIENTE {client_id}"), probability=FILTERS_PROB_FAILURE)
-                    # ==================================================================
+                    FAULTS.point(self, 'node.post_ack_de_fin_cliente', FILTERS_PROB_FAILURE, "CAIDA POST ACK DE FIN CLIENTE {}", client_id)
         
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
@@ -135,6 +145,14 @@ class Node:
         self.push_exchange_name = E_FROM_MASTER_PUSH + f'_{self.container_name}_{self.id}'
         self._middleware.declare_exchange(self.push_exchange_name, type="fanout")
 
+        if self.promoted_state is not None:
+            # Maestro promovido: arranca con el estado de la réplica que lo aloja, sin pedírselo a las demás
+            for chunk in self.promoted_state:
+                self.load_state(chunk)
+            self.last_msg_id += 1
+            logging.info(f"Master {self.id}: Promovido con el estado de la réplica {self.promoted_state[-1].node_id}. last_msg_id = {self.last_msg_id}")
+            return
+
         # DE ESTE EXCHANGE RECIBO LAS RESPUESTAS LAS REPLICAS A MIS PULLS
         self.pull_exchange_name = E_FROM_REPLICA_PULL_ANS + f'_{self.container_name}_{self.id}'
         self._middleware.declare_exchange(self.pull_exchange_name)
@@ -149,39 +167,20 @@ class Node:
         self._middleware.send_to_queue(self.sync_request_exchange, pull_msg.encode(), "pull")
         logging.info(f"Master {self.id}: Mensaje PULL_DATA enviado a todas las réplicas.")
 
-        responses = set()
-
-        def on_response(ch, method, properties, body):
-            """Callback para manejar las respuestas de las réplicas."""
-            nonlocal responses
-            msg = decode_msg(body)
-
-            if not msg.node_id in responses:
-                if isinstance(msg, SimpleMessage) and msg.type == MsgType.EMPTY_STATE:
-                    logging.info(f"Master {self.id}: Recibido estado vacío de réplica {msg.node_id}.")
-                    responses.add(msg.node_id)
-                elif isinstance(msg, PushDataMessage):
-                    last_msg_id = msg.data['last_msg_id']
-                    logging.info(f"Master {self.id}: Recibido estado completo de réplica {msg.node_id}. last_msg_id = {last_msg_id}")
-                    if msg.data["last_msg_id"] > self.last_msg_id:
-                        logging.info(f"action: cargar estado | last_msg_id = {last_msg_id}")
-                        self.load_state(msg)
-                    responses.add(msg.node_id)
-            else:
-                logging.info(f"RECIBI PULL REPETIDO DE {msg.node_id}")
-
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-
-            # Detener el consumo si ya se recibió una respuesta de cada réplica compañera
-            if len(responses) >= self.n_replicas:
-                ch.stop_consuming()
-
-        # Escuchar respuestas hasta recibir de todas las réplicas
+        def request_stream(replica_id: int, cursor: int):
+            # requester_id 0: las réplicas responden por el exchange del maestro
+            stream_msg = SimpleMessage(type=MsgType.STATE_STREAM_REQUEST, requester_id=0, msg_id=cursor)
+            self._middleware.send_to_queue(self.sync_request_exchange, stream_msg.encode(), str(replica_id))
 
-        self._middleware.receive_from_queue(self.recv_queue, on_response, auto_ack=False)
+        # Escuchar las ofertas de todas las réplicas y cargar por chunks el estado de la más actualizada
+        receive_state(self._middleware, self.recv_queue, self.n_replicas, self.last_msg_id, request_stream, self.load_state, f"Master {self.id}")
         # Eliminar la cola anonima después de procesar el mensaje
         self._middleware.delete_queue(self.recv_queue)
 
+        # Las réplicas solo aplican pushes con un ID mayor al último que aplicaron
+        if self.last_msg_id > 0:
+            self.last_msg_id += 1
+
     def push_update(self, type: str, client_id: int, update = None):
         """
         Lógica del mensaje push para actualizar el estado de las réplicas.
@@ -197,11 +196,30 @@ class Node:
             self._middleware.send_to_queue(self.push_exchange_name, push_msg.encode())
 
         self.last_msg_id += 1
+        METRICS.set('last_msg_id', self.last_msg_id)
+        state_size = self.client_state_size(client_id)
+        if state_size is not None:
+            METRICS.set('client_state_items', state_size, client=client_id)
+
+    def client_state_size(self, client_id: int):
+        """
+        Cantidad de elementos del estado del cliente, para las métricas. None si el nodo no guarda estado por cliente.
+        """
+        return None
+
+    def publish_relevant_games(self, client_id: int, app_ids):
+        """
+        Publica el conjunto de juegos relevantes de un cliente para que el ScoreFilter
+        descarte temprano las reseñas de juegos que nunca van a joinear.
+        """
+        msg = RelevantGamesMessage(client_id=client_id, node_type=self.get_type().value, app_ids=list(app_ids))
+        self._middleware.send_to_queue(E_RELEVANT_GAMES, msg.encode())
 
 def init_listener(id, ip_prefix):
     """
     Inicia el proceso Listener del nodo.
     """
+    METRICS.read_only() # El Listener solo lee las métricas del nodo
     listener = Listener(id, ip_prefix)
     listener.run()
 
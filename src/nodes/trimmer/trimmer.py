@@ -1,11 +1,13 @@
 import logging
-from messages.messages import Dataset, ListMessage, MsgType, decode_msg
+from messages.messages import BatchBuilder, Dataset, MsgType, decode_msg
 from messages.games_msg import GamesType, Q1Game, GenreGame, Genre
 from messages.reviews_msg import Review, ReviewsType, Score
 from node import Node  # Importa la clase base Nodo
 
 from typing import List, Tuple
 import csv
+import io
+import re
 import sys
 
 from utils.container_constants import GENRE_CONTAINER_NAME, OS_COUNTER_CONTAINER_NAME, SCORE_CONTAINER_NAME
@@ -28,6 +30,13 @@ REVIEW_FIELD_NAMES = ['app_id','app_name','review_text','review_score','review_v
 # Aumenta el límite del tamaño de campo
 csv.field_size_limit(sys.maxsize)  # Esto establece el límite en el tamaño máximo permitido por el sistema
 
+def iter_rows(rows: bytes):
+    """
+    Devuelve un iterador perezoso de líneas de texto sobre el bloque de filas de un mensaje `Data`.
+    Las líneas se decodifican a medida que el lector CSV las pide, sin armar la lista completa.
+    """
+    return io.TextIOWrapper(io.BytesIO(rows), encoding='utf-8', newline='')
+
 def get_genres(genres_string: str):
     """
     Obtiene un listado de géneros a partir de una string.
@@ -35,6 +44,16 @@ def get_genres(genres_string: str):
     values = genres_string.split(',')
     return [genre for value in values if (genre := Genre.from_string(value)) != Genre.OTHER]
 
+YEAR_PATTERN = re.compile(r'\b(\d{4})\b')
+
+def get_release_year(release_date: str) -> int:
+    """
+    Obtiene el año de lanzamiento de una fecha (por ejemplo "Oct 21, 2008").
+    Se toma el último número de 4 dígitos; si no hay ninguno devuelve 0.
+    """
+    years = YEAR_PATTERN.findall(release_date)
+    return int(years[-1]) if years else 0
+
 class Trimmer(Node):
     """
     Clase del nodo Trimmer.
@@ -112,46 +131,43 @@ class Trimmer(Node):
         """
         Procesa mensajes de tipo DATA, filtrando juegos y reseñas.
         """
-        genre_games_batch, q1_games_batch, reviews_batch = [], [], []
-        
         if msg.dataset == Dataset.GAME:
-            self._process_game_data(msg, genre_games_batch, q1_games_batch)
+            self._process_game_data(msg)
         elif msg.dataset == Dataset.REVIEW:
-            self._process_review_data(msg, reviews_batch)
+            self._process_review_data(msg)
 
-    def _process_game_data(self, msg, genre_games_batch, q1_games_batch):
+    def _process_game_data(self, msg):
         """
         Procesa datos GAME y envía a las colas correspondientes.
         """
-        reader = csv.DictReader(msg.rows, fieldnames=GAME_FIELD_NAMES)
+        q1_games_batch = BatchBuilder(MsgType.GAMES, GamesType.Q1GAMES, msg.client_id, lambda payload: self._middleware.send_to_queue(E_FROM_TRIMMER, payload, key=K_Q1GAME))
+        genre_games_batch = BatchBuilder(MsgType.GAMES, GamesType.GENREGAMES, msg.client_id, lambda payload: self._middleware.send_to_queue(E_FROM_TRIMMER, payload, key=K_GENREGAME))
+
+        reader = csv.DictReader(iter_rows(msg.rows), fieldnames=GAME_FIELD_NAMES)
         for values in reader:
             q1_game, genre_game = self._get_game(values)
             if q1_game:
-                q1_games_batch.append(q1_game)
+                q1_games_batch.add(q1_game)
             if genre_game:
-                genre_games_batch.append(genre_game)
+                genre_games_batch.add(genre_game)
 
         # Enviar lotes por separado para cada tipo de juego
-        if q1_games_batch:
-            q1_games_msg = ListMessage(type=MsgType.GAMES, item_type=GamesType.Q1GAMES, items=q1_games_batch, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_TRIMMER, q1_games_msg.encode(), key=K_Q1GAME)
-        if genre_games_batch:
-            genre_games_msg = ListMessage(type=MsgType.GAMES, item_type=GamesType.GENREGAMES, items=genre_games_batch, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_TRIMMER, genre_games_msg.encode(), key=K_GENREGAME)
+        q1_games_batch.flush()
+        genre_games_batch.flush()
 
-    def _process_review_data(self, msg, reviews_batch):
+    def _process_review_data(self, msg):
         """
         Procesa datos del dataset REVIEW y envía a la cola correspondiente.
         """
-        reader = csv.DictReader(msg.rows, fieldnames=REVIEW_FIELD_NAMES)
+        reviews_batch = BatchBuilder(MsgType.REVIEWS, ReviewsType.FULLREVIEW, msg.client_id, lambda payload: self._middleware.send_to_queue(E_FROM_TRIMMER, payload, key=K_REVIEW))
+
+        reader = csv.DictReader(iter_rows(msg.rows), fieldnames=REVIEW_FIELD_NAMES)
         for values in reader:
             review = self._get_review(values)
             if review:
-                reviews_batch.append(review)
+                reviews_batch.add(review)
         
-        if reviews_batch:
-            reviews_msg = ListMessage(type=MsgType.REVIEWS, item_type=ReviewsType.FULLREVIEW, items=reviews_batch, client_id=msg.client_id)
-            self._middleware.send_to_queue(E_FROM_TRIMMER, reviews_msg.encode(), key=K_REVIEW)
+        reviews_batch.flush()
 
     def _get_game(self, values):
         """
@@ -168,7 +184,7 @@ class Trimmer(Node):
         try:
             app_id = int(values['AppID'])
             name = values['Name']
-            release_date = values['Release date']
+            release_year = get_release_year(values['Release date'])
             avg_playtime = int(values['Average playtime forever'])
             windows = values['Windows'] == "True"
             mac = values['Mac'] == "True"
@@ -181,7 +197,7 @@ class Trimmer(Node):
         q1_game = Q1Game(app_id, windows, linux, mac) if any([windows, linux, mac]) else None
 
         # Crear GenreGame si hay géneros y otros detalles
-        genre_game = GenreGame(app_id, name, release_date, avg_playtime, genres) if genres else None
+        genre_game = GenreGame(app_id, name, release_year, avg_playtime, genres) if genres else None
 
         return q1_game, genre_game
 
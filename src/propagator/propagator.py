@@ -7,7 +7,11 @@ from messages.messages import MsgType, PushDataMessage, SimpleMessage, decode_ms
 from middleware.middleware import Middleware
 from listener import Listener
 from utils.container_constants import PROP_PROB_FAILURE
-from utils.utils import log_with_location, NodeType, simulate_random_failure
+from utils.metrics import METRICS
+from utils.tracing import TRACER
+from utils.fault_injection import FAULTS
+from utils.utils import NodeType
+from utils.state_transfer import receive_state
 from utils.middleware_constants import E_FROM_MASTER_PUSH, E_FROM_PROP, E_FROM_REPLICA_PULL_ANS, E_REPLICA_SYNC_REQUEST_LISTENER, K_FIN, K_NOTIFICATION, Q_TO_PROP
 
 class Propagator:
@@ -30,6 +34,8 @@ class Propagator:
         self.nodes_instances = nodes_instances
         self.nodes_fins_state = {}
         self._middleware = Middleware()
+        TRACER.enable(f'propagator_{id}')
+        FAULTS.enable(f'propagator_{id}')
 
         self.last_msg_id = 0
 
@@ -91,10 +97,7 @@ class Propagator:
             # logging.info(f'Se actualiza el diccionario: {self.nodes_fins_state[msg.client_id]}')
             # pusheamos el cambio de estado a las replicas
             self.push_update('node_fin_state', msg.client_id, update=(node.name, msg.node_instance, True))
-            # ==================================================================
-            # CAIDA POST PUSHEAR LLEGADA DE FIN CLIENTE
-            simulate_random_failure(self, log_with_location(f"CAIDA POST PUSHEAR LLEGADA DE FIN CLIENTE {msg.client_id} de {node.name} {msg.node_instance}"), probability=PROP_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'propagator.post_pushear_llegada_de_fin_cliente', PROP_PROB_FAILURE, "CAIDA POST PUSHEAR LLEGADA DE FIN CLIENTE {} de {} {}", msg.client_id, node.name, msg.node_instance)
 
             # nos fijamos si se puede propagar el fin
             for fin_received in nodes_client_fins:
@@ -105,20 +108,14 @@ class Propagator:
             # se puede propagar el fin
             self._propagate_fins(nodes_client_fins, msg.client_id, node)
 
-            # ==================================================================
-            # CAIDA POST PROPAGACION DE FINS DE CLIENTE
-            simulate_random_failure(self, log_with_location(f"CAIDA POST PROPAGACION DE FINS DE CLIENTE {msg.client_id} DE {node.name}"), probability=PROP_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'propagator.post_propagacion_de_fins_de_cliente', PROP_PROB_FAILURE, "CAIDA POST PROPAGACION DE FINS DE CLIENTE {} DE {}", msg.client_id, node.name)
         
         # notificamos a los nodos que ya propagamos el fin
         logging.info(f'Se notifica a {node.name} que ya se propagaron los fins del cliente {msg.client_id}')
         fin_propagated_msg = SimpleMessage(type=MsgType.FIN_PROPAGATED, client_id=msg.client_id, node_type=node.value)
         self._middleware.send_to_queue(E_FROM_PROP, fin_propagated_msg.encode(), key=K_NOTIFICATION + f'_{NodeType.node_type_to_string(node)}')
 
-        # ==================================================================
-        # CAIDA POST NOTIFICACION DE FINS CLIENTE
-        simulate_random_failure(self, log_with_location(f"CAIDA POST NOTIFICACION DE FINS DE CLIENTE {msg.client_id} A {node.name}"), probability=PROP_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'propagator.post_notificacion_de_fins_de_cliente', PROP_PROB_FAILURE, "CAIDA POST NOTIFICACION DE FINS DE CLIENTE {} A {}", msg.client_id, node.name)
 
     def _process_delete_client(self, msg: SimpleMessage):
         logging.info(f'Me llego un CLIENT_CLOSE del cliente {msg.client_id}')
@@ -131,7 +128,7 @@ class Propagator:
     def _propagate_fins(self, nodes_client_fins: dict[int, bool], client_id: int, origin_node: NodeType):
         fins_propagated = nodes_client_fins['fins_propagated'] # lo consigue gracias a las replicas
         logging.info(f'Se propagan los fins del cliente {client_id}, desde {origin_node.name}. Ya habia {fins_propagated} fins propagados')
-        next_nodes = NodeType.get_next_nodes(origin_node)
+        next_nodes = self._get_next_nodes(origin_node)
         
         aggregate = 0
         for node in next_nodes:
@@ -163,10 +160,7 @@ class Propagator:
 
             fin_msg = SimpleMessage(type=MsgType.FIN, client_id=client_id, node_type=origin_node.value, msg_id=self.last_msg_id)
             for _ in range(fins_to_propagate):
-                # ==================================================================
-                # CAIDA EN MEDIO DE PROPAGACION FINS CLIENTE
-                simulate_random_failure(self, log_with_location(f"CAIDA EN MEDIO DE PROPAGACION FINS CLIENTE {client_id} de {origin_node.name}"), probability=PROP_PROB_FAILURE/100)
-                # ==================================================================
+                FAULTS.point(self, 'propagator.en_medio_de_propagacion_fins_cliente', PROP_PROB_FAILURE/100, "CAIDA EN MEDIO DE PROPAGACION FINS CLIENTE {} de {}", client_id, origin_node.name)
                 logging.info(f"Envie fin con key {K_FIN+f'_{name}'}")
                 self._middleware.send_to_queue(E_FROM_PROP, fin_msg.encode(), key=K_FIN+f'.{name}')
                 self.last_msg_id += 1 # se le agrega 1
@@ -175,6 +169,20 @@ class Propagator:
         nodes_client_fins['fins_propagated'] = aggregate
         logging.info(f'Fins del cliente {client_id} propagados desde {origin_node.name}')
     
+    def _get_next_nodes(self, node_type: NodeType) -> list[NodeType]:
+        """
+        Obtiene los nodos siguientes a los que propagar los fins. Un nodo sin instancias está
+        fusionado con el anterior (por ejemplo el ReleaseDateFilter dentro del GenreFilter),
+        por lo que se reemplaza por sus propios nodos siguientes.
+        """
+        next_nodes = []
+        for node in NodeType.get_next_nodes(node_type):
+            if self.nodes_instances.get(node.name, 1) == 0:
+                next_nodes.extend(self._get_next_nodes(node))
+            else:
+                next_nodes.append(node)
+        return next_nodes
+
     def _shutdown(self):
         """Gracefully shuts down the node, stopping consumption and closing connections."""
         if self.shutting_down:
@@ -243,43 +251,27 @@ class Propagator:
         self._middleware.send_to_queue(self.sync_request_exchange, pull_msg.encode(), "pull")
         logging.info(f"Master {self.id}: Mensaje PULL_DATA enviado a todas las réplicas.")
 
-        responses = set()
-
-        def on_response(ch, method, properties, body):
-            """Callback para manejar las respuestas de las réplicas."""
-            nonlocal responses
-            msg = decode_msg(body)
-
-            if not msg.node_id in responses:
-                if isinstance(msg, SimpleMessage) and msg.type == MsgType.EMPTY_STATE:
-                    logging.info(f"Master {self.id}: Recibido estado vacío de réplica {msg.node_id}.")
-                    responses.add(msg.node_id)
-                elif isinstance(msg, PushDataMessage):
-                    last_msg_id = msg.data['last_msg_id']
-                    logging.info(f"Master {self.id}: Recibido estado completo de réplica {msg.node_id}. last_msg_id = {last_msg_id}")
-                    if msg.data["last_msg_id"] > self.last_msg_id:
-                        logging.info(f"CARGUE DATA. last_msg_id = {last_msg_id}")
-                        self.load_state(msg)
-                    responses.add(msg.node_id)
-            else:
-                logging.info(f"RECIBI PULL REPETIDO DE {msg.node_id}")
-
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-
-            # Detener el consumo si ya se recibió una respuesta de cada réplica compañera
-            if len(responses) >= self.n_replicas:
-                ch.stop_consuming()
-
-        # Escuchar respuestas hasta recibir de todas las réplicas
+        def request_stream(replica_id: int, cursor: int):
+            # requester_id 0: las réplicas responden por el exchange del maestro
+            stream_msg = SimpleMessage(type=MsgType.STATE_STREAM_REQUEST, requester_id=0, msg_id=cursor)
+            self._middleware.send_to_queue(self.sync_request_exchange, stream_msg.encode(), str(replica_id))
 
-        self._middleware.receive_from_queue(self.recv_queue, on_response, auto_ack=False)
+        # Escuchar las ofertas de todas las réplicas y cargar por chunks el estado de la más actualizada
+        receive_state(self._middleware, self.recv_queue, self.n_replicas, self.last_msg_id, request_stream, self.load_state, f"Master {self.id}")
         # Eliminar la cola anonima después de procesar el mensaje
         self._middleware.delete_queue(self.recv_queue)
 
     def load_state(self, msg: PushDataMessage):
-        self.nodes_fins_state = msg.data["nodes_fins_state"]
-        self.last_msg_id = msg.data["last_msg_id"]
-        logging.info(f"Estado sicronizado a {self.nodes_fins_state}")
+        """Carga un chunk del estado recibido: los clientes que trae y, en el fence, el último mensaje procesado."""
+        if "nodes_fins_state" in msg.data:
+            # Un cliente puede venir partido en varios chunks: se mezcla por nodo en vez de reemplazarlo
+            for client_id, nodes in msg.data["nodes_fins_state"].items():
+                client_state = self.nodes_fins_state.setdefault(client_id, {})
+                for node_name, node_state in nodes.items():
+                    client_state.setdefault(node_name, {}).update(node_state)
+        if "last_msg_id" in msg.data:
+            self.last_msg_id = msg.data["last_msg_id"]
+            logging.info(f"Estado sicronizado a {self.nodes_fins_state}")
 
     def push_update(self, type: str, client_id: int, update = None):
 
@@ -293,13 +285,16 @@ class Propagator:
             self._middleware.send_to_queue(self.push_exchange_name, push_msg.encode())
 
         self.last_msg_id += 1
+        METRICS.set('last_msg_id', self.last_msg_id)
 
     def init_listener_process(self):
+        METRICS.enable(f'propagator_{self.id}')
         process = Process(target=init_listener, args=(self.id, 'propagator',))
         process.start()
         self.listener = process
 
 
 def init_listener(id, ip_prefix):
+    METRICS.read_only() # El Listener solo lee las métricas del nodo
     listener = Listener(id, ip_prefix)
     listener.run()
\ No newline at end of file
@@ -1,7 +1,10 @@
-from collections import defaultdict
 import logging
+from typing import List
 from messages.messages import PushDataMessage
 from replica import Replica
+from avg_counter import AvgCounter
+from utils.container_constants import AVG_COUNTER_CONTAINER_NAME
+from utils.cow_dict import CowDict
 from utils.utils import NodeType
 
 class AvgCounterReplica(Replica):
@@ -12,7 +15,7 @@ class AvgCounterReplica(Replica):
     def _initialize_storage(self):
         """Inicializa las estructuras de almacenamiento específicas."""
         # Inicialización de almacenamiento
-        self.avg_count = defaultdict(list)
+        self.avg_count = CowDict(list)
 
         # Variables de estado compartido
         logging.info("Replica: Almacenamiento inicializado.")
@@ -41,16 +44,23 @@ class AvgCounterReplica(Replica):
                 self.last_msg_id = msg.msg_id
                 self.synchronized = True
 
-    def _create_pull_answer(self):
-        """Procesa un mensaje de solicitud de pull de datos."""
-        response_data = PushDataMessage(
-            data={
-                "last_msg_id": self.last_msg_id,
-                "avg_count": {client_id: list(heap) for client_id, heap in self.avg_count.items()}
-            },
-            node_id=self.id
+    def _snapshot(self):
+        """Foto del estado. Los heaps se reemplazan enteros, así que no se copian."""
+        return {"last_msg_id": self.last_msg_id, "avg_count": self.avg_count.snapshot()}
+
+    def _state_parts(self, snapshot: dict):
+        """Recorre la foto por estructura. Cada heap va entero en un chunk."""
+        yield "avg_count", snapshot["avg_count"]
+
+    def _create_master(self, state: List[PushDataMessage]):
+        """Crea el AvgCounter que ejecuta la réplica al ser promovida."""
+        return AvgCounter(
+            id=int(self.master_name.rsplit('_', 1)[1]),
+            n_nodes=1,
+            container_name=AVG_COUNTER_CONTAINER_NAME,
+            n_replicas=self.n_replicas,
+            promoted_state=state
         )
-        return response_data
 
     def _delete_client_state(self, client_id):
         """Elimina el estado de un cliente específico."""
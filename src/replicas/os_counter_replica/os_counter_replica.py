@@ -1,7 +1,11 @@
 from collections import defaultdict
 import logging
+from typing import List
 from messages.messages import PushDataMessage
 from replica import Replica
+from os_counter import OsCounter
+from utils.container_constants import OS_COUNTER_CONTAINER_NAME
+from utils.cow_dict import CowDict
 from utils.utils import NodeType
 
 class OsCounterReplica(Replica):
@@ -12,7 +16,7 @@ class OsCounterReplica(Replica):
     def _initialize_storage(self):
         """Inicializa las estructuras de almacenamiento específicas."""
 
-        self.os_count = defaultdict(lambda: defaultdict(int))
+        self.os_count = CowDict(lambda: defaultdict(int))
         logging.info("Replica: Almacenamiento inicializado.")
 
     def get_type(self):
@@ -39,16 +43,23 @@ class OsCounterReplica(Replica):
                 self.last_msg_id = msg.msg_id
                 self.synchronized = True
 
-    def _create_pull_answer(self):
-        """Procesa un mensaje de solicitud de pull de datos."""
-        response_data = PushDataMessage(
-            data={
-                "last_msg_id": self.last_msg_id,
-                "os_count": dict(self.os_count)
-            },
-            node_id=self.id
+    def _snapshot(self):
+        """Foto del estado. Los contadores se reemplazan enteros, así que no se copian."""
+        return {"last_msg_id": self.last_msg_id, "os_count": self.os_count.snapshot()}
+
+    def _state_parts(self, snapshot: dict):
+        """Recorre la foto por estructura."""
+        yield "os_count", snapshot["os_count"]
+
+    def _create_master(self, state: List[PushDataMessage]):
+        """Crea el OsCounter que ejecuta la réplica al ser promovida."""
+        return OsCounter(
+            id=int(self.master_name.rsplit('_', 1)[1]),
+            n_nodes=1,
+            container_name=OS_COUNTER_CONTAINER_NAME,
+            n_replicas=self.n_replicas,
+            promoted_state=state
         )
-        return response_data
 
     def _delete_client_state(self, client_id):
         """Elimina el estado de un cliente específico."""
@@ -1,6 +1,8 @@
+import copy
 import logging
 from messages.messages import PushDataMessage
 from replica import Replica
+from utils.cow_dict import CowDict
 from utils.middleware_constants import E_FROM_PROP, K_FIN
 from utils.utils import NodeType
 
@@ -17,20 +19,18 @@ class PropagatorReplica(Replica):
     def _initialize_storage(self):
         """Inicializa las estructuras de almacenamiento específicas para Propagator."""
        # Inicialización de almacenamiento
-        self.nodes_fins_state = {}
+        self.nodes_fins_state = CowDict(copy_value=copy.deepcopy)  # client_id -> nodo -> estado de sus FINs
 
     def get_type(self):
         return NodeType.PROPAGATOR_REPLICA
 
-    def _create_pull_answer(self):
-        response_data = PushDataMessage(
-            data={
-                "nodes_fins_state": self.nodes_fins_state,
-                "last_msg_id": self.last_msg_id,
-            },
-            node_id=self.id
-        )
-        return response_data
+    def _snapshot(self):
+        """Foto del estado, con copy-on-write por cliente."""
+        return {"last_msg_id": self.last_msg_id, "nodes_fins_state": self.nodes_fins_state.snapshot()}
+
+    def _state_parts(self, snapshot: dict):
+        """Recorre la foto por estructura."""
+        yield "nodes_fins_state", snapshot["nodes_fins_state"]
 
     def _process_push_data(self, msg: PushDataMessage):
         """Procesa los datos de un mensaje `PushDataMessage`."""
@@ -57,7 +57,7 @@ class PropagatorReplica(Replica):
         node_type, node_instance, value = update
 
         if client_id in self.nodes_fins_state:
-            self.nodes_fins_state[client_id][node_type][node_instance] = value
+            self.nodes_fins_state.mutable(client_id)[node_type][node_instance] = value
 
     def _delete_client_state(self, client_id: int):
         """Elimina todas las referencias al cliente en el estado."""
@@ -82,7 +82,7 @@ class PropagatorReplica(Replica):
             
             with self.lock:
                 if client_id in self.nodes_fins_state:
-                    self.nodes_fins_state[client_id][node.name]['fins_propagated'] += 1
+                    self.nodes_fins_state.mutable(client_id)[node.name]['fins_propagated'] += 1
                 
                 self.last_msg_id = msg.msg_id
                 self.synchronized = True
@@ -92,11 +92,16 @@ class PropagatorReplica(Replica):
         state = msg.data
 
         if 'nodes_fins_state' in state:
-            self.nodes_fins_state = state['nodes_fins_state']
+            # Un cliente puede venir partido en varios chunks: se mezcla por nodo en vez de reemplazarlo
+            for client_id, nodes in state['nodes_fins_state'].items():
+                if client_id not in self.nodes_fins_state:
+                    self.nodes_fins_state[client_id] = {}
+                client_state = self.nodes_fins_state.mutable(client_id)
+                for node_name, node_state in nodes.items():
+                    client_state.setdefault(node_name, {}).update(node_state)
 
         if "last_msg_id" in state:
             self.last_msg_id = state.get('last_msg_id')
+            logging.info(f"Estado actualizado a: {self.nodes_fins_state}, con last_msg_id {self.last_msg_id}")
 
-        self.synchronized = True
-
-        logging.info(f"Estado actualizado a: {self.nodes_fins_state}, con last_msg_id {self.last_msg_id}")
\ No newline at end of file
+        self.synchronized = True
\ No newline at end of file
@@ -4,6 +4,7 @@ import threading
 from messages.messages import MsgType, PushDataMessage, SimpleMessage, decode_msg
 from middleware.middleware import Middleware
 from replica import Replica
+from utils.cow_dict import CowDict
 from utils.utils import NodeType
 
 class Q3JoinerReplica(Replica):
@@ -13,30 +14,29 @@ class Q3JoinerReplica(Replica):
         
     def _initialize_storage(self):
         """Inicializa las estructuras de almacenamiento específicas para Q3Joiner."""
-        self.games_per_client = defaultdict(dict)  # Juegos por cliente (client_id -> {app_id: name})
-        self.review_counts_per_client = defaultdict(lambda: defaultdict(int))  # Reseñas por cliente (client_id -> app_id -> count)
-        self.fins_per_client = defaultdict(lambda: [False, False])  # Fins por cliente (client_id -> [fin_games, fin_reviews])
+        self.games_per_client = CowDict(set)  # Juegos por cliente (client_id -> {app_id})
+        self.review_counts_per_client = CowDict(lambda: defaultdict(int))  # Reseñas por cliente (client_id -> app_id -> count)
+        self.fins_per_client = CowDict(lambda: [False, False])  # Fins por cliente (client_id -> [fin_games, fin_reviews])
         
         logging.info("Replica: Almacenamiento inicializado.")
 
     def get_type(self):
         return NodeType.Q3_JOINER_REPLICA
 
-    def _create_pull_answer(self):
-        """Procesa un mensaje de solicitud de pull de datos."""
-        response_data = PushDataMessage(
-            data={
-                "last_msg_id": self.last_msg_id,
-                "games_per_client": dict(self.games_per_client),
-                "review_counts_per_client": {
-                    k: dict(v) for k, v in self.review_counts_per_client.items()
-                },
-                "fins_per_client": dict(self.fins_per_client),
-            },
-            node_id=self.id,
-        )
-        return response_data
-
+    def _snapshot(self):
+        """Foto del estado, con copy-on-write por cliente."""
+        return {
+            "last_msg_id": self.last_msg_id,
+            "games_per_client": self.games_per_client.snapshot(),
+            "review_counts_per_client": self.review_counts_per_client.snapshot(),
+            "fins_per_client": self.fins_per_client.snapshot(),
+        }
+
+    def _state_parts(self, snapshot: dict):
+        """Recorre la foto por estructura."""
+        yield "games_per_client", snapshot["games_per_client"]
+        yield "review_counts_per_client", snapshot["review_counts_per_client"]
+        yield "fins_per_client", snapshot["fins_per_client"]
 
     def _process_push_data(self, msg: PushDataMessage):
         """Procesa los datos de un mensaje `PushDataMessage`."""
@@ -65,30 +65,19 @@ class Q3JoinerReplica(Replica):
             logging.info(f"llego el primer push y cambie a: {self.synchronized}")
 
 
-    def _update_games(self, client_id: int, updates: dict):
-        """Actualiza los juegos de un cliente en la réplica."""
-        # Obtener el diccionario actual de juegos del cliente
-        client_games = self.games_per_client.get(client_id, {})
-        
-        # Actualizar los valores en el diccionario
-        for app_id, name in updates.items():
-            client_games[app_id] = name
-        
-        # Reasignar el diccionario actualizado al estado compartido
-        self.games_per_client[client_id] = client_games
+    def _update_games(self, client_id: int, updates: list):
+        """Agrega los `app_id` de los juegos de un cliente en la réplica."""
+        self.games_per_client.mutable(client_id).update(updates)
 
 
     def _update_reviews(self, client_id: int, updates: dict):
         """Actualiza las reseñas de un cliente en la réplica."""
-        # Obtener el diccionario actual de reseñas del cliente
-        client_reviews = self.review_counts_per_client.get(client_id, {})
+        # Obtener el diccionario actual de reseñas del cliente (una copia si lo comparte con una foto)
+        client_reviews = self.review_counts_per_client.mutable(client_id)
         
         # Actualizar los valores en el diccionario
         for app_id, count in updates.items():
             client_reviews[app_id] = count
-        
-        # Reasignar el diccionario actualizado al estado compartido
-        self.review_counts_per_client[client_id] = client_reviews
 
 
     def _update_fins(self, client_id: int, updates: list):
@@ -132,7 +121,6 @@ class Q3JoinerReplica(Replica):
                     self._update_fins(client_id, fins)
             if "last_msg_id" in state:
                 self.last_msg_id = state["last_msg_id"]
+                logging.info(f"recibi este estado {state['last_msg_id']}")
         
-            self.synchronized = True
-        
-        logging.info(f"recibi este estado {state['last_msg_id']}")
\ No newline at end of file
+            self.synchronized = True
\ No newline at end of file
@@ -15,7 +15,9 @@ def main():
             id=config_params["instance_id"],
             container_name="q4_joiner_replica",
             master_name="q4_joiner_1",
-            n_replicas=config_params["q4_joiner_replica_instances"]
+            n_replicas=config_params["q4_joiner_replica_instances"],
+            reviews_store_dir=config_params["reviews_store_dir"],
+            reviews_memory_budget=config_params["reviews_memory_budget"]
         )
         
         logging.info(f"Q4JoinerReplica {config_params['instance_id']} iniciada. Esperando mensajes...")
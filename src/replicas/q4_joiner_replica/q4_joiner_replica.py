@@ -2,43 +2,59 @@ from collections import defaultdict
 import logging
 from messages.messages import PushDataMessage
 from replica import Replica
+from utils.cow_dict import CowDict
+from utils.review_store import ReviewStore
 from utils.utils import NodeType
 
 
 class Q4JoinerReplica(Replica):
 
-    def __init__(self, id: int, container_name: str, master_name: str, n_replicas: int):
+    def __init__(self, id: int, container_name: str, master_name: str, n_replicas: int, reviews_store_dir: str, reviews_memory_budget: int):
+        self.reviews_store_dir = reviews_store_dir
+        self.reviews_memory_budget = reviews_memory_budget * 1024
         super().__init__(id, container_name, master_name, n_replicas)
 
     def _initialize_storage(self):
         """Inicializa las estructuras de almacenamiento específicas para Q4Joiner."""
-        self.negative_reviews_count_per_client = defaultdict(lambda: defaultdict(int))
-        self.games_per_client = defaultdict(dict)
-        self.negative_reviews_per_client = defaultdict(lambda: defaultdict(lambda: ([], False)))
-        self.fins_per_client = defaultdict(lambda: [False, False])
+        self.negative_reviews_count_per_client = CowDict(lambda: defaultdict(int))
+        self.games_per_client = CowDict(set)
+        self.reviews_store = ReviewStore(self.reviews_store_dir, self.reviews_memory_budget)
+        self.overpassed_per_client = CowDict(set)
+        self.fins_per_client = CowDict(lambda: [False, False])
         logging.info("Replica: Almacenamiento inicializado.")
 
     def get_type(self):
         return NodeType.Q4_JOINER_REPLICA
 
-    def _create_pull_answer(self):
-        """Procesa un mensaje de solicitud de pull de datos."""
-        response_data = PushDataMessage(
-            data={
-                "last_msg_id": self.last_msg_id,
-                "negative_reviews_count_per_client": {
-                    k: dict(v) for k, v in self.negative_reviews_count_per_client.items()
-                },
-                "games_per_client": dict(self.games_per_client),
-                "negative_reviews_per_client": {
-                    k: {app_id: (list(reviews), processed) for app_id, (reviews, processed) in v.items()}
-                    for k, v in self.negative_reviews_per_client.items()
-                },
-                "fins_per_client": dict(self.fins_per_client),
-            },
-            node_id=self.id,
-        )
-        return response_data
+    def _snapshot(self):
+        """
+        Foto del estado, con copy-on-write por cliente. De las reseñas se copian el índice y los
+        buffers pendientes, y los textos se leen del disco después, sin el lock.
+        """
+        return {
+            "last_msg_id": self.last_msg_id,
+            "negative_reviews_count_per_client": self.negative_reviews_count_per_client.snapshot(),
+            "games_per_client": self.games_per_client.snapshot(),
+            "reviews": self.reviews_store.snapshot(),
+            "overpassed_per_client": self.overpassed_per_client.snapshot(),
+            "fins_per_client": self.fins_per_client.snapshot(),
+        }
+
+    def _state_parts(self, snapshot: dict):
+        """
+        Recorre la foto por estructura. Los textos de las reseñas se leen del disco a medida que se
+        envían, y los textos de cada juego van numerados (posición -> texto) para poder partirlos.
+        """
+        # La foto de las reseñas se cierra aunque el envío se corte, para liberar sus segmentos
+        with snapshot["reviews"] as reviews:
+            yield "negative_reviews_count_per_client", snapshot["negative_reviews_count_per_client"]
+            yield "games_per_client", snapshot["games_per_client"]
+            yield "overpassed_per_client", snapshot["overpassed_per_client"]
+            yield "negative_reviews_per_client", {
+                client_id: {app_id: enumerate(reviews.iter_texts(client_id, app_id)) for app_id in reviews.app_ids(client_id)}
+                for client_id in reviews.clients()
+            }
+            yield "fins_per_client", snapshot["fins_per_client"]
 
     def _process_push_data(self, msg: PushDataMessage):
         """Procesa los datos de un mensaje `PushDataMessage`."""
@@ -51,6 +67,8 @@ class Q4JoinerReplica(Replica):
             with self.lock:
                 if update_type == "reviews":
                     self._update_negative_reviews(client_id, state.get("update", {}))
+                elif update_type == "prune_reviews":
+                    self._prune_negative_reviews(client_id, state.get("update", []))
                 elif update_type == "reviews_count":
                     self._update_negative_reviews_count(client_id, state.get("update", {}))
                 elif update_type == "games":
@@ -66,25 +84,31 @@ class Q4JoinerReplica(Replica):
                 self.synchronized = True
 
     def _update_negative_reviews(self, client_id: int, updates: dict):
-        """Actualiza las reseñas negativas de un cliente en la réplica."""
-        client_reviews = self.negative_reviews_per_client.get(client_id, {})
-        for app_id, value in updates.items():
-            client_reviews[app_id] = value
-        self.negative_reviews_per_client[client_id] = client_reviews
+        """
+        Actualiza las reseñas negativas de un cliente en la réplica.
+        Cada actualización trae [se enviaron las reseñas anteriores al filtro de inglés, textos nuevos].
+        """
+        for app_id, (sent, reviews) in updates.items():
+            if sent:
+                self.reviews_store.discard(client_id, app_id)
+                self.overpassed_per_client.mutable(client_id).add(app_id)
+            for review in reviews:
+                self.reviews_store.append(client_id, app_id, review)
+
+    def _prune_negative_reviews(self, client_id: int, app_ids: list):
+        """Descarta las reseñas negativas de los juegos indicados de un cliente en la réplica."""
+        for app_id in app_ids:
+            self.reviews_store.discard(client_id, app_id)
 
     def _update_negative_reviews_count(self, client_id: int, updates: dict):
         """Actualiza la cantidad de reseñas negativas de un cliente en la réplica."""
-        client_reviews = self.negative_reviews_count_per_client.get(client_id, {})
+        client_reviews = self.negative_reviews_count_per_client.mutable(client_id)
         for app_id, count in updates.items():
             client_reviews[app_id] = count
-        self.negative_reviews_count_per_client[client_id] = client_reviews
 
-    def _update_games(self, client_id: int, updates: dict):
-        """Actualiza los juegos de un cliente en la réplica."""
-        client_games = self.games_per_client.get(client_id, {})
-        for app_id, name in updates.items():
-            client_games[app_id] = name
-        self.games_per_client[client_id] = client_games
+    def _update_games(self, client_id: int, updates: list):
+        """Agrega los `app_id` de los juegos de un cliente en la réplica."""
+        self.games_per_client.mutable(client_id).update(updates)
 
     def _update_fins(self, client_id: int, updates: list):
         """Actualiza los estados de FIN de un cliente en la réplica."""
@@ -97,7 +121,8 @@ class Q4JoinerReplica(Replica):
         """Elimina todas las referencias al cliente en el estado."""
         self.negative_reviews_count_per_client.pop(client_id, None)
         self.games_per_client.pop(client_id, None)
-        self.negative_reviews_per_client.pop(client_id, None)
+        self.reviews_store.delete_client(client_id)
+        self.overpassed_per_client.pop(client_id, None)
         self.fins_per_client.pop(client_id, None)
         logging.info(f"Replica: Estado borrado para client_id: {client_id}")
 
@@ -111,14 +136,20 @@ class Q4JoinerReplica(Replica):
             if "games_per_client" in state:
                 for client_id, games in state["games_per_client"].items():
                     self._update_games(client_id, games)
+            if "overpassed_per_client" in state:
+                for client_id, app_ids in state["overpassed_per_client"].items():
+                    for app_id in app_ids:
+                        self.reviews_store.discard(client_id, app_id)
+                    self.overpassed_per_client.mutable(client_id).update(app_ids)
             if "negative_reviews_per_client" in state:
-                for client_id, reviews in state["negative_reviews_per_client"].items():
-                    self._update_negative_reviews(client_id, reviews)
+                for client_id, negative_reviews in state["negative_reviews_per_client"].items():
+                    for app_id, texts in negative_reviews.items():
+                        self.reviews_store.load_texts(client_id, app_id, texts)
             if "fins_per_client" in state:
                 for client_id, fins in state["fins_per_client"].items():
                     self._update_fins(client_id, fins)
             if "last_msg_id" in state:
                 self.last_msg_id = state["last_msg_id"]
+                logging.info(f"Replica: Estado completo cargado con last_msg_id {state['last_msg_id']}.")
 
-            self.synchronized = True
-            logging.info(f"Replica: Estado completo cargado con last_msg_id {state['last_msg_id']}.")
\ No newline at end of file
+            self.synchronized = True
\ No newline at end of file
@@ -2,6 +2,7 @@ from collections import defaultdict
 import logging
 from messages.messages import PushDataMessage
 from replica import Replica
+from utils.cow_dict import CowDict
 from utils.utils import NodeType
 
 class Q5JoinerReplica(Replica):
@@ -12,27 +13,27 @@ class Q5JoinerReplica(Replica):
     def _initialize_storage(self):
         """Inicializa las estructuras de almacenamiento específicas para Q5Joiner."""
         # Inicialización de almacenamiento
-        self.games_per_client = defaultdict(dict)
-        self.negative_review_counts_per_client = defaultdict(lambda: defaultdict(int))
-        self.fins_per_client = defaultdict(lambda: [False, False])
+        self.games_per_client = CowDict(set)
+        self.negative_review_counts_per_client = CowDict(lambda: defaultdict(int))
+        self.fins_per_client = CowDict(lambda: [False, False])
 
     def get_type(self):
         return NodeType.Q5_JOINER_REPLICA
 
-    def _create_pull_answer(self):
-        """Procesa un mensaje de solicitud de pull de datos."""
-        response_data = PushDataMessage(
-            data={
-                "last_msg_id": self.last_msg_id,
-                "games_per_client": dict(self.games_per_client),
-                "negative_review_counts_per_client": {
-                    k: dict(v) for k, v in self.negative_review_counts_per_client.items()
-                },
-                "fins_per_client": dict(self.fins_per_client),
-            },
-            node_id=self.id,
-        )
-        return response_data
+    def _snapshot(self):
+        """Foto del estado, con copy-on-write por cliente."""
+        return {
+            "last_msg_id": self.last_msg_id,
+            "games_per_client": self.games_per_client.snapshot(),
+            "negative_review_counts_per_client": self.negative_review_counts_per_client.snapshot(),
+            "fins_per_client": self.fins_per_client.snapshot(),
+        }
+
+    def _state_parts(self, snapshot: dict):
+        """Recorre la foto por estructura."""
+        yield "games_per_client", snapshot["games_per_client"]
+        yield "negative_review_counts_per_client", snapshot["negative_review_counts_per_client"]
+        yield "fins_per_client", snapshot["fins_per_client"]
 
     def _process_push_data(self, msg: PushDataMessage):
         """Procesa los datos de un mensaje `PushDataMessage`."""
@@ -57,15 +58,15 @@ class Q5JoinerReplica(Replica):
                 self.last_msg_id = msg.msg_id
                 self.synchronized = True
 
-    def _update_games(self, client_id: int, updates: dict):
-        """Actualiza los juegos de un cliente en la réplica."""
-        for app_id, name in updates.items():
-            self.games_per_client[client_id][app_id] = name
+    def _update_games(self, client_id: int, updates: list):
+        """Agrega los `app_id` de los juegos de un cliente en la réplica."""
+        self.games_per_client.mutable(client_id).update(updates)
 
     def _update_reviews(self, client_id: int, updates: dict):
         """Actualiza las reseñas negativas de un cliente en la réplica."""
+        client_reviews = self.negative_review_counts_per_client.mutable(client_id)
         for app_id, count in updates.items():
-            self.negative_review_counts_per_client[client_id][app_id] = count
+            client_reviews[app_id] = count
 
     def _update_fins(self, client_id: int, updates: list):
         """Actualiza los estados de FIN de un cliente en la réplica."""
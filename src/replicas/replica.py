@@ -1,13 +1,20 @@
 import logging
-from multiprocessing import Process
+from multiprocessing import Process, Value
 import signal
 import threading
-from messages.messages import MsgType, PushDataMessage, SimpleMessage, decode_msg
+import time
+from typing import Iterator, List, Tuple
+from messages.messages import MsgType, PushDataMessage, SimpleMessage, decode_msg, encode_state_chunks
 from middleware.middleware import Middleware
 from utils.middleware_constants import E_FROM_MASTER_PUSH, E_FROM_REPLICA_PULL_ANS, E_REPLICA_SYNC_REQUEST_LISTENER, E_SYNC_STATE, Q_MASTER_REPLICA, Q_REPLICA_SYNC_REQUEST_LISTENER
 from utils.container_constants import LISTENER_PORT, REPLICAS_PROB_FAILURE
 from listener import Listener
-from utils.utils import simulate_random_failure, log_with_location
+from utils.metrics import METRICS
+from utils.fault_injection import FAULTS
+from utils.profiler import SamplingProfiler
+from utils.state_transfer import STATE_CHUNK_SIZE, receive_state
+
+PROMOTION_CHECK_INTERVAL = 0.1 # Segundos entre chequeos del pedido de promoción (y de devolución) mientras se consume
 
 class Replica:
     def __init__(self, id: int, container_name: str, master_name: str, n_replicas: int):
@@ -29,6 +36,16 @@ class Replica:
         # Lock para proteger el acceso al estado compartido
         self.lock = threading.Lock()
 
+        # Estado que el Listener le informa al WatchDog, y su pedido de promoción
+        self.status_last_msg_id = Value('q', 0, lock=False)
+        self.status_synchronized = Value('b', False, lock=False)
+        self.promote_requested = Value('b', False, lock=False)
+        # Devolución del rol de maestro: la pide el hilo de sincronización al llegar el PULL del maestro reiniciado,
+        # y el hilo principal avisa cuando aplicó todos los pushes del maestro promovido
+        self.handback_lock = threading.Lock()
+        self.handback = threading.Event()
+        self.handback_done = threading.Event()
+
         # Validación de nombres de contenedor
         if not container_name:
             raise ValueError("container_name no puede ser None o vacío.")
@@ -66,16 +83,29 @@ class Replica:
         )
         self.sync_listener_thread.start()
 
-        self.listener = Process(target=init_listener, args=(id, container_name, self.port,))
+        METRICS.enable(f'{container_name}_{id}')
+        FAULTS.enable(f'{container_name}_{id}')
+        self.listener = Process(target=init_listener, args=(id, container_name, self.port, self.status_last_msg_id, self.status_synchronized, self.promote_requested))
         self.listener.start()
 
+        # Perfilado a demanda con SIGUSR1 (instalado después de crear el Listener, que no lo hereda)
+        self.profiler = SamplingProfiler(f'{container_name}_{id}')
+        self.profiler.install()
+
     def run(self):
         """Inicia el consumo de mensajes en la cola de la réplica."""
         try:
             while not self.shutting_down:
                 # AHORA REVIVE EL WATCHDOG A LOS MASTERS, NO NECESITO VERIFICAR CON TIMEOUT
+                cancel = self._middleware.stop_consuming_when(lambda: self.promote_requested.value, PROMOTION_CHECK_INTERVAL)
                 self._middleware.receive_from_queue(self.recv_queue, self.process_replica_message, auto_ack=False)
-                self.recover_state()  # Método para solicitar sincronización
+                cancel()
+                if self.shutting_down:
+                    break
+                if self.promote_requested.value:
+                    self._run_as_master()
+                else:
+                    self.recover_state()  # Método para solicitar sincronización
         except Exception as e:
             if not self.shutting_down:
                 logging.error(f"action: listening_queue | result: fail | error: {e.with_traceback()}")
@@ -95,9 +125,104 @@ class Replica:
     def _process_fin_message(self, msg):
         pass
 
-    def _create_pull_answer(self):
+    def _snapshot(self) -> dict:
+        """
+        Foto del estado en este instante, con el `last_msg_id`. Se toma con el lock, así que
+        tiene que ser barata (ver `CowDict.snapshot`): no copia ni serializa los valores.
+        """
         pass
 
+    def _state_parts(self, snapshot: dict) -> Iterator[Tuple[str, object]]:
+        """
+        Recorre una foto por estructura, como pares (estructura, valor) para `encode_state_chunks`,
+        sin armar el estado completo. Se llama sin el lock.
+        """
+        return iter(())
+
+    def _state_chunks(self) -> Tuple[int, Iterator[bytes]]:
+        """
+        Estado por chunks sin frenar la aplicación de pushes: con el lock solo se toma la foto, y los
+        chunks se arman (y se serializan) desde la foto, fuera del lock, a medida que se recorren.
+
+        :return: El último push aplicado de la foto y los chunks del estado, sin el fence.
+        """
+        start_time = time.monotonic()
+        with self.lock:
+            snapshot = self._snapshot()
+        METRICS.observe('state_snapshot_seconds', time.monotonic() - start_time)
+        return snapshot["last_msg_id"], encode_state_chunks(self._state_parts(snapshot), self.id, STATE_CHUNK_SIZE)
+
+    def _create_master(self, state: List[PushDataMessage]):
+        """
+        Crea el maestro que esta réplica ejecuta al ser promovida, con el estado recibido por chunks.
+        None si el maestro de esta réplica no se puede promover.
+        """
+        return None
+
+    def _publish_status(self):
+        """Actualiza el estado que el Listener le informa al WatchDog."""
+        self.status_last_msg_id.value = self.last_msg_id
+        self.status_synchronized.value = self.synchronized
+
+    def _run_as_master(self):
+        """
+        Atiende las colas del maestro caído hasta que el maestro reiniciado pide el estado (PULL_DATA).
+
+        El maestro promovido arranca con el estado de esta réplica y publica sus pushes en el exchange
+        del maestro original, así que esta réplica y sus compañeras los reciben por las colas de siempre.
+        Al devolver el rol, esta réplica aplica los pushes que quedaron en su cola y recién entonces
+        le responde el PULL al maestro reiniciado, que no consume hasta tener las respuestas de todas.
+        """
+        # El estado se copia pasándolo por el codec, para que el maestro no comparta estructuras con la réplica
+        last_msg_id, chunks = self._state_chunks()
+        state = [decode_msg(chunk) for chunk in chunks]
+        state.append(PushDataMessage(data={"last_msg_id": last_msg_id}, node_id=self.id, msg_id=len(state)))
+        promotion_msg_id = self.last_msg_id
+
+        master = self._create_master(state) if self.synchronized else None
+        if master is None:
+            logging.warning(f"Replica {self.id}: No se puede promover a maestro de {self.master_name} (sincronizada: {self.synchronized}).")
+        else:
+            logging.info(f"Replica {self.id}: Promovida a maestro de {self.master_name}. last_msg_id = {promotion_msg_id}")
+            METRICS.set('promoted', 1)
+            cancel = master._middleware.stop_consuming_when(lambda: self.handback.is_set() or self.shutting_down, PROMOTION_CHECK_INTERVAL)
+            try:
+                master.run()
+            except SystemExit:
+                # Caída simulada del maestro promovido: se cae la réplica entera, con su Listener
+                self._shutdown()
+                raise
+            cancel()
+            master._shutdown()
+            METRICS.set('promoted', 0)
+
+            # Se aplican los pushes del maestro promovido, que están en la cola de esta réplica en orden
+            last_push = master.last_msg_id - 1
+            logging.info(f"Replica {self.id}: Devolviendo el rol de maestro. Aplicando pushes hasta {last_push}.")
+            if self.last_msg_id < last_push and not self.shutting_down:
+                cancel = self._middleware.stop_consuming_when(lambda: self.last_msg_id >= last_push or self.shutting_down, PROMOTION_CHECK_INTERVAL)
+                self._middleware.receive_from_queue(self.recv_queue, self.process_replica_message, auto_ack=False)
+                cancel()
+
+        with self.handback_lock:
+            self.promote_requested.value = False
+            waiting = self.handback.is_set()
+            self.handback.clear()
+        if waiting:
+            self.handback_done.set()
+
+    def _hand_back(self):
+        """
+        Si la réplica está promovida, le pide al hilo principal que devuelva el rol de maestro y espera
+        a que termine. Lo llama el hilo de sincronización antes de responder el PULL del maestro reiniciado.
+        """
+        with self.handback_lock:
+            if not self.promote_requested.value:
+                return
+            self.handback.set()
+        self.handback_done.wait()
+        self.handback_done.clear()
+
     def _shutdown(self):
         """Cierra la réplica de forma segura."""
         if self.shutting_down:
@@ -134,10 +259,6 @@ class Replica:
     def process_replica_message(self, ch, method, properties, raw_message):
         """Procesa mensajes de la cola `Q_REPLICA`."""
         try:
-            # ==================================================================
-            # CAIDA LUEGO DE CONSUMIR MENSAJE Y ANTES DE DAR EL ACK
-            # simulate_random_failure(self, log_with_location("CAIDA LUEGO DE CONSUMIR MENSAJE Y ANTES DE DAR EL ACK"), probability=REPLICAS_PROB_FAILURE)
-            # ==================================================================
             msg = decode_msg(raw_message)
             # Determinar si la réplica necesita sincronización
             if msg.msg_id > 0 and not self.synchronized:
@@ -145,10 +266,7 @@ class Replica:
                 # devuelvo el mensaje a la cola (si el msg_id es > 0 se trata de un push)
                 ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
 
-                # ==================================================================
-                # CAIDA LUEGO DE DEVOLVER A LA COLA CON NACK
-                simulate_random_failure(self, log_with_location("CAIDA LUEGO DE DEVOLVER A LA COLA CON NACK"), probability=REPLICAS_PROB_FAILURE)
-                # ==================================================================
+                FAULTS.point(self, 'replica.luego_de_devolver_a_la_cola_con_nack', REPLICAS_PROB_FAILURE, "CAIDA LUEGO DE DEVOLVER A LA COLA CON NACK")
 
                 ch.stop_consuming()
                 logging.info(f"Replica {self.id}: Recibiendo primer mensaje con ID {msg.msg_id} de tipo {msg.type}. Iniciando sincronización.")
@@ -156,24 +274,22 @@ class Replica:
             
 
             elif msg.type == MsgType.PUSH_DATA:
+                # Distancia entre el último push del master y el último aplicado por la réplica
+                METRICS.set('replica_push_gap', msg.msg_id - self.last_msg_id)
                 # Procesar solo mensajes con un ID mayor al último procesado
                 self._process_push_data(msg)
+                METRICS.set('last_msg_id', self.last_msg_id)
 
-                # ==================================================================
-                # CAIDA POST PROCESAR MENSAJE PUSH Y ANTES DE DAR EL ACK
-                simulate_random_failure(self, log_with_location("CAIDA POST PROCESAR MENSAJE PUSH Y ANTES DE DAR EL ACK"), probability=REPLICAS_PROB_FAILURE)
-                # ==================================================================
+                FAULTS.point(self, 'replica.post_procesar_mensaje_push_y_antes_de_dar_el_ack', REPLICAS_PROB_FAILURE, "CAIDA POST PROCESAR MENSAJE PUSH Y ANTES DE DAR EL ACK")
             
             elif msg.type == MsgType.FIN:
                 self._process_fin_message(msg)
 
             # Confirmar la recepción del mensaje
             ch.basic_ack(delivery_tag=method.delivery_tag)
+            self._publish_status()
 
-            # ==================================================================
-            # CAIDA ACA POST PROCESAR MENSAJE Y DESPUES DE DAR EL ACK
-            simulate_random_failure(self, log_with_location("CAIDA ACA POST PROCESAR MENSAJE Y DESPUES DE DAR EL ACK"), probability=REPLICAS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'replica.post_procesar_mensaje_y_despues_de_dar_el_ack', REPLICAS_PROB_FAILURE, "CAIDA ACA POST PROCESAR MENSAJE Y DESPUES DE DAR EL ACK")
 
         except Exception as e:
             logging.error(f"action: process_replica_message | result: fail | error: {e.with_traceback()}")
@@ -184,10 +300,7 @@ class Replica:
         """
         logging.info(f"Replica {self.id}: Solicitando estado a réplicas compañeras.")
 
-        # ==================================================================
-        # CAIDA LUEGO DE ENTRAR A RECOVER_STATE Y ANTES DE ENVIAR SYNC_MSG
-        simulate_random_failure(self, log_with_location("CAIDA LUEGO DE ENTRAR A RECOVER_STATE Y ANTES DE ENVIAR SYNC_MSG"), probability=REPLICAS_PROB_FAILURE)
-        # ==================================================================
+        FAULTS.point(self, 'replica.luego_de_entrar_a_recover_state_y_antes_de_enviar_sync_msg', REPLICAS_PROB_FAILURE, "CAIDA LUEGO DE ENTRAR A RECOVER_STATE Y ANTES DE ENVIAR SYNC_MSG")
 
         # Crear una cola anónima y vincularla al exchange E_SYNC_STATE_REQUEST con la routing key basada en el ID de la réplica
         self.sync_anonymous_queue = self._middleware.declare_anonymous_queue(exchange_name=self.sync_exchange, routing_key=str(self.id))
@@ -197,51 +310,58 @@ class Replica:
         # Lo envio al exchange sync donde escuchan los procesos externos
         self._middleware.send_to_queue(self.sync_request_listener_exchange, sync_msg.encode(), key="sync")
 
-        # ==================================================================
-        # CAIDA LUEGO DE ENVIAR SYNC_MSG Y ANTES DE ESPERAR RESPUESTA
-        simulate_random_failure(self, log_with_location("CAIDA LUEGO DE ENVIAR SYNC_MSG Y ANTES DE ESPERAR RESPUESTA"), probability=REPLICAS_PROB_FAILURE)
-        # ==================================================================
-
-        responses = set()
-
-        # Esperar respuesta
-        def on_state_response(ch, method, properties, body):
-            nonlocal responses
-            msg = decode_msg(body)
-
-            if not msg.node_id in responses:
-                if isinstance(msg, SimpleMessage) and msg.type == MsgType.EMPTY_STATE:
-                    logging.info(f"Replica {self.id}: Recibido estado vacío de réplica {msg.node_id}. ")
-                    responses.add(msg.node_id)
-
-                elif isinstance(msg, PushDataMessage):
-                    last_msg_id = msg.data['last_msg_id']
-                    logging.info(f"Replica {self.id}: Recibido estado completo de réplica {msg.node_id}. last_msg_id = {last_msg_id}")
-                    if msg.data["last_msg_id"] > self.last_msg_id:
-                        self._load_state(msg)
-                    responses.add(msg.node_id)
-                    # logging.info(f"Replica {self.id}: Estado recuperado de la réplica compañera.")
-                
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            # Detener el consumo si ya se recibió una respuesta de cada réplica
-            if len(responses) >= self.n_replicas-1:
-                logging.info("recibi todas las respues de mis compañeras")
-                ch.stop_consuming()
-                # Eliminar la cola después de procesar el mensaje
-                self._middleware.delete_queue(self.sync_anonymous_queue)
+        FAULTS.point(self, 'replica.luego_de_enviar_sync_msg_y_antes_de_esperar_respuesta', REPLICAS_PROB_FAILURE, "CAIDA LUEGO DE ENVIAR SYNC_MSG Y ANTES DE ESPERAR RESPUESTA")
+
+        def request_stream(replica_id: int, cursor: int):
+            stream_msg = SimpleMessage(type=MsgType.STATE_STREAM_REQUEST, requester_id=self.id, msg_id=cursor)
+            self._middleware.send_to_queue(self.sync_request_listener_exchange, stream_msg.encode(), str(replica_id))
+
+        def load_chunk(msg: PushDataMessage):
+            self._load_state(msg)
 
-            # ==================================================================
-            # CAIDA LUEGO DE HACER LOAD Y ANTES DE DAR ACK AL SYNC_MSG
-            simulate_random_failure(self, log_with_location("CAIDA LUEGO DE HACER LOAD Y ANTES DE DAR ACK AL SYNC_MSG"), probability=REPLICAS_PROB_FAILURE)
-            # ==================================================================
+            FAULTS.point(self, 'replica.luego_de_hacer_load_y_antes_de_dar_ack_al_sync_msg', REPLICAS_PROB_FAILURE, "CAIDA LUEGO DE HACER LOAD Y ANTES DE DAR ACK AL SYNC_MSG")
 
-            # ==================================================================
-            # CAIDA LUEGO DE HACER LOAD Y LUEGO DE DAR ACK AL SYNC_MSG
-            simulate_random_failure(self, log_with_location("CAIDA LUEGO DE HACER LOAD Y LUEGO DE DAR ACK AL SYNC_MSG"), probability=REPLICAS_PROB_FAILURE)
-            # ==================================================================
+        # Esperar las ofertas de las compañeras y cargar por chunks el estado de la más actualizada
+        receive_state(self._middleware, self.sync_anonymous_queue, self.n_replicas - 1, self.last_msg_id, request_stream, load_chunk, f"Replica {self.id}")
+        logging.info("recibi todas las respues de mis compañeras")
+        # Eliminar la cola después de procesar el estado
+        self._middleware.delete_queue(self.sync_anonymous_queue)
+
+        FAULTS.point(self, 'replica.luego_de_hacer_load_y_luego_de_dar_ack_al_sync_msg', REPLICAS_PROB_FAILURE, "CAIDA LUEGO DE HACER LOAD Y LUEGO DE DAR ACK AL SYNC_MSG")
 
-        self._middleware.receive_from_queue(self.sync_anonymous_queue, on_state_response, auto_ack=False)
         self.synchronized = True
+        self._publish_status()
+
+    def _create_offer(self) -> SimpleMessage:
+        """Oferta de estado para un pedido de sincronización: el último push aplicado, o EMPTY_STATE."""
+        with self.lock:
+            if not self.synchronized:
+                return SimpleMessage(type=MsgType.EMPTY_STATE, node_id=self.id)
+            return SimpleMessage(type=MsgType.STATE_OFFER, node_id=self.id, msg_id=self.last_msg_id)
+
+    def _send_state(self, middleware: Middleware, exchange: str, key: str, cursor: int):
+        """
+        Envía el estado por chunks: un encabezado con el último push aplicado, los chunks desde `cursor`
+        y el fence con el `last_msg_id` (ver `utils.state_transfer.receive_state`).
+
+        Si la réplica no está sincronizada (por ejemplo, se reinició después de ofrecer su estado),
+        responde EMPTY_STATE, como a un pedido de sincronización, y el que pide sigue con otra réplica.
+        """
+        if not self.synchronized:
+            logging.warning(f"Replica {self.id}: Pedido de estado sin estar sincronizada. Se responde EMPTY_STATE.")
+            middleware.send_to_queue(exchange, SimpleMessage(type=MsgType.EMPTY_STATE, node_id=self.id).encode(), key)
+            return
+
+        last_msg_id, chunks = self._state_chunks()
+
+        middleware.send_to_queue(exchange, SimpleMessage(type=MsgType.STATE_OFFER, node_id=self.id, msg_id=last_msg_id).encode(), key)
+        total = 0
+        for seq, chunk in enumerate(chunks):
+            if seq >= cursor:
+                middleware.send_to_queue(exchange, chunk, key)
+            total = seq + 1
+        middleware.send_to_queue(exchange, PushDataMessage(data={"last_msg_id": last_msg_id}, node_id=self.id, msg_id=total).encode(), key)
+        logging.info(f"Replica {self.id}: Estado enviado en {total} chunks desde el {cursor} a {exchange}. last_msg_id = {last_msg_id}")
 
     def _run_sync_listener(self):
         """
@@ -260,20 +380,22 @@ class Replica:
                 elif msg.type == MsgType.SYNC_STATE_REQUEST and msg.requester_id != self.id:
                     logging.info(f"Replica {self.id}: Procesando mensaje de sincronización de réplica {msg.requester_id}.")
 
-                    with self.lock:
-                        answer = self._create_pull_answer() if self.synchronized else SimpleMessage(type=MsgType.EMPTY_STATE, node_id = self.id)
-
-                    _sync_middleware.send_to_queue(self.sync_exchange, answer.encode(), str(msg.requester_id))
-                    logging.info(f"envie estado a replica a {self.sync_exchange}, {msg.requester_id}")
+                    _sync_middleware.send_to_queue(self.sync_exchange, self._create_offer().encode(), str(msg.requester_id))
+                    logging.info(f"envie oferta de estado a replica a {self.sync_exchange}, {msg.requester_id}")
                 
                 elif msg.type == MsgType.PULL_DATA:
                     logging.info(f"Replica {self.id}: Procesando mensaje de pull de master.")
+                    self._hand_back()
 
-                    with self.lock:
-                        answer = self._create_pull_answer() if self.synchronized else SimpleMessage(type=MsgType.EMPTY_STATE, node_id = self.id)
+                    _sync_middleware.send_to_queue(self.send_exchange, self._create_offer().encode())
+                    logging.info(f"envie oferta de estado a master a {self.send_exchange}")
 
-                    _sync_middleware.send_to_queue(self.send_exchange, answer.encode())
-                    logging.info(f"envie pull a master a {self.send_exchange}")
+                elif msg.type == MsgType.STATE_STREAM_REQUEST:
+                    # requester_id 0 es el maestro; el resto son réplicas compañeras
+                    if msg.requester_id == 0:
+                        self._send_state(_sync_middleware, self.send_exchange, '', msg.msg_id)
+                    else:
+                        self._send_state(_sync_middleware, self.sync_exchange, str(msg.requester_id), msg.msg_id)
 
                 ch.basic_ack(delivery_tag=method.delivery_tag)
             except Exception as e:
@@ -296,6 +418,32 @@ class Replica:
         finally:
             _sync_middleware.close()
 
-def init_listener(id, container_name, port):
-    listener = Listener(id, container_name, port)
+class ReplicaListener(Listener):
+    """
+    Listener de las réplicas: además del KEEP_ALIVE, le informa al WatchDog el último push aplicado
+    (REPLICA_STATUS) y recibe su pedido de promoción (PROMOTE), a través de valores compartidos con la réplica.
+    """
+
+    def __init__(self, id, ip_prefix, port, last_msg_id, synchronized, promote_requested):
+        super().__init__(id, ip_prefix, port)
+        self.last_msg_id = last_msg_id
+        self.synchronized = synchronized
+        self.promote_requested = promote_requested
+
+    def handle_msg(self, msg, conn):
+        if msg.type == MsgType.REPLICA_STATUS:
+            status = SimpleMessage(type=MsgType.REPLICA_STATUS, socket_compatible=True, msg_id=self.last_msg_id.value, synchronized=int(self.synchronized.value))
+            conn.sendall(status.encode())
+
+        elif msg.type == MsgType.PROMOTE:
+            logging.info(f"[Listener] Pedido de promoción recibido.")
+            self.promote_requested.value = True
+            conn.sendall(SimpleMessage(type=MsgType.PROMOTE, socket_compatible=True).encode())
+
+        else:
+            super().handle_msg(msg, conn)
+
+def init_listener(id, container_name, port, last_msg_id, synchronized, promote_requested):
+    METRICS.read_only() # El Listener solo lee las métricas del nodo
+    listener = ReplicaListener(id, container_name, port, last_msg_id, synchronized, promote_requested)
     listener.run()
\ No newline at end of file
@@ -3,6 +3,7 @@ import signal
 from messages.messages import Data, MsgType, SimpleMessage, decode_msg
 from middleware.middleware import Middleware
 from utils.middleware_constants import Q_GATEWAY_TRIMMER
+from utils.tracing import TRACER
 from utils.utils import NodeType, recv_msg
 
 
@@ -17,6 +18,7 @@ class ConnectionHandler:
         self._middleware = Middleware()  # Each child process has its own middleware connection
         self._middleware.declare_queue(Q_GATEWAY_TRIMMER)
         self.shutting_down = False
+        TRACER.enable('gateway')
         signal.signal(signal.SIGTERM, self._handle_sigterm)
 
     def _handle_sigterm(self, sig, frame):
@@ -45,9 +47,12 @@ class ConnectionHandler:
                 # Process the message based on its type
                 if msg.type == MsgType.CLIENT_DATA:
                     data_msg = Data( client_id=self.id, rows=msg.rows, dataset=msg.dataset)
+                    TRACER.start(self.id)
                     self._middleware.send_to_queue(Q_GATEWAY_TRIMMER, data_msg.encode())
                 elif msg.type == MsgType.CLIENT_FIN:
                     fin_msg = SimpleMessage(type=MsgType.FIN, client_id=self.id, node_type=NodeType.GATEWAY.value)
+                    # Los FIN se trazan siempre: su camino hasta los resultados es el que define la latencia del cliente
+                    TRACER.start(self.id, kind='fin', force=True)
                     with self.fins_lock:
                         logging.info(f"Con el lock empiezo a mandar los FINs del cliente {self.id}")
                         for _ in range(self.n_next_nodes):
@@ -3,6 +3,7 @@ import signal
 from messages.messages import decode_msg, SimpleMessage, MsgType
 from middleware.middleware import Middleware
 from utils.middleware_constants import Q_TO_PROP
+from utils.tracing import TRACER
 
 class ResultDispatcher:
     """Listens to RabbitMQ result queues and dispatches results to the correct client."""
@@ -17,6 +18,7 @@ class ResultDispatcher:
         self._middleware.declare_queue(Q_TO_PROP)
         self.shutting_down = False
         self.client_ids = set()
+        TRACER.enable('result_dispatcher')
         signal.signal(signal.SIGTERM, self._handle_sigterm)
 
     def _handle_sigterm(self, sig, frame):
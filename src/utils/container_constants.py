@@ -1,6 +1,12 @@
 LISTENER_PORT = 12345
 ELECTION_PORT = 8080
 
+# Latidos UDP de los Listeners a los WatchDogs
+HEARTBEAT_PORT = LISTENER_PORT # Puerto UDP de los WatchDogs (el TCP del mismo número es el de su Listener)
+HEARTBEAT_INTERVAL = 0.25 # Segundos entre latidos
+HEARTBEAT_TIMEOUT = 1.0 # Segundos tras los que un latido con secuencia menor indica que el nodo se reinició
+HEARTBEAT_RESOLVE_INTERVAL = 5 # Segundos entre resoluciones de las direcciones de los WatchDogs (cambian al reiniciarlos)
+
 SERVER_CONTAINER_NAME = "server"
 TRIMMER_CONTAINER_NAME = "trimmer"
 GENRE_CONTAINER_NAME = "genre"
@@ -21,6 +27,15 @@ WATCHDOG_CONTAINER_NAME = "watchdog"
 PROPAGATOR_REPLICA = "propagator_replica"
 PROPAGATOR = "propagator"
 
+# Maestros que, al caerse, se reemplazan por su réplica más actualizada mientras el WatchDog los reinicia.
+# Los joiners guardan los nombres de los juegos solo en el volumen del maestro (no se replican, ver NameStore),
+# así que una réplica promovida no podría resolver los resultados. El propagator no es un `Node` que pueda
+# arrancar con el estado de una réplica, y los clientes que cerró no se replican. Ambos esperan al reinicio.
+PROMOTABLE_MASTERS = {
+    OS_COUNTER_CONTAINER_NAME: OS_COUNTER_REPLICA_CONTAINER_NAME,
+    AVG_COUNTER_CONTAINER_NAME: AVG_COUNTER_REPLICA_CONTAINER_NAME,
+}
+
 GENERAL_CONFIG_KEYS = ["instance_id", "logging_level"]
 
 SERVER_CONFIG_KEYS = [
@@ -74,6 +89,8 @@ Q3_JOINER_REPLICA_CONFIG_KEYS = [
 Q4_JOINER_REPLICA_CONFIG_KEYS = [
     "q4_joiner_replica_instances",
     "timeout",
+    "reviews_store_dir",
+    "reviews_memory_budget"
 ] + GENERAL_CONFIG_KEYS
 
 Q5_JOINER_REPLICA_CONFIG_KEYS = [
@@ -101,7 +118,9 @@ Q4_JOINER_CONFIG_KEYS = [
     "n_reviews",
     "max_batch_size",
     "english_instances",
-    "q4_joiner_replica_instances"
+    "q4_joiner_replica_instances",
+    "reviews_store_dir",
+    "reviews_memory_budget"
 ] + GENERAL_CONFIG_KEYS
 
 Q3_JOINER_CONFIG_KEYS = [
@@ -116,7 +135,8 @@ SCORE_FILTER_NEXT_NODES = [
 ]
 
 SCORE_FILTER_CONFIG_KEYS = [
-    "score_instances"
+    "score_instances",
+    "combine_reviews"
 ] + [f"{node}_instances" for node in SCORE_FILTER_NEXT_NODES] + GENERAL_CONFIG_KEYS
 
 RELEASE_DATE_FILTER_NEXT_NODES = [
@@ -169,3 +189,6 @@ ENDPOINTS_PROB_FAILURE = 0.00001
 REPLICAS_PROB_FAILURE = 0.0001
 PROP_PROB_FAILURE = 0.001
 FILTERS_PROB_FAILURE = 0.001
+
+# Directorio donde los joiners guardan los nombres de los juegos: es un volumen, para que sobreviva a recrear el contenedor
+NAMES_STORE_DIR = "/game_names"
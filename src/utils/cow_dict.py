@@ -0,0 +1,53 @@
+import copy
+
+
+class CowDict(dict):
+    """
+    Diccionario (por ejemplo cliente -> estado) con fotos baratas, por copy-on-write.
+
+    `snapshot()` copia solo las referencias a los valores, y los valores que comparte con
+    alguna foto se copian recién la primera vez que se modifican en el lugar. Así la foto se
+    puede recorrer y serializar sin el lock mientras se siguen aplicando cambios.
+
+    Como un `defaultdict`, las claves que faltan se crean con `factory`. Los valores se
+    reemplazan con `d[k] = v`, y para modificarlos en el lugar hay que pedirlos con `mutable(k)`.
+    """
+
+    def __init__(self, factory=None, copy_value=copy.copy):
+        """
+        :param factory: Crea el valor de una clave que no existe. Sin factory, falta la clave.
+        :param copy_value: Copia un valor compartido con una foto antes de modificarlo.
+        """
+        super().__init__()
+        self.factory = factory
+        self.copy_value = copy_value
+        self._shared = set()  # Claves cuyo valor puede estar en alguna foto
+
+    def __missing__(self, key):
+        if self.factory is None:
+            raise KeyError(key)
+        value = self[key] = self.factory()
+        return value
+
+    def __setitem__(self, key, value):
+        self._shared.discard(key)
+        super().__setitem__(key, value)
+
+    def mutable(self, key):
+        """
+        Devuelve el valor de `key` para modificarlo en el lugar, copiándolo si lo comparte con una foto.
+        """
+        value = self[key]
+        if key in self._shared:
+            self._shared.discard(key)
+            value = self.copy_value(value)
+            super().__setitem__(key, value)
+        return value
+
+    def snapshot(self) -> dict:
+        """
+        Foto del diccionario en este instante: sus valores no cambian aunque después se modifique.
+        Cuesta lo mismo que copiar las referencias a los valores, sin copiar los valores.
+        """
+        self._shared = set(self.keys())
+        return dict(self)
@@ -0,0 +1,100 @@
+import http.client
+import json
+import logging
+import os
+import socket
+import time
+from urllib.parse import quote
+
+DOCKER_SOCKET = os.getenv('DOCKER_SOCKET', '/var/run/docker.sock') # Socket de la API del Docker Engine
+STOP_TIMEOUT = 10 # Segundos que Docker espera al SIGTERM antes del SIGKILL (el mismo default que `docker stop`)
+REQUEST_TIMEOUT = STOP_TIMEOUT + 5 # Segundos de cada pedido a la API, que incluyen la espera del stop
+
+
+class DockerError(Exception):
+    """Excepción para las respuestas de error de la API de Docker."""
+    def __init__(self, message: str):
+        super().__init__(f"DockerError: {message}")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    Conexión HTTP sobre un socket unix, como la que expone el Docker Engine.
+    """
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerClient:
+    """
+    Cliente mínimo de la API HTTP del Docker Engine, para reanimar contenedores sin lanzar
+    procesos del CLI de docker.
+
+    Cada pedido usa su propia conexión, así que varios hilos pueden reanimar contenedores a la vez.
+    El socket se puede reemplazar (`DOCKER_SOCKET`) por un servidor falso para probarlo.
+    """
+
+    def __init__(self, socket_path: str = DOCKER_SOCKET, timeout: float = REQUEST_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str) -> tuple[int, bytes]:
+        connection = UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            connection.request(method, path, headers={'Host': 'docker'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def state(self, container_name: str) -> dict:
+        """
+        Estado del contenedor (`State` de `docker inspect`): `Status`, `Running`, `ExitCode`, etc.
+        """
+        status, body = self._request('GET', f'/containers/{quote(container_name)}/json')
+        if status != 200:
+            raise DockerError(f"inspect {container_name}: {status} {body.decode(errors='replace').strip()}")
+        return json.loads(body)['State']
+
+    def stop(self, container_name: str, timeout: int = STOP_TIMEOUT):
+        status, body = self._request('POST', f'/containers/{quote(container_name)}/stop?t={timeout}')
+        if status not in (204, 304): # 304: ya estaba detenido
+            raise DockerError(f"stop {container_name}: {status} {body.decode(errors='replace').strip()}")
+
+    def start(self, container_name: str):
+        status, body = self._request('POST', f'/containers/{quote(container_name)}/start')
+        if status not in (204, 304): # 304: ya estaba corriendo
+            raise DockerError(f"start {container_name}: {status} {body.decode(errors='replace').strip()}")
+
+    def reanimate(self, container_name: str, before_start=None) -> bool:
+        """
+        Reanima un contenedor: si sigue corriendo (colgado) lo detiene, y luego lo inicia.
+        Si el contenedor ya terminó, no se paga el stop.
+
+        :param before_start: Función que se llama con el contenedor ya detenido, antes de iniciarlo.
+        :return: True si el contenedor quedó iniciado.
+        """
+        start_time = time.monotonic()
+        try:
+            state = self.state(container_name)
+            if state.get('Running') or state.get('Paused'):
+                logging.info(f"Container {container_name} is {state.get('Status')}. Attempting to stop it.")
+                self.stop(container_name)
+            else:
+                logging.info(f"Container {container_name} is {state.get('Status')} (exit code {state.get('ExitCode')}). No need to stop.")
+            if before_start is not None:
+                before_start()
+            self.start(container_name)
+        except (DockerError, OSError, http.client.HTTPException, ValueError, KeyError) as e:
+            logging.error(f"Failed to reanimate container {container_name}: {e}")
+            return False
+        logging.info(f"Container {container_name} reanimated successfully in {time.monotonic() - start_time:.2f}s.")
+        return True
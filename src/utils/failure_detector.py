@@ -0,0 +1,160 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import deque
+from typing import Optional
+
+from utils.container_constants import HEARTBEAT_INTERVAL
+
+PHI_WINDOW = 100 # Intervalos entre latidos que se recuerdan por nodo
+PHI_MIN_STD_DEV = 0.1 # Desvío mínimo (en segundos), para que un nodo muy regular no se sospeche ante el menor atraso
+PHI_ACCEPTABLE_PAUSE = 0.5 # Segundos de pausa (GC, CPU saturada) que se toleran sin aumentar la sospecha
+
+# Umbral de sospecha por tipo de nodo: phi = 8 equivale a 1 en 10^8 de equivocarse al declararlo caído.
+# Los latidos los manda el Listener, otro proceso, así que un callback largo no los atrasa: phi mide si
+# el contenedor responde, y es el mismo para todos los tipos salvo que se lo cambie por entorno.
+DEFAULT_PHI_THRESHOLD = 8
+PHI_THRESHOLDS = {}
+
+# Segundos que un nodo puede estar procesando un mismo mensaje (el `busy_ms` de sus latidos) antes de
+# considerarlo colgado. Los nodos con callbacks pesados (langid en el english, joins grandes) tienen más margen.
+DEFAULT_MAX_BUSY_SECONDS = 60
+MAX_BUSY_SECONDS = {
+    'english': 120,
+    'q4_joiner': 300,
+    'q5_joiner': 120,
+}
+
+
+def load_thresholds(value: str, defaults: dict = PHI_THRESHOLDS, default: float = DEFAULT_PHI_THRESHOLD) -> dict:
+    """
+    Umbrales por tipo de nodo: los de `defaults` pisados por los de `value` (un JSON como
+    `{"english": 16, "default": 10}`), que se toma de una variable de entorno.
+    """
+    thresholds = {'default': default, **defaults}
+    if value:
+        thresholds.update(json.loads(value))
+    return thresholds
+
+
+class PhiAccrualDetector:
+    """
+    Detector de fallas phi-accrual (Hayashibara et al.) sobre los latidos de los nodos.
+
+    Para cada nodo guarda los últimos `PHI_WINDOW` intervalos entre latidos y, en lugar de decidir
+    vivo/caído con un timeout fijo, calcula phi = -log10(P(que el próximo latido llegue todavía más tarde)),
+    suponiendo intervalos con distribución normal. Phi crece con el tiempo desde el último latido, más rápido
+    cuanto más regulares fueron los latidos del nodo, y el nodo se sospecha cuando supera el umbral de su tipo.
+
+    Como los latidos siguen llegando aunque el nodo esté trabado en un callback, también se lo sospecha cuando
+    el último latido dice que lleva procesando el mismo mensaje más que el máximo de su tipo.
+
+    Los latidos los registra el hilo que los recibe y la sospecha la consulta el hilo principal, por eso un lock.
+    """
+
+    def __init__(self, thresholds: str = os.getenv('PHI_THRESHOLDS', ''),
+                 max_busy: str = os.getenv('MAX_BUSY_SECONDS', ''), window: int = PHI_WINDOW,
+                 min_std_dev: float = PHI_MIN_STD_DEV, acceptable_pause: float = PHI_ACCEPTABLE_PAUSE,
+                 first_interval: float = HEARTBEAT_INTERVAL):
+        self.thresholds = load_thresholds(thresholds)
+        self.max_busy_seconds = load_thresholds(max_busy, MAX_BUSY_SECONDS, DEFAULT_MAX_BUSY_SECONDS)
+        self.window = window
+        self.min_std_dev = min_std_dev
+        self.acceptable_pause = acceptable_pause
+        self.first_interval = first_interval
+        self.last = {} # Nodo -> momento del último latido
+        self.intervals = {} # Nodo -> últimos intervalos entre latidos
+        self.sums = {} # Nodo -> (suma de los intervalos, suma de sus cuadrados)
+        self.busy_since = {} # Nodo -> desde cuándo procesa el mensaje actual, según su último latido
+        self._lock = threading.Lock()
+
+    def heartbeat(self, node: str, now: float, busy: float = 0.0):
+        """
+        Registra un latido del nodo, que lleva `busy` segundos procesando el mensaje actual (0 si está esperando).
+        """
+        with self._lock:
+            last = self.last.get(node)
+            self.last[node] = now
+            if busy > 0:
+                self.busy_since[node] = now - busy
+            else:
+                self.busy_since.pop(node, None)
+            if last is None:
+                # Sin historia, se arranca con el intervalo esperado y un desvío de un cuarto de él
+                self.intervals[node] = deque()
+                self.sums[node] = (0.0, 0.0)
+                std_dev = self.first_interval / 4
+                self._add(node, self.first_interval - std_dev)
+                self._add(node, self.first_interval + std_dev)
+                return
+            self._add(node, now - last)
+
+    def _add(self, node: str, interval: float):
+        intervals = self.intervals[node]
+        total, squares = self.sums[node]
+        if len(intervals) >= self.window:
+            oldest = intervals.popleft()
+            total, squares = total - oldest, squares - oldest * oldest
+        intervals.append(interval)
+        self.sums[node] = (total + interval, squares + interval * interval)
+
+    def forget(self, node: str):
+        """
+        Descarta la historia de un nodo (por ejemplo, al reiniciarlo).
+        """
+        with self._lock:
+            self.last.pop(node, None)
+            self.intervals.pop(node, None)
+            self.sums.pop(node, None)
+            self.busy_since.pop(node, None)
+
+    def phi(self, node: str, now: float) -> Optional[float]:
+        """
+        Nivel de sospecha del nodo, o None si no se recibió ningún latido suyo desde que se lo conoce (o se lo olvidó).
+        """
+        with self._lock:
+            last = self.last.get(node)
+            if last is None:
+                return None
+            count = len(self.intervals[node])
+            total, squares = self.sums[node]
+        mean = total / count + self.acceptable_pause
+        std_dev = max(self.min_std_dev, math.sqrt(max(0.0, squares / count - (total / count) ** 2)))
+
+        # Aproximación logística de la cola de la normal, la misma que usan Akka y Cassandra
+        y = (now - last - mean) / std_dev
+        try:
+            e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        except OverflowError:
+            return 0.0 # Muy antes de lo esperado
+        if e == 0:
+            return math.inf
+        if now - last > mean:
+            return -math.log10(e / (1.0 + e))
+        return -math.log10(1.0 - 1.0 / (1.0 + e))
+
+    def threshold(self, node: str) -> float:
+        return self.thresholds.get(re.sub(r'_\d+$', '', node), self.thresholds['default'])
+
+    def max_busy(self, node: str) -> float:
+        return self.max_busy_seconds.get(re.sub(r'_\d+$', '', node), self.max_busy_seconds['default'])
+
+    def busy_seconds(self, node: str, now: float) -> float:
+        """
+        Hace cuánto el nodo está procesando el mismo mensaje, según sus latidos (0 si está esperando mensajes).
+        """
+        with self._lock:
+            busy_since = self.busy_since.get(node)
+        return now - busy_since if busy_since is not None else 0.0
+
+    def stuck(self, node: str, now: float) -> bool:
+        """
+        Si el nodo lleva procesando el mismo mensaje más que el máximo de su tipo.
+        """
+        return self.busy_seconds(node, now) > self.max_busy(node)
+
+    def suspect(self, node: str, now: float) -> bool:
+        phi = self.phi(node, now)
+        return (phi is not None and phi >= self.threshold(node)) or self.stuck(node, now)
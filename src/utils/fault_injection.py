@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import random
+import sys
+from collections import defaultdict
+
+from utils.metrics import METRICS
+from utils.utils import NodeType
+
+# Plan de fallas: ruta a un JSON o el JSON directamente. Sin plan, la inyección de fallas queda deshabilitada.
+FAULT_SCHEDULE = os.getenv('FAULT_SCHEDULE', '')
+
+# Las réplicas 1 nunca se caen, y los maestros sin réplicas tampoco (no tendrían de dónde recuperar el estado)
+NEVER_FAIL_REPLICAS = {NodeType.AVG_COUNTER_REPLICA, NodeType.OS_COUNTER_REPLICA, NodeType.Q3_JOINER_REPLICA, NodeType.Q4_JOINER_REPLICA, NodeType.Q5_JOINER_REPLICA, NodeType.PROPAGATOR_REPLICA}
+MASTERS = {NodeType.AVG_COUNTER, NodeType.OS_COUNTER, NodeType.Q3_JOINER, NodeType.Q4_JOINER, NodeType.Q5_JOINER, NodeType.PROPAGATOR}
+
+
+def load_schedule(value: str) -> dict:
+    if not value:
+        return {}
+    if value.lstrip().startswith('{'):
+        return json.loads(value)
+    with open(value) as schedule_file:
+        return json.load(schedule_file)
+
+
+class FaultInjector:
+    """
+    Inyección de caídas en puntos con nombre, según un plan determinístico.
+
+    El plan (`FAULT_SCHEDULE`) tiene la forma:
+
+        {
+            "seed": 42,
+            "default": false,
+            "points": {
+                "q4_joiner.antes_de_enviar_resultado_q4": {"at": [1]},
+                "replica.luego_de_devolver_a_la_cola_con_nack": {"probability": 0.01, "node": "q3_joiner_replica_2"}
+            }
+        }
+
+    - `at`: números de pasada (desde 1) por el punto en los que el nodo se cae.
+    - `probability`: probabilidad de caerse en cada pasada, con un generador sembrado con `seed` y el nombre del nodo.
+    - `node`: si está, el punto solo aplica a ese nodo.
+    - `default`: si es true, los puntos que no están en el plan usan la probabilidad definida en el código.
+
+    Sin plan, `point` vuelve apenas consulta `enabled`, por lo que cada punto cuesta una llamada y una
+    lectura de atributo. El mensaje de log recién se arma cuando el nodo se cae.
+    """
+
+    def __init__(self, schedule: str = FAULT_SCHEDULE):
+        self.enabled = False
+        self.node = ''
+        self.schedule = load_schedule(schedule)
+        self.points = self.schedule.get('points', {})
+        self.use_default = self.schedule.get('default', False)
+        self.hits = defaultdict(int)
+        self._random = random.Random()
+
+    def enable(self, node: str):
+        if not self.schedule:
+            return
+        self.node = node
+        self._random.seed(f"{self.schedule.get('seed', 0)}:{node}")
+        self.enabled = True
+        logging.info(f"action: fault_injection enable | node: {node} | points: {len(self.points)} | default: {self.use_default}")
+
+    def point(self, node, name: str, probability: float, message: str, *args):
+        """
+        Pasada por el punto de inyección `name`. Si el plan lo indica, loguea el mensaje (formateado con `args`)
+        y tira el nodo.
+        """
+        if not self.enabled:
+            return
+        self.hits[name] += 1
+        hit = self.hits[name]
+        METRICS.inc('fault_point_hits_total', point=name)
+
+        config = self.points.get(name)
+        if config is not None and config.get('node', self.node) != self.node:
+            return
+        if config is None:
+            if not self.use_default:
+                return
+            config = {'probability': probability}
+
+        if (node.get_type() in NEVER_FAIL_REPLICAS) and node.id == 1:
+            return
+        if (node.get_type() in MASTERS) and node.n_replicas == 0:
+            return
+
+        if hit in config.get('at', ()) or self._random.random() < config.get('probability', 0):
+            caller = sys._getframe(1)
+            logging.warning(f"Simulando caída en el punto {name} (pasada {hit}) del nodo {self.node}.")
+            logging.warning(f"{message.format(*args)} - {caller.f_code.co_filename} - LINE {caller.f_lineno}")
+            node._shutdown()
+            exit(0)
+
+
+# Inyector del proceso. Los nodos, réplicas y propagators lo habilitan al iniciar.
+FAULTS = FaultInjector()
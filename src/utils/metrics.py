@@ -0,0 +1,188 @@
+import ctypes
+import logging
+import threading
+import time
+from bisect import bisect_left
+from multiprocessing import RawArray, RawValue
+
+MAX_SERIES = 512 # Cantidad máxima de series por nodo
+MAX_SLOTS = 8192 # Cantidad máxima de valores por nodo (un histograma ocupa varios)
+SERIES_NAME_SIZE = 256 # Largo máximo de `nombre{labels}` de una serie
+
+# Límites superiores (en segundos) de los buckets de los histogramas
+HISTOGRAM_BUCKETS = (0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+COUNTER = 0
+GAUGE = 1
+HISTOGRAM = 2
+KIND_NAMES = {COUNTER: 'counter', GAUGE: 'gauge', HISTOGRAM: 'histogram'}
+
+# Un histograma ocupa un slot por bucket, uno para +Inf, uno para la suma y uno para la cantidad
+HISTOGRAM_SLOTS = len(HISTOGRAM_BUCKETS) + 3
+
+
+class Metrics:
+    """
+    Métricas de un nodo en memoria compartida: contadores, gauges e histogramas de latencia.
+
+    El nodo escribe y el Listener (un proceso hijo creado después de `enable`) lee las mismas
+    `RawArray`, sin locks: cada serie se publica escribiendo primero su nombre y su tipo, y recién
+    después incrementando la cantidad de series. Solo el registro de una serie nueva toma un lock.
+
+    Los slots libres e índice de series son propios de cada proceso, así que un único proceso puede
+    registrar y escribir series: el Listener tiene que llamar a `read_only` al iniciar, o las series
+    que registre pisarían los slots que el nodo todavía no repartió.
+
+    Mientras no se llame a `enable`, todas las operaciones son no-ops.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.recording = False
+        self.node = ''
+        self._lock = threading.Lock()
+        self._index = {}
+
+    def enable(self, node: str):
+        """
+        Reserva la memoria compartida. Debe llamarse antes de crear el proceso del Listener.
+        """
+        self.node = node
+        self._values = RawArray(ctypes.c_double, MAX_SLOTS)
+        self._names = RawArray(ctypes.c_char, MAX_SERIES * SERIES_NAME_SIZE)
+        self._kinds = RawArray(ctypes.c_byte, MAX_SERIES)
+        self._slots = RawArray(ctypes.c_int, MAX_SERIES)
+        self._series_count = RawValue(ctypes.c_int, 0)
+        self._busy_since = RawValue(ctypes.c_double, 0)
+        self._next_slot = 0
+        self._index = {}
+        self.enabled = True
+        self.recording = True
+
+    def read_only(self):
+        """
+        Deja de registrar y escribir series en este proceso, que solo lee las del nodo (`render`).
+        """
+        self.recording = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Incrementa un contador.
+        """
+        if not self.recording:
+            return
+        slot = self._slot(COUNTER, name, labels)
+        if slot >= 0:
+            self._values[slot] += value
+
+    def set(self, name: str, value: float, **labels):
+        """
+        Fija el valor de un gauge.
+        """
+        if not self.recording:
+            return
+        slot = self._slot(GAUGE, name, labels)
+        if slot >= 0:
+            self._values[slot] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """
+        Registra una duración en un histograma.
+        """
+        if not self.recording:
+            return
+        slot = self._slot(HISTOGRAM, name, labels)
+        if slot < 0:
+            return
+        values = self._values
+        values[slot + bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+        values[slot + HISTOGRAM_SLOTS - 2] += seconds
+        values[slot + HISTOGRAM_SLOTS - 1] += 1
+
+    def busy(self):
+        """
+        Marca el inicio del procesamiento de un mensaje.
+        """
+        if self.recording:
+            self._busy_since.value = time.monotonic()
+
+    def idle(self):
+        """
+        Marca el fin del procesamiento de un mensaje.
+        """
+        if self.recording:
+            self._busy_since.value = 0
+
+    def busy_seconds(self) -> float:
+        """
+        Hace cuánto el nodo está procesando el mensaje actual (0 si está esperando mensajes).
+        """
+        if not self.enabled or not self._busy_since.value:
+            return 0
+        return time.monotonic() - self._busy_since.value
+
+    def render(self) -> str:
+        """
+        Devuelve las métricas en el formato de texto de Prometheus. Solo lee la memoria compartida,
+        por lo que puede llamarse desde el proceso del Listener.
+        """
+        if not self.enabled:
+            return ''
+        values = self._values
+        # Las series de una misma métrica tienen que quedar contiguas en la salida
+        families = {}
+        for series in range(self._series_count.value):
+            raw = self._names[series * SERIES_NAME_SIZE:(series + 1) * SERIES_NAME_SIZE]
+            full_name = raw.split(b'\0', 1)[0].decode()
+            families.setdefault(full_name.partition('{')[0], []).append((full_name, self._kinds[series], self._slots[series]))
+
+        lines = []
+        for name, family in families.items():
+            lines.append(f"# TYPE {name} {KIND_NAMES[family[0][1]]}")
+            for full_name, kind, slot in family:
+                if kind != HISTOGRAM:
+                    lines.append(f"{full_name} {values[slot]:g}")
+                    continue
+                labels = full_name.partition('{')[2].rstrip('}')
+                cumulative = 0
+                for i, bound in enumerate(HISTOGRAM_BUCKETS + ('+Inf',)):
+                    cumulative += values[slot + i]
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative:g}')
+                lines.append(f"{name}_sum{{{labels}}} {values[slot + HISTOGRAM_SLOTS - 2]:g}")
+                lines.append(f"{name}_count{{{labels}}} {values[slot + HISTOGRAM_SLOTS - 1]:g}")
+        return '\n'.join(lines) + '\n'
+
+    def _slot(self, kind: int, name: str, labels: dict) -> int:
+        key = (name, tuple(labels.items()))
+        slot = self._index.get(key)
+        if slot is None:
+            slot = self._register(kind, name, labels, key)
+        return slot
+
+    def _register(self, kind: int, name: str, labels: dict, key) -> int:
+        with self._lock:
+            if key in self._index:
+                return self._index[key]
+            label_text = ','.join([f'node="{self.node}"'] + [f'{label}="{value}"' for label, value in labels.items()])
+            full_name = f"{name}{{{label_text}}}".encode()
+            size = HISTOGRAM_SLOTS if kind == HISTOGRAM else 1
+            series = self._series_count.value
+            if series >= MAX_SERIES or self._next_slot + size > MAX_SLOTS or len(full_name) >= SERIES_NAME_SIZE:
+                logging.warning(f"action: metrics register | result: fail | series: {full_name.decode()}")
+                self._index[key] = -1
+                return -1
+
+            slot = self._next_slot
+            self._next_slot += size
+            offset = series * SERIES_NAME_SIZE
+            self._names[offset:offset + len(full_name)] = full_name
+            self._kinds[series] = kind
+            self._slots[series] = slot
+            # Recién ahora la serie queda visible para el Listener
+            self._series_count.value = series + 1
+            self._index[key] = slot
+            return slot
+
+
+# Métricas del proceso. Los nodos la habilitan al iniciar; en el resto de los procesos no registra nada.
+METRICS = Metrics()
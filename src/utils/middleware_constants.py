@@ -35,6 +35,7 @@ Q_NOTIFICATION = 'notification'
 Q_REPLICA_SYNC_REQUEST_LISTENER = 'replica-sync-request-listener'
 Q_Q3_JOINER = 'q3-joiner'
 Q_Q5_JOINER = 'q5-joiner'
+Q_RELEVANT_GAMES = 'relevant_games'
 
 # Exchange Names
 E_FROM_TRIMMER = 'trimmer-filters'
@@ -45,12 +46,17 @@ E_FROM_REPLICA_PULL_ANS = 'from-replica-pull-ans'
 E_FROM_PROP = 'from-propagator'
 E_REPLICA_SYNC_REQUEST_LISTENER = 'from-replica-sync-listener'
 E_SYNC_STATE = 'sync'
+E_RELEVANT_GAMES = 'relevant-games'
 
 # Routing Keys
 K_GENREGAME = 'genregame'
-K_INDIE_Q2GAMES = 'indie_q2games'
-K_INDIE_BASICGAMES = 'indie_basicgames'
-K_SHOOTER_GAMES = 'shooter_games'
+K_GAMES_DIMENSION = 'games_dimension'
+# La dimensión de juegos se publica con la key de sus géneros, y cada consumidor se bindea solo a las que usa
+K_GAMES_DIMENSION_INDIE = K_GAMES_DIMENSION + '.indie'
+K_GAMES_DIMENSION_ACTION = K_GAMES_DIMENSION + '.action'
+K_GAMES_DIMENSION_INDIE_ACTION = K_GAMES_DIMENSION + '.indie.action'
+K_INDIE_GAMES = (K_GAMES_DIMENSION_INDIE, K_GAMES_DIMENSION_INDIE_ACTION)
+K_ACTION_GAMES = (K_GAMES_DIMENSION_ACTION, K_GAMES_DIMENSION_INDIE_ACTION)
 K_NEGATIVE = 'negative'
 K_Q1GAME = 'q1game'
 K_POSITIVE = 'positive'
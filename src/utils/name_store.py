@@ -0,0 +1,134 @@
+import logging
+import mmap
+import os
+import struct
+
+from utils.metrics import METRICS
+
+NAME_RECORD_HEADER = struct.Struct('>IH')  # app_id, largo del nombre
+NAMES_FILE_PREFIX = 'names_'
+NAMES_FILE_SUFFIX = '.bin'
+
+
+class MissingGameNamesError(Exception):
+    """
+    Faltan nombres de juegos de un resultado: el join falla en lugar de enviar un nombre inventado.
+    """
+    def __init__(self, client_id: int, app_ids: list):
+        super().__init__(f"Faltan los nombres de los juegos {app_ids} del cliente {client_id}")
+        self.client_id = client_id
+        self.app_ids = app_ids
+
+class NameStore:
+    """
+    Diccionario compacto `app_id -> nombre` por cliente, guardado en disco.
+
+    Los nombres se escriben una única vez al llegar los juegos, en un archivo de solo
+    agregado por cliente, y se resuelven recién en `join_results` para los `app_id`
+    que forman parte del resultado. Los joiners solo mantienen en memoria los `app_id`.
+
+    Los nombres no se replican, para no mandarlos en cada push ni en cada transferencia de
+    estado: el directorio es un volumen del contenedor del joiner, que sobrevive a su reinicio.
+    Cada batch escribe sus nombres antes del push de sus `app_id`, así que todo juego del estado
+    recuperado de las réplicas tiene su nombre en disco. Al iniciar se descartan los registros
+    truncados por una caída a mitad de escritura (el batch se vuelve a recibir y los escribe).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        for file_name in os.listdir(directory):
+            if file_name.startswith(NAMES_FILE_PREFIX) and file_name.endswith(NAMES_FILE_SUFFIX):
+                self._truncate_partial_record(os.path.join(directory, file_name))
+
+    def add(self, client_id: int, games):
+        """
+        Agrega al archivo del cliente los nombres de un batch de juegos (con `app_id` y `name`).
+        """
+        self.add_names(client_id, {game.app_id: game.name for game in games})
+
+    def add_names(self, client_id: int, names: dict):
+        """
+        Agrega al archivo del cliente los nombres `{app_id: nombre}`.
+        """
+        records = bytearray()
+        for app_id, name in names.items():
+            encoded_name = name.encode('utf-8')
+            records += NAME_RECORD_HEADER.pack(app_id, len(encoded_name))
+            records += encoded_name
+        if not records:
+            return
+        with open(self._names_path(client_id), 'ab') as names_file:
+            names_file.write(records)
+
+    def resolve(self, client_id: int, app_ids) -> dict:
+        """
+        Devuelve `{app_id: nombre}` para los `app_id` pedidos, recorriendo el archivo del cliente.
+        Si falta alguno, lanza `MissingGameNamesError`.
+        """
+        pending = set(app_ids)
+        names = {}
+        path = self._names_path(client_id)
+        if pending and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as names_file:
+                with mmap.mmap(names_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    offset = 0
+                    size = len(data)
+                    while pending and offset + NAME_RECORD_HEADER.size <= size:
+                        app_id, length = NAME_RECORD_HEADER.unpack_from(data, offset)
+                        offset += NAME_RECORD_HEADER.size
+                        if offset + length > size:
+                            # Registro truncado por una caída a mitad de escritura
+                            break
+                        if app_id in pending:
+                            names[app_id] = data[offset:offset + length].decode('utf-8')
+                            pending.discard(app_id)
+                        offset += length
+
+        if pending:
+            logging.error(f"action: name_store resolve | result: fail | client_id: {client_id} | missing_names: {sorted(pending)}")
+            METRICS.inc('missing_game_names_total', len(pending))
+            raise MissingGameNamesError(client_id, sorted(pending))
+        return names
+
+    def retain(self, client_ids):
+        """
+        Borra los archivos de los clientes que no están en `client_ids` (el estado recuperado):
+        son de clientes ya resueltos, o de un batch cuyo push no llegó y que se va a volver a recibir.
+        """
+        client_ids = set(client_ids)
+        for file_name in os.listdir(self.directory):
+            if not (file_name.startswith(NAMES_FILE_PREFIX) and file_name.endswith(NAMES_FILE_SUFFIX)):
+                continue
+            client_id = file_name[len(NAMES_FILE_PREFIX):-len(NAMES_FILE_SUFFIX)]
+            if not client_id.isdigit() or int(client_id) not in client_ids:
+                os.remove(os.path.join(self.directory, file_name))
+
+    def delete_client(self, client_id: int):
+        """
+        Elimina el archivo de nombres de un cliente.
+        """
+        try:
+            os.remove(self._names_path(client_id))
+        except FileNotFoundError:
+            pass
+
+    def _names_path(self, client_id: int) -> str:
+        return os.path.join(self.directory, f'{NAMES_FILE_PREFIX}{client_id}{NAMES_FILE_SUFFIX}')
+
+    @staticmethod
+    def _truncate_partial_record(path: str):
+        """
+        Corta el archivo después de su último registro completo.
+        """
+        with open(path, 'r+b') as names_file:
+            data = names_file.read()
+            offset = 0
+            while offset + NAME_RECORD_HEADER.size <= len(data):
+                _, length = NAME_RECORD_HEADER.unpack_from(data, offset)
+                if offset + NAME_RECORD_HEADER.size + length > len(data):
+                    break
+                offset += NAME_RECORD_HEADER.size + length
+            if offset < len(data):
+                logging.warning(f"action: name_store repair | path: {path} | truncated_bytes: {len(data) - offset}")
+                names_file.truncate(offset)
@@ -0,0 +1,82 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/profiles') # Directorio de los archivos de stacks
+PROFILE_RATE = int(os.getenv('PROFILE_RATE', '100')) # Muestras por segundo
+PROFILE_WINDOW = float(os.getenv('PROFILE_WINDOW', '30')) # Segundos máximos de cada perfilado
+MAX_STACK_DEPTH = 128
+
+
+class SamplingProfiler:
+    """
+    Profiler por muestreo del hilo principal (el que consume de las colas).
+
+    Al recibir la señal (SIGUSR1 por defecto) arranca un hilo que toma el stack del hilo principal
+    `PROFILE_RATE` veces por segundo; una segunda señal, o el fin de la ventana de `PROFILE_WINDOW`
+    segundos, lo detiene y escribe los stacks en formato colapsado (una línea `f1;f2;f3 cantidad` por
+    stack), que se convierte en flamegraph con `flamegraph.pl` o se abre directamente en speedscope.
+
+    Desde el host: `docker kill -s USR1 q4_joiner_1`. Mientras no se perfila, no hay ningún costo.
+    """
+
+    def __init__(self, node: str, directory: str = PROFILE_DIR, rate: int = PROFILE_RATE, window: float = PROFILE_WINDOW):
+        self.node = node
+        self.directory = directory
+        self.interval = 1 / rate
+        self.window = window
+        self.target = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = None
+
+    def install(self, signum=signal.SIGUSR1):
+        signal.signal(signum, self._handle_signal)
+
+    def _handle_signal(self, sig, frame):
+        self.toggle()
+
+    def toggle(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._stop.set()
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        logging.info(f"action: profiler start | node: {self.node} | rate: {1 / self.interval:g} | window: {self.window}")
+        stacks = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + self.window
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                break
+            stacks[self._collapse(frame)] += 1
+            samples += 1
+        self._write(stacks, samples, time.monotonic() - started)
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _write(self, stacks: Counter, samples: int, elapsed: float):
+        path = os.path.join(self.directory, f"{self.node}_{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w') as profile_file:
+                for stack, count in stacks.most_common():
+                    profile_file.write(f"{stack} {count}\n")
+        except OSError as e:
+            logging.error(f"action: profiler write | result: fail | error: {e}")
+            return
+        logging.info(f"action: profiler stop | node: {self.node} | samples: {samples} | seconds: {elapsed:.1f} | file: {path}")
@@ -0,0 +1,318 @@
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+from array import array
+
+from messages.reviews_msg import TextReview
+
+COMPACTION_RATIO = 0.5 # Fracción descartada de un segmento a partir de la cual se compacta
+COMPACTION_MIN_BYTES = 1 << 20 # Bytes descartados mínimos para compactar un segmento
+
+class ReviewStore:
+    """
+    Almacén de textos de reseñas con desborde a disco.
+
+    Cada reseña se guarda como un `TextReview` codificado (con su largo al principio)
+    en un archivo de segmento por cliente. En memoria solo quedan un índice
+    `app_id -> offsets` por cliente y un buffer de escritura, cuyo tamaño total
+    está acotado por `memory_budget` (en bytes).
+
+    Las reseñas descartadas siguen ocupando su lugar en el segmento hasta que lo
+    descartado supera `COMPACTION_RATIO` del segmento (y `COMPACTION_MIN_BYTES`):
+    entonces se reescribe el segmento solo con las reseñas vigentes. Así el disco
+    de cada cliente queda acotado a alrededor del doble de lo que guarda.
+
+    Cada segmento tiene un número de generación en el nombre: al compactar o borrar un cliente se
+    deja de usar, y se borra del disco recién cuando no lo necesita ninguna foto (ver `snapshot`).
+    """
+
+    def __init__(self, directory: str, memory_budget: int):
+        """
+        :param directory: Directorio donde se escriben los segmentos. Se vacía al iniciar,
+                          ya que el estado se recupera de las réplicas.
+        :param memory_budget: Cantidad máxima de bytes pendientes de escritura en memoria.
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self._buffers = {}  # client_id -> bytearray con los registros pendientes de escribir
+        self._flushed = {}  # client_id -> cantidad de bytes ya escritos en el segmento
+        self._index = {}  # client_id -> {app_id: array de offsets}
+        self._sizes = {}  # client_id -> {app_id: bytes de sus registros}
+        self._discarded = {}  # client_id -> bytes de registros descartados que siguen en el segmento
+        self._paths = {}  # client_id -> segmento actual del cliente
+        self._generation = 0
+        self._readers = {}  # segmento -> cantidad de fotos que lo pueden leer
+        self._retired = set()  # Segmentos que ya no se usan pero que alguna foto todavía puede leer
+        self._readers_lock = threading.Lock()  # Las fotos se liberan desde otro hilo
+        self._buffered_bytes = 0
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, client_id: int, app_id: int, text: str) -> int:
+        """
+        Agrega el texto de una reseña y devuelve la cantidad de reseñas guardadas del juego.
+        """
+        buffer = self._buffers.get(client_id)
+        if buffer is None:
+            buffer = self._buffers[client_id] = bytearray()
+            self._flushed.setdefault(client_id, 0)
+            if client_id not in self._paths:
+                self._paths[client_id] = self._new_segment_path(client_id)
+
+        offsets = self._index.setdefault(client_id, {}).get(app_id)
+        if offsets is None:
+            offsets = self._index[client_id][app_id] = array('Q')
+
+        record = TextReview(app_id, text).encode()
+        offsets.append(self._flushed[client_id] + len(buffer))
+        buffer += record
+        sizes = self._sizes.setdefault(client_id, {})
+        sizes[app_id] = sizes.get(app_id, 0) + len(record)
+        self._buffered_bytes += len(record)
+
+        if self._buffered_bytes > self.memory_budget:
+            self.flush()
+
+        return len(offsets)
+
+    def count(self, client_id: int, app_id: int) -> int:
+        """
+        Devuelve la cantidad de reseñas guardadas de un juego.
+        """
+        offsets = self._index.get(client_id, {}).get(app_id)
+        return len(offsets) if offsets is not None else 0
+
+    def app_ids(self, client_id: int) -> list:
+        """
+        Devuelve los `app_id` con reseñas guardadas de un cliente.
+        """
+        return list(self._index.get(client_id, {}).keys())
+
+    def clients(self) -> list:
+        """
+        Devuelve los clientes con reseñas guardadas.
+        """
+        return list(self._index.keys())
+
+    def iter_encoded(self, client_id: int, app_id: int):
+        """
+        Itera los registros codificados (`TextReview.encode()`) de un juego, leyéndolos del segmento.
+        """
+        offsets = self._index.get(client_id, {}).get(app_id)
+        if not offsets:
+            return
+
+        self._flush_client(client_id)
+        with open(self._paths[client_id], 'rb') as segment:
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset in offsets:
+                    length = struct.unpack_from('>I', data, offset)[0]
+                    yield data[offset:offset + 4 + length]
+
+    def iter_texts(self, client_id: int, app_id: int):
+        """
+        Itera los textos de las reseñas guardadas de un juego.
+        """
+        for record in self.iter_encoded(client_id, app_id):
+            yield TextReview.decode(record[4:]).text
+
+    def load_texts(self, client_id: int, app_id: int, texts: dict):
+        """
+        Carga textos numerados (posición -> texto) de un juego, recibidos en un chunk de estado.
+        Las posiciones de un juego llegan en orden y partidas en chunks consecutivos: el que trae
+        la posición 0 reemplaza las reseñas guardadas, y los siguientes se agregan al final.
+        """
+        if 0 in texts:
+            self.discard(client_id, app_id)
+        for position in sorted(texts):
+            self.append(client_id, app_id, texts[position])
+
+    def discard(self, client_id: int, app_id: int):
+        """
+        Descarta las reseñas de un juego. El espacio en disco se libera al compactar el segmento o al borrar al cliente.
+        """
+        if self._index.get(client_id, {}).pop(app_id, None) is None:
+            return
+        discarded = self._discarded.get(client_id, 0) + self._sizes[client_id].pop(app_id)
+        self._discarded[client_id] = discarded
+        total = self._flushed[client_id] + len(self._buffers[client_id])
+        if discarded >= COMPACTION_MIN_BYTES and discarded > total * COMPACTION_RATIO:
+            self._compact(client_id)
+
+    def delete_client(self, client_id: int):
+        """
+        Elimina el índice, el buffer y el segmento de un cliente.
+        """
+        self._index.pop(client_id, None)
+        self._sizes.pop(client_id, None)
+        self._discarded.pop(client_id, None)
+        self._flushed.pop(client_id, None)
+        buffer = self._buffers.pop(client_id, None)
+        if buffer is not None:
+            self._buffered_bytes -= len(buffer)
+        path = self._paths.pop(client_id, None)
+        if path is not None:
+            self._retire(path)
+
+    def snapshot(self) -> 'ReviewStoreSnapshot':
+        """
+        Foto del almacén en este instante, que se puede leer mientras se siguen agregando reseñas.
+
+        Los segmentos solo crecen y los offsets de cada juego solo se agregan al final, así que
+        alcanza con copiar el índice de cada cliente (sin copiar los offsets), recordar hasta qué
+        byte estaba escrito su segmento y copiar su buffer, que está acotado por `memory_budget`.
+        No escribe ni abre archivos: los segmentos se abren recién al leer la foto.
+        """
+        clients = {}
+        with self._readers_lock:
+            for client_id, index in self._index.items():
+                path = self._paths[client_id]
+                self._readers[path] = self._readers.get(path, 0) + 1
+                clients[client_id] = (dict(index), self._flushed[client_id], bytes(self._buffers[client_id]), path)
+        return ReviewStoreSnapshot(self, clients)
+
+    def flush(self):
+        """
+        Escribe en disco los buffers pendientes de todos los clientes.
+        """
+        for client_id in list(self._buffers.keys()):
+            self._flush_client(client_id)
+
+    def _flush_client(self, client_id: int):
+        """
+        Escribe en el segmento del cliente los registros pendientes.
+        """
+        buffer = self._buffers.get(client_id)
+        if not buffer:
+            return
+        with open(self._paths[client_id], 'ab') as segment:
+            segment.write(buffer)
+        self._flushed[client_id] += len(buffer)
+        self._buffered_bytes -= len(buffer)
+        buffer.clear()
+        logging.debug(f"action: review_store flush | client_id: {client_id} | segment_size: {self._flushed[client_id]}")
+
+    def _compact(self, client_id: int):
+        """
+        Reescribe el segmento del cliente solo con las reseñas vigentes y actualiza sus offsets.
+        El segmento nuevo es de otra generación, y el anterior se borra cuando ninguna foto lo necesita.
+        """
+        self._flush_client(client_id)
+        path = self._paths[client_id]
+        compacted_path = self._new_segment_path(client_id)
+        index = {}
+        size = 0
+        with open(path, 'rb') as segment, open(compacted_path, 'wb') as compacted:
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for app_id, offsets in self._index[client_id].items():
+                    new_offsets = index[app_id] = array('Q')
+                    for offset in offsets:
+                        length = struct.unpack_from('>I', data, offset)[0]
+                        compacted.write(data[offset:offset + 4 + length])
+                        new_offsets.append(size)
+                        size += 4 + length
+        self._paths[client_id] = compacted_path
+        self._retire(path)
+        logging.info(f"action: review_store compact | client_id: {client_id} | segment_size: {self._flushed[client_id]} -> {size}")
+        self._index[client_id] = index
+        self._flushed[client_id] = size
+        self._discarded[client_id] = 0
+
+    def _new_segment_path(self, client_id: int) -> str:
+        self._generation += 1
+        return os.path.join(self.directory, f'reviews_{client_id}_{self._generation}.seg')
+
+    def _retire(self, path: str):
+        """Deja de usar un segmento: lo borra, o lo deja para cuando lo suelte la última foto que lo puede leer."""
+        with self._readers_lock:
+            if self._readers.get(path):
+                self._retired.add(path)
+                return
+        self._remove(path)
+
+    def _release(self, path: str):
+        """Una foto ya no va a leer el segmento."""
+        with self._readers_lock:
+            self._readers[path] -= 1
+            if self._readers[path]:
+                return
+            del self._readers[path]
+            if path not in self._retired:
+                return
+            self._retired.discard(path)
+        self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass # El cliente no llegó a escribir su segmento
+
+
+class ReviewStoreSnapshot:
+    """
+    Foto de un `ReviewStore` (ver `ReviewStore.snapshot`).
+
+    Se puede leer sin el lock del que modifica el almacén: los segmentos que necesita no se borran
+    hasta cerrarla, aunque después se compacten o se borre el cliente. Cada segmento se abre la primera
+    vez que se lee. Hay que cerrarla (`close` o `with`) al terminar de leerla.
+    """
+
+    def __init__(self, store: ReviewStore, clients: dict):
+        self._store = store
+        self._clients = clients  # client_id -> (índice app_id -> offsets, bytes escritos, buffer pendiente, segmento)
+        self._segments = {}  # client_id -> segmento abierto
+
+    def clients(self) -> list:
+        return list(self._clients.keys())
+
+    def app_ids(self, client_id: int) -> list:
+        index, _, _, _ = self._clients.get(client_id, ({}, 0, b'', None))
+        return list(index.keys())
+
+    def iter_texts(self, client_id: int, app_id: int):
+        """
+        Itera los textos de las reseñas que tenía guardadas el juego al tomar la foto.
+        """
+        index, size, pending, path = self._clients.get(client_id, ({}, 0, b'', None))
+        offsets = index.get(app_id)
+        if not offsets:
+            return
+        data = None
+        if size > 0:
+            segment = self._segments.get(client_id)
+            if segment is None:
+                segment = self._segments[client_id] = open(path, 'rb')
+            data = mmap.mmap(segment.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            for offset in offsets:
+                if offset < size:
+                    source, position = data, offset
+                elif offset < size + len(pending):
+                    source, position = pending, offset - size
+                else:
+                    break # Reseñas agregadas después de la foto: los offsets de un cliente son crecientes
+                length = struct.unpack_from('>I', source, position)[0]
+                yield TextReview.decode(source[position + 4:position + 4 + length]).text
+        finally:
+            if data is not None:
+                data.close()
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        for _, _, _, path in self._clients.values():
+            self._store._release(path)
+        self._segments = {}
+        self._clients = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
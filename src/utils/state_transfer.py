@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from messages.messages import MsgType, PushDataMessage, decode_msg
+from utils.metrics import METRICS
+
+STATE_CHUNK_SIZE = int(os.getenv('STATE_CHUNK_SIZE', str(1 << 20))) # Bytes de JSON de cada chunk de una transferencia de estado
+STATE_STREAM_TIMEOUT = float(os.getenv('STATE_STREAM_TIMEOUT', '5')) # Segundos sin mensajes de la réplica antes de volver a pedir el estado
+STATE_STREAM_RETRIES = int(os.getenv('STATE_STREAM_RETRIES', '5')) # Pedidos que se repiten antes de abandonar la transferencia
+STATE_STREAM_CHECK_INTERVAL = 0.25 # Segundos entre chequeos del plazo mientras se consume
+
+
+class StateTransferError(Exception):
+    """Excepción para las transferencias de estado que no se completan."""
+    def __init__(self, message: str):
+        super().__init__(f"StateTransferError: {message}")
+
+
+def receive_state(middleware, queue: str, n_answers: int, last_msg_id: int,
+                  request_stream: Callable[[int, int], None], load_state: Callable[[PushDataMessage], None],
+                  name: str) -> Optional[int]:
+    """
+    Recibe el estado de las réplicas por `queue`, después de haberles enviado el pedido (PULL_DATA o SYNC_STATE_REQUEST).
+
+    1. Cada réplica responde con una oferta (STATE_OFFER, con su último push aplicado en el msg_id) o con EMPTY_STATE.
+    2. Con las `n_answers` respuestas, se le pide el estado (`request_stream(réplica, cursor)`) solo a la más
+       actualizada, si supera `last_msg_id`.
+    3. La réplica envía un encabezado (otra STATE_OFFER, con el último push aplicado del estado que envía),
+       los chunks (PushDataMessages numerados en el msg_id) y un fence (un PushDataMessage con solo el
+       `last_msg_id`). Cada chunk se aplica con `load_state` apenas llega, y el fence fija el `last_msg_id`.
+
+    El cursor es el próximo chunk a aplicar: si la réplica vuelve a enviar el mismo estado, los chunks ya
+    aplicados se descartan, y si envía otro (su estado avanzó), se aplica desde el principio.
+
+    Si pasan `STATE_STREAM_TIMEOUT` segundos sin mensajes de la réplica, se le vuelve a pedir el estado desde
+    el cursor. Si no había enviado nada desde el último pedido, o si responde EMPTY_STATE (se reinició y ya
+    no tiene el estado que ofreció), se le pide a la siguiente más actualizada, desde el principio: los chunks
+    ya aplicados quedan, y el estado de la siguiente se aplica encima.
+
+    :return: El `last_msg_id` del estado cargado, o None si ninguna réplica tenía un estado más nuevo.
+    :raises StateTransferError: Si el estado no se completó después de `STATE_STREAM_RETRIES` pedidos repetidos.
+    """
+    offers = {}
+
+    def on_offer(ch, method, properties, body):
+        msg = decode_msg(body)
+        if msg.type == MsgType.STATE_OFFER:
+            offers.setdefault(msg.node_id, msg.msg_id)
+        elif msg.type == MsgType.EMPTY_STATE:
+            offers.setdefault(msg.node_id, None)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        if len(offers) >= n_answers:
+            ch.stop_consuming()
+
+    if n_answers > 0:
+        middleware.receive_from_queue(queue, on_offer, auto_ack=False)
+
+    candidates = sorted(((offer, node_id) for node_id, offer in offers.items() if offer is not None and offer > last_msg_id), reverse=True)
+    if not candidates:
+        logging.info(f"{name}: Ninguna réplica tiene un estado más nuevo que {last_msg_id}.")
+        return None
+
+    sender = None
+    requested = 0 # Cursor del último pedido: la réplica envía los chunks desde ahí
+    cursor = 0
+    snapshot = None
+    fence = None
+    abandoned = False
+    last_seen = 0.0
+
+    def request(replica_id: int, offer: int, from_cursor: int):
+        nonlocal sender, requested, cursor, snapshot, abandoned
+        if replica_id != sender:
+            sender, cursor, snapshot = replica_id, 0, None
+        requested = from_cursor
+        abandoned = False
+        logging.info(f"{name}: Pidiendo el estado a la réplica {sender} desde el chunk {from_cursor}. last_msg_id = {offer}")
+        request_stream(sender, from_cursor)
+
+    def on_chunk(ch, method, properties, body):
+        nonlocal cursor, snapshot, fence, requested, abandoned, last_seen
+        msg = decode_msg(body)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        if msg.node_id != sender:
+            return # Respuestas repetidas de las otras réplicas
+        last_seen = time.monotonic()
+
+        if msg.type == MsgType.EMPTY_STATE:
+            abandoned = True
+            ch.stop_consuming()
+            return
+
+        if msg.type == MsgType.STATE_OFFER:
+            if msg.msg_id != snapshot:
+                # Encabezado de otro estado: se aplica desde el principio
+                snapshot = msg.msg_id
+                cursor = 0
+                if requested > 0:
+                    # La réplica solo envía desde el cursor pedido, así que el estado nuevo se pide entero
+                    requested = 0
+                    request_stream(sender, 0)
+            return
+
+        if not isinstance(msg, PushDataMessage) or msg.msg_id != cursor:
+            return # Chunk ya aplicado, o de un envío que no empieza en el cursor
+
+        load_state(msg)
+        if "last_msg_id" in msg.data:
+            fence = msg.data["last_msg_id"]
+            logging.info(f"{name}: Estado de la réplica {sender} cargado en {msg.msg_id} chunks. last_msg_id = {fence}")
+            ch.stop_consuming()
+            return
+        cursor = msg.msg_id + 1
+
+    index = 0
+    request(candidates[index][1], candidates[index][0], 0)
+    for retry in range(STATE_STREAM_RETRIES + 1):
+        progress = cursor
+        last_seen = time.monotonic()
+        cancel = middleware.stop_consuming_when(lambda: time.monotonic() - last_seen > STATE_STREAM_TIMEOUT, STATE_STREAM_CHECK_INTERVAL)
+        middleware.receive_from_queue(queue, on_chunk, auto_ack=False)
+        cancel()
+        if fence is not None:
+            return fence
+        if retry == STATE_STREAM_RETRIES:
+            break
+
+        METRICS.inc('state_stream_retries_total')
+        if abandoned or cursor == progress:
+            # La réplica se reinició o no responde: se sigue con la siguiente más actualizada
+            logging.warning(f"{name}: La réplica {sender} no envió el estado ({'se reinició' if abandoned else 'sin respuesta'}).")
+            index = (index + 1) % len(candidates)
+            request(candidates[index][1], candidates[index][0], 0)
+        else:
+            logging.warning(f"{name}: La réplica {sender} dejó de enviar el estado en el chunk {cursor}.")
+            request(sender, candidates[index][0], cursor)
+
+    raise StateTransferError(f"{name}: El estado no se completó después de {STATE_STREAM_RETRIES} pedidos repetidos")
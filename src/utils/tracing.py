@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Optional
+
+TRACE_HEADER = 'trace' # Header AMQP que lleva el contexto de la traza
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0')) # Fracción de batches de datos que se trazan (0 deshabilita)
+TRACE_DIR = os.getenv('TRACE_DIR', '/traces') # Directorio de los archivos de spans
+MAX_HOPS = 32 # Cota de saltos que acumula un contexto, por si un mensaje circula más de lo esperado
+
+# Posiciones de cada salto dentro de `hops`
+HOP_NODE, HOP_QUEUE, HOP_RECEIVED, HOP_SENT = range(4)
+
+
+class Tracer:
+    """
+    Trazas de latencia de los batches a lo largo del pipeline.
+
+    El gateway inicia una traza al publicar un batch de un cliente (con probabilidad `TRACE_SAMPLE_RATE`,
+    y siempre para los FIN). El contexto viaja en el header `trace` de los mensajes: el `Middleware` lo
+    toma al recibir, lo deja como contexto actual mientras corre el callback y lo copia en cada mensaje
+    que se publica durante ese callback, agregando el salto con sus timestamps de recepción y envío.
+
+    Cada mensaje trazado que se recibe deja un span en `TRACE_DIR/<nodo>.<pid>.jsonl`. El último span
+    de cada camino (el del ResultDispatcher) contiene todos los saltos, con los que
+    `scripts/trace_report.py` reconstruye el camino crítico de cada cliente.
+
+    Mientras no se llame a `enable` con una tasa de muestreo mayor a 0, todas las operaciones son no-ops.
+    """
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, directory: str = TRACE_DIR):
+        self.enabled = False
+        self.node = ''
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.current = None
+        self._received_at = None
+        self._file = None
+        self._pid = None
+
+    def enable(self, node: str):
+        if self.sample_rate <= 0:
+            return
+        self.node = node
+        self.enabled = True
+
+    def start(self, client_id: int, kind: str = 'data', force: bool = False):
+        """
+        Inicia (o no, según el muestreo) la traza de lo próximo que se publique para el cliente.
+        """
+        self.current = None
+        if not self.enabled or (not force and random.random() >= self.sample_rate):
+            return
+        now = time.time()
+        self.current = {
+            'id': uuid.uuid4().hex[:16],
+            'client': client_id,
+            'kind': kind,
+            'ingress': now,
+            'hops': [[self.node, '', now, None]],
+        }
+
+    def header(self) -> Optional[str]:
+        """
+        Devuelve el contexto a publicar con el próximo mensaje, con el envío del salto actual marcado ahora.
+        """
+        if self.current is None:
+            return None
+        hops = self.current['hops']
+        last = hops[-1][:HOP_SENT] + [time.time()]
+        return json.dumps({**self.current, 'hops': hops[:-1] + [last]}, separators=(',', ':'))
+
+    def receive(self, queue: str, properties) -> bool:
+        """
+        Toma el contexto de un mensaje recibido, si lo trae, y lo deja como contexto actual.
+        """
+        headers = getattr(properties, 'headers', None)
+        raw = headers.get(TRACE_HEADER) if headers else None
+        if raw is None:
+            self.current = None
+            return False
+        try:
+            context = json.loads(raw)
+        except ValueError:
+            self.current = None
+            return False
+        if len(context['hops']) >= MAX_HOPS:
+            self.current = None
+            return False
+        self._received_at = time.time()
+        context['hops'].append([self.node, queue, self._received_at, None])
+        self.current = context
+        return True
+
+    def finish(self):
+        """
+        Registra el span del mensaje recibido y limpia el contexto actual.
+        """
+        context, self.current = self.current, None
+        if context is None:
+            return
+        previous = context['hops'][-2]
+        span = {
+            'trace': context['id'],
+            'client': context['client'],
+            'kind': context['kind'],
+            'node': self.node,
+            'queue': context['hops'][-1][HOP_QUEUE],
+            'from': previous[HOP_NODE],
+            'sent': previous[HOP_SENT],
+            'received': self._received_at,
+            'end': time.time(),
+            'ingress': context['ingress'],
+            'hops': context['hops'],
+        }
+        self._write(span)
+
+    def _write(self, span: dict):
+        try:
+            # Tras un fork, cada proceso escribe su propio archivo
+            if self._file is None or self._pid != os.getpid():
+                os.makedirs(self.directory, exist_ok=True)
+                self._pid = os.getpid()
+                self._file = open(os.path.join(self.directory, f'{self.node}.{self._pid}.jsonl'), 'a', buffering=1)
+            self._file.write(json.dumps(span, separators=(',', ':')) + '\n')
+        except OSError as e:
+            logging.warning(f"action: trace write | result: fail | error: {e}")
+            self.enabled = False
+
+
+# Tracer del proceso. Los nodos y el server lo habilitan al iniciar.
+TRACER = Tracer()
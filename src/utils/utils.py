@@ -1,9 +1,9 @@
 from enum import Enum
 import logging
 import struct
-import subprocess
 import time
-import inspect
+
+from utils.metrics import METRICS
 
 BYTES_HEADER = 4
 
@@ -70,89 +70,16 @@ class EncodeError(Exception):
 def handle_encode_error(func):
     def wrapper(*args, **kwargs):
         try:
-            return func(*args, **kwargs)
+            if not METRICS.recording:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            encoded = func(*args, **kwargs)
+            METRICS.observe('encode_seconds', time.perf_counter() - start, type=args[0].type.name)
+            return encoded
         except Exception as e:
             raise EncodeError(f"Error in {func.__name__}: {e}")
     return wrapper
 
-def reanimate_container(container_name, sleep_seconds=0):
-    """Reanima un contenedor Docker específico.
-    
-    Verifica si el contenedor está activo, lo detiene si es necesario y luego lo reinicia.
-    
-    :param container_name: Nombre del contenedor a reiniciar.
-    :param sleep_seconds: Tiempo en segundos entre detener y reiniciar el contenedor.
-    """
-    try:
-        # Verificar si el contenedor está corriendo
-        ps_result = subprocess.run(
-            ['docker', 'ps', '--filter', f'name={container_name}', '--format', '{{.Names}}'],
-            check=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        running_containers = ps_result.stdout.decode().strip().splitlines()
-
-        logging.info(
-            'Docker ps executed. Result: {}. Output: {}. Error: {}'.format(
-                ps_result.returncode,
-                ps_result.stdout.decode().strip(),
-                ps_result.stderr.decode().strip()
-            )
-        )
-
-        if container_name in running_containers:
-            logging.info(f"Container {container_name} is running. Attempting to stop it.")
-            
-            # Detener el contenedor
-            stop_result = subprocess.run(
-                ['docker', 'stop', container_name],
-                check=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            logging.info(
-                'Docker stop executed. Result: {}. Output: {}. Error: {}'.format(
-                    stop_result.returncode,
-                    stop_result.stdout.decode().strip(),
-                    stop_result.stderr.decode().strip()
-                )
-            )
-
-            if stop_result.returncode != 0:
-                logging.error(f"Failed to stop container {container_name}. Aborting reanimation.")
-                return
-        else:
-            logging.info(f"Container {container_name} is not running. No need to stop.")
-
-        # Esperar antes de intentar reiniciar
-        time.sleep(sleep_seconds)
-
-        # Intentar reiniciar el contenedor
-        start_result = subprocess.run(
-            ['docker', 'start', container_name],
-            check=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        logging.info(
-            'Docker start executed. Result: {}. Output: {}. Error: {}'.format(
-                start_result.returncode,
-                start_result.stdout.decode().strip(),
-                start_result.stderr.decode().strip()
-            )
-        )
-
-        if start_result.returncode != 0:
-            logging.error(f"Failed to start container {container_name}.")
-            return False
-        else:
-            logging.info(f"Container {container_name} reanimated successfully.")
-            return True
-
-    except Exception as e:
-        logging.error(f"Unexpected error while handling container {container_name}: {e}")
-
 class TaskType(Enum):
     PULL = 0
     REANIMATE_MASTER = 1
@@ -239,43 +166,3 @@ _STRING_TO_NODE_TYPE = {
     "propagator_replica": NodeType.PROPAGATOR_REPLICA,
     "watchdog": NodeType.WATCHDOG
 }
-
-def log_with_location(message):
-    """Log message with dynamic file name and line number."""
-    frame = inspect.currentframe().f_back
-    file_name = frame.f_code.co_filename
-    line_number = frame.f_lineno
-    return f"{message} - {file_name} - LINE {line_number}"
-
-import random
-
-def simulate_random_failure(node, log_message, probability=0.01):
-    """
-    Simula una caída del sistema con una probabilidad dada.
-    
-    Args:
-        node (node): La instancia de la réplica/nodo en la que se ejecuta la simulación.
-        log_message (str): Mensaje de log que describe la simulación.
-        probability (float): Probabilidad de simular una caída (entre 0 y 1).
-    """
-    replicas = {NodeType.AVG_COUNTER_REPLICA, NodeType.OS_COUNTER_REPLICA, NodeType.Q3_JOINER_REPLICA, NodeType.Q4_JOINER_REPLICA, NodeType.Q5_JOINER_REPLICA, NodeType.PROPAGATOR_REPLICA}
-    masters = {NodeType.AVG_COUNTER, NodeType.OS_COUNTER, NodeType.Q3_JOINER, NodeType.Q4_JOINER, NodeType.Q5_JOINER, NodeType.PROPAGATOR}
-    if (node.get_type() in replicas) and node.id == 1: #SI ES EL NODO 1 NO LO TIRO NUNCA SI ES UNA REPLICA
-        return
-
-    # # Verificar si el nodo inició hace menos de 5 segundos
-    # current_time = time.time()
-    # time_since_start = current_time - node.timestamp  # Calcular tiempo transcurrido
-
-    # if time_since_start < 30:  # Si han pasado menos de 5 segundos, no simular fallo
-    #     return
-    
-    # Si es un master y no tiene réplicas, no simular fallo
-    if (node.get_type() in masters) and node.n_replicas == 0:
-        return
-
-    if random.random() < probability:
-        logging.warning(f"Simulando caída con probabilidad {probability * 100}% en la réplica {node.id}.")
-        logging.warning(log_message)
-        node._shutdown()
-        exit(0)
@@ -1,16 +1,28 @@
 # Clase watchdog
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
 import signal
 from multiprocessing import Condition, Lock, Manager, Process, Value
 import socket
+import threading
 import time
-from election.election_logic import initiate_election
+from election.election_logic import initiate_election, request_all
 from messages.messages import MsgType, SimpleMessage, decode_msg
-from utils.container_constants import LISTENER_PORT
-from utils.utils import NodeType, reanimate_container, recv_msg
+from utils.failure_detector import PhiAccrualDetector
+from utils.container_constants import HEARTBEAT_INTERVAL, HEARTBEAT_PORT, HEARTBEAT_TIMEOUT, LISTENER_PORT, PROMOTABLE_MASTERS
+from utils.metrics import METRICS
+from utils.docker_client import DockerClient
+from utils.utils import NodeType, recv_msg
 from listener.watchdog_listener import WatchDogListener
 
-INITIAL_TRIES = 5
+DISCOVERY_TIMEOUT = 1 # Segundos que se reintenta preguntar el líder a los WatchDogs que todavía no responden
+DISCOVERY_RETRY_INTERVAL = 0.25
+LEADER_LEASE = 1.0 # Segundos que dura el lease del líder, que se renueva con cada latido o KEEP_ALIVE suyo
+LEADER_LEASE_MISSES = 2 # KEEP_ALIVEs fallidos seguidos, con el lease vencido, para iniciar una elección
+PROBE_TIMEOUT = 2 # Segundos que tiene cada nodo para responder el KEEP_ALIVE
+MAX_PROBE_WORKERS = 64 # Sondeos en paralelo
+MAX_REANIMATION_WORKERS = 8 # Reanimaciones en paralelo (cada una espera a que docker detenga e inicie el contenedor)
+MAX_HEARTBEAT_SIZE = 512
 
 class WatchDog:
     def __init__(self, id: int, n_watchdogs: int, container_name: str, nodes_to_monitor: list[tuple[NodeType, int]] = [], check_interval=2):
@@ -42,6 +54,20 @@ class WatchDog:
 
 
         self.nodes_to_monitor = nodes_to_monitor
+        self.last_alive = {} # Nodo -> último momento en el que respondió
+        self.beats = {} # Nodo -> (momento del último latido, número de secuencia)
+        self.last_probe = {} # Nodo -> último KEEP_ALIVE enviado para confirmar una sospecha
+        self.detector = PhiAccrualDetector() # Sospecha de cada nodo según la regularidad de sus latidos
+        self.reanimating = set() # Nodos con una reanimación en curso, que no se sondean hasta que termine
+        self.recovering = {} # Nodo reanimado -> último momento en el que estuvo vivo, hasta que vuelva a responder
+        # Protege beats, last_alive, last_probe, reanimating y recovering, que modifican el hilo principal,
+        # el que recibe los latidos y los de reanimación
+        self.lock = threading.Lock()
+        self.docker = DockerClient()
+        self.lease_renewed = 0 # Último momento en que el líder dio señales de vida
+        self.leader_misses = 0 # KEEP_ALIVEs seguidos que el líder no respondió
+        self.probe_pool = None
+        self.reanimation_pool = None
 
         signal.signal(signal.SIGTERM, self._handle_sigterm)
 
@@ -52,65 +78,278 @@ class WatchDog:
         - Periódicamente verifica si los nodos están vivos.
         """
 
+        # Las métricas se habilitan antes de crear el Listener, que las sirve desde la memoria compartida
+        METRICS.enable(f'{self.container_name}_{self.id}')
         self.init_listener_process()
-        self.search_leader()        
+        threading.Thread(target=self._receive_heartbeats, daemon=True).start()
+        self.search_leader()
+        self.lease_renewed = time.monotonic()
+
+        targets = self._targets()
+        self.probe_pool = ThreadPoolExecutor(max_workers=max(1, min(MAX_PROBE_WORKERS, len(targets))))
+        self.reanimation_pool = ThreadPoolExecutor(max_workers=MAX_REANIMATION_WORKERS)
 
         while not self.shutting_down:
+            check_start = time.monotonic()
             if self.leader_id.value == self.id:
                 try:
-                    for node_type, instances in self.nodes_to_monitor:
-                        for instance_id in range(1, instances+1):
-                            if not (self.shutting_down or (self.container_name == node_type and self.id == instance_id)):
-                                self._check_node(node_type, instance_id)
+                    self._sweep(self._suspects(targets))
                 except Exception as e:
                     logging.error(f"[Main]: Error en el proceso de verificación: {e}")
             else:
                 try:
-                    if not self._check_node(self.container_name, self.leader_id.value): # type: ignore
-                        self.election_leader()
+                    self._check_leader()
                 except Exception as e:
                     logging.error(f"[Main]: Error en el proceso de verificación: {e}")
 
-            time.sleep(self.check_interval)  # Esperar antes de la próxima verificación
+            # Esperar antes de la próxima verificación, descontando lo que tardó esta
+            time.sleep(max(0, HEARTBEAT_INTERVAL - (time.monotonic() - check_start)))
 
-    def _check_node(self, node_type: str, instance_id: int):
+    def _check_leader(self):
         """
-        Verifica si un nodo está vivo enviando un mensaje de conexión.
-        
-        :param node_type: Tipo del nodo.
-        :param instance_id: ID de la instancia del nodo.
+        Verifica al líder desde un seguidor. Cada latido del líder renueva su lease por `LEADER_LEASE` segundos;
+        recién con el lease vencido se le envía un KEEP_ALIVE, y solo después de `LEADER_LEASE_MISSES`
+        KEEP_ALIVEs fallidos seguidos se inicia una elección, para no reelegir por un único sondeo perdido.
         """
-        node_address = f"{node_type}_{instance_id}"
-        
+        leader = f"{self.container_name}_{self.leader_id.value}"
+        beat = self.beats.get(leader)
+        if beat is not None:
+            self.lease_renewed = max(self.lease_renewed, beat[0])
+        if time.monotonic() - self.lease_renewed < LEADER_LEASE:
+            self.leader_misses = 0
+            return
+
+        if self._probe(leader):
+            self.lease_renewed = time.monotonic()
+            self.leader_misses = 0
+            return
+
+        self.leader_misses += 1
+        logging.warning(f"[Main] El líder {leader} no respondió ({self.leader_misses}/{LEADER_LEASE_MISSES}).")
+        if self.leader_misses >= LEADER_LEASE_MISSES:
+            self.leader_misses = 0
+            election_start = time.monotonic()
+            self.election_leader()
+            METRICS.observe('election_seconds', time.monotonic() - election_start)
+            # El líder electo arranca con un lease nuevo
+            self.lease_renewed = time.monotonic()
+
+    def _targets(self) -> list[str]:
+        """
+        Direcciones de todos los nodos a monitorear, salvo este mismo WatchDog.
+        """
+        return [
+            f"{node_type}_{instance_id}"
+            for node_type, instances in self.nodes_to_monitor
+            for instance_id in range(1, instances+1)
+            if not (self.container_name == node_type and self.id == instance_id)
+        ]
+
+    def _receive_heartbeats(self):
+        """
+        Recibe los latidos UDP de los Listeners y mantiene la tabla con el último latido de cada nodo.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('', HEARTBEAT_PORT))
+        while not self.shutting_down:
+            try:
+                data, _ = sock.recvfrom(MAX_HEARTBEAT_SIZE)
+                beat = decode_msg(data)
+            except Exception as e:
+                logging.warning(f"[Heartbeat] Latido inválido: {e}")
+                continue
+            if beat.type != MsgType.HEARTBEAT:
+                continue
+
+            now = time.monotonic()
+            with self.lock:
+                previous = self.beats.get(beat.node)
+                if previous is not None and beat.msg_id <= previous[1]:
+                    if now - previous[0] < HEARTBEAT_TIMEOUT:
+                        continue # Latido que llegó desordenado
+                    logging.info(f"[Heartbeat] El nodo {beat.node} se reinició.")
+                    self.detector.forget(beat.node)
+                elif previous is not None and beat.msg_id > previous[1] + 1:
+                    METRICS.inc('heartbeats_lost_total', beat.msg_id - previous[1] - 1, target=beat.node)
+                self.beats[beat.node] = (now, beat.msg_id)
+                self.detector.heartbeat(beat.node, now, beat.busy_ms / 1000)
+            METRICS.set('node_rss_kb', beat.rss_kb, target=beat.node)
+            METRICS.set('node_busy_seconds', beat.busy_ms / 1000, target=beat.node)
+
+    def _suspects(self, targets: list[str]) -> list[str]:
+        """
+        Nodos cuya sospecha (phi) superó el umbral de su tipo, o que llevan procesando el mismo mensaje más
+        que el máximo de su tipo, que hay que confirmar con un KEEP_ALIVE.
+        Los nodos de los que no se reciben latidos se sondean como antes, una vez cada `check_interval`.
+        """
+        now = time.monotonic()
+        suspects = []
+        with self.lock:
+            for address in targets:
+                if address in self.reanimating:
+                    continue
+                phi = self.detector.phi(address, now)
+                if phi is not None and phi < self.detector.threshold(address) and not self.detector.stuck(address, now):
+                    self.last_alive[address] = self.beats[address][0]
+                    self._recovered(address, self.beats[address][0])
+                    continue
+                if now - self.last_probe.get(address, float('-inf')) >= self.check_interval:
+                    if phi is not None:
+                        METRICS.set('suspicion_phi', phi, target=address)
+                    self.last_probe[address] = now
+                    suspects.append(address)
+        return suspects
+
+    def _sweep(self, targets: list[str]):
+        """
+        Sondea todos los nodos en paralelo, por lo que una pasada tarda a lo sumo `PROBE_TIMEOUT`
+        sin importar la cantidad de nodos, y reanima en segundo plano a los que no respondieron.
+        """
+        sweep_start = time.monotonic()
+        if not targets:
+            return
+        with self.lock:
+            targets = [address for address in targets if address not in self.reanimating]
+        probes = {self.probe_pool.submit(self._probe, address): address for address in targets}
+        done, _ = wait(probes, timeout=PROBE_TIMEOUT + 1)
+        now = time.monotonic()
+        METRICS.observe('sweep_seconds', now - sweep_start)
+
+        for probe, address in probes.items():
+            if self.shutting_down:
+                return
+            alive = probe in done and probe.result()
+            # El Listener responde el KEEP_ALIVE aunque el nodo esté trabado en un callback
+            stuck = alive and self.detector.stuck(address, now)
+            with self.lock:
+                if alive and not stuck:
+                    if self.detector.phi(address, now) is not None:
+                        # Sospechado por sus latidos pero vivo: una pausa larga, no una caída
+                        METRICS.inc('false_suspicions_total', target=address)
+                    self.last_alive[address] = sweep_start
+                    self._recovered(address, now)
+                    continue
+
+                # Se chequea y se marca en un mismo paso, para no reanimar dos veces el mismo contenedor
+                if address in self.reanimating:
+                    continue
+                self.reanimating.add(address)
+
+                # El nodo estuvo vivo por última vez en el último sondeo exitoso: la detección tardó a lo sumo esto
+                last_alive = self.last_alive.pop(address, None)
+                self.recovering.setdefault(address, last_alive if last_alive is not None else now)
+
+            if stuck:
+                busy = self.detector.busy_seconds(address, now)
+                logging.warning(f"[Main] Nodo {address} lleva {busy:.0f}s procesando el mismo mensaje.")
+            if last_alive is not None:
+                detection = now - last_alive
+                METRICS.observe('failure_detection_seconds', detection)
+                METRICS.set('last_failure_detection_seconds', detection, target=address)
+                logging.warning(f"[Main] Nodo {address}:{LISTENER_PORT} no responde. Caída detectada en {detection:.2f}s.")
+            else:
+                logging.warning(f"[Main] Nodo {address}:{LISTENER_PORT} no responde.")
+
+            self.reanimation_pool.submit(self._reanimate, address)
+
+    def _probe(self, node_address: str) -> bool:
+        """
+        Verifica si un nodo está vivo enviándole un KEEP_ALIVE. El nodo tiene `PROBE_TIMEOUT` segundos
+        en total para aceptar la conexión y responder.
+
+        :param node_address: Nombre del contenedor del nodo.
+        """
+        deadline = time.monotonic() + PROBE_TIMEOUT
         try:
-            with socket.create_connection((node_address, LISTENER_PORT), timeout=2) as sock:
-                
+            with socket.create_connection((node_address, LISTENER_PORT), timeout=PROBE_TIMEOUT) as sock:
+                sock.settimeout(max(0.01, deadline - time.monotonic()))
                 sock.sendall(SimpleMessage(type=MsgType.KEEP_ALIVE, socket_compatible=True).encode())
                 # logging.info(f"[MAIN] KEEP_ALIVE enviado a {node_address}:{LISTENER_PORT}.")
 
                 raw_msg = recv_msg(sock)
                 response = decode_msg(raw_msg)
 
-                if response.type != MsgType.ALIVE: # Esta corrompido
-                    if self.leader_id.value != self.id:
-                        return False
-                    if reanimate_container(node_address):
-                        logging.info(f"Updated state for {node_type} instance {instance_id} to alive.")
+                return response.type == MsgType.ALIVE # Si responde otra cosa, está corrompido
 
         except (ConnectionRefusedError, socket.timeout, socket.gaierror):
-            logging.warning(f"[Main] Nodo {node_address}:{LISTENER_PORT} no responde.")
-
-            #TODO que reanimate retorne si lo logro o no
-            if self.leader_id.value != self.id:
-                return False
-            if reanimate_container(node_address):
-                logging.info(f"Updated state for {node_type} instance {instance_id} to alive.")
+            return False
 
         except Exception as e:
             logging.error(f"[Main] Error inesperado al verificar nodo {node_address}:{LISTENER_PORT}: {e}")
 
         return True
 
+    def _recovered(self, node_address: str, alive_at: float):
+        """
+        Registra el tiempo de recuperación de un nodo reanimado: desde la última vez que estuvo vivo
+        hasta que volvió a responder. Se llama con `lock` tomado.
+        """
+        down_since = self.recovering.pop(node_address, None)
+        if down_since is None:
+            return
+        recovery = alive_at - down_since
+        METRICS.observe('time_to_recover_seconds', recovery)
+        METRICS.set('last_time_to_recover_seconds', recovery, target=node_address)
+        logging.info(f"[Main] Nodo {node_address} recuperado en {recovery:.2f}s.")
+
+    def _reanimate(self, node_address: str):
+        try:
+            if self.leader_id.value == self.id and not self.shutting_down:
+                reanimation_start = time.monotonic()
+                before_start = None
+                if node_address.rsplit('_', 1)[0] in PROMOTABLE_MASTERS:
+                    # La réplica se promueve con el maestro ya detenido, para que nunca consuman los dos a la vez
+                    before_start = lambda: self._promote_replica(node_address)
+                if self.docker.reanimate(node_address, before_start):
+                    METRICS.observe('reanimation_seconds', time.monotonic() - reanimation_start)
+                else:
+                    METRICS.inc('reanimation_failures_total', target=node_address)
+        except Exception as e:
+            logging.error(f"[Main] Error al reanimar {node_address}: {e}")
+        finally:
+            # El nodo recién reiniciado tiene `check_interval` segundos para volver a responder
+            with self.lock:
+                self.last_probe[node_address] = time.monotonic()
+                self.detector.forget(node_address)
+                # El contenedor reiniciado numera sus latidos desde 0: si no se olvida la secuencia anterior,
+                # sus latidos se descartarían como desordenados durante `HEARTBEAT_TIMEOUT`
+                self.beats.pop(node_address, None)
+                self.reanimating.discard(node_address)
+
+    def _promote_replica(self, master_address: str):
+        """
+        Promueve la réplica más actualizada de un maestro caído, que atiende sus colas mientras el
+        contenedor del maestro se reinicia. El maestro reiniciado le pide el estado al arrancar y la
+        réplica le devuelve el rol, así que la espera del pipeline es la de este pedido y no la del reinicio.
+        """
+        replica_type = PROMOTABLE_MASTERS[master_address.rsplit('_', 1)[0]]
+        n_replicas = dict(self.nodes_to_monitor).get(replica_type, 0)
+        if n_replicas == 0:
+            return
+
+        promotion_start = time.monotonic()
+        status_msg = SimpleMessage(type=MsgType.REPLICA_STATUS, socket_compatible=True, synchronized=0)
+        replies = request_all(replica_type, list(range(1, n_replicas + 1)), status_msg, timeout=PROBE_TIMEOUT)
+        # Las réplicas informan el último push que aplicaron: la de ID mayor tiene todo el estado del maestro
+        candidates = [
+            (reply.msg_id, replica_id) for replica_id, reply in replies.items()
+            if reply is not None and reply.type == MsgType.REPLICA_STATUS and reply.synchronized
+        ]
+        if not candidates:
+            logging.warning(f"[Main] Ninguna réplica de {master_address} está sincronizada. Se espera al reinicio.")
+            return
+
+        last_msg_id, replica_id = max(candidates)
+        promote_msg = SimpleMessage(type=MsgType.PROMOTE, socket_compatible=True)
+        ack = request_all(replica_type, [replica_id], promote_msg, timeout=PROBE_TIMEOUT)[replica_id]
+        if ack is None or ack.type != MsgType.PROMOTE:
+            logging.warning(f"[Main] La réplica {replica_type}_{replica_id} no aceptó la promoción.")
+            return
+
+        METRICS.observe('promotion_seconds', time.monotonic() - promotion_start)
+        METRICS.inc('promotions_total', target=master_address)
+        logging.info(f"[Main] Réplica {replica_type}_{replica_id} promovida a maestro de {master_address} (last_msg_id = {last_msg_id}).")
+
     def _shutdown(self):
         """Gracefully shuts down the node, stopping consumption and closing connections."""
         if self.shutting_down:
@@ -121,6 +360,10 @@ class WatchDog:
 
         self.manager.shutdown()
 
+        for pool in (self.probe_pool, self.reanimation_pool):
+            if pool:
+                pool.shutdown(wait=False)
+
         if self.election_process:
             self.election_process.terminate()
             self.election_process.join()
@@ -155,35 +398,27 @@ class WatchDog:
         self.election_process.join()
 
     def search_leader(self):
-        leader_found = False
-        for id in range(1, self.n_watchdogs+1):
-            if id == self.id: continue
-            node_address = f'{self.container_name}_{id}'
-            for _ in range(INITIAL_TRIES):
-                try:
-                    with socket.create_connection((node_address, LISTENER_PORT), timeout=2) as sock:
-                        sock.sendall(SimpleMessage(type=MsgType.ASK_LEADER, socket_compatible=True).encode())
-                        
-                        raw_msg = recv_msg(sock)
-                        response = decode_msg(raw_msg)
-
-                        if response.type == MsgType.COORDINATOR:
-                            logging.info(f"Es un mensaje de COORDINATOR del nodo {response.node_id}")
-                            self.leader_id.value = response.node_id
-                            leader_found = True
-                        break
-                            
-                except (ConnectionRefusedError, socket.timeout, socket.gaierror):
-                    logging.warning(f"[MAIN] Nodo {node_address}:{LISTENER_PORT} no responde.")
-
-                except Exception as e:
-                    logging.error(f"[MAIN] Error inesperado al verificar nodo {node_address}:{LISTENER_PORT}: {e}")
-                time.sleep(2)
+        """
+        Pregunta en paralelo a los demás WatchDogs quién es el líder. A los que todavía no responden (por
+        ejemplo, porque su contenedor recién arranca) se les vuelve a preguntar cada `DISCOVERY_RETRY_INTERVAL`
+        segundos, durante a lo sumo `DISCOVERY_TIMEOUT`. Si ninguno es líder, se asume el de ID mayor.
+        """
+        peers = [id for id in range(1, self.n_watchdogs+1) if id != self.id]
+        ask_leader = SimpleMessage(type=MsgType.ASK_LEADER, socket_compatible=True)
+        deadline = time.monotonic() + DISCOVERY_TIMEOUT
+        while peers:
+            replies = request_all(self.container_name, peers, ask_leader)
+            leaders = [reply.node_id for reply in replies.values() if reply is not None and reply.type == MsgType.COORDINATOR]
+            if leaders:
+                logging.info(f"Es un mensaje de COORDINATOR del nodo {max(leaders)}")
+                self.leader_id.value = max(leaders)
+                return
+            peers = [id for id, reply in replies.items() if reply is None]
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(DISCOVERY_RETRY_INTERVAL)
 
-            if leader_found: break
-        
-        if not leader_found:
-            self.leader_id.value = self.n_watchdogs
+        self.leader_id.value = self.n_watchdogs
 
 def init_listener(id, ip_prefix, n_watchdogs, election_in_progress, election_condition, waiting_ok, ok_condition, leader_id):
     listener = WatchDogListener(id, ip_prefix, n_watchdogs, election_in_progress, election_condition, waiting_ok, ok_condition, leader_id)
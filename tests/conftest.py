@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del sistema se importan desde src, como dentro de los contenedores
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
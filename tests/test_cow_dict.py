@@ -0,0 +1,54 @@
+from utils.cow_dict import CowDict
+
+
+def test_snapshot_keeps_values_modified_through_mutable():
+    counts = CowDict(dict)
+    counts.mutable(1)[10] = 1
+
+    snapshot = counts.snapshot()
+    counts.mutable(1)[10] = 2
+    counts.mutable(1)[20] = 1
+
+    assert snapshot == {1: {10: 1}}
+    assert counts == {1: {10: 2, 20: 1}}
+
+
+def test_mutable_copies_only_once_per_snapshot():
+    games = CowDict(set)
+    games.mutable(1).add(10)
+    snapshot = games.snapshot()
+
+    copied = games.mutable(1)
+    assert copied is not snapshot[1]
+    assert games.mutable(1) is copied
+
+
+def test_missing_key_is_created_with_the_factory():
+    fins = CowDict(lambda: [False, False])
+
+    assert fins[1] == [False, False]
+    assert 1 in fins
+    assert fins[1] is not CowDict(lambda: [False, False])[1]
+
+
+def test_missing_key_without_factory_raises():
+    names = CowDict()
+
+    try:
+        names[1]
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("se esperaba KeyError")
+
+
+def test_deleted_key_is_recreated_without_touching_the_snapshot():
+    games = CowDict(set)
+    games.mutable(1).add(10)
+    snapshot = games.snapshot()
+
+    del games[1]
+    games.mutable(1).add(20)
+
+    assert snapshot == {1: {10}}
+    assert games == {1: {20}}
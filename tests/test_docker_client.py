@@ -0,0 +1,126 @@
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from utils.docker_client import DockerClient
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    """
+    Responde como la API del Docker Engine a partir de `server.containers` (nombre -> estado),
+    o con `server.status` si está definido, y anota cada pedido en `server.requests`.
+    """
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        self.server.requests.append((self.command, self.path))
+        status, body = self._respond()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body: # Las respuestas 204 no tienen cuerpo, y el cliente puede cerrar apenas lee los encabezados
+            self.wfile.write(body)
+
+    def _respond(self):
+        if self.server.status is not None:
+            return self.server.status, b'{"message": "error"}'
+        _, _, name, action = self.path.split('?')[0].split('/')
+        state = self.server.containers.get(name)
+        if state is None:
+            return 404, b'{"message": "No such container"}'
+        if action == 'json':
+            return 200, json.dumps({'State': state}).encode()
+        if action == 'stop':
+            state.update(Running=False, Status='exited')
+        elif action == 'start':
+            state.update(Running=True, Status='running')
+        return 204, b''
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def docker(tmp_path):
+    socket_path = str(tmp_path / 'docker.sock')
+    server = socketserver.ThreadingUnixStreamServer(socket_path, FakeDockerHandler)
+    server.daemon_threads = True
+    server.containers = {}
+    server.requests = []
+    server.status = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, DockerClient(socket_path, timeout=2)
+    server.shutdown()
+    server.server_close()
+
+
+def test_reanimate_stops_and_starts_a_running_container(docker):
+    server, client = docker
+    server.containers['q4_joiner_1'] = {'Running': True, 'Paused': False, 'Status': 'running'}
+
+    assert client.reanimate('q4_joiner_1')
+    assert server.requests == [
+        ('GET', '/containers/q4_joiner_1/json'),
+        ('POST', '/containers/q4_joiner_1/stop?t=10'),
+        ('POST', '/containers/q4_joiner_1/start'),
+    ]
+    assert server.containers['q4_joiner_1']['Running']
+
+
+def test_reanimate_only_starts_an_exited_container(docker):
+    server, client = docker
+    server.containers['q4_joiner_1'] = {'Running': False, 'Paused': False, 'Status': 'exited', 'ExitCode': 0}
+
+    assert client.reanimate('q4_joiner_1')
+    assert server.requests == [
+        ('GET', '/containers/q4_joiner_1/json'),
+        ('POST', '/containers/q4_joiner_1/start'),
+    ]
+
+
+def test_reanimate_calls_before_start_with_the_container_stopped(docker):
+    server, client = docker
+    server.containers['q4_joiner_1'] = {'Running': True, 'Paused': False, 'Status': 'running'}
+    seen = []
+
+    assert client.reanimate('q4_joiner_1', lambda: seen.append(dict(server.containers['q4_joiner_1'])))
+    assert seen == [{'Running': False, 'Paused': False, 'Status': 'exited'}]
+
+
+def test_reanimate_fails_for_a_missing_container(docker):
+    server, client = docker
+
+    assert not client.reanimate('q4_joiner_1')
+    assert server.requests == [('GET', '/containers/q4_joiner_1/json')]
+
+
+def test_reanimate_fails_when_the_engine_errors(docker):
+    server, client = docker
+    server.containers['q4_joiner_1'] = {'Running': True, 'Paused': False, 'Status': 'running'}
+    server.status = 500
+
+    assert not client.reanimate('q4_joiner_1')
+
+
+def test_reanimate_fails_when_start_errors(docker):
+    server, client = docker
+    server.containers['q4_joiner_1'] = {'Running': False, 'Paused': False, 'Status': 'exited', 'ExitCode': 1}
+
+    def fail_start():
+        server.status = 500
+
+    assert not client.reanimate('q4_joiner_1', fail_start)
+    assert server.requests[-1] == ('POST', '/containers/q4_joiner_1/start')
+
+
+def test_reanimate_fails_without_a_docker_engine(tmp_path):
+    assert not DockerClient(str(tmp_path / 'missing.sock'), timeout=1).reanimate('q4_joiner_1')
@@ -0,0 +1,41 @@
+from utils.failure_detector import PhiAccrualDetector
+
+
+def beat(detector, node, start, count, busy=0.0, interval=0.25):
+    for i in range(count):
+        detector.heartbeat(node, start + i * interval, busy)
+    return start + (count - 1) * interval
+
+
+def test_regular_beats_are_not_suspected():
+    detector = PhiAccrualDetector(thresholds='', max_busy='')
+    last = beat(detector, 'filter_1', 0.0, 20)
+
+    assert not detector.suspect('filter_1', last + 0.25)
+    assert detector.suspect('filter_1', last + 30)
+
+
+def test_busy_node_is_suspected_even_if_it_keeps_beating():
+    detector = PhiAccrualDetector(thresholds='', max_busy='{"default": 10, "english": 20}')
+    last = beat(detector, 'filter_1', 0.0, 20, busy=15)
+    beat(detector, 'english_1', 0.0, 20, busy=15)
+
+    assert detector.phi('filter_1', last) < detector.threshold('filter_1')
+    assert detector.stuck('filter_1', last)
+    assert detector.suspect('filter_1', last)
+    # Los tipos con callbacks pesados tienen más margen
+    assert not detector.suspect('english_1', last)
+
+
+def test_busy_time_is_reset_when_the_node_finishes_the_message():
+    detector = PhiAccrualDetector(thresholds='', max_busy='{"default": 10}')
+    detector.heartbeat('filter_1', 0.0, busy=11)
+    assert detector.busy_seconds('filter_1', 1.0) == 12
+
+    detector.heartbeat('filter_1', 1.0)
+    assert detector.busy_seconds('filter_1', 1.0) == 0
+    assert not detector.stuck('filter_1', 1.0)
+
+    detector.heartbeat('filter_1', 1.25, busy=11)
+    detector.forget('filter_1')
+    assert not detector.stuck('filter_1', 1.25)
@@ -0,0 +1,40 @@
+import socket
+
+from listener.listener import Listener
+from messages.messages import MsgType, SimpleMessage, decode_msg
+from utils.utils import recv_msg
+
+
+class StatusListener(Listener):
+    """Listener que además responde REPLICA_STATUS, como el de las réplicas."""
+
+    def handle_msg(self, msg, conn):
+        if msg.type == MsgType.REPLICA_STATUS:
+            conn.sendall(SimpleMessage(type=MsgType.REPLICA_STATUS, socket_compatible=True, msg_id=7, synchronized=1).encode())
+        else:
+            super().handle_msg(msg, conn)
+
+
+def ask(listener: Listener, msg: SimpleMessage):
+    """Envía un mensaje al listener por un par de sockets y devuelve su respuesta."""
+    client, server = socket.socketpair()
+    with client, server:
+        client.sendall(msg.encode())
+        listener.process_msg(server)
+        return decode_msg(recv_msg(client))
+
+
+def test_subclass_handles_its_own_messages():
+    # Sin __init__, para no bindear el puerto del nodo
+    listener = StatusListener.__new__(StatusListener)
+    response = ask(listener, SimpleMessage(type=MsgType.REPLICA_STATUS, socket_compatible=True, synchronized=0))
+
+    assert response.type == MsgType.REPLICA_STATUS
+    assert response.msg_id == 7
+
+
+def test_subclass_delegates_keep_alive_to_the_base_listener():
+    listener = StatusListener.__new__(StatusListener)
+    response = ask(listener, SimpleMessage(type=MsgType.KEEP_ALIVE, socket_compatible=True))
+
+    assert response.type == MsgType.ALIVE
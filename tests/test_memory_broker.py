@@ -0,0 +1,130 @@
+from middleware.memory_broker import MemoryBroker, MemoryConnection
+
+
+def consume(channel, queue, n, on_message=None):
+    """
+    Consume `n` mensajes de `queue` y devuelve los `(body, method)` recibidos, en orden.
+    """
+    received = []
+
+    def callback(ch, method, properties, body):
+        received.append((body, method))
+        if on_message is not None:
+            on_message(ch, method)
+        if len(received) == n:
+            ch.stop_consuming()
+
+    channel.basic_consume(queue, callback, auto_ack=False)
+    channel.start_consuming()
+    return received
+
+
+def test_nack_requeues_at_the_head_of_the_queue_as_redelivered():
+    channel = MemoryConnection(MemoryBroker()).channel()
+    channel.queue_declare('q')
+    for body in (b'1', b'2', b'3'):
+        channel.basic_publish('', 'q', body)
+
+    first, = consume(channel, 'q', 1)
+    channel.basic_nack(first[1].delivery_tag, requeue=True)
+
+    received = consume(channel, 'q', 3, lambda ch, method: ch.basic_ack(method.delivery_tag))
+    assert [body for body, _ in received] == [b'1', b'2', b'3']
+    assert [method.redelivered for _, method in received] == [True, False, False]
+
+
+def test_nack_multiple_keeps_the_original_order():
+    channel = MemoryConnection(MemoryBroker()).channel()
+    channel.queue_declare('q')
+    for body in (b'1', b'2', b'3'):
+        channel.basic_publish('', 'q', body)
+
+    received = consume(channel, 'q', 2)
+    channel.basic_nack(received[-1][1].delivery_tag, multiple=True, requeue=True)
+
+    received = consume(channel, 'q', 3, lambda ch, method: ch.basic_ack(method.delivery_tag))
+    assert [body for body, _ in received] == [b'1', b'2', b'3']
+
+
+def test_nack_without_requeue_drops_the_message():
+    broker = MemoryBroker()
+    channel = MemoryConnection(broker).channel()
+    channel.queue_declare('q')
+    channel.basic_publish('', 'q', b'1')
+
+    first, = consume(channel, 'q', 1)
+    channel.basic_nack(first[1].delivery_tag, requeue=False)
+
+    assert broker.stats()['q']['depth'] == 0
+
+
+def test_closing_a_channel_requeues_unacked_messages():
+    broker = MemoryBroker()
+    connection = MemoryConnection(broker)
+    channel = connection.channel()
+    channel.queue_declare('q')
+    channel.basic_publish('', 'q', b'1')
+    consume(channel, 'q', 1)
+    channel.close()
+
+    other = MemoryConnection(broker).channel()
+    (body, method), = consume(other, 'q', 1)
+    assert body == b'1' and method.redelivered
+
+
+def test_fanout_reaches_every_anonymous_queue():
+    broker = MemoryBroker()
+    channels = [MemoryConnection(broker).channel() for _ in range(3)]
+    queues = []
+    for channel in channels:
+        channel.exchange_declare('sync', 'fanout')
+        queue = channel.queue_declare('', exclusive=True).method.queue
+        channel.queue_bind(queue, 'sync', routing_key='ignored')
+        queues.append(queue)
+
+    assert len(set(queues)) == 3
+    channels[0].basic_publish('sync', 'any', b'state')
+
+    for channel, queue in zip(channels, queues):
+        (body, method), = consume(channel, queue, 1)
+        assert body == b'state'
+        assert method.exchange == 'sync'
+
+
+def test_anonymous_exclusive_queues_are_deleted_with_their_connection():
+    broker = MemoryBroker()
+    connection = MemoryConnection(broker)
+    channel = connection.channel()
+    channel.exchange_declare('sync', 'fanout')
+    queue = channel.queue_declare('', exclusive=True).method.queue
+    channel.queue_bind(queue, 'sync')
+    connection.close()
+
+    assert queue not in broker.stats()
+    MemoryConnection(broker).channel().basic_publish('sync', '', b'state')
+
+
+def test_stop_consuming_from_a_callback_returns_from_start_consuming():
+    channel = MemoryConnection(MemoryBroker()).channel()
+    channel.queue_declare('q')
+    for body in (b'1', b'2', b'3'):
+        channel.basic_publish('', 'q', body)
+
+    received = consume(channel, 'q', 1, lambda ch, method: ch.basic_ack(method.delivery_tag))
+
+    assert [body for body, _ in received] == [b'1']
+    # El consumidor se canceló: los mensajes restantes siguen en la cola
+    assert channel.callbacks == {}
+    assert [body for body, _ in consume(channel, 'q', 2)] == [b'2', b'3']
+
+
+def test_stop_consuming_from_a_timer_returns_from_start_consuming():
+    connection = MemoryConnection(MemoryBroker())
+    channel = connection.channel()
+    channel.queue_declare('q')
+    channel.basic_consume('q', lambda *args: None)
+    connection.call_later(0.05, channel.stop_consuming)
+
+    channel.start_consuming()
+
+    assert channel.callbacks == {}
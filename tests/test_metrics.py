@@ -0,0 +1,46 @@
+import multiprocessing
+
+import pytest
+
+from messages.messages import HeartbeatMessage, decode_msg
+from utils.metrics import METRICS
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    # Se restauran al terminar, para no dejar las métricas habilitadas en los demás tests
+    monkeypatch.setattr(METRICS, 'enabled', METRICS.enabled)
+    monkeypatch.setattr(METRICS, 'recording', METRICS.recording)
+    METRICS.enable('test_1')
+    return METRICS
+
+
+def listener_process():
+    """Lo que hace el Listener: codifica latidos y decodifica mensajes."""
+    METRICS.read_only()
+    for seq in range(4):
+        decode_msg(HeartbeatMessage(node='test_1', msg_id=seq).encode())
+    METRICS.inc('listener_total')
+
+
+def test_listener_process_does_not_alias_node_series(metrics):
+    process = multiprocessing.get_context('fork').Process(target=listener_process)
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+    metrics.inc('messages_in_total')
+    metrics.observe('encode_seconds', 0.001, type='HEARTBEAT')
+
+    lines = metrics.render().splitlines()
+    assert 'messages_in_total{node="test_1"} 1' in lines
+    assert 'encode_seconds_count{node="test_1",type="HEARTBEAT"} 1' in lines
+    assert not any(line.startswith('listener_total') for line in lines)
+
+
+def test_read_only_process_still_renders_node_series(metrics):
+    metrics.inc('messages_in_total', 3)
+    metrics.read_only()
+    metrics.inc('messages_in_total')
+
+    assert 'messages_in_total{node="test_1"} 3' in metrics.render().splitlines()
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from utils.name_store import MissingGameNamesError, NameStore
+
+
+def test_names_survive_a_restart(tmp_path):
+    NameStore(str(tmp_path)).add_names(1, {10: "Hades", 20: "Celeste"})
+
+    assert NameStore(str(tmp_path)).resolve(1, [10, 20]) == {10: "Hades", 20: "Celeste"}
+
+
+def test_missing_names_fail_instead_of_using_the_app_id(tmp_path):
+    store = NameStore(str(tmp_path))
+    store.add_names(1, {10: "Hades"})
+
+    with pytest.raises(MissingGameNamesError) as error:
+        store.resolve(1, [10, 20])
+    assert error.value.app_ids == [20]
+
+
+def test_partial_record_is_dropped_on_restart(tmp_path):
+    store = NameStore(str(tmp_path))
+    store.add_names(1, {10: "Hades"})
+    path = os.path.join(str(tmp_path), os.listdir(tmp_path)[0])
+    with open(path, 'ab') as names_file:
+        names_file.write(b'\x00\x00\x00\x14\x00\x07Cel')  # Caída a mitad de escritura
+
+    # El batch se vuelve a recibir y escribe sus nombres a continuación del último registro completo
+    store = NameStore(str(tmp_path))
+    store.add_names(1, {20: "Celeste"})
+
+    assert store.resolve(1, [10, 20]) == {10: "Hades", 20: "Celeste"}
+
+
+def test_retain_keeps_only_the_recovered_clients(tmp_path):
+    store = NameStore(str(tmp_path))
+    store.add_names(1, {10: "Hades"})
+    store.add_names(2, {20: "Celeste"})
+
+    store.retain({2: set()})
+
+    assert store.resolve(2, [20]) == {20: "Celeste"}
+    with pytest.raises(MissingGameNamesError):
+        store.resolve(1, [10])
@@ -0,0 +1,46 @@
+import os
+
+from utils import review_store as review_store_module
+from utils.review_store import ReviewStore
+
+
+def test_snapshot_reads_its_texts_while_appends_continue(tmp_path):
+    store = ReviewStore(str(tmp_path), memory_budget=1 << 20)
+    store.append(1, 10, "escrita")
+    store.flush()
+    store.append(1, 10, "pendiente")
+
+    with store.snapshot() as snapshot:
+        store.append(1, 10, "posterior")
+        store.append(1, 20, "otro juego")
+        store.flush()
+
+        assert snapshot.clients() == [1]
+        assert snapshot.app_ids(1) == [10]
+        assert list(snapshot.iter_texts(1, 10)) == ["escrita", "pendiente"]
+
+    assert list(store.iter_texts(1, 10)) == ["escrita", "pendiente", "posterior"]
+
+
+def test_snapshot_survives_compaction_and_delete(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_store_module, 'COMPACTION_MIN_BYTES', 0)
+    store = ReviewStore(str(tmp_path), memory_budget=1 << 20)
+    store.append(1, 10, "descartada")
+    store.append(1, 20, "vigente")
+    store.append(2, 30, "borrada")
+    store.flush()
+
+    snapshot = store.snapshot()
+    store.discard(1, 10)  # Compacta el segmento del cliente 1
+    store.delete_client(2)
+
+    assert list(snapshot.iter_texts(1, 10)) == ["descartada"]
+    assert list(snapshot.iter_texts(1, 20)) == ["vigente"]
+    assert list(snapshot.iter_texts(2, 30)) == ["borrada"]
+    assert list(store.iter_texts(1, 20)) == ["vigente"]
+    assert len(os.listdir(tmp_path)) == 3
+
+    # Al cerrar la foto se borran los segmentos que ya no se usan
+    snapshot.close()
+    assert len(os.listdir(tmp_path)) == 1
+    assert list(store.iter_texts(1, 20)) == ["vigente"]
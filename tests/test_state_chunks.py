@@ -0,0 +1,87 @@
+from messages.messages import decode_msg, encode_state_chunks
+from utils.review_store import ReviewStore
+
+
+def merge(target: dict, data: dict):
+    """Une un chunk al estado como lo hacen los que lo cargan: los dicts y las listas de sets se mezclan."""
+    for key, value in data.items():
+        if isinstance(value, dict):
+            merge(target.setdefault(key, {}), value)
+        elif isinstance(value, list) and isinstance(target.get(key), list):
+            target[key].extend(value)
+        else:
+            target[key] = value
+
+
+def decode_chunks(chunks) -> list:
+    return [decode_msg(chunk) for chunk in chunks]
+
+
+def test_small_state_fits_in_one_chunk():
+    chunks = decode_chunks(encode_state_chunks([("count", {1: {10: 2}}), ("fins", {1: [True, False]})], node_id=3, max_size=1024))
+
+    assert len(chunks) == 1
+    assert chunks[0].msg_id == 0
+    assert chunks[0].node_id == 3
+    assert chunks[0].data == {"count": {1: {10: 2}}, "fins": {1: [True, False]}}
+
+
+def test_clients_and_sets_are_split_across_chunks():
+    games = {1: set(range(50)), 2: {7}}
+    chunks = decode_chunks(encode_state_chunks([("games", games), ("fins", {1: [True, True]})], node_id=1, max_size=40))
+
+    assert len(chunks) > 2
+    assert [chunk.msg_id for chunk in chunks] == list(range(len(chunks)))
+    # El primer cliente no entra en un solo chunk: sus juegos se reparten
+    assert sum(1 for chunk in chunks if 1 in chunk.data.get("games", {})) > 1
+
+    state = {}
+    for chunk in chunks:
+        merge(state, chunk.data)
+    assert {client_id: set(app_ids) for client_id, app_ids in state["games"].items()} == games
+    assert state["fins"] == {1: [True, True]}
+
+
+def test_same_state_is_always_split_the_same_way():
+    state = [("names", {2: {5: "b", 1: "a"}, 1: {3: "c"}}), ("games", {1: {9, 2, 5}})]
+
+    assert list(encode_state_chunks(state, 1, 20)) == list(encode_state_chunks(state, 1, 20))
+
+
+def test_iterators_are_split_lazily():
+    consumed = []
+
+    def texts():
+        for position, text in enumerate(["uno", "dos", "tres", "cuatro"]):
+            consumed.append(position)
+            yield position, text
+
+    chunks = encode_state_chunks([("reviews", {1: {10: texts()}})], node_id=1, max_size=30)
+
+    first = decode_msg(next(chunks))
+    assert consumed[-1] < 3
+    assert first.data["reviews"][1][10][0] == "uno"
+
+    state = first.data
+    for chunk in chunks:
+        merge(state, decode_msg(chunk).data)
+    assert state["reviews"][1][10] == {0: "uno", 1: "dos", 2: "tres", 3: "cuatro"}
+
+
+def test_empty_containers_are_kept():
+    chunks = decode_chunks(encode_state_chunks([("games", {1: set()}), ("names", {2: {}})], node_id=1, max_size=1024))
+
+    assert chunks[0].data == {"games": {1: []}, "names": {2: {}}}
+
+
+def test_review_texts_can_be_reloaded_from_the_start(tmp_path):
+    store = ReviewStore(str(tmp_path), memory_budget=1024)
+    store.append(1, 10, "vieja")
+
+    store.load_texts(1, 10, {0: "uno", 1: "dos"})
+    store.load_texts(1, 10, {2: "tres"})
+    # Al reaplicar desde el primer chunk se reemplazan las que ya estaban
+    store.load_texts(1, 10, {0: "uno", 1: "dos"})
+    store.load_texts(1, 10, {2: "tres"})
+
+    assert list(store.iter_texts(1, 10)) == ["uno", "dos", "tres"]
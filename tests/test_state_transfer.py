@@ -0,0 +1,122 @@
+import uuid
+
+import pytest
+
+from middleware import middleware as middleware_module
+import utils.state_transfer
+from messages.messages import MsgType, PushDataMessage, SimpleMessage
+from middleware.middleware import Middleware
+from utils.state_transfer import StateTransferError, receive_state
+
+
+@pytest.fixture
+def state_queue(monkeypatch):
+    monkeypatch.setattr(middleware_module, 'MIDDLEWARE_BACKEND', 'memory')
+    monkeypatch.setattr(utils.state_transfer, 'STATE_STREAM_TIMEOUT', 0.2)
+    monkeypatch.setattr(utils.state_transfer, 'STATE_STREAM_CHECK_INTERVAL', 0.05)
+    monkeypatch.setattr(utils.state_transfer, 'STATE_STREAM_RETRIES', 3)
+    instance = Middleware()
+    queue = f'state-{uuid.uuid4().hex}'
+    instance.declare_queue(queue)
+    yield instance, queue
+    instance.close()
+
+
+class FakeReplicas:
+    """
+    Réplicas que responden los pedidos de estado publicando en la cola del que lo pide.
+    `streams[réplica]` tiene, para cada pedido, cuántos chunks envía antes de caerse (None: todos)
+    o 'empty' si responde EMPTY_STATE.
+    """
+
+    def __init__(self, middleware, queue, states, streams):
+        self.middleware = middleware
+        self.queue = queue
+        self.states = states  # réplica -> (last_msg_id, chunks)
+        self.streams = streams
+        self.requests = []
+
+    def offer(self):
+        for replica_id, (last_msg_id, _) in self.states.items():
+            self.send(SimpleMessage(type=MsgType.STATE_OFFER, node_id=replica_id, msg_id=last_msg_id))
+
+    def request_stream(self, replica_id, cursor):
+        self.requests.append((replica_id, cursor))
+        behaviour = self.streams[replica_id].pop(0) if self.streams.get(replica_id) else None
+        if behaviour == 'empty':
+            self.send(SimpleMessage(type=MsgType.EMPTY_STATE, node_id=replica_id))
+            return
+        if behaviour == 'silent':
+            return
+        last_msg_id, chunks = self.states[replica_id]
+        self.send(SimpleMessage(type=MsgType.STATE_OFFER, node_id=replica_id, msg_id=last_msg_id))
+        sent = chunks[cursor:] if behaviour is None else chunks[cursor:cursor + behaviour]
+        for seq, chunk in enumerate(sent, start=cursor):
+            self.send(PushDataMessage(data=chunk, node_id=replica_id, msg_id=seq))
+        if behaviour is None:
+            self.send(PushDataMessage(data={"last_msg_id": last_msg_id}, node_id=replica_id, msg_id=len(chunks)))
+
+    def send(self, msg):
+        self.middleware.send_to_queue(self.queue, msg.encode())
+
+
+def transfer(middleware, queue, replicas, last_msg_id=0):
+    loaded = []
+    replicas.offer()
+    result = receive_state(middleware, queue, len(replicas.states), last_msg_id, replicas.request_stream,
+                           lambda msg: loaded.append((msg.node_id, msg.data)), 'test')
+    return result, loaded
+
+
+def test_loads_the_most_recent_state(state_queue):
+    replicas = FakeReplicas(*state_queue, {1: (5, [{"a": 1}]), 2: (7, [{"b": 1}, {"b": 2}])}, {})
+
+    result, loaded = transfer(*state_queue, replicas)
+
+    assert result == 7
+    assert replicas.requests == [(2, 0)]
+    assert loaded == [(2, {"b": 1}), (2, {"b": 2}), (2, {"last_msg_id": 7})]
+
+
+def test_returns_none_without_a_newer_state(state_queue):
+    replicas = FakeReplicas(*state_queue, {1: (5, [{"a": 1}])}, {})
+
+    assert transfer(*state_queue, replicas, last_msg_id=5) == (None, [])
+    assert replicas.requests == []
+
+
+def test_resumes_from_the_cursor_when_the_stream_stalls(state_queue):
+    replicas = FakeReplicas(*state_queue, {1: (7, [{"a": 1}, {"a": 2}, {"a": 3}])}, {1: [2]})
+
+    result, loaded = transfer(*state_queue, replicas)
+
+    assert result == 7
+    assert replicas.requests == [(1, 0), (1, 2)]
+    assert [data for _, data in loaded] == [{"a": 1}, {"a": 2}, {"a": 3}, {"last_msg_id": 7}]
+
+
+def test_falls_back_to_the_next_replica_when_the_sender_is_silent(state_queue):
+    replicas = FakeReplicas(*state_queue, {1: (5, [{"a": 1}]), 2: (7, [{"b": 1}])}, {2: ['silent']})
+
+    result, loaded = transfer(*state_queue, replicas)
+
+    assert result == 5
+    assert replicas.requests == [(2, 0), (1, 0)]
+    assert loaded == [(1, {"a": 1}), (1, {"last_msg_id": 5})]
+
+
+def test_falls_back_to_the_next_replica_on_empty_state(state_queue):
+    replicas = FakeReplicas(*state_queue, {1: (5, [{"a": 1}]), 2: (7, [{"b": 1}])}, {2: ['empty']})
+
+    result, _ = transfer(*state_queue, replicas)
+
+    assert result == 5
+    assert replicas.requests == [(2, 0), (1, 0)]
+
+
+def test_raises_after_the_retries(state_queue):
+    replicas = FakeReplicas(*state_queue, {1: (5, [{"a": 1}])}, {1: ['silent'] * 10})
+
+    with pytest.raises(StateTransferError):
+        transfer(*state_queue, replicas)
+    assert len(replicas.requests) == 1 + utils.state_transfer.STATE_STREAM_RETRIES